@@ -0,0 +1,93 @@
+from typing import TypeVar
+from sqlmodel import Session, SQLModel
+from sqlalchemy.dialects import postgresql, sqlite
+
+# Rows per INSERT statement, keeps wide tables well under the bind parameter limit
+BULK_INSERT_CHUNK_SIZE = 500
+
+# Rows fetched per round trip when streaming an export through a server-side cursor
+EXPORT_BATCH_SIZE = 1000
+
+ModelType = TypeVar("ModelType", bound=SQLModel)
+
+
+def dialect_insert(db: Session, model):
+    """Return an INSERT construct for the model that supports ON CONFLICT clauses.
+
+    PostgreSQL is the production database; SQLite is used by the test suite.
+    """
+    if db.get_bind().dialect.name == "sqlite":
+        return sqlite.insert(model)
+    return postgresql.insert(model)
+
+
+def _insert_row(table, record: SQLModel) -> dict:
+    """Return the column values to insert for a record.
+
+    Fields left unset with no value are omitted rather than sent as NULL, so
+    server defaults apply; Python-side defaults are still sent. An unset
+    primary key is left to the database to generate.
+    """
+    fields_set = record.model_fields_set
+    row = {}
+    for column in table.columns:
+        value = getattr(record, column.name)
+        if value is None and (column.primary_key or column.name not in fields_set):
+            continue
+        row[column.name] = value
+    return row
+
+
+def bulk_insert_returning(db: Session,
+                          model: type[ModelType],
+                          records: list[SQLModel],
+                          conflict_columns: list[str] = None,
+                          update_on_conflict: bool = False,
+                          chunk_size: int = BULK_INSERT_CHUNK_SIZE) -> list[ModelType]:
+    """Insert records in bulk and read back generated keys and defaults with RETURNING.
+
+    With conflict_columns, rows that already exist are updated when
+    update_on_conflict is set and skipped otherwise. Returns new model
+    instances for the written rows in input order; skipped rows are left out.
+    The caller is responsible for committing.
+
+    Rows are grouped by the columns they set, so every statement is uniform.
+    Without conflict_columns each group runs as an executemany whose RETURNING
+    rows SQLAlchemy sorts into parameter order. With them a row may be
+    skipped, which that sorting cannot handle, so each chunk is one multi-row
+    INSERT and its returned rows are matched back by the conflict key.
+    """
+    table = model.__table__
+    groups: dict[tuple[str, ...], list[tuple[int, dict]]] = {}
+    for position, record in enumerate(records):
+        row = _insert_row(table, record)
+        groups.setdefault(tuple(row), []).append((position, row))
+    if not groups:
+        return []
+
+    written: dict[int, ModelType] = {}
+    for columns, group in groups.items():
+        stmt = dialect_insert(db, model)
+        if conflict_columns and update_on_conflict:
+            stmt = stmt.on_conflict_do_update(
+                index_elements=conflict_columns,
+                set_={name: stmt.excluded[name] for name in columns if name not in conflict_columns}
+            )
+        elif conflict_columns:
+            stmt = stmt.on_conflict_do_nothing(index_elements=conflict_columns)
+
+        for start in range(0, len(group), chunk_size):
+            chunk = group[start:start + chunk_size]
+            if conflict_columns:
+                positions = {tuple(row[name] for name in conflict_columns): position
+                             for position, row in chunk}
+                result = db.execute(stmt.values([row for _, row in chunk]).returning(*table.columns))
+                for returned in result.mappings():
+                    key = tuple(returned[name] for name in conflict_columns)
+                    written[positions[key]] = model(**returned)
+            else:
+                result = db.execute(stmt.returning(*table.columns, sort_by_parameter_order=True),
+                                    [row for _, row in chunk])
+                written.update((position, model(**returned))
+                               for (position, _), returned in zip(chunk, result.mappings()))
+    return [written[position] for position in sorted(written)]
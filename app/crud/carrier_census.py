@@ -0,0 +1,127 @@
+import logging
+from datetime import datetime
+from typing import Iterator
+from sqlalchemy import func, union
+from sqlmodel import Session, select
+from app.models.carrier_census import CarrierCensus, CarrierCensusImport
+from app.models.carrier_data import CarrierData
+from app.crud.bulk import dialect_insert
+
+# Set up a module-level logger
+logger = logging.getLogger(__name__)
+
+
+def get_census_carriers(db: Session, usdot_numbers: list[str]) -> dict[str, CarrierCensus]:
+    """Retrieves census records for the given USDOT numbers with one primary key lookup, keyed by USDOT."""
+    if not usdot_numbers:
+        return {}
+
+    carriers = db.exec(
+        select(CarrierCensus).where(CarrierCensus.usdot.in_(usdot_numbers))
+    ).all()
+    logger.info(f"🔍 Found {len(carriers)} of {len(usdot_numbers)} carriers in the FMCSA census.")
+    return {carrier.usdot: carrier for carrier in carriers}
+
+
+def stream_known_usdots(db: Session, batch_size: int = 10000) -> Iterator[str]:
+    """Yields every USDOT number in CarrierData or the census once, in numeric order.
+
+    Ordering by length first sorts digit strings numerically. Rows are fetched
+    batch_size at a time from a server-side cursor.
+    """
+    known = union(select(CarrierData.usdot), select(CarrierCensus.usdot)).subquery()
+    query = select(known.c.usdot).order_by(func.length(known.c.usdot), known.c.usdot)
+    streamed = 0
+    for usdot in db.exec(query.execution_options(yield_per=batch_size)):
+        streamed += 1
+        yield usdot
+
+    logger.info(f"✅ Streamed {streamed} known USDOT numbers.")
+
+
+def start_census_import(db: Session,
+                        source: str,
+                        file_size: int,
+                        restart: bool = False) -> CarrierCensusImport:
+    """Returns the progress of the census import for a file, creating it when needed.
+
+    An import of the same file (name and size) continues from its saved
+    offset. A different file, or restart=True, starts again from the top.
+    """
+    progress = db.get(CarrierCensusImport, source)
+    if progress and progress.file_size == file_size and not restart:
+        logger.info(f"🔍 Resuming census import of {source} at byte {progress.byte_offset}, "
+                    f"{progress.rows_imported} rows imported.")
+        return progress
+
+    now = datetime.utcnow()
+    if progress is None:
+        progress = CarrierCensusImport(source=source, file_size=file_size)
+    progress.file_size = file_size
+    progress.byte_offset = 0
+    progress.rows_imported = 0
+    progress.rows_skipped = 0
+    progress.started_at = now
+    progress.updated_at = now
+    progress.completed_at = None
+    try:
+        db.add(progress)
+        db.commit()
+        db.refresh(progress)
+        logger.info(f"🔍 Starting census import of {source} ({file_size} bytes).")
+        return progress
+    except Exception as e:
+        logger.error(f"❌ Error starting census import: {e}")
+        db.rollback()
+        raise
+
+
+def save_census_batch(db: Session,
+                      progress: CarrierCensusImport,
+                      records: list[dict],
+                      byte_offset: int,
+                      rows_skipped: int = 0) -> CarrierCensusImport:
+    """Upserts a batch of census records and saves the import progress in the same transaction.
+
+    byte_offset is the end of the last row of the batch, so a resumed import
+    never loses or repeats a saved row.
+    """
+    now = datetime.utcnow()
+    try:
+        if records:
+            rows = [{**record, "imported_at": now} for record in records]
+            stmt = dialect_insert(db, CarrierCensus)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[CarrierCensus.usdot],
+                set_={name: stmt.excluded[name] for name in rows[0] if name != "usdot"}
+            )
+            db.execute(stmt, rows)
+
+        progress.byte_offset = byte_offset
+        progress.rows_imported += len(records)
+        progress.rows_skipped += rows_skipped
+        progress.updated_at = now
+        db.add(progress)
+        db.commit()
+        db.refresh(progress)
+        return progress
+    except Exception as e:
+        logger.error(f"❌ Error saving census batch: {e}")
+        db.rollback()
+        raise
+
+
+def complete_census_import(db: Session, progress: CarrierCensusImport) -> CarrierCensusImport:
+    """Marks a census import as finished."""
+    try:
+        progress.completed_at = datetime.utcnow()
+        db.add(progress)
+        db.commit()
+        db.refresh(progress)
+        logger.info(f"✅ Census import of {progress.source} finished: {progress.rows_imported} rows imported, "
+                    f"{progress.rows_skipped} skipped.")
+        return progress
+    except Exception as e:
+        logger.error(f"❌ Error completing census import: {e}")
+        db.rollback()
+        raise
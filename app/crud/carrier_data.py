@@ -1,8 +1,10 @@
 import logging
-from sqlmodel import Session
+from datetime import datetime, timedelta
+from sqlmodel import Session, select
 from app.models.carrier_data import CarrierData, CarrierDataCreate
 from app.crud.ocr_results import get_ocr_results
-from app.crud.engagement import generate_engagement_records
+from app.crud.engagement import insert_engagement_records_bulk
+from app.crud.bulk import bulk_insert_returning
 from fastapi import HTTPException
 
 # Set up a module-level logger
@@ -51,6 +53,29 @@ def get_carrier_data_by_dot(db: Session, dot_number: str) -> CarrierData:
 
     return carrier
 
+def get_fresh_carrier_data(db: Session,
+                           usdot_numbers: list[str],
+                           max_age_seconds: float) -> dict[str, CarrierData]:
+    """Retrieves carriers whose SAFER data was looked up within max_age_seconds, keyed by USDOT."""
+    if not usdot_numbers:
+        return {}
+
+    cutoff = datetime.utcnow() - timedelta(seconds=max_age_seconds)
+    carriers = db.query(CarrierData)\
+                 .filter(CarrierData.usdot.in_(usdot_numbers),
+                         CarrierData.lookup_timestamp >= cutoff)\
+                 .all()
+    logger.info(f"🔍 Found {len(carriers)} of {len(usdot_numbers)} carriers with fresh SAFER data.")
+    return {carrier.usdot: carrier for carrier in carriers}
+
+def get_stored_usdots(db: Session, usdot_numbers: list[str]) -> set[str]:
+    """Returns the USDOT numbers that already have a CarrierData row."""
+    if not usdot_numbers:
+        return set()
+
+    return set(db.exec(select(CarrierData.usdot)
+                       .where(CarrierData.usdot.in_(usdot_numbers))).all())
+
 def save_carrier_data(db: Session, carrier_data: CarrierDataCreate) -> CarrierData:
     """Saves carrier data to the database, performing upsert based on DOT number."""
     logger.info("🔍 Saving carrier data to the database.")
@@ -81,65 +106,50 @@ def save_carrier_data(db: Session, carrier_data: CarrierDataCreate) -> CarrierDa
         raise HTTPException(status_code=500, detail=str(e))
     
 
-def generate_carrier_records(db: Session, 
+def upsert_carrier_data_bulk(db: Session,
                              carrier_data: list[CarrierDataCreate]) -> list[CarrierData]:
-    """Saves multiple carrier data records to the database, performing upserts."""
-    logger.info("🔍 Saving multiple carrier data records to the database.")
-    carrier_records = []
-    
+    """Inserts or updates carriers with INSERT ... ON CONFLICT (usdot) DO UPDATE.
+
+    The stored rows come back through RETURNING, so no per-carrier SELECT or
+    refresh is needed. The caller is responsible for committing.
+    """
+    # Postgres rejects a statement that updates the same row twice, the last record for a USDOT wins
+    carrier_records = {}
     for data in carrier_data:
-        try:
-            logger.info("🔍 Validating carrier data.")
-            carrier_record = CarrierData.model_validate(data)
-
-            # Check if the carrier with the same USDOT number already exists
-            existing_carrier = db.query(CarrierData).filter(CarrierData.usdot == data.usdot).first()
-            
-            if existing_carrier:
-                logger.info(f"🔍 Carrier with USDOT {data.usdot} exists. Updating record.")
-                for key, value in carrier_record.dict().items():
-                    setattr(existing_carrier, key, value)
-                carrier_records.append(existing_carrier)
-            else:
-                logger.info(f"🔍 Carrier with USDOT {data.usdot} does not exist. Inserting new record.")
-                carrier_records.append(carrier_record)
-
-        except Exception as e:
-            logger.error(f"❌ Error processing carrier data: {e}")
-            raise HTTPException(status_code=500, detail=str(e))
-    return carrier_records
+        carrier_records[data.usdot] = CarrierData.model_validate(data)
+
+    logger.info(f"🔍 Upserting {len(carrier_records)} carrier records.")
+    return bulk_insert_returning(db, CarrierData, list(carrier_records.values()),
+                                 conflict_columns=["usdot"],
+                                 update_on_conflict=True)
 
 
 def save_carrier_data_bulk(db: Session, 
                            carrier_data: list[CarrierDataCreate],
                            user_id: str,
                            org_id: str) -> list[CarrierData]:
-    """Saves multiple carrier data records to the database, performing upserts."""
-    usdot_numbers = [data.usdot for data in carrier_data if data.lookup_success_flag]
-    carrier_records = generate_carrier_records(db, carrier_data)
-    engagement_records = generate_engagement_records(db,
-                                                    usdot_numbers,
-                                                    user_id=user_id,
-                                                    org_id=org_id)
-    if carrier_records and engagement_records and len(carrier_records) == len(engagement_records):
-        try:
-            logger.info(f"🔍 Saving {len(carrier_records)} carrier records to the database in bulk.")
-            db.add_all(carrier_records)
-            db.add_all(engagement_records)
-            db.commit()
-            
-            
-            # Refresh all records to get the latest state
-            for carrier_record, engagement_record in zip(carrier_records, engagement_records):
-                db.refresh(carrier_record)
-                db.refresh(engagement_record)
-
-            logger.info("✅ All carrier records saved successfully.")
-            return carrier_records
-        except Exception as e:
-            logger.error(f"❌ Error saving carrier records in bulk: {e}")
-            db.rollback()
-            raise HTTPException(status_code=500, detail=str(e))
-    else:
+    """Saves multiple carrier data records to the database, performing upserts.
+
+    Carriers the org has not engaged yet get an engagement record. Carriers
+    that are already engaged are still updated.
+    """
+    if not carrier_data:
         logger.warning("⚠ No valid carrier records to save.")
-    return []
\ No newline at end of file
+        return []
+
+    usdot_numbers = [data.usdot for data in carrier_data if data.lookup_success_flag]
+    try:
+        logger.info(f"🔍 Saving {len(carrier_data)} carrier records to the database in bulk.")
+        carrier_records = upsert_carrier_data_bulk(db, carrier_data)
+        engagement_records = insert_engagement_records_bulk(db,
+                                                            usdot_numbers,
+                                                            user_id=user_id,
+                                                            org_id=org_id)
+        db.commit()
+
+        logger.info(f"✅ All carrier records saved successfully, {len(engagement_records)} new engagement records.")
+        return carrier_records
+    except Exception as e:
+        logger.error(f"❌ Error saving carrier records in bulk: {e}")
+        db.rollback()
+        raise HTTPException(status_code=500, detail=str(e))
@@ -1,101 +1,248 @@
 import re
 import logging
-from sqlmodel import Session
+from sqlmodel import Session, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlalchemy import Row, tuple_, update
 from app.models.carrier_data import CarrierData
-from app.models.engagement import CarrierChangeItem, CarrierEngagementStatus
+from app.models.engagement import (CarrierChangeItem, CarrierChangeResult, CarrierEngagementStatus,
+                                   CarrierWithEngagementResponse, CarrierPageResponse)
+from app.models.sobject_sync_status import SObjectSyncStatus
+from app.crud.bulk import EXPORT_BATCH_SIZE, bulk_insert_returning
+from app.helpers.pagination import encode_cursor
 from datetime import datetime
+from typing import Iterator
 from fastapi import HTTPException
+from pydantic import ValidationError
 
 # Set up a module-level logger
 logger = logging.getLogger(__name__)
 
+# Engagement flags, each with a _timestamp and _by_user_id column recording the last change
+ENGAGEMENT_FLAG_FIELDS = ["carrier_interested", "carrier_contacted", "carrier_followed_up", "carrier_emailed"]
+
+# Dashboard sort order and keyset pagination key, matches ix_carrierengagementstatus_org_created_usdot
+ENGAGEMENT_SORT_KEY = tuple_(CarrierEngagementStatus.created_at, CarrierEngagementStatus.usdot)
+
 def get_engagement_data(db: Session, 
                         org_id: str = None,
                         offset: int = None, 
                         limit: int = None,
                         carrier_interested: bool = None,
-                        carrier_contacted: bool = None) -> list[CarrierEngagementStatus]:
-    """Retrieves carrier engagement statuses from the database."""
+                        carrier_contacted: bool = None,
+                        cursor: tuple[datetime, str] = None) -> list[CarrierEngagementStatus]:
+    """Retrieves carrier engagement statuses from the database.
+
+    Records are ordered newest first by (created_at, usdot). A cursor of the
+    last record's (created_at, usdot) returns the records after it. Filters
+    and paging are those of the dashboard, see _engagement_page_query.
+    """
+    query = _engagement_page_query(select(CarrierEngagementStatus), org_id, offset, limit,
+                                   carrier_interested, carrier_contacted, cursor)
+    carriers = db.exec(query).all()
+
+    logger.info(f"✅ Found {len(carriers)} carrier engagement records.")
+
+    return carriers
 
+
+def _engagement_page_query(query,
+                           org_id: str = None,
+                           offset: int = None,
+                           limit: int = None,
+                           carrier_interested: bool = None,
+                           carrier_contacted: bool = None,
+                           cursor: tuple[datetime, str] = None):
+    """Apply the dashboard filters, sort order and page range to a select over CarrierEngagementStatus."""
     if org_id:
-        carriers = db.query(CarrierEngagementStatus).filter(CarrierEngagementStatus.org_id == org_id)
+        query = query.where(CarrierEngagementStatus.org_id == org_id)
     else:
         logger.info("🔍 Fetching all carrier engagement status without group filtering.")
-        carriers = db.query(CarrierEngagementStatus)
 
     if carrier_interested is not None:
         logger.info("🔍 Filtering carrier data for interested carriers.")
-        carriers = carriers.filter(CarrierEngagementStatus.carrier_interested == carrier_interested)
+        query = query.where(CarrierEngagementStatus.carrier_interested == carrier_interested)
 
     if carrier_contacted is not None:
         logger.info("🔍 Filtering carrier data for contacted carriers.")
-        carriers = carriers.filter(CarrierEngagementStatus.carrier_contacted == carrier_contacted)
+        query = query.where(CarrierEngagementStatus.carrier_contacted == carrier_contacted)
+
+    if cursor is not None:
+        logger.info(f"🔍 Continuing after cursor: {cursor}")
+        query = query.where(ENGAGEMENT_SORT_KEY < tuple_(*cursor))
 
     # Order by timestamp descending (newest first)
-    carriers = carriers.order_by(CarrierEngagementStatus.created_at.desc())
+    query = query.order_by(CarrierEngagementStatus.created_at.desc(),
+                           CarrierEngagementStatus.usdot.desc())
 
     if offset is not None and limit is not None:
         logger.info(f"🔍 Applying offset: offset={offset}, limit={limit}")
-        carriers = carriers.offset(offset).limit(limit)
-    else:
-        logger.info("🔍 Offset is disabled.")
+        query = query.offset(offset).limit(limit)
+    return query
 
-    carriers = carriers.all()
 
-    logger.info(f"✅ Found {len(carriers)} carrier engagement records.")
+def _carrier_dashboard_select():
+    """Select the carrier dashboard columns: engagement status, carrier fields and the org's sync status."""
+    return select(CarrierEngagementStatus.usdot,
+                  CarrierEngagementStatus.created_at,
+                  CarrierEngagementStatus.carrier_interested,
+                  CarrierEngagementStatus.carrier_contacted,
+                  CarrierEngagementStatus.carrier_followed_up,
+                  CarrierEngagementStatus.carrier_follow_up_by_date,
+                  CarrierData.legal_name,
+                  CarrierData.phone,
+                  CarrierData.mailing_address,
+                  SObjectSyncStatus.sync_status.label("sf_sync_status"),
+                  SObjectSyncStatus.sobject_id.label("sf_sobject_id"),
+                  SObjectSyncStatus.updated_at.label("sf_sync_timestamp"))\
+               .join(CarrierData, CarrierData.usdot == CarrierEngagementStatus.usdot)\
+               .outerjoin(SObjectSyncStatus,
+                          (SObjectSyncStatus.usdot == CarrierEngagementStatus.usdot)
+                          & (SObjectSyncStatus.org_id == CarrierEngagementStatus.org_id))
 
-    return carriers
 
+async def get_engagement_rows_async(db: AsyncSession,
+                                    org_id: str = None,
+                                    offset: int = None,
+                                    limit: int = None,
+                                    carrier_interested: bool = None,
+                                    carrier_contacted: bool = None,
+                                    cursor: tuple[datetime, str] = None) -> list[Row]:
+    """Retrieves a page of the carrier dashboard as flat rows in a single query.
 
-def generate_engagement_records(db: Session, 
-                                usdot_numbers: list[int], 
-                                user_id: str, 
-                                org_id:str) -> list[CarrierData]:
-    """Generates engagement records for the given USDOT numbers."""
-    logger.info("🔍 Generating engagement records for carriers."
-                f"USDOT numbers: {usdot_numbers}, User ID: {user_id}, Org ID: {org_id}")
-    engagement_records = []
-    for usdot in usdot_numbers:
-        try:
+    Each row carries the engagement status, the carrier's name and contact
+    fields and the org's Salesforce sync status (sf_* columns, None when the
+    carrier was never synced). Filters and paging match get_engagement_data.
+    """
+    query = _carrier_dashboard_select()
+    query = _engagement_page_query(query, org_id, offset, limit,
+                                   carrier_interested, carrier_contacted, cursor)
+    rows = (await db.exec(query)).all()
+
+    logger.info(f"✅ Found {len(rows)} carrier dashboard rows.")
+    return rows
+
+
+async def get_carrier_dashboard_page_async(db: AsyncSession,
+                                           org_id: str = None,
+                                           offset: int = None,
+                                           limit: int = None,
+                                           carrier_interested: bool = None,
+                                           carrier_contacted: bool = None,
+                                           cursor: tuple[datetime, str] = None) -> CarrierPageResponse:
+    """Reads a page of the carrier dashboard, ready to return to the client.
+
+    The page comes from the single statement of get_engagement_rows_async, so
+    building it costs one indexed query regardless of the page size.
+    next_cursor is set when the page is full and there may be more rows.
+    """
+    rows = await get_engagement_rows_async(db,
+                                           org_id=org_id,
+                                           offset=offset,
+                                           carrier_contacted=carrier_contacted,
+                                           carrier_interested=carrier_interested,
+                                           limit=limit,
+                                           cursor=cursor)
+
+    items = [
+        CarrierWithEngagementResponse(
+            usdot=row.usdot,
+            legal_name=row.legal_name,
+            phone=row.phone,
+            mailing_address=row.mailing_address,
+            created_at=row.created_at.strftime("%Y-%m-%d %H:%M:%S"),
+            carrier_interested=row.carrier_interested,
+            carrier_contacted=row.carrier_contacted,
+            carrier_followed_up=row.carrier_followed_up,
+            carrier_follow_up_by_date=row.carrier_follow_up_by_date.strftime("%Y-%m-%d")
+                if row.carrier_follow_up_by_date else None,
+            # Salesforce sync status, None when the carrier was never synced
+            sf_sync_status=row.sf_sync_status,
+            sf_sobject_id=row.sf_sobject_id,
+            sf_sync_timestamp=row.sf_sync_timestamp.strftime("%Y-%m-%d %H:%M:%S")
+                if row.sf_sync_timestamp else None
+        )
+        for row in rows
+    ]
+
+    # The cursor keeps the full created_at precision, the formatted value drops microseconds
+    next_cursor = (encode_cursor(rows[-1].created_at, rows[-1].usdot)
+                   if rows and len(rows) == limit else None)
+    return CarrierPageResponse(items=items, next_cursor=next_cursor)
+
+
+def stream_engagement_export_rows(db: Session,
+                                  org_id: str = None,
+                                  batch_size: int = EXPORT_BATCH_SIZE) -> Iterator[Row]:
+    """Yields all of an org's carrier dashboard rows for export.
+
+    Rows have the columns of get_engagement_rows_async, in dashboard order, and
+    are fetched batch_size at a time from a server-side cursor so memory use
+    does not grow with the number of carriers.
+    """
+    query = _engagement_page_query(_carrier_dashboard_select(), org_id)
+    exported = 0
+    for row in db.exec(query.execution_options(yield_per=batch_size)):
+        exported += 1
+        yield row
+
+    logger.info(f"✅ Streamed {exported} carrier dashboard rows for export.")
+
+
+def stream_carrier_snapshot_rows(db: Session,
+                                 org_id: str,
+                                 column_names: list[str],
+                                 batch_size: int = EXPORT_BATCH_SIZE) -> Iterator[Row]:
+    """Yields the chosen CarrierData columns for every carrier the org has engaged.
+
+    Carriers come in dashboard order from a single join of the engagement
+    records and the carrier table, fetched batch_size rows at a time from a
+    server-side cursor.
+    """
+    query = select(*[CarrierData.__table__.columns[name] for name in column_names])\
+                .join(CarrierEngagementStatus, CarrierEngagementStatus.usdot == CarrierData.usdot)
+    query = _engagement_page_query(query, org_id)
+    exported = 0
+    for row in db.exec(query.execution_options(yield_per=batch_size)):
+        exported += 1
+        yield row
+
+    logger.info(f"✅ Streamed {exported} carrier snapshot rows for export.")
+
+
+def insert_engagement_records_bulk(db: Session,
+                                   usdot_numbers: list[str],
+                                   user_id: str,
+                                   org_id: str) -> list[CarrierEngagementStatus]:
+    """Creates engagement records for carriers the org has not engaged yet.
+
+    All rows go out in one INSERT ... ON CONFLICT (usdot, org_id) DO NOTHING
+    statement, so existing engagement (and its status flags) is left untouched.
+    Returns only the records that were created. The caller is responsible for committing.
+    """
+    usdot_numbers = list(dict.fromkeys(usdot_numbers))
+    if not usdot_numbers:
+        return []
+
+    logger.info(f"🔍 Creating engagement records for {len(usdot_numbers)} carriers, Org ID: {org_id}")
+    created_records = bulk_insert_returning(
+        db, CarrierEngagementStatus,
+        [CarrierEngagementStatus(usdot=usdot, org_id=org_id, user_id=user_id) for usdot in usdot_numbers],
+        conflict_columns=["usdot", "org_id"]
+    )
+    logger.info(f"✅ Created {len(created_records)} engagement records, "
+                f"{len(usdot_numbers) - len(created_records)} already existed.")
+    return created_records
 
-            # Check if the engagement record already exists
-            existing_engagement = db.query(CarrierEngagementStatus)\
-                                     .filter(CarrierEngagementStatus.usdot == usdot,
-                                             CarrierEngagementStatus.org_id == org_id)\
-                                     .first()
-            if existing_engagement:
-                logger.info(f"🔍 Engagement record already exists for USDOT: {usdot} and ORG {org_id}. Skipping.")
-                continue
 
-            # Create a new engagement record
-            engagement_record = CarrierEngagementStatus(
-                usdot=usdot,
-                org_id=org_id,
-                user_id=user_id,
-            )
-            engagement_records.append(engagement_record)
-
-        except Exception as e:
-            logger.error(f"❌ Error generating engagement record for USDOT {usdot}: {e}")
-            raise HTTPException(status_code=500, detail=str(e))
-        
-    return engagement_records
-    
 def save_engagement_records_bulk(db: Session,
-                                 usdot_numbers: list[int], 
+                                 usdot_numbers: list[str], 
                                  user_id: str, 
-                                 org_id:str) -> None:
-    """Saves multiple engagement records to the database."""
-    engagement_records = generate_engagement_records(db, usdot_numbers, user_id, org_id)
+                                 org_id:str) -> list[CarrierEngagementStatus]:
+    """Saves engagement records for the given USDOT numbers, skipping existing ones."""
     try:
-        logger.info(f"🔍 Saving {len(engagement_records)} engagement records to the database.")
-        db.add_all(engagement_records)
+        engagement_records = insert_engagement_records_bulk(db, usdot_numbers, user_id, org_id)
         db.commit()
 
-        # Refresh all records to get the latest state
-        for record in engagement_records:
-            db.refresh(record)
-
         logger.info("✅ All engagement records saved successfully.")
         return engagement_records
     except Exception as e:
@@ -105,8 +252,15 @@ def save_engagement_records_bulk(db: Session,
 
 
 
-def update_carrier_engagement(db: Session, carrier_change_item: dict) -> CarrierEngagementStatus:
-    """Updates carrier interests based on user input."""
+def update_carrier_engagement(db: Session,
+                              carrier_change_item: dict,
+                              org_id: str) -> CarrierEngagementStatus:
+    """Updates one engagement field of a carrier for the given org.
+
+    The record is addressed by its full (usdot, org_id) primary key, so another
+    org's engagement with the same carrier is never touched. Returns None when
+    the org has not engaged the carrier.
+    """
 
     carrier_change_item = CarrierChangeItem.model_validate(carrier_change_item)
     dot_number = carrier_change_item.usdot
@@ -114,28 +268,22 @@ def update_carrier_engagement(db: Session, carrier_change_item: dict) -> Carrier
     value = carrier_change_item.value
 
     try:
-        logger.info(f"Updating carrier interest for DOT number: {dot_number}, field: {field}, value: {value}, type: {type(value)}")
+        values = _engagement_update_values(field, value, carrier_change_item.user_id, datetime.now())
+    except ValueError as e:
+        logger.error(f"❌ Invalid field or value type for field: {field}, value: {value}")
+        raise HTTPException(status_code=400, detail=str(e))
+
+    try:
+        logger.info(f"Updating carrier interest for DOT number: {dot_number}, Org ID: {org_id}, field: {field}, value: {value}")
 
-        # Check if the carrier exists
-        carrier = db.query(CarrierEngagementStatus)\
-                    .filter(CarrierEngagementStatus.usdot == dot_number)\
-                    .first()
+        carrier = db.get(CarrierEngagementStatus, (dot_number, org_id))
         if not carrier:
-            logger.warning(f"⚠ No carrier found for DOT number: {dot_number}")
+            logger.warning(f"⚠ No engagement found for DOT number: {dot_number}, Org ID: {org_id}")
             return None
 
-        # Update the specified fields
-        if field in ["carrier_interested", "carrier_contacted", "carrier_followed_up", "carrier_emailed"]:
+        for name, column_value in values.items():
+            setattr(carrier, name, column_value)
 
-            setattr(carrier, field, value)
-            setattr(carrier, field + "_timestamp", datetime.now())
-            setattr(carrier, field + "_by_user_id", carrier_change_item.user_id)
-        elif field in CarrierEngagementStatus.__table__.columns and type(value) == str:
-            setattr(carrier, field, value)
-        else:
-            logger.error(f"❌ Invalid field or value type for field: {field}, value: {value}")
-            raise HTTPException(status_code=400, detail="Invalid field or value type")
-        
         db.commit()
         db.refresh(carrier)
         logger.info(f"✅ Carrier interests updated for DOT number: {dot_number}")
@@ -143,4 +291,92 @@ def update_carrier_engagement(db: Session, carrier_change_item: dict) -> Carrier
         logger.error(f"❌ Error updating carrier interests for DOT {dot_number}: {e}")
         db.rollback()
         raise HTTPException(status_code=500, detail=str(e))
-    return carrier
\ No newline at end of file
+    return carrier
+
+
+def _engagement_update_values(field: str, value, user_id: str, changed_at: datetime) -> dict:
+    """Translate one dashboard change into the column values it sets.
+
+    Raises ValueError for fields the dashboard may not change or values of the wrong type.
+    """
+    if field in ENGAGEMENT_FLAG_FIELDS:
+        if not isinstance(value, bool):
+            raise ValueError(f"{field} must be true or false")
+        return {field: value,
+                field + "_timestamp": changed_at,
+                field + "_by_user_id": user_id}
+    if field == "carrier_follow_up_by_date" and isinstance(value, (datetime, str)):
+        # An empty date input clears the follow up date
+        if isinstance(value, str):
+            value = datetime.fromisoformat(value) if value else None
+        return {field: value}
+    if field == "rental_notes" and isinstance(value, str):
+        if len(value) > 360:
+            raise ValueError("rental_notes is limited to 360 characters")
+        return {field: value}
+    raise ValueError(f"Invalid field or value type for field: {field}")
+
+
+def update_carrier_engagements_bulk(db: Session,
+                                    changes: list[dict],
+                                    org_id: str,
+                                    user_id: str) -> list[CarrierChangeResult]:
+    """Applies a batch of dashboard changes to the org's engagement records.
+
+    Every change is validated first. Invalid changes are reported and skipped.
+    The valid ones are grouped by field and value and written in one
+    transaction with one UPDATE ... WHERE org_id = :org_id AND usdot IN (...)
+    per group. When a carrier's field is changed twice, the last change wins.
+    Returns one result per change, in input order.
+    """
+    changed_at = datetime.now()
+    results = []
+    latest = {}  # (usdot, field) -> (result index, group) of the change that is applied
+    groups = {}  # (field, value) -> (column values, usdots)
+
+    for change in changes:
+        try:
+            item = CarrierChangeItem.model_validate(change)
+            values = _engagement_update_values(item.field, item.value, user_id, changed_at)
+        except (ValidationError, ValueError) as e:
+            change = change if isinstance(change, dict) else {}
+            results.append(CarrierChangeResult(usdot=change.get("usdot"), field=change.get("field"),
+                                               status="invalid", detail=str(e)))
+            continue
+
+        group_key = (item.field, values[item.field])
+        previous = latest.get((item.usdot, item.field))
+        if previous is not None:
+            previous_index, previous_group_key = previous
+            results[previous_index].status = "superseded"
+            groups[previous_group_key][1].discard(item.usdot)
+
+        results.append(CarrierChangeResult(usdot=item.usdot, field=item.field, status="not_found"))
+        latest[(item.usdot, item.field)] = (len(results) - 1, group_key)
+        groups.setdefault(group_key, (values, set()))[1].add(item.usdot)
+
+    logger.info(f"🔄 Applying {len(latest)} engagement changes in up to {len(groups)} updates, Org ID: {org_id}")
+    updated = set()
+    try:
+        for (field, _), (values, usdots) in groups.items():
+            if not usdots:
+                continue
+            stmt = update(CarrierEngagementStatus)\
+                    .where(CarrierEngagementStatus.org_id == org_id,
+                           CarrierEngagementStatus.usdot.in_(sorted(usdots)))\
+                    .values(**values)\
+                    .returning(CarrierEngagementStatus.usdot)
+            updated.update((usdot, field) for usdot in db.execute(stmt).scalars())
+        db.commit()
+    except Exception as e:
+        logger.error(f"❌ Error applying engagement changes: {e}")
+        db.rollback()
+        raise HTTPException(status_code=500, detail=str(e))
+
+    for key, (index, _) in latest.items():
+        if key in updated:
+            results[index].status = "updated"
+        else:
+            results[index].detail = f"No engagement record for DOT {key[0]} in this organization"
+    logger.info(f"✅ Updated {len(updated)} of {len(latest)} engagement changes.")
+    return results
@@ -1,19 +1,16 @@
 from sqlmodel import Session, select
+from sqlmodel.ext.asyncio.session import AsyncSession
 from datetime import datetime, timedelta
 from typing import Optional
 from app.models.oauth import OAuthToken
 from app.helpers.salesforce_auth import refresh_salesforce_token
 from fastapi import HTTPException
 
-def upsert_salesforce_token(db: Session, user_id: str, org_id: str, token_data: dict) -> OAuthToken:
-    """Upserts a Salesforce OAuth token for a user and organization.
-    If a token already exists, it updates the existing record; otherwise, it creates a new one.
-    """
-    stmt = select(OAuthToken).where(
-        OAuthToken.user_id == user_id,
-        OAuthToken.org_id == org_id
-    )
-    token_obj = db.exec(stmt).first()
+def _apply_salesforce_token(token_obj: Optional[OAuthToken],
+                            user_id: str,
+                            org_id: str,
+                            token_data: dict) -> OAuthToken:
+    """Copy Salesforce token data onto an existing token record, or build a new one."""
     token_issued_at = datetime.fromtimestamp(int(token_data.get('issued_at', 0)) / 1000)
     token_valid_until = token_issued_at + timedelta(seconds=7200)  # Assuming 2 hours validity
     if token_obj:
@@ -24,24 +21,50 @@ def upsert_salesforce_token(db: Session, user_id: str, org_id: str, token_data:
         token_obj.valid_until = token_valid_until
         token_obj.provider = 'salesforce'
         token_obj.token_data = token_data
-    else:
-        token_obj = OAuthToken(
-            user_id=user_id,
-            org_id=org_id,
-            provider='salesforce',
-            access_token=token_data.get('access_token'),
-            refresh_token=token_data.get('refresh_token'),
-            token_type=token_data.get('token_type'),
-            issued_at=token_issued_at,
-            valid_until=token_valid_until,
-            token_data=token_data
-        )
+        return token_obj
+    return OAuthToken(
+        user_id=user_id,
+        org_id=org_id,
+        provider='salesforce',
+        access_token=token_data.get('access_token'),
+        refresh_token=token_data.get('refresh_token'),
+        token_type=token_data.get('token_type'),
+        issued_at=token_issued_at,
+        valid_until=token_valid_until,
+        token_data=token_data
+    )
+
+
+def upsert_salesforce_token(db: Session, user_id: str, org_id: str, token_data: dict) -> OAuthToken:
+    """Upserts a Salesforce OAuth token for a user and organization.
+    If a token already exists, it updates the existing record; otherwise, it creates a new one.
+    """
+    stmt = select(OAuthToken).where(
+        OAuthToken.user_id == user_id,
+        OAuthToken.org_id == org_id
+    )
+    existing_token = db.exec(stmt).first()
+    token_obj = _apply_salesforce_token(existing_token, user_id, org_id, token_data)
+    if not existing_token:
         db.add(token_obj)
     db.commit()
     db.refresh(token_obj)
     return token_obj
 
 
+async def upsert_salesforce_token_async(db: AsyncSession, user_id: str, org_id: str, token_data: dict) -> OAuthToken:
+    """Async variant of upsert_salesforce_token."""
+    stmt = select(OAuthToken).where(
+        OAuthToken.user_id == user_id,
+        OAuthToken.org_id == org_id
+    )
+    token_obj = _apply_salesforce_token((await db.exec(stmt)).first(), user_id, org_id, token_data)
+    db.add(token_obj)
+    await db.commit()
+    await db.refresh(token_obj)
+    return token_obj
+
+
 async def get_valid_salesforce_token(db: Session, user_id: str, org_id:str) -> Optional[OAuthToken]:
     # 1. Get a valid Salesforce access token (refresh if needed)
 
@@ -64,7 +87,27 @@ async def get_valid_salesforce_token(db: Session, user_id: str, org_id:str) -> O
     else:
         return None
     return token_record
-    
+
+
+async def get_valid_salesforce_token_async(db: AsyncSession, user_id: str, org_id: str) -> Optional[OAuthToken]:
+    """Async variant of get_valid_salesforce_token, refreshes an expired token when possible."""
+    stmt = select(OAuthToken).where(
+        OAuthToken.user_id == user_id,
+        OAuthToken.org_id == org_id,
+        OAuthToken.provider == "salesforce"
+    )
+    token_record = (await db.exec(stmt)).first()
+
+    if not token_record or not token_record.access_token:
+        return None
+    if token_record.valid_until and token_record.valid_until < datetime.utcnow():
+        if not token_record.refresh_token:
+            return None  # No refresh token available, cannot refresh
+        token_record = await refresh_salesforce_token(token_record.refresh_token,
+                                                      user_id, org_id)
+        token_record = await upsert_salesforce_token_async(db, user_id, org_id, token_record.token_data)
+    return token_record
+
 
 def delete_salesforce_token(db: Session, user_id: str, org_id: str, provider: str) -> bool:
     """Deletes a Salesforce OAuth token for a user and organization."""
@@ -1,12 +1,22 @@
 import logging
-from sqlmodel import Session
-from app.models.ocr_results import OCRResult, OCRResultCreate
+from datetime import datetime, timedelta
+from typing import Iterator
+from sqlmodel import Session, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlalchemy import Row, delete, tuple_
+from app.models.ocr_results import OCRResult, OCRResultCreate, OCRTextCache
+from app.models.carrier_data import CarrierData
+from app.models.user_org_membership import AppUser, AppOrg
+from app.crud.bulk import EXPORT_BATCH_SIZE, dialect_insert, bulk_insert_returning
 from fastapi import HTTPException
 from sqlalchemy.orm import joinedload
 
 # Set up a module-level logger
 logger = logging.getLogger(__name__)
 
+# Lookup history sort order and keyset pagination key, matches ix_ocrresult_org_timestamp_id
+OCR_RESULT_SORT_KEY = tuple_(OCRResult.timestamp, OCRResult.id)
+
 
 def save_ocr_results_bulk(db: Session, ocr_results: list[OCRResult]) -> list[OCRResult]:
     """Saves multiple OCR results to the database."""
@@ -15,15 +25,11 @@ def save_ocr_results_bulk(db: Session, ocr_results: list[OCRResult]) -> list[OCR
     if ocr_results:
         try:
             logger.info(f"🔍 Saving {len(ocr_results)} OCR results to the database in bulk.")
-            db.add_all(ocr_results)
+            saved_results = bulk_insert_returning(db, OCRResult, ocr_results)
             db.commit()
 
-            # Refresh all records to get the latest state
-            for record in ocr_results:
-                db.refresh(record)
-
             logger.info("✅ All OCR results saved successfully.")
-            return ocr_results
+            return saved_results
         except Exception as e:
             logger.error(f"❌ Error saving OCR results in bulk: {e}")
             db.rollback()
@@ -72,8 +78,13 @@ def get_ocr_results(db: Session,
                     offset: int = None, 
                     limit: int = None, 
                     valid_dot_only: bool = True,
-                    eager_relations:bool = False) -> dict:
-    """Retrieves OCR results with a valid DOT number."""
+                    eager_relations:bool = False,
+                    cursor: tuple[datetime, int] = None) -> dict:
+    """Retrieves OCR results with a valid DOT number.
+
+    Results are ordered newest first by (timestamp, id). A cursor of the
+    last result's (timestamp, id) returns the results after it.
+    """
 
     query = db.query(OCRResult)
     if eager_relations:
@@ -88,8 +99,12 @@ def get_ocr_results(db: Session,
         logger.info("🔍 Filtering OCR results with a valid DOT number.")
         query = query.filter(OCRResult.dot_reading != None)
 
+    if cursor is not None:
+        logger.info(f"🔍 Continuing OCR results after cursor: {cursor}")
+        query = query.filter(OCR_RESULT_SORT_KEY < tuple_(*cursor))
+
     # Order by timestamp descending (newest first)
-    query = query.order_by(OCRResult.timestamp.desc())
+    query = query.order_by(OCRResult.timestamp.desc(), OCRResult.id.desc())
     
     if offset is not None and limit is not None:
         logger.info(f"🔍 Applying range to OCR results: offset={offset}, limit={limit}")
@@ -101,3 +116,149 @@ def get_ocr_results(db: Session,
         
     logger.info(f"✅ Found {len(results)} OCR results.")
     return results
+
+
+def _ocr_results_page_query(query,
+                            org_id: str = None,
+                            offset: int = None,
+                            limit: int = None,
+                            valid_dot_only: bool = True,
+                            cursor: tuple[datetime, int] = None):
+    """Apply the lookup history filters, sort order and page range to a select over OCRResult."""
+    if org_id:
+        logger.info(f"🔍 Filtering OCR results by org ID: {org_id}")
+        query = query.where(OCRResult.org_id == org_id)
+
+    if valid_dot_only:
+        logger.info("🔍 Filtering OCR results with a valid DOT number.")
+        query = query.where(OCRResult.dot_reading != None)
+
+    if cursor is not None:
+        logger.info(f"🔍 Continuing OCR results after cursor: {cursor}")
+        query = query.where(OCR_RESULT_SORT_KEY < tuple_(*cursor))
+
+    # Order by timestamp descending (newest first)
+    query = query.order_by(OCRResult.timestamp.desc(), OCRResult.id.desc())
+
+    if offset is not None and limit is not None:
+        logger.info(f"🔍 Applying range to OCR results: offset={offset}, limit={limit}")
+        query = query.offset(offset).limit(limit)
+    return query
+
+
+def _lookup_history_select():
+    """Select the lookup history columns: OCR result, carrier fields, uploader email and org name."""
+    return select(OCRResult.id,
+                  OCRResult.dot_reading,
+                  OCRResult.timestamp,
+                  OCRResult.filename,
+                  CarrierData.usdot.label("carrier_usdot"),
+                  CarrierData.legal_name,
+                  CarrierData.phone,
+                  CarrierData.mailing_address,
+                  AppUser.user_email,
+                  AppOrg.org_name)\
+               .outerjoin(CarrierData, CarrierData.usdot == OCRResult.dot_reading)\
+               .join(AppUser, AppUser.user_id == OCRResult.user_id)\
+               .join(AppOrg, AppOrg.org_id == OCRResult.org_id)
+
+
+async def get_ocr_result_rows_async(db: AsyncSession,
+                                    org_id: str = None,
+                                    offset: int = None,
+                                    limit: int = None,
+                                    valid_dot_only: bool = True,
+                                    cursor: tuple[datetime, int] = None) -> list[Row]:
+    """Retrieves a page of lookup history as flat rows in a single query.
+
+    Each row carries the OCR result, the carrier's name and contact fields
+    (carrier_usdot is None when the DOT reading has no carrier), the
+    uploader's email and the org name. Filters and paging match get_ocr_results.
+    """
+    query = _lookup_history_select()
+    query = _ocr_results_page_query(query, org_id, offset, limit, valid_dot_only, cursor)
+    rows = (await db.exec(query)).all()
+
+    logger.info(f"✅ Found {len(rows)} lookup history rows.")
+    return rows
+
+
+def stream_ocr_result_export_rows(db: Session,
+                                  org_id: str = None,
+                                  valid_dot_only: bool = False,
+                                  batch_size: int = EXPORT_BATCH_SIZE) -> Iterator[Row]:
+    """Yields all of an org's lookup history rows for export.
+
+    Rows have the columns of get_ocr_result_rows_async, newest first, and are
+    fetched batch_size at a time from a server-side cursor so memory use does
+    not grow with the number of OCR results.
+    """
+    query = _ocr_results_page_query(_lookup_history_select(), org_id, valid_dot_only=valid_dot_only)
+    exported = 0
+    for row in db.exec(query.execution_options(yield_per=batch_size)):
+        exported += 1
+        yield row
+
+    logger.info(f"✅ Streamed {exported} lookup history rows for export.")
+
+
+# OCR text cache operations
+def get_cached_ocr_texts(db: Session,
+                         content_hashes: list[str],
+                         max_age_seconds: float) -> dict[str, str]:
+    """Retrieves cached OCR text for the given image hashes that are newer than max_age_seconds."""
+    if not content_hashes:
+        return {}
+
+    cutoff = datetime.utcnow() - timedelta(seconds=max_age_seconds)
+    rows = db.exec(
+        select(OCRTextCache).where(
+            OCRTextCache.content_hash.in_(content_hashes),
+            OCRTextCache.created_at >= cutoff
+        )
+    ).all()
+    logger.info(f"🔍 Found {len(rows)} of {len(content_hashes)} image hashes in the OCR cache.")
+    return {row.content_hash: row.extracted_text for row in rows}
+
+
+def save_cached_ocr_texts(db: Session, entries: dict[str, str]) -> None:
+    """Upserts OCR text for the given image hashes in a single statement."""
+    if not entries:
+        return
+
+    now = datetime.utcnow()
+    stmt = dialect_insert(db, OCRTextCache).values([
+        {"content_hash": content_hash, "extracted_text": text, "created_at": now}
+        for content_hash, text in entries.items()
+    ])
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[OCRTextCache.content_hash],
+        set_={"extracted_text": stmt.excluded.extracted_text,
+              "created_at": stmt.excluded.created_at}
+    )
+    try:
+        db.execute(stmt)
+        db.commit()
+        logger.info(f"✅ Saved {len(entries)} entries to the OCR cache.")
+    except Exception as e:
+        logger.error(f"❌ Error saving OCR cache entries: {e}")
+        db.rollback()
+        raise
+
+
+def prune_ocr_text_cache(db: Session, max_age_seconds: float, max_entries: int) -> None:
+    """Deletes expired OCR cache entries and the oldest entries beyond max_entries."""
+    cutoff = datetime.utcnow() - timedelta(seconds=max_age_seconds)
+    try:
+        db.execute(delete(OCRTextCache).where(OCRTextCache.created_at < cutoff))
+
+        newest = select(OCRTextCache.content_hash)\
+                    .order_by(OCRTextCache.created_at.desc())\
+                    .limit(max_entries)
+        db.execute(delete(OCRTextCache).where(OCRTextCache.content_hash.not_in(newest)))
+        db.commit()
+        logger.info("✅ OCR cache pruned.")
+    except Exception as e:
+        logger.error(f"❌ Error pruning OCR cache: {e}")
+        db.rollback()
+        raise
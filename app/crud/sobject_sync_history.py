@@ -1,4 +1,5 @@
 from sqlmodel import Session, select
+from sqlmodel.ext.asyncio.session import AsyncSession
 from app.models.sobject_sync_history import SObjectSyncHistory
 from datetime import datetime
 from typing import List, Optional
@@ -44,6 +45,43 @@ def create_sync_history_record(
         raise
 
 
+async def create_sync_history_record_async(
+    db: AsyncSession,
+    usdot: str,
+    sync_status: str,
+    sobject_type: str,
+    user_id: str,
+    org_id: str,
+    sobject_id: Optional[str] = None,
+    detail: Optional[str] = None,
+    sync_timestamp: Optional[datetime] = None
+) -> SObjectSyncHistory:
+    """Async variant of create_sync_history_record."""
+    try:
+        sync_record = SObjectSyncHistory(
+            usdot=usdot,
+            sync_status=sync_status,
+            sobject_type=sobject_type,
+            user_id=user_id,
+            org_id=org_id,
+            sobject_id=sobject_id,
+            detail=detail,
+            sync_timestamp=sync_timestamp or datetime.utcnow()
+        )
+
+        db.add(sync_record)
+        await db.commit()
+        await db.refresh(sync_record)
+
+        logger.info(f"Created sync history record for USDOT {usdot} with status {sync_status}")
+        return sync_record
+
+    except Exception as e:
+        await db.rollback()
+        logger.error(f"Failed to create sync history record for USDOT {usdot}: {str(e)}")
+        raise
+
+
 def get_sync_history_by_usdot(
     db: Session,
     usdot: str,
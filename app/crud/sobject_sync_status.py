@@ -1,4 +1,5 @@
 from sqlmodel import Session, select
+from sqlmodel.ext.asyncio.session import AsyncSession
 from app.models.sobject_sync_status import SObjectSyncStatus
 from datetime import datetime
 from typing import List, Optional, Dict
@@ -131,6 +132,50 @@ def get_sync_status_for_usdots(
         raise
 
 
+async def upsert_sync_status_async(
+    db: AsyncSession,
+    usdot: str,
+    org_id: str,
+    user_id: str,
+    sync_status: str,
+    sobject_id: Optional[str] = None
+) -> SObjectSyncStatus:
+    """Async variant of upsert_sync_status."""
+    try:
+        record = (await db.exec(
+            select(SObjectSyncStatus).where(
+                SObjectSyncStatus.usdot == usdot,
+                SObjectSyncStatus.org_id == org_id
+            )
+        )).first()
+
+        if record:
+            record.user_id = user_id
+            record.updated_at = datetime.utcnow()
+            record.sync_status = sync_status
+            record.sobject_id = sobject_id
+        else:
+            record = SObjectSyncStatus(
+                usdot=usdot,
+                org_id=org_id,
+                user_id=user_id,
+                sync_status=sync_status,
+                sobject_id=sobject_id
+            )
+
+        db.add(record)
+        await db.commit()
+        await db.refresh(record)
+
+        logger.info(f"Upserted sync status for USDOT {usdot}, org {org_id} to {sync_status}")
+        return record
+
+    except Exception as e:
+        await db.rollback()
+        logger.error(f"Failed to upsert sync status for USDOT {usdot}, org {org_id}: {str(e)}")
+        raise
+
+
 def delete_sync_status(
     db: Session,
     usdot: str,
@@ -0,0 +1,154 @@
+import logging
+from datetime import datetime, timedelta
+from sqlmodel import Session, select, or_, and_
+from app.models.upload_job import UploadJob, UploadJobFile
+
+# Set up a module-level logger
+logger = logging.getLogger(__name__)
+
+
+def create_upload_job(db: Session,
+                      user_id: str,
+                      org_id: str,
+                      files: list[tuple[str, bytes]],
+                      invalid_filenames: list[str] = None) -> UploadJob:
+    """Queue an upload job with the image bytes of each valid file."""
+    invalid_filenames = invalid_filenames or []
+    try:
+        job = UploadJob(user_id=user_id,
+                        org_id=org_id,
+                        total_files=len(files))
+        db.add(job)
+        db.flush()
+
+        db.add_all([
+            UploadJobFile(job_id=job.id, position=position, filename=filename, content=content)
+            for position, (filename, content) in enumerate(files)
+        ] + [
+            UploadJobFile(job_id=job.id, position=len(files) + position, filename=filename, status="invalid")
+            for position, filename in enumerate(invalid_filenames)
+        ])
+        db.commit()
+        db.refresh(job)
+
+        logger.info(f"✅ Upload job {job.id} queued with {len(files)} files.")
+        return job
+    except Exception as e:
+        db.rollback()
+        logger.error(f"❌ Error queueing upload job: {e}")
+        raise
+
+
+def get_upload_job(db: Session, job_id: int, org_id: str) -> UploadJob | None:
+    """Get an upload job visible to the organization."""
+    return db.exec(
+        select(UploadJob).where(UploadJob.id == job_id,
+                                UploadJob.org_id == org_id)
+    ).first()
+
+
+def get_upload_job_files(db: Session, job_id: int) -> list[UploadJobFile]:
+    """Get all files of an upload job in upload order."""
+    return db.exec(
+        select(UploadJobFile)
+        .where(UploadJobFile.job_id == job_id)
+        .order_by(UploadJobFile.position)
+    ).all()
+
+
+def get_pending_upload_job_files(db: Session, job_id: int, limit: int) -> list[UploadJobFile]:
+    """Get the next files of an upload job that still need processing."""
+    return db.exec(
+        select(UploadJobFile)
+        .where(UploadJobFile.job_id == job_id,
+               UploadJobFile.status == "pending")
+        .order_by(UploadJobFile.position)
+        .limit(limit)
+    ).all()
+
+
+def claim_next_upload_job(db: Session, stale_seconds: float) -> UploadJob | None:
+    """Mark the oldest runnable upload job as running and return it.
+
+    Queued jobs are runnable, and so are running jobs whose worker has not
+    reported progress for stale_seconds (e.g. the instance restarted).
+    Rows are locked with SKIP LOCKED so concurrent workers never claim the same job.
+    """
+    stale_cutoff = datetime.utcnow() - timedelta(seconds=stale_seconds)
+    try:
+        job = db.exec(
+            select(UploadJob)
+            .where(or_(UploadJob.status == "queued",
+                       and_(UploadJob.status == "running",
+                            UploadJob.updated_at < stale_cutoff)))
+            .order_by(UploadJob.id)
+            .limit(1)
+            .with_for_update(skip_locked=True)
+        ).first()
+        if job is None:
+            db.rollback()
+            return None
+
+        if job.status == "running":
+            logger.warning(f"⚠ Resuming stale upload job {job.id}.")
+        job.status = "running"
+        job.updated_at = datetime.utcnow()
+        db.add(job)
+        db.commit()
+        db.refresh(job)
+        return job
+    except Exception as e:
+        db.rollback()
+        logger.error(f"❌ Error claiming upload job: {e}")
+        raise
+
+
+def save_upload_job_file_outcomes(db: Session,
+                                  job: UploadJob,
+                                  job_files: list[UploadJobFile],
+                                  outcomes: list) -> UploadJob:
+    """Record the outcome of processed job files and bump the job's progress.
+
+    Each outcome is the saved OCRResult for the file or the exception that
+    stopped it. Image bytes are dropped once a file is processed.
+    """
+    try:
+        for job_file, outcome in zip(job_files, outcomes):
+            if isinstance(outcome, BaseException):
+                job_file.status = "failed"
+                job_file.error = str(outcome) or type(outcome).__name__
+            else:
+                job_file.status = "completed"
+                job_file.ocr_result_id = outcome.id
+                job_file.dot_reading = outcome.dot_reading
+            job_file.content = None
+            db.add(job_file)
+
+        job.processed_files += len(job_files)
+        job.updated_at = datetime.utcnow()
+        db.add(job)
+        db.commit()
+        db.refresh(job)
+        return job
+    except Exception as e:
+        db.rollback()
+        logger.error(f"❌ Error saving progress for upload job {job.id}: {e}")
+        raise
+
+
+def finish_upload_job(db: Session, job: UploadJob, error: str = None) -> UploadJob:
+    """Mark an upload job as completed, or failed when an error is given."""
+    try:
+        job.status = "failed" if error else "completed"
+        job.error = error
+        job.updated_at = job.finished_at = datetime.utcnow()
+        db.add(job)
+        db.commit()
+        db.refresh(job)
+
+        logger.info(f"✅ Upload job {job.id} {job.status}.")
+        return job
+    except Exception as e:
+        db.rollback()
+        logger.error(f"❌ Error finishing upload job {job.id}: {e}")
+        raise
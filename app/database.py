@@ -1,5 +1,9 @@
 from sqlmodel import Session, SQLModel, create_engine
+from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlalchemy.ext.asyncio import create_async_engine
 import os
+from typing import Callable
+from app.helpers.db_pool import InstrumentedQueuePool, InstrumentedAsyncAdaptedQueuePool, PoolMetrics, instrument_engine_pool
 
 # Database connection settings
 DB_USER = os.getenv('DB_USER')
@@ -12,15 +16,61 @@ if not all([DB_USER, DB_PASSWORD, DB_HOST, DB_PORT, DB_NAME]):
     raise EnvironmentError(f"One or more required environment variables are not set. {DB_USER}, {DB_PASSWORD}, {DB_HOST}, {DB_PORT}, {DB_NAME}")
 
 DATABASE_URL = f"postgresql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}/{DB_NAME}"
+ASYNC_DATABASE_URL = f"postgresql+asyncpg://{DB_USER}:{DB_PASSWORD}@{DB_HOST}/{DB_NAME}"
+
+# Connection pool settings, tune per instance against the Cloud SQL connection limit
+DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', 5))
+DB_MAX_OVERFLOW = int(os.getenv('DB_MAX_OVERFLOW', 10))
+DB_POOL_TIMEOUT = float(os.getenv('DB_POOL_TIMEOUT', 30))
+DB_POOL_RECYCLE = int(os.getenv('DB_POOL_RECYCLE', 1800))  # Seconds, -1 disables
+DB_POOL_PRE_PING = os.getenv('DB_POOL_PRE_PING', 'true').lower() in ('1', 'true', 'yes')
+DB_POOL_SLOW_CHECKOUT_SECONDS = float(os.getenv('DB_POOL_SLOW_CHECKOUT_SECONDS', 1))
+
+# The async engine has its own pool on top of the sync one. It only serves the
+# dashboard fetches and the Salesforce routes, so it defaults to a small pool.
+# An instance opens at most DB_POOL_SIZE + DB_MAX_OVERFLOW + DB_ASYNC_POOL_SIZE
+# + DB_ASYNC_MAX_OVERFLOW connections.
+DB_ASYNC_POOL_SIZE = int(os.getenv('DB_ASYNC_POOL_SIZE', 2))
+DB_ASYNC_MAX_OVERFLOW = int(os.getenv('DB_ASYNC_MAX_OVERFLOW', 3))
 
 # Create engine and session
-engine = create_engine(DATABASE_URL)
+engine = create_engine(DATABASE_URL,
+                       poolclass=InstrumentedQueuePool,
+                       pool_size=DB_POOL_SIZE,
+                       max_overflow=DB_MAX_OVERFLOW,
+                       pool_timeout=DB_POOL_TIMEOUT,
+                       pool_recycle=DB_POOL_RECYCLE,
+                       pool_pre_ping=DB_POOL_PRE_PING)
+pool_metrics = instrument_engine_pool(engine, PoolMetrics(DB_POOL_SLOW_CHECKOUT_SECONDS))
+
+# Async engine for the async route handlers, its pool is carved out of the same budget
+async_engine = create_async_engine(ASYNC_DATABASE_URL,
+                                   poolclass=InstrumentedAsyncAdaptedQueuePool,
+                                   pool_size=DB_ASYNC_POOL_SIZE,
+                                   max_overflow=DB_ASYNC_MAX_OVERFLOW,
+                                   pool_timeout=DB_POOL_TIMEOUT,
+                                   pool_recycle=DB_POOL_RECYCLE,
+                                   pool_pre_ping=DB_POOL_PRE_PING)
+async_pool_metrics = instrument_engine_pool(async_engine.sync_engine, PoolMetrics(DB_POOL_SLOW_CHECKOUT_SECONDS))
 
 def get_db():
     """Dependency to get database session."""
     with Session(engine) as session:
         yield session
 
+def get_session_factory() -> Callable[[], Session]:
+    """Dependency for streaming responses that read the database while the body is sent.
+
+    Sessions from get_db are closed before a StreamingResponse starts iterating,
+    so the response body opens its own session from this factory.
+    """
+    return lambda: Session(engine)
+
+async def get_async_db():
+    """Dependency to get an async database session that does not block the event loop."""
+    async with AsyncSession(async_engine, expire_on_commit=False) as session:
+        yield session
+
 def init_db():
     """Initialize the database."""
     #SQLModel.metadata.create_all(bind=engine)
@@ -0,0 +1,86 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+
+
+class TTLCache:
+    """Thread-safe in-process LRU cache with per-entry time-to-live and hit/miss counters."""
+
+    def __init__(self, maxsize: int = 1024, ttl_seconds: float = 3600, count_lookups: bool = True):
+        self.maxsize = maxsize
+        self.ttl_seconds = ttl_seconds
+        self.count_lookups = count_lookups  # Off when the owner keeps its own counters
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Return the cached value for key, or default if missing or expired."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._count(hit=False)
+                return default
+
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                self._count(hit=False)
+                return default
+
+            self._entries.move_to_end(key)
+            self._count(hit=True)
+            return value
+
+    def _count(self, hit: bool) -> None:
+        if not self.count_lookups:
+            return
+        if hit:
+            self.hits += 1
+        else:
+            self.misses += 1
+
+    def set(self, key: Hashable, value: Any, ttl_seconds: Optional[float] = None) -> None:
+        """Store value under key, evicting the least recently used entry when full."""
+        if self.maxsize <= 0:
+            return
+        ttl = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        """Remove key from the cache and return its value."""
+        with self._lock:
+            entry = self._entries.pop(key, None)
+        return entry[1] if entry else default
+
+    def clear(self) -> None:
+        """Remove all entries and reset the counters."""
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> dict:
+        """Return hit/miss counters and current size."""
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": hit_rate(self.hits, self.misses),
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+        }
+
+
+def hit_rate(hits: int, misses: int) -> float | None:
+    """Share of lookups that were hits, None before the first lookup."""
+    lookups = hits + misses
+    return round(hits / lookups, 4) if lookups else None
@@ -0,0 +1,206 @@
+import csv
+import logging
+import os
+from typing import Iterator
+from sqlmodel import Session
+from app.crud.carrier_census import (
+    get_census_carriers,
+    start_census_import,
+    save_census_batch,
+    complete_census_import
+)
+from app.models.carrier_census import CarrierCensus, CarrierCensusImport
+from app.models.carrier_data import CarrierDataCreate
+
+# Set up a module-level logger
+logger = logging.getLogger(__name__)
+
+# Census import settings
+CENSUS_IMPORT_BATCH_SIZE = int(os.environ.get("CENSUS_IMPORT_BATCH_SIZE", 5000))
+CENSUS_FILE_ENCODING = os.environ.get("CENSUS_FILE_ENCODING", "latin-1")
+
+# CarrierCensus column and the census file headers it is read from, older and newer file layouts
+CENSUS_FIELDS = {
+    "usdot": ("DOT_NUMBER",),
+    "legal_name": ("LEGAL_NAME",),
+    "dba_name": ("DBA_NAME",),
+    "usdot_status": ("STATUS_CODE",),
+    "phone": ("TELEPHONE", "PHONE"),
+    "power_units": ("NBR_POWER_UNIT", "POWER_UNITS"),
+    "drivers": ("DRIVER_TOTAL", "TOTAL_DRIVERS"),
+    "mcs_150_form_date": ("MCS150_DATE",),
+    "mcs_150_mileage_year_mileage": ("MCS150_MILEAGE",),
+    "mcs_150_mileage_year_year": ("MCS150_MILEAGE_YEAR",),
+    "carrier_operation": ("CARRIER_OPERATION",),
+}
+CENSUS_INT_FIELDS = {"power_units", "drivers", "mcs_150_mileage_year_mileage", "mcs_150_mileage_year_year"}
+
+# Address columns and the header prefixes of their street, city, state and zip parts
+CENSUS_ADDRESS_FIELDS = {
+    "physical_address": ("PHY_",),
+    "mailing_address": ("MAILING_", "CARRIER_MAILING_"),
+}
+CENSUS_ADDRESS_PARTS = ("STREET", "CITY", "STATE", "ZIP")
+
+# Census codes spelled the way SAFER shows them
+CARRIER_OPERATION_CODES = {"A": "Interstate", "B": "Intrastate Only (HM)", "C": "Intrastate Only (Non-HM)"}
+USDOT_STATUS_CODES = {"A": "ACTIVE", "I": "INACTIVE"}
+
+
+def census_column_positions(header: list[str]) -> dict[str, int | tuple[int | None, ...]]:
+    """Map each CarrierCensus column to its position in a census file header.
+
+    Address columns map to the positions of their parts. Raises ValueError
+    when the header has no DOT number column.
+    """
+    positions = {name.strip().upper(): i for i, name in enumerate(header)}
+    columns = {}
+    for field, headers in CENSUS_FIELDS.items():
+        position = next((positions[name] for name in headers if name in positions), None)
+        if position is not None:
+            columns[field] = position
+    for field, prefixes in CENSUS_ADDRESS_FIELDS.items():
+        for prefix in prefixes:
+            parts = tuple(positions.get(prefix + part) for part in CENSUS_ADDRESS_PARTS)
+            if any(part is not None for part in parts):
+                columns[field] = parts
+                break
+
+    if "usdot" not in columns:
+        raise ValueError(f"Census file header has no DOT_NUMBER column: {header[:10]}")
+    return columns
+
+
+def format_census_address(street: str, city: str, state: str, zip_code: str) -> str | None:
+    """Join address parts as `street, city, ST zip`, leaving out empty parts."""
+    region = " ".join(part for part in (state, zip_code) if part)
+    return ", ".join(part for part in (street, city, region) if part) or None
+
+
+def parse_census_row(columns: dict, values: list[str]) -> dict | None:
+    """Convert one census file row into CarrierCensus column values.
+
+    Every column is present in the result so batches upsert the same columns.
+    Returns None for rows without a numeric DOT number.
+    """
+    def value(position):
+        if position is None or position >= len(values):
+            return ""
+        return values[position].strip()
+
+    usdot = value(columns["usdot"])
+    if not usdot.isdigit():
+        return None
+
+    record = {"usdot": str(int(usdot))}
+    for field in CENSUS_FIELDS:
+        if field == "usdot":
+            continue
+        raw = value(columns.get(field))
+        if field in CENSUS_INT_FIELDS:
+            record[field] = int(raw) if raw.isdigit() else None
+        elif field == "carrier_operation":
+            record[field] = CARRIER_OPERATION_CODES.get(raw, raw or None)
+        elif field == "usdot_status":
+            record[field] = USDOT_STATUS_CODES.get(raw, raw or None)
+        else:
+            record[field] = raw or None
+    for field in CENSUS_ADDRESS_FIELDS:
+        parts = columns.get(field, (None,) * len(CENSUS_ADDRESS_PARTS))
+        record[field] = format_census_address(*(value(position) for position in parts))
+    return record
+
+
+def read_census_rows(path: str,
+                     byte_offset: int = 0,
+                     encoding: str = CENSUS_FILE_ENCODING) -> Iterator[tuple[dict | None, int]]:
+    """Stream the rows of a census CSV file from byte_offset.
+
+    Yields (record, end_offset) where end_offset is the byte position right
+    after the row, the place to resume from. Records that cannot be used are
+    None. Only the current row is held in memory.
+    """
+    with open(path, "rb") as f:
+        header = next(csv.reader([f.readline().decode(encoding).lstrip("\ufeff")]))
+        columns = census_column_positions(header)
+        if byte_offset > f.tell():
+            f.seek(byte_offset)
+        offset = f.tell()
+
+        def lines():
+            # Counted as bytes, csv pulls more lines for a quoted field spanning several
+            nonlocal offset
+            for line in f:
+                offset += len(line)
+                yield line.decode(encoding)
+
+        for values in csv.reader(lines()):
+            if not values:
+                yield None, offset
+                continue
+            yield parse_census_row(columns, values), offset
+
+
+def import_census_file(db: Session,
+                       path: str,
+                       batch_size: int = CENSUS_IMPORT_BATCH_SIZE,
+                       restart: bool = False) -> CarrierCensusImport:
+    """Load an FMCSA census CSV file into the carrier_census table.
+
+    Rows are upserted in batches of batch_size. Each batch is committed with
+    the byte offset it ends at, so an interrupted import of the same file
+    resumes after the last saved batch instead of starting over.
+    """
+    progress = start_census_import(db, os.path.basename(path), os.path.getsize(path), restart)
+    if progress.completed_at is not None:
+        logger.info(f"✅ Census file {progress.source} was already imported on {progress.completed_at}.")
+        return progress
+
+    batch = {}
+    skipped = 0
+    offset = progress.byte_offset
+    for record, offset in read_census_rows(path, progress.byte_offset):
+        if record is None:
+            skipped += 1
+            continue
+        # A statement cannot upsert the same row twice, the last row for a USDOT wins
+        batch[record["usdot"]] = record
+        if len(batch) >= batch_size:
+            progress = save_census_batch(db, progress, list(batch.values()), offset, skipped)
+            logger.info(f"🔍 Imported {progress.rows_imported} census rows, "
+                        f"{offset / max(progress.file_size, 1):.0%} of {progress.source}.")
+            batch = {}
+            skipped = 0
+
+    progress = save_census_batch(db, progress, list(batch.values()), offset, skipped)
+    return complete_census_import(db, progress)
+
+
+def carrier_data_from_census(census: CarrierCensus) -> CarrierDataCreate:
+    """Build the carrier record the SAFER lookup would return from a census row.
+
+    lookup_timestamp stays empty: it records the last SAFER scrape, and this
+    carrier has not been scraped.
+    """
+    return CarrierDataCreate.model_validate(
+        census,
+        update={
+            "lookup_timestamp": None,
+            "lookup_success_flag": True,
+        }
+    )
+
+
+def get_census_lookups(db: Session, dot_numbers: list[str]) -> dict[str, CarrierDataCreate]:
+    """Resolve DOT numbers from the census table, keyed by DOT number.
+
+    Numbers missing from the census are left out. Failures are logged and
+    treated as misses so the caller falls back to SAFER.
+    """
+    try:
+        census_carriers = get_census_carriers(db, dot_numbers)
+    except Exception as e:
+        logger.warning(f"⚠ Census lookup failed, scraping instead: {e}")
+        return {}
+    return {dot_number: carrier_data_from_census(census)
+            for dot_number, census in census_carriers.items()}
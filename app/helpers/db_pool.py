@@ -0,0 +1,117 @@
+import logging
+import threading
+import time
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+# Set up a module-level logger
+logger = logging.getLogger(__name__)
+
+
+class PoolMetrics:
+    """Thread-safe counters for connection pool checkouts and checkout wait time."""
+
+    def __init__(self, slow_checkout_seconds: float = 1.0):
+        self.slow_checkout_seconds = slow_checkout_seconds
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self.checkouts = 0
+            self.connects = 0
+            self.invalidations = 0
+            self.timeouts = 0
+            self.wait_seconds_total = 0.0
+            self.wait_seconds_max = 0.0
+            self.slow_checkouts = 0
+
+    def record_wait(self, wait_seconds: float, timed_out: bool = False) -> None:
+        with self._lock:
+            self.wait_seconds_total += wait_seconds
+            self.wait_seconds_max = max(self.wait_seconds_max, wait_seconds)
+            if timed_out:
+                self.timeouts += 1
+            elif wait_seconds >= self.slow_checkout_seconds:
+                self.slow_checkouts += 1
+
+    def record_event(self, name: str) -> None:
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def stats(self) -> dict:
+        """Return the counters accumulated since the last reset."""
+        with self._lock:
+            return {
+                "checkouts": self.checkouts,
+                "connects": self.connects,
+                "invalidations": self.invalidations,
+                "timeouts": self.timeouts,
+                "slow_checkouts": self.slow_checkouts,
+                "wait_seconds_total": round(self.wait_seconds_total, 4),
+                "wait_seconds_max": round(self.wait_seconds_max, 4),
+                "wait_seconds_avg": round(self.wait_seconds_total / self.checkouts, 4) if self.checkouts else 0.0,
+            }
+
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool that records how long callers wait for a connection."""
+
+    metrics: PoolMetrics = None
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except PoolTimeoutError:
+            self._record_wait(time.perf_counter() - start, timed_out=True)
+            raise
+        self._record_wait(time.perf_counter() - start)
+        return connection
+
+    def recreate(self):
+        pool = super().recreate()
+        pool.metrics = self.metrics
+        return pool
+
+    def _record_wait(self, wait_seconds: float, timed_out: bool = False) -> None:
+        if self.metrics is None:
+            return
+        self.metrics.record_wait(wait_seconds, timed_out)
+        if timed_out:
+            logger.error(f"❌ Timed out after {wait_seconds:.2f}s waiting for a database connection. {self.status()}")
+        elif wait_seconds >= self.metrics.slow_checkout_seconds:
+            logger.warning(f"⚠ Waited {wait_seconds:.2f}s for a database connection. {self.status()}")
+
+
+class InstrumentedAsyncAdaptedQueuePool(InstrumentedQueuePool, AsyncAdaptedQueuePool):
+    """InstrumentedQueuePool for async engines."""
+
+
+def instrument_engine_pool(engine: Engine, metrics: PoolMetrics) -> PoolMetrics:
+    """Attach pool metrics to an engine's connection pool."""
+    if isinstance(engine.pool, InstrumentedQueuePool):
+        engine.pool.metrics = metrics
+
+    event.listen(engine, "checkout", lambda *args: metrics.record_event("checkouts"))
+    event.listen(engine, "connect", lambda *args: metrics.record_event("connects"))
+    event.listen(engine, "invalidate", lambda *args: metrics.record_event("invalidations"))
+    return metrics
+
+
+def pool_stats(engine: Engine, metrics: PoolMetrics) -> dict:
+    """Return the pool's current occupancy together with the accumulated metrics."""
+    pool = engine.pool
+    current = {}
+    if isinstance(pool, QueuePool):
+        current = {
+            "pool_size": pool.size(),
+            "checked_out": pool.checkedout(),
+            "checked_in": pool.checkedin(),
+            "overflow": pool.overflow(),
+            "max_overflow": pool._max_overflow,
+            "timeout_seconds": pool.timeout(),
+        }
+    return {**current, **metrics.stats()}
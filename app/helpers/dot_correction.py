@@ -0,0 +1,242 @@
+import asyncio
+import logging
+import os
+from array import array
+from bisect import bisect_left, insort
+from datetime import datetime
+from itertools import combinations, product
+from typing import Callable, Iterable, NamedTuple
+from sqlmodel import Session
+from app.crud.carrier_census import stream_known_usdots
+
+# Set up a module-level logger
+logger = logging.getLogger(__name__)
+
+# DOT correction settings
+DOT_CORRECTION_MAX_SUBSTITUTIONS = int(os.environ.get("DOT_CORRECTION_MAX_SUBSTITUTIONS", 2))
+DOT_CORRECTION_MIN_CONFIDENCE = float(os.environ.get("DOT_CORRECTION_MIN_CONFIDENCE", 0.6))
+# Weight of a number missing from the known USDOT index relative to one in it
+DOT_CORRECTION_UNKNOWN_PRIOR = float(os.environ.get("DOT_CORRECTION_UNKNOWN_PRIOR", 0.02))
+KNOWN_USDOT_REFRESH_SECONDS = float(os.environ.get("KNOWN_USDOT_REFRESH_SECONDS", 3600))
+
+# Letters OCR reads in place of a digit: (digit, probability it stands for that digit).
+# Estimated from misreads seen in lookup history, the first entry is the usual reading.
+OCR_CHAR_DIGITS = {
+    "O": (("0", 0.95),), "o": (("0", 0.95),), "Q": (("0", 0.8),), "D": (("0", 0.8),),
+    "I": (("1", 0.95),), "l": (("1", 0.95),), "i": (("1", 0.9),), "|": (("1", 0.9),),
+    "S": (("5", 0.9),), "s": (("5", 0.9),),
+    "B": (("8", 0.85), ("3", 0.1)),
+    "Z": (("2", 0.85),), "z": (("2", 0.85),),
+    "G": (("6", 0.8), ("9", 0.1)),
+}
+
+# Digits OCR reads in place of another digit: (actual digit, probability). The rest is the digit as read.
+OCR_DIGIT_CONFUSIONS = {
+    "0": (("8", 0.04), ("6", 0.02)),
+    "1": (("7", 0.04),),
+    "3": (("8", 0.04),),
+    "5": (("6", 0.03), ("3", 0.02)),
+    "6": (("8", 0.03), ("5", 0.03), ("0", 0.02)),
+    "7": (("1", 0.04),),
+    "8": (("3", 0.03), ("0", 0.03), ("6", 0.02), ("9", 0.02)),
+    "9": (("8", 0.02),),
+}
+
+
+# Possible digits for every character OCR may read in a number, usual reading first
+OCR_READING_OPTIONS = {
+    **{digit: ((digit, 1 - sum(p for _, p in OCR_DIGIT_CONFUSIONS.get(digit, ()))),
+               *OCR_DIGIT_CONFUSIONS.get(digit, ()))
+       for digit in "0123456789"},
+    **OCR_CHAR_DIGITS,
+}
+
+
+class DotCandidate(NamedTuple):
+    """A DOT number read from OCR text and how likely it is to be the right one."""
+    usdot: str
+    confidence: float
+    known: bool  # Found in the known USDOT index
+
+
+class KnownUSDOTIndex:
+    """Sorted array of the USDOT numbers in CarrierData and the census.
+
+    Membership is a binary search over 4-byte integers, so millions of
+    carriers fit in a few MB and a check costs no database round trip.
+    """
+
+    def __init__(self, refresh_seconds: float = KNOWN_USDOT_REFRESH_SECONDS):
+        self.refresh_seconds = refresh_seconds
+        self.loaded_at: datetime | None = None
+        self._numbers = array("I")
+        self._task: asyncio.Task | None = None
+
+    def __contains__(self, usdot: str) -> bool:
+        return usdot.isdigit() and self.contains_number(int(usdot))
+
+    def contains_number(self, number: int) -> bool:
+        numbers = self._numbers
+        position = bisect_left(numbers, number)
+        return position < len(numbers) and numbers[position] == number
+
+    def __len__(self) -> int:
+        return len(self._numbers)
+
+    def replace(self, usdots: Iterable[str]) -> None:
+        """Swap in a new set of known numbers. Input in numeric order is not sorted again."""
+        numbers = array("I")
+        in_order = True
+        for usdot in usdots:
+            if not usdot or not usdot.isdigit() or not usdot.strip("0"):
+                continue  # All zeros is the orphan record, not a carrier
+            number = int(usdot)
+            if numbers and number <= numbers[-1]:
+                if number == numbers[-1]:
+                    continue
+                in_order = False
+            numbers.append(number)
+        if not in_order:
+            numbers = array("I", sorted(set(numbers)))
+        self._numbers = numbers
+        self.loaded_at = datetime.utcnow()
+
+    def add(self, usdots: Iterable[str]) -> None:
+        """Add newly found carriers without waiting for the next refresh."""
+        for usdot in usdots:
+            if usdot.isdigit() and usdot.strip("0") and usdot not in self:
+                insort(self._numbers, int(usdot))
+
+    def load(self, db: Session) -> None:
+        """Rebuild the index from the database."""
+        self.replace(stream_known_usdots(db))
+        logger.info(f"✅ Loaded {len(self)} known USDOT numbers for DOT correction.")
+
+    def start(self, session_factory: Callable[[], Session]) -> None:
+        """Load the index in the background and refresh it every refresh_seconds."""
+        self._task = asyncio.create_task(self._run(session_factory), name="known-usdot-index")
+
+    async def stop(self) -> None:
+        """Cancel the background refresh."""
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _run(self, session_factory: Callable[[], Session]) -> None:
+        while True:
+            try:
+                await asyncio.to_thread(self._load_with_session, session_factory)
+            except Exception as e:
+                logger.warning(f"⚠ Loading known USDOT numbers failed, DOT readings are not corrected: {e}")
+            await asyncio.sleep(self.refresh_seconds)
+
+    def _load_with_session(self, session_factory: Callable[[], Session]) -> None:
+        with session_factory() as db:
+            self.load(db)
+
+
+# Known carriers shared by all requests, loaded by the app lifespan
+known_usdot_index = KnownUSDOTIndex()
+
+
+def dot_reading_options(token: str) -> list[tuple[tuple[str, float], ...]] | None:
+    """Return the possible digits at each position of a misread number, usual reading first.
+
+    Returns None when the token has a character that cannot stand for a digit.
+    """
+    options = []
+    for char in token:
+        position_options = OCR_READING_OPTIONS.get(char)
+        if position_options is None:
+            return None
+        options.append(position_options)
+    return options
+
+
+def dot_number_candidates(token: str,
+                          max_substitutions: int = DOT_CORRECTION_MAX_SUBSTITUTIONS) -> dict[int, float]:
+    """Expand a DOT number as OCR read it into the numbers it may stand for, with their likelihoods.
+
+    The usual reading of every character comes first. Up to max_substitutions
+    positions take a less likely digit instead. Candidates are built with
+    integer arithmetic since a token can have a few hundred of them.
+    """
+    options = dot_reading_options(token)
+    if options is None:
+        return {}
+
+    usual_number = int("".join(position_options[0][0] for position_options in options))
+    if not usual_number:
+        return {}  # All zeros is the orphan record, not a carrier
+    usual_likelihood = 1.0
+    for position_options in options:
+        usual_likelihood *= position_options[0][1]
+    if not max_substitutions:
+        return {usual_number: usual_likelihood}
+
+    # Each less likely digit as (change of the number, change of the likelihood)
+    substitutions = []
+    for i, ((usual_digit, usual_p), *alternatives) in enumerate(options):
+        place = 10 ** (len(options) - 1 - i)
+        if alternatives:
+            substitutions.append([((int(digit) - int(usual_digit)) * place, p / usual_p)
+                                  for digit, p in alternatives])
+
+    candidates = {usual_number: usual_likelihood}
+    for count in range(1, min(max_substitutions, len(substitutions)) + 1):
+        for positions in combinations(substitutions, count):
+            for changes in product(*positions):
+                number = usual_number
+                likelihood = usual_likelihood
+                for delta, ratio in changes:
+                    number += delta
+                    likelihood *= ratio
+                if number:
+                    candidates[number] = likelihood
+    return candidates
+
+
+def dot_reading_candidates(token: str,
+                           max_substitutions: int = DOT_CORRECTION_MAX_SUBSTITUTIONS) -> dict[str, float]:
+    """Same as dot_number_candidates, keyed by the numbers as strings."""
+    return {str(number): likelihood
+            for number, likelihood in dot_number_candidates(token, max_substitutions).items()}
+
+
+def correct_dot_reading(token: str,
+                        known_usdots: KnownUSDOTIndex,
+                        max_substitutions: int = DOT_CORRECTION_MAX_SUBSTITUTIONS,
+                        min_confidence: float = DOT_CORRECTION_MIN_CONFIDENCE,
+                        unknown_prior: float = DOT_CORRECTION_UNKNOWN_PRIOR) -> DotCandidate | None:
+    """Pick the most plausible DOT number for a token read next to a DOT label.
+
+    A usual reading found in the known USDOT index is kept as read: it is
+    more likely than any misread of it, so the misreads are not expanded.
+    Its confidence counts every other reading as an unknown number.
+    Otherwise each candidate is weighed by its likelihood, times
+    unknown_prior when it is not in the index. The confidence of the best
+    known candidate is its share of the total weight. When it is below
+    min_confidence, or no candidate is known, the usual reading is kept with
+    its own likelihood so it can still be looked up on SAFER.
+    """
+    usual_reading = dot_number_candidates(token, max_substitutions=0)
+    if not usual_reading:
+        return None
+
+    (usual, usual_likelihood), = usual_reading.items()
+    if known_usdots.contains_number(usual):
+        confidence = usual_likelihood / (usual_likelihood + (1 - usual_likelihood) * unknown_prior)
+        return DotCandidate(str(usual), round(confidence, 4), True)
+
+    candidates = dot_number_candidates(token, max_substitutions)
+    known = {number: likelihood for number, likelihood in candidates.items()
+             if known_usdots.contains_number(number)}
+    if known:
+        best = max(known, key=known.get)
+        known_weight = sum(known.values())
+        total = known_weight + (sum(candidates.values()) - known_weight) * unknown_prior
+        confidence = known[best] / total
+        if confidence >= min_confidence:
+            return DotCandidate(str(best), round(confidence, 4), True)
+    return DotCandidate(str(usual), round(usual_likelihood, 4), False)
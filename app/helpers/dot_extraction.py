@@ -0,0 +1,99 @@
+import logging
+import re
+from typing import NamedTuple
+from app.helpers.dot_correction import (
+    DOT_CORRECTION_MAX_SUBSTITUTIONS,
+    KnownUSDOTIndex,
+    correct_dot_reading,
+    dot_reading_candidates,
+    known_usdot_index
+)
+
+# Set up a module-level logger
+logger = logging.getLogger(__name__)
+
+# Building blocks of the label patterns. Separators include line breaks, so a
+# label on one line and its number on the next still match.
+SEPARATOR = r'[\s#:.\-]*?'
+NUMBER_WORD = r'(?:(?:NO|NUM|NUMBER|NBR)\b' + SEPARATOR + r')?'
+DOT_NUMBER = r'((?-i:[0-9OoQDIl|iSsBZzG]){5,8})\b'
+MC_NUMBER = r'((?-i:[0-9OoQDIl|iSsBZzG]){4,7})\b'
+
+
+class ExtractionPattern(NamedTuple):
+    """A compiled label pattern, its group 1 is the number as OCR read it."""
+    name: str
+    kind: str  # usdot or mc
+    regex: re.Pattern
+    weight: float  # How much a match of this label is trusted, 0 to 1
+
+
+# Ranked most trusted first; a number matched by several patterns keeps the first
+EXTRACTION_PATTERNS = [
+    ExtractionPattern("usdot", "usdot",
+                      re.compile(r'\bU\.?\s*S\.?\s*D[O0]T' + SEPARATOR + NUMBER_WORD + DOT_NUMBER, re.IGNORECASE),
+                      1.0),
+    ExtractionPattern("dot", "usdot",
+                      re.compile(r'\bD[O0]T' + SEPARATOR + NUMBER_WORD + DOT_NUMBER, re.IGNORECASE),
+                      0.9),
+    ExtractionPattern("mc", "mc",
+                      re.compile(r'\b(?:ICC\s*)?M\.?C' + SEPARATOR + NUMBER_WORD + MC_NUMBER, re.IGNORECASE),
+                      1.0),
+]
+
+
+class IdentifierCandidate(NamedTuple):
+    """A DOT or MC number found in OCR text."""
+    kind: str  # usdot or mc
+    number: str
+    start: int  # Position of the number as read in the text
+    end: int
+    confidence: float  # Label weight times the confidence of the reading
+    known: bool  # USDOT found in the known USDOT index, always False for MC numbers
+    pattern: str
+
+
+def extract_identifiers(text: str | None,
+                        known_usdots: KnownUSDOTIndex | None = None,
+                        patterns: list[ExtractionPattern] = EXTRACTION_PATTERNS) -> list[IdentifierCandidate]:
+    """Return every DOT and MC number in OCR text, in text order.
+
+    DOT numbers are corrected for digit misreads against the known USDOT
+    index, see app.helpers.dot_correction. Images showing several carriers
+    return one candidate per number.
+    """
+    known_usdots = known_usdot_index if known_usdots is None else known_usdots
+    found = {}
+    for pattern in patterns:
+        for match in pattern.regex.finditer(text or ""):
+            start, end = match.span(1)
+            token = match.group(1)
+            # A word after the label is not a misread number
+            if (pattern.kind, start) in found or \
+                    sum(not char.isdigit() for char in token) > DOT_CORRECTION_MAX_SUBSTITUTIONS:
+                continue
+
+            if pattern.kind == "usdot":
+                reading = correct_dot_reading(token, known_usdots)
+                if reading is None:
+                    continue
+                number, confidence, known = reading
+            else:
+                readings = dot_reading_candidates(token, max_substitutions=0)
+                if not readings:
+                    continue
+                (number, confidence), = readings.items()
+                known = False
+
+            found[(pattern.kind, start)] = IdentifierCandidate(pattern.kind, number, start, end,
+                                                               round(pattern.weight * confidence, 4),
+                                                               known, pattern.name)
+    return sorted(found.values(), key=lambda candidate: candidate.start)
+
+
+def best_dot_candidate(candidates: list[IdentifierCandidate]) -> IdentifierCandidate | None:
+    """Pick the DOT number to look up: a known carrier first, then the most confident, then the first read."""
+    dot_candidates = [candidate for candidate in candidates if candidate.kind == "usdot"]
+    if not dot_candidates:
+        return None
+    return max(dot_candidates, key=lambda candidate: (candidate.known, candidate.confidence, -candidate.start))
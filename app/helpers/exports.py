@@ -0,0 +1,293 @@
+import csv
+import io
+import re
+import zipfile
+from datetime import datetime
+from itertools import islice
+from typing import Callable, Iterable, Iterator, NamedTuple
+from xml.sax.saxutils import escape, quoteattr
+import pyarrow as pa
+import pyarrow.parquet as pq
+from openpyxl.utils import get_column_letter
+from sqlalchemy import Boolean, DateTime, Integer
+from app.models.carrier_data import CarrierData
+
+# Rows written between flushes of the output to the client
+EXPORT_FLUSH_ROWS = 500
+
+# Rows per Parquet row group, each group is buffered in memory before it is written
+PARQUET_ROW_GROUP_ROWS = 10000
+
+
+class ExportColumn(NamedTuple):
+    """A column of an export: its Parquet field name, its spreadsheet header and its value kind."""
+    name: str
+    header: str
+    kind: str = "string"  # "string", "int", "bool", "datetime" or "date"
+
+
+class ExportFormat(NamedTuple):
+    """A streaming export writer together with the response media type and file extension."""
+    write: Callable[[str, list[ExportColumn], Iterable[Iterable]], Iterator[bytes]]
+    media_type: str
+    extension: str
+
+
+_ARROW_TYPES = {
+    "string": pa.string(),
+    "int": pa.int64(),
+    "bool": pa.bool_(),
+    "datetime": pa.timestamp("us"),
+    "date": pa.date32(),
+}
+
+# Control characters that are not allowed in XML 1.0
+_ILLEGAL_XML_CHARS = re.compile(r"[\x00-\x08\x0b\x0c\x0e-\x1f]")
+
+_CONTENT_TYPES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/xl/workbook.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+    '<Override PartName="/xl/worksheets/sheet1.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+    '<Override PartName="/xl/styles.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>'
+    '</Types>'
+)
+
+_ROOT_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+    'Target="xl/workbook.xml"/>'
+    '</Relationships>'
+)
+
+_WORKBOOK = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+    'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+    '<sheets><sheet name={title} sheetId="1" r:id="rId1"/></sheets>'
+    '</workbook>'
+)
+
+_WORKBOOK_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+    'Target="worksheets/sheet1.xml"/>'
+    '<Relationship Id="rId2" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/styles" '
+    'Target="styles.xml"/>'
+    '</Relationships>'
+)
+
+_STYLES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<styleSheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+    '<fonts count="1"><font><sz val="11"/><name val="Calibri"/></font></fonts>'
+    '<fills count="2"><fill><patternFill patternType="none"/></fill>'
+    '<fill><patternFill patternType="gray125"/></fill></fills>'
+    '<borders count="1"><border><left/><right/><top/><bottom/><diagonal/></border></borders>'
+    '<cellStyleXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0"/></cellStyleXfs>'
+    '<cellXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0"/></cellXfs>'
+    '<cellStyles count="1"><cellStyle name="Normal" xfId="0" builtinId="0"/></cellStyles>'
+    '</styleSheet>'
+)
+
+_SHEET_START = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>'
+)
+
+_SHEET_END = '</sheetData></worksheet>'
+
+
+class _ChunkSink(io.RawIOBase):
+    """Unseekable file object that collects the bytes zipfile writes until they are drained."""
+
+    def __init__(self):
+        self._chunks = []
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def _cell_xml(reference: str, value) -> str:
+    """Render one cell, booleans and numbers keep their type and everything else is an inline string."""
+    if isinstance(value, bool):
+        return f'<c r="{reference}" t="b"><v>{int(value)}</v></c>'
+    if isinstance(value, (int, float)):
+        return f'<c r="{reference}"><v>{value}</v></c>'
+    text = escape(_ILLEGAL_XML_CHARS.sub("", str(value)))
+    return f'<c r="{reference}" t="inlineStr"><is><t xml:space="preserve">{text}</t></is></c>'
+
+
+def _text_value(column: ExportColumn, value):
+    """Format dates for the text based formats, other values pass through unchanged."""
+    if value is None:
+        return None
+    if column.kind == "datetime":
+        return value.strftime("%Y-%m-%d %H:%M:%S")
+    if column.kind == "date":
+        return value.strftime("%Y-%m-%d")
+    return value
+
+
+def _row_xml(row_number: int, values: Iterable) -> str:
+    cells = "".join(_cell_xml(f"{get_column_letter(column)}{row_number}", value)
+                    for column, value in enumerate(values, start=1)
+                    if value is not None)
+    return f'<row r="{row_number}">{cells}</row>'
+
+
+def stream_xlsx(title: str,
+                columns: list[ExportColumn],
+                rows: Iterable[Iterable],
+                flush_rows: int = EXPORT_FLUSH_ROWS) -> Iterator[bytes]:
+    """Write a single-sheet workbook as a stream of bytes chunks.
+
+    The worksheet is compressed into the zip as rows arrive and the output is
+    handed back every flush_rows rows, so the first bytes reach the client
+    before the last row is read and memory use does not depend on the row
+    count. None values are left as empty cells.
+    """
+    sink = _ChunkSink()
+    with zipfile.ZipFile(sink, "w", compression=zipfile.ZIP_DEFLATED) as workbook:
+        workbook.writestr("[Content_Types].xml", _CONTENT_TYPES)
+        workbook.writestr("_rels/.rels", _ROOT_RELS)
+        workbook.writestr("xl/workbook.xml", _WORKBOOK.format(title=quoteattr(title[:31])))
+        workbook.writestr("xl/_rels/workbook.xml.rels", _WORKBOOK_RELS)
+        workbook.writestr("xl/styles.xml", _STYLES)
+
+        # Sheet size is unknown up front, zip64 keeps exports past 4 GB valid
+        with workbook.open("xl/worksheets/sheet1.xml", "w", force_zip64=True) as sheet:
+            sheet.write((_SHEET_START + _row_xml(1, [column.header for column in columns])).encode())
+            for row_number, values in enumerate(rows, start=2):
+                values = [_text_value(column, value) for column, value in zip(columns, values)]
+                sheet.write(_row_xml(row_number, values).encode())
+                if row_number % flush_rows == 0 and (chunk := sink.drain()):
+                    yield chunk
+            sheet.write(_SHEET_END.encode())
+    yield sink.drain()
+
+
+def stream_csv(title: str,
+               columns: list[ExportColumn],
+               rows: Iterable[Iterable],
+               flush_rows: int = EXPORT_FLUSH_ROWS) -> Iterator[bytes]:
+    """Write rows as UTF-8 CSV, handing the output back every flush_rows rows.
+
+    None values are written as empty fields. The title is not part of a CSV file.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow([column.header for column in columns])
+    for row_number, values in enumerate(rows, start=1):
+        writer.writerow([_text_value(column, value) for column, value in zip(columns, values)])
+        if row_number % flush_rows == 0:
+            yield buffer.getvalue().encode()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue().encode()
+
+
+def stream_parquet(title: str,
+                   columns: list[ExportColumn],
+                   rows: Iterable[Iterable],
+                   row_group_rows: int = PARQUET_ROW_GROUP_ROWS) -> Iterator[bytes]:
+    """Write rows as a Parquet file, one row group at a time.
+
+    Columns keep their types (booleans, timestamps and dates) and are named by
+    ExportColumn.name. Only the row group being written is held in memory. The
+    title is not part of a Parquet file.
+    """
+    schema = pa.schema([(column.name, _ARROW_TYPES[column.kind]) for column in columns])
+    sink = _ChunkSink()
+    rows = iter(rows)
+    with pq.ParquetWriter(sink, schema) as writer:
+        while batch := list(islice(rows, row_group_rows)):
+            arrays = [pa.array([value.date() if column.kind == "date" and isinstance(value, datetime) else value
+                                for value in values], type=_ARROW_TYPES[column.kind])
+                      for column, values in zip(columns, zip(*batch))]
+            writer.write_batch(pa.record_batch(arrays, schema=schema))
+            if chunk := sink.drain():
+                yield chunk
+    yield sink.drain()
+
+
+EXPORT_FORMATS = {
+    "xlsx": ExportFormat(stream_xlsx, "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet", "xlsx"),
+    "csv": ExportFormat(stream_csv, "text/csv", "csv"),
+    "parquet": ExportFormat(stream_parquet, "application/vnd.apache.parquet", "parquet"),
+}
+
+
+# Export layouts, values are taken from the rows of the stream_*_export_rows CRUD functions
+CARRIER_EXPORT_COLUMNS = [
+    ExportColumn("usdot", "DOT Number"),
+    ExportColumn("legal_name", "Legal Name"),
+    ExportColumn("phone", "Phone Number"),
+    ExportColumn("mailing_address", "Mailing Address"),
+    ExportColumn("created_at", "Created At", "datetime"),
+    ExportColumn("carrier_contacted", "Client Contacted?", "bool"),
+    ExportColumn("carrier_followed_up", "Carrier Followed Up?", "bool"),
+    ExportColumn("carrier_follow_up_by_date", "Carrier Follow Up by Date", "date"),
+    ExportColumn("carrier_interested", "Carrier Interested", "bool"),
+]
+
+LOOKUP_HISTORY_EXPORT_COLUMNS = [
+    ExportColumn("dot_reading", "DOT Number"),
+    ExportColumn("legal_name", "Legal Name"),
+    ExportColumn("phone", "Phone Number"),
+    ExportColumn("mailing_address", "Mailing Address"),
+    ExportColumn("timestamp", "Created At", "datetime"),
+    ExportColumn("filename", "Filename"),
+    ExportColumn("user_email", "Created By"),
+]
+
+
+# Export kind of the column types used by CarrierData, anything else is exported as a string
+_COLUMN_KINDS = [(Boolean, "bool"), (Integer, "int"), (DateTime, "datetime")]
+
+
+def _column_kind(column) -> str:
+    return next((kind for column_type, kind in _COLUMN_KINDS if isinstance(column.type, column_type)), "string")
+
+
+def carrier_snapshot_columns(names: list[str] = None) -> list[ExportColumn]:
+    """Build the full carrier snapshot layout from the CarrierData table.
+
+    All columns are exported in table order unless names picks a subset.
+    usdot always comes first so every row can be traced back to its carrier.
+    Raises ValueError for names that are not CarrierData columns.
+    """
+    table_columns = CarrierData.__table__.columns
+    if names:
+        unknown = [name for name in names if name not in table_columns]
+        if unknown:
+            raise ValueError(f"Unknown carrier columns: {', '.join(unknown)}")
+        names = ["usdot"] + [name for name in dict.fromkeys(names) if name != "usdot"]
+    else:
+        names = [column.name for column in table_columns]
+    return [ExportColumn(name, name, _column_kind(table_columns[name])) for name in names]
+
+
+def export_values(columns: list[ExportColumn], rows: Iterable) -> Iterator[list]:
+    """Pick the export columns out of named database rows, in column order."""
+    for row in rows:
+        yield [getattr(row, column.name) for column in columns]
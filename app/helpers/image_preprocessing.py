@@ -0,0 +1,183 @@
+import asyncio
+import io
+import logging
+import os
+import threading
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor
+from functools import cache
+from typing import NamedTuple
+from PIL import Image, ImageOps
+
+# Set up a module-level logger
+logger = logging.getLogger(__name__)
+
+# Image preprocessing settings
+IMAGE_PREPROCESSING = os.environ.get("IMAGE_PREPROCESSING", "true").lower() == "true"
+# Long side in pixels, enough for Vision and Tesseract to read a DOT number on a truck door
+IMAGE_MAX_DIMENSION = int(os.environ.get("IMAGE_MAX_DIMENSION", 2048))
+IMAGE_JPEG_QUALITY = int(os.environ.get("IMAGE_JPEG_QUALITY", 85))
+IMAGE_PREPROCESS_WORKERS = int(os.environ.get("IMAGE_PREPROCESS_WORKERS", os.cpu_count() or 1))
+
+PREPROCESS_STEPS = ("decode", "orient", "resize", "grayscale", "encode")
+
+# Upload formats every OCR backend reads, sent as uploaded when converting does not help
+ORIGINAL_FORMATS = ("JPEG", "PNG")
+
+
+class PreprocessedImage(NamedTuple):
+    """Image bytes ready for OCR and what preprocessing did to them."""
+    contents: bytes
+    original_bytes: int
+    processed_bytes: int
+    timings: dict[str, float]  # Seconds per step, see PREPROCESS_STEPS
+    error: str | None = None  # Set when the original bytes are passed through undecoded
+
+
+@cache
+def enable_heif_decoding() -> None:
+    """Let Pillow open HEIC/HEIF images in this process, once."""
+    try:
+        from pillow_heif import register_heif_opener  # Optional, without it HEIC uploads pass through as sent
+    except ImportError:
+        logger.warning("⚠ pillow-heif is not installed, HEIC images cannot be decoded.")
+        return
+    register_heif_opener()
+
+
+def preprocess_image(contents: bytes,
+                     max_dimension: int = IMAGE_MAX_DIMENSION,
+                     quality: int = IMAGE_JPEG_QUALITY) -> PreprocessedImage:
+    """Decode, auto-orient, downscale and convert an image to grayscale JPEG for OCR.
+
+    The original bytes are kept when the image cannot be decoded, or when it
+    is a JPEG or PNG, the result is no smaller and it did not need rotating.
+    """
+    enable_heif_decoding()
+    timings = {}
+    try:
+        start = time.perf_counter()
+        image = Image.open(io.BytesIO(contents))
+        source_format = image.format
+        # JPEG decoders can scale by 1/2 to 1/8 while decoding, much cheaper than decoding then resizing
+        image.draft("L", (max_dimension, max_dimension))
+        image.load()
+        timings["decode"] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        orientation = image.getexif().get(0x0112, 1)  # EXIF Orientation tag
+        image = ImageOps.exif_transpose(image)
+        timings["orient"] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        image.thumbnail((max_dimension, max_dimension), Image.Resampling.LANCZOS)
+        timings["resize"] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        image = image.convert("L")
+        timings["grayscale"] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        output = io.BytesIO()
+        image.save(output, format="JPEG", quality=quality, optimize=True)
+        processed = output.getvalue()
+        timings["encode"] = time.perf_counter() - start
+    except Exception as e:
+        return PreprocessedImage(contents, len(contents), len(contents), timings, str(e))
+
+    # Other formats are always converted, Vision rejects HEIC and the Tesseract workers cannot decode it
+    if len(processed) >= len(contents) and orientation == 1 and source_format in ORIGINAL_FORMATS:
+        processed = contents
+    return PreprocessedImage(processed, len(contents), len(processed), timings)
+
+
+class ImagePreprocessor:
+    """Runs preprocess_image for uploads in a process pool and keeps totals for monitoring.
+
+    Preprocessing is best effort: an image that cannot be decoded, or a
+    failed worker, sends the original bytes to OCR.
+    """
+
+    def __init__(self,
+                 enabled: bool = IMAGE_PREPROCESSING,
+                 max_dimension: int = IMAGE_MAX_DIMENSION,
+                 quality: int = IMAGE_JPEG_QUALITY,
+                 max_workers: int = IMAGE_PREPROCESS_WORKERS,
+                 executor: Executor | None = None):
+        self.enabled = enabled
+        self.max_dimension = max_dimension
+        self.quality = quality
+        self.max_workers = max_workers
+        self._executor = executor
+        self.images = 0
+        self.original_bytes = 0
+        self.processed_bytes = 0
+        self.step_seconds = dict.fromkeys(PREPROCESS_STEPS, 0.0)
+        self._counter_lock = threading.Lock()
+
+    @property
+    def executor(self) -> Executor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+        return self._executor
+
+    async def preprocess(self, contents: bytes) -> bytes:
+        """Return the image bytes to send to OCR."""
+        return (await self.preprocess_many([contents]))[0]
+
+    async def preprocess_many(self, contents: list[bytes]) -> list[bytes]:
+        """Return the image bytes to send to OCR for each image, in order."""
+        if not self.enabled or not contents:
+            return contents
+
+        loop = asyncio.get_running_loop()
+        results = await asyncio.gather(*(
+            loop.run_in_executor(self.executor, preprocess_image, item, self.max_dimension, self.quality)
+            for item in contents
+        ), return_exceptions=True)
+
+        processed = []
+        for item, result in zip(contents, results):
+            if isinstance(result, BaseException):
+                logger.warning(f"⚠ Image preprocessing failed, sending the original image: {result}")
+                result = PreprocessedImage(item, len(item), len(item), {}, str(result))
+            elif result.error:
+                logger.warning(f"⚠ Image could not be decoded, sending the original image: {result.error}")
+            processed.append(result)
+        self._record(processed)
+        return [result.contents for result in processed]
+
+    def stats(self) -> dict:
+        """Return bytes saved and time per step for monitoring."""
+        return {"images": self.images,
+                "original_bytes": self.original_bytes,
+                "processed_bytes": self.processed_bytes,
+                "bytes_saved": self.original_bytes - self.processed_bytes,
+                "step_seconds": dict(self.step_seconds)}
+
+    def close(self) -> None:
+        """Shut down the worker pool. It is created again on next use."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def _record(self, results: list[PreprocessedImage]) -> None:
+        original_bytes = sum(result.original_bytes for result in results)
+        processed_bytes = sum(result.processed_bytes for result in results)
+        step_seconds = {step: sum(result.timings.get(step, 0.0) for result in results)
+                        for step in PREPROCESS_STEPS}
+        with self._counter_lock:
+            self.images += len(results)
+            self.original_bytes += original_bytes
+            self.processed_bytes += processed_bytes
+            for step, seconds in step_seconds.items():
+                self.step_seconds[step] += seconds
+
+        saved = original_bytes - processed_bytes
+        logger.info(f"✅ Preprocessed {len(results)} images: {original_bytes / 1e6:.2f} MB -> "
+                    f"{processed_bytes / 1e6:.2f} MB ({saved / max(original_bytes, 1):.0%} saved), "
+                    + ", ".join(f"{step} {seconds * 1000:.0f} ms" for step, seconds in step_seconds.items()))
+
+
+# Preprocessing pool shared by all requests, closed by the app lifespan
+image_preprocessor = ImagePreprocessor()
@@ -1,57 +1,183 @@
+import asyncio
 import logging
-import re
-from google.cloud import vision
-from google.cloud.vision import ImageAnnotatorClient
 from fastapi import UploadFile, File
 from app.models.ocr_results import OCRResult, OCRResultCreate
+from app.helpers.ocr_backends import (
+    OCR_MAX_CONCURRENCY,
+    OCR_TIMEOUT_SECONDS,
+    OCRBackend
+)
+from app.helpers.ocr_cache import OCRCache, NullOCRCache, build_ocr_cache, image_content_hash
+from app.helpers.image_preprocessing import ImagePreprocessor, image_preprocessor
+from app.helpers.dot_correction import KnownUSDOTIndex
+from app.helpers.dot_extraction import best_dot_candidate, extract_identifiers
 from datetime import datetime
 # Set up a module-level logger
 logger = logging.getLogger(__name__)
 
-async def cloud_ocr_from_image_file(vision_client: ImageAnnotatorClient, 
-                                    file: UploadFile = File(...)):
-    """Perform OCR on an image file using Google Cloud Vision API."""
+# Content-addressed cache so duplicate images are not sent to OCR again
+ocr_cache = build_ocr_cache()
+
+
+async def ocr_image_contents(ocr_backend: OCRBackend,
+                             contents: bytes,
+                             timeout: float = OCR_TIMEOUT_SECONDS,
+                             cache: OCRCache | None = None,
+                             preprocessor: ImagePreprocessor | None = None) -> str:
+    """Perform OCR on raw image bytes with the given OCR backend.
+
+    The OCR cache is checked first, so an image seen before costs no OCR call.
+    Cache keys hash the bytes as uploaded; only misses are preprocessed.
+    """
+    cache = ocr_cache if cache is None else cache
+    preprocessor = image_preprocessor if preprocessor is None else preprocessor
+    content_hash = image_content_hash(contents, ocr_backend.cache_namespace)
+    cached_text = await asyncio.to_thread(cache.get, content_hash)
+    if cached_text is not None:
+        logger.info("✅ OCR cache hit, skipping OCR call.")
+        return cached_text
+
+    # The backend runs OCR in its worker pool so the event loop is not blocked
+    logger.info(f"🔍 Performing OCR on the uploaded image ({ocr_backend.name}).")
+    ocr_text = await ocr_backend.ocr_image(await preprocessor.preprocess(contents), timeout=timeout)
+
+    await asyncio.to_thread(cache.set, content_hash, ocr_text)
+    return ocr_text
+
+
+async def cloud_ocr_from_image_file(ocr_backend: OCRBackend,
+                                    file: UploadFile = File(...),
+                                    timeout: float = OCR_TIMEOUT_SECONDS,
+                                    cache: OCRCache | None = None):
+    """Perform OCR on an image file with the given OCR backend, see app.helpers.ocr_backends."""
     # Read the image file
     contents = await file.read()
-    image = vision.Image(content=contents)
-
-    # Perform OCR
-    logger.info("🔍 Performing OCR on the uploaded image.")
-    response = vision_client.text_detection(image=image)
-
-    # Check for errors
-    if response.error.message:
-        raise Exception(f"Google Vision API Error: {response.error.message}")
-
-    if not response.text_annotations:
-        logger.warning("⚠ No text detected in the image.")
-    else:
-        logger.info(f"✅ Text detected: {response.text_annotations[0].description}")
-    # Extract text from response
-    ocr_text = response.text_annotations[0].description if response.text_annotations else ""
-    
-    return ocr_text
+    return await ocr_image_contents(ocr_backend, contents, timeout=timeout, cache=cache)
+
+
+async def _ocr_contents_concurrently(ocr_backend: OCRBackend,
+                                     contents: list[bytes],
+                                     max_concurrency: int,
+                                     timeout: float,
+                                     cache: OCRCache | None = None,
+                                     preprocessor: ImagePreprocessor | None = None) -> list[str | BaseException]:
+    """Run single-image OCR for each item with bounded concurrency, in input order."""
+    semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def _ocr_with_limit(image_contents: bytes) -> str:
+        async with semaphore:
+            return await asyncio.wait_for(
+                ocr_image_contents(ocr_backend, image_contents, timeout=timeout, cache=cache,
+                                   preprocessor=preprocessor),
+                timeout=ocr_backend.request_timeout(timeout)
+            )
+
+    return await asyncio.gather(*(_ocr_with_limit(item) for item in contents),
+                                return_exceptions=True)
+
+
+async def batch_cloud_ocr_from_image_files(ocr_backend: OCRBackend,
+                                           files: list[UploadFile],
+                                           batch_size: int | None = None,
+                                           max_concurrency: int = OCR_MAX_CONCURRENCY,
+                                           timeout: float = OCR_TIMEOUT_SECONDS,
+                                           cache: OCRCache | None = None,
+                                           preprocessor: ImagePreprocessor | None = None) -> list[str | BaseException]:
+    """Perform OCR on multiple image files using batched backend requests.
+
+    Images already in the OCR cache, and repeats of the same image within the
+    upload, are not sent to OCR. The rest are preprocessed, see
+    app.helpers.image_preprocessing, and packed into batches of up to
+    `batch_size` images (the backend's batch size by default, 16 for Vision),
+    sent concurrently. Only the images that failed inside a batch (or whose
+    whole batch failed) are retried with individual calls. Results are
+    returned in the same order as `files`.
+    """
+    cache = ocr_cache if cache is None else cache
+    preprocessor = image_preprocessor if preprocessor is None else preprocessor
+    batch_size = batch_size or ocr_backend.batch_size
+    contents = [await file.read() for file in files]
+    content_hashes = [image_content_hash(item, ocr_backend.cache_namespace) for item in contents]
+    ocr_texts: dict[str, str | BaseException] = await asyncio.to_thread(cache.get_many, content_hashes)
+
+    # One OCR request per distinct image that is not cached yet
+    pending = {}
+    for content_hash, item in zip(content_hashes, contents):
+        if content_hash not in ocr_texts:
+            pending.setdefault(content_hash, item)
+    pending_hashes = list(pending)
+    pending = dict(zip(pending_hashes, await preprocessor.preprocess_many(list(pending.values()))))
+    chunks = [pending_hashes[i:i + batch_size] for i in range(0, len(pending_hashes), batch_size)]
+    logger.info(f"🔍 Performing OCR on {len(contents)} images with {ocr_backend.name}: {len(ocr_texts)} cached, "
+                f"{len(pending_hashes)} sent in {len(chunks)} batch requests.")
+
+    semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def _annotate_chunk(chunk: list[str]) -> list[str | BaseException]:
+        async with semaphore:
+            return await asyncio.wait_for(
+                ocr_backend.ocr_images([pending[content_hash] for content_hash in chunk], timeout=timeout),
+                timeout=ocr_backend.request_timeout(timeout)
+            )
+
+    chunk_results = await asyncio.gather(*(_annotate_chunk(chunk) for chunk in chunks),
+                                         return_exceptions=True)
+
+    for chunk, chunk_result in zip(chunks, chunk_results):
+        if isinstance(chunk_result, BaseException):
+            logger.warning(f"⚠ Batch OCR request failed for {len(chunk)} images: {chunk_result}")
+            chunk_result = [chunk_result] * len(chunk)
+        ocr_texts.update(zip(chunk, chunk_result))
+
+    # Fall back to per-image calls for the failed items only
+    failed = [content_hash for content_hash in pending_hashes
+              if isinstance(ocr_texts[content_hash], BaseException)]
+    if failed:
+        logger.warning(f"⚠ Retrying OCR individually for {len(failed)} images.")
+        retries = await _ocr_contents_concurrently(ocr_backend,
+                                                   [pending[content_hash] for content_hash in failed],
+                                                   max_concurrency, timeout,
+                                                   cache=NullOCRCache(),
+                                                   preprocessor=ImagePreprocessor(enabled=False))
+        ocr_texts.update(zip(failed, retries))
+
+    await asyncio.to_thread(cache.set_many, {
+        content_hash: ocr_texts[content_hash]
+        for content_hash in pending_hashes
+        if not isinstance(ocr_texts[content_hash], BaseException)
+    })
+    return [ocr_texts[content_hash] for content_hash in content_hashes]
+
 
+def generate_dot_record(ocr_result: OCRResultCreate,
+                        known_usdots: KnownUSDOTIndex | None = None) -> OCRResult:
+    """Extract DOT number from OCR text.
 
-def generate_dot_record(ocr_result: OCRResultCreate) -> OCRResult:
-    """Extract DOT number from OCR text."""
+    Every DOT and MC number is extracted, see app.helpers.dot_extraction, and
+    the most plausible DOT number is kept with its confidence.
+    """
     try:
-        # Extract the 10-digit number following "DOT"
         logger.info("🔍 Extracting DOT number from OCR result.")
-        match = re.search(r'\b(?:US\s*DOT|USDOT|DOT)[\s#-]*?(\d{5,8})\b', ocr_result.extracted_text, re.IGNORECASE)
-        dot_reading = match.group(1) if match else "00000000" # 00000000 is the orphan record so the foreign key is maintained
+        candidates = extract_identifiers(ocr_result.extracted_text, known_usdots)
+        candidate = best_dot_candidate(candidates)
+        dot_reading = candidate.number if candidate else "00000000" # 00000000 is the orphan record so the foreign key is maintained
 
-        if not dot_reading:
+        if not candidate:
             logger.warning("❌ No DOT number found in OCR result.")
         else:
-            logger.info(f"✅ DOT number extracted: {dot_reading}")
+            logger.info(f"✅ DOT number extracted: {dot_reading} (confidence {candidate.confidence:.2f}, "
+                        f"{'known' if candidate.known else 'unverified'})")
+        other_numbers = [f"{other.kind.upper()} {other.number}" for other in candidates if other is not candidate]
+        if other_numbers:
+            logger.info(f"🔍 Other numbers in the image: {', '.join(other_numbers)}")
 
         # Validate and update the OCR result
         return OCRResult.model_validate(
             ocr_result, 
             update={
                 "timestamp": datetime.now(),
-                "dot_reading": dot_reading
+                "dot_reading": dot_reading,
+                "dot_confidence": candidate.confidence if candidate else None
             }
         )
     except Exception as e:
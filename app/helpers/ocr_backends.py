@@ -0,0 +1,346 @@
+import asyncio
+import io
+import logging
+import os
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+from typing import Callable
+from google.cloud import vision
+from google.cloud.vision import ImageAnnotatorClient
+from app.helpers.dot_extraction import best_dot_candidate, extract_identifiers
+from app.helpers.image_preprocessing import enable_heif_decoding
+
+# Set up a module-level logger
+logger = logging.getLogger(__name__)
+
+# OCR concurrency settings
+OCR_MAX_CONCURRENCY = int(os.environ.get("OCR_MAX_CONCURRENCY", 8))
+OCR_TIMEOUT_SECONDS = float(os.environ.get("OCR_TIMEOUT_SECONDS", 30))
+
+# OCR backend settings
+OCR_BACKEND = os.environ.get("OCR_BACKEND", "vision")  # vision, tesseract or cascade
+OCR_BACKEND_BY_ORG = os.environ.get("OCR_BACKEND_BY_ORG", "")  # org_id=backend,org_id=backend
+TESSERACT_WORKERS = int(os.environ.get("TESSERACT_WORKERS", os.cpu_count() or 1))
+TESSERACT_LANG = os.environ.get("TESSERACT_LANG", "eng")
+# Sparse text mode finds labels scattered over a truck door, LSTM engine only
+TESSERACT_CONFIG = os.environ.get("TESSERACT_CONFIG", "--oem 1 --psm 11")
+
+# The Vision API accepts at most 16 images per batch_annotate_images request
+VISION_BATCH_SIZE = 16
+
+
+class OCRBackend:
+    """Turns image bytes into text. Subclasses implement the OCR engine.
+
+    Blocking engine calls run in the backend's executor so the event loop is
+    not blocked. The OCR cache and concurrency limits are applied by the
+    callers in app.helpers.ocr.
+    """
+    name = ""
+    batch_size = 1  # Images per detect_text_batch call
+    cache_namespace = ""  # Hashed with the image bytes so each backend caches its own text
+
+    def __init__(self, executor: Executor | None = None):
+        self._executor = executor
+
+    @property
+    def executor(self) -> Executor:
+        if self._executor is None:
+            self._executor = self._create_executor()
+        return self._executor
+
+    async def ocr_image(self, contents: bytes, timeout: float = OCR_TIMEOUT_SECONDS) -> str:
+        """Return the text of one image."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, partial(self.detect_text, contents, timeout))
+
+    async def ocr_images(self, contents: list[bytes],
+                         timeout: float = OCR_TIMEOUT_SECONDS) -> list[str | BaseException]:
+        """Return the text of up to batch_size images, or the exception of each image that failed."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, partial(self.detect_text_batch, contents, timeout))
+
+    def request_timeout(self, timeout: float) -> float:
+        """Longest an ocr_image or ocr_images call may take when each OCR step is given timeout."""
+        return timeout
+
+    def detect_text(self, contents: bytes, timeout: float) -> str:
+        raise NotImplementedError
+
+    def detect_text_batch(self, contents: list[bytes], timeout: float) -> list[str | BaseException]:
+        results = []
+        for item in contents:
+            try:
+                results.append(self.detect_text(item, timeout))
+            except Exception as e:
+                results.append(e)
+        return results
+
+    def close(self) -> None:
+        """Shut down the executor. It is created again on next use."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def _create_executor(self) -> Executor:
+        raise NotImplementedError
+
+
+def text_from_annotate_response(response) -> str:
+    """Extract the full text from a Vision annotate response."""
+    # Check for errors
+    if response.error.message:
+        raise Exception(f"Google Vision API Error: {response.error.message}")
+
+    if not response.text_annotations:
+        logger.warning("⚠ No text detected in the image.")
+    else:
+        logger.info(f"✅ Text detected: {response.text_annotations[0].description}")
+    # Extract text from response
+    return response.text_annotations[0].description if response.text_annotations else ""
+
+
+def batch_text_detection(vision_client: ImageAnnotatorClient,
+                         contents: list[bytes],
+                         timeout: float = OCR_TIMEOUT_SECONDS) -> list[str | Exception]:
+    """Run text detection for several images in one batch_annotate_images call.
+
+    Returns one entry per image, in order: the detected text, or the
+    exception for an image the API failed to annotate.
+    """
+    requests = [
+        vision.AnnotateImageRequest(
+            image=vision.Image(content=content),
+            features=[vision.Feature(type_=vision.Feature.Type.TEXT_DETECTION)]
+        )
+        for content in contents
+    ]
+    response = vision_client.batch_annotate_images(requests=requests, timeout=timeout)
+
+    if len(response.responses) != len(contents):
+        raise Exception(f"Google Vision API returned {len(response.responses)} responses "
+                        f"for {len(contents)} images.")
+
+    results = []
+    for image_response in response.responses:
+        try:
+            results.append(text_from_annotate_response(image_response))
+        except Exception as e:
+            results.append(e)
+    return results
+
+
+class VisionOCRBackend(OCRBackend):
+    """Google Cloud Vision text detection, up to 16 images per request.
+
+    The client is created on first use, so deployments that never call
+    Vision need no API key.
+    """
+    name = "vision"
+    batch_size = VISION_BATCH_SIZE
+
+    def __init__(self,
+                 vision_client: ImageAnnotatorClient | None = None,
+                 executor: Executor | None = None,
+                 max_workers: int = OCR_MAX_CONCURRENCY):
+        super().__init__(executor)
+        self._vision_client = vision_client
+        self.max_workers = max_workers
+
+    @property
+    def vision_client(self) -> ImageAnnotatorClient:
+        if self._vision_client is None:
+            self._vision_client = vision.ImageAnnotatorClient(
+                client_options={"api_key": os.environ.get("GCP_OCR_API_KEY")}
+            )
+        return self._vision_client
+
+    def detect_text(self, contents: bytes, timeout: float) -> str:
+        response = self.vision_client.text_detection(image=vision.Image(content=contents), timeout=timeout)
+        return text_from_annotate_response(response)
+
+    def detect_text_batch(self, contents: list[bytes], timeout: float) -> list[str | BaseException]:
+        return batch_text_detection(self.vision_client, contents, timeout)
+
+    def _create_executor(self) -> Executor:
+        return ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="ocr")
+
+
+def _init_tesseract_worker() -> None:
+    # The pool runs one image per core already, more Tesseract threads only contend
+    os.environ.setdefault("OMP_THREAD_LIMIT", "1")
+    # HEIC uploads reach Tesseract as sent when preprocessing is disabled
+    enable_heif_decoding()
+
+
+def tesseract_image_text(contents: bytes, lang: str, config: str, timeout: float) -> str:
+    """Run Tesseract on image bytes. Runs in a worker process of TesseractOCRBackend."""
+    import pytesseract  # Optional, only deployments using the tesseract backend install it
+    from PIL import Image
+
+    with Image.open(io.BytesIO(contents)) as image:
+        return pytesseract.image_to_string(image, lang=lang, config=config, timeout=timeout).strip()
+
+
+class TesseractOCRBackend(OCRBackend):
+    """Local Tesseract OCR in a process pool, one image per worker.
+
+    Needs the tesseract binary and the pytesseract package. Costs nothing
+    per image and works offline, but reads small or angled text less
+    reliably than Vision.
+    """
+    name = "tesseract"
+    cache_namespace = "tesseract"
+
+    def __init__(self,
+                 executor: Executor | None = None,
+                 max_workers: int = TESSERACT_WORKERS,
+                 lang: str = TESSERACT_LANG,
+                 config: str = TESSERACT_CONFIG):
+        super().__init__(executor)
+        self.max_workers = max_workers
+        self.lang = lang
+        self.config = config
+
+    async def ocr_image(self, contents: bytes, timeout: float = OCR_TIMEOUT_SECONDS) -> str:
+        loop = asyncio.get_running_loop()
+        ocr_text = await loop.run_in_executor(self.executor, tesseract_image_text,
+                                              contents, self.lang, self.config, timeout)
+        if not ocr_text:
+            logger.warning("⚠ No text detected in the image.")
+        return ocr_text
+
+    async def ocr_images(self, contents: list[bytes],
+                         timeout: float = OCR_TIMEOUT_SECONDS) -> list[str | BaseException]:
+        return await asyncio.gather(*(self.ocr_image(item, timeout) for item in contents),
+                                    return_exceptions=True)
+
+    def _create_executor(self) -> Executor:
+        return ProcessPoolExecutor(max_workers=self.max_workers, initializer=_init_tesseract_worker)
+
+
+def has_dot_candidate(ocr_text: str) -> bool:
+    """Whether OCR text holds a DOT number, see app.helpers.dot_extraction."""
+    return best_dot_candidate(extract_identifiers(ocr_text)) is not None
+
+
+class CascadeOCRBackend(OCRBackend):
+    """Runs the local backend first and sends an image to the remote one only when needed.
+
+    An image escalates when the local backend fails on it or its text has no
+    DOT candidate, so Vision is paid for only the images Tesseract cannot read.
+    Each stage has its own timeout: an image the local backend cannot read in
+    time, for example while its workers are busy, escalates as well.
+    """
+    name = "cascade"
+    cache_namespace = "cascade"
+
+    def __init__(self,
+                 local: OCRBackend,
+                 remote: OCRBackend,
+                 is_sufficient: Callable[[str], bool] = has_dot_candidate):
+        super().__init__()
+        self.local = local
+        self.remote = remote
+        self.is_sufficient = is_sufficient
+        self.batch_size = remote.batch_size
+        self.escalations = 0
+
+    async def ocr_image(self, contents: bytes, timeout: float = OCR_TIMEOUT_SECONDS) -> str:
+        return (await self.ocr_images([contents], timeout))[0]
+
+    async def ocr_images(self, contents: list[bytes],
+                         timeout: float = OCR_TIMEOUT_SECONDS) -> list[str | BaseException]:
+        # Per image, so a slow image does not take the local results of the others with it
+        results = await asyncio.gather(*(
+            asyncio.wait_for(self.local.ocr_image(item, timeout), self.local.request_timeout(timeout))
+            for item in contents
+        ), return_exceptions=True)
+        escalate = [i for i, ocr_text in enumerate(results)
+                    if isinstance(ocr_text, BaseException) or not self.is_sufficient(ocr_text)]
+        if not escalate:
+            return results
+
+        logger.info(f"🔍 {len(escalate)} of {len(contents)} images have no DOT candidate "
+                    f"from {self.local.name}, sending them to {self.remote.name}.")
+        self.escalations += len(escalate)
+        remote_results = []
+        for i in range(0, len(escalate), self.remote.batch_size):
+            chunk = escalate[i:i + self.remote.batch_size]
+            try:
+                remote_results.extend(await asyncio.wait_for(
+                    self.remote.ocr_images([contents[j] for j in chunk], timeout),
+                    self.remote.request_timeout(timeout)
+                ))
+            except Exception as e:
+                remote_results.extend([e] * len(chunk))
+
+        results = list(results)
+        for position, remote_result in zip(escalate, remote_results):
+            # Keep the local text when the remote backend fails too
+            if not isinstance(remote_result, BaseException) or isinstance(results[position], BaseException):
+                results[position] = remote_result
+        return results
+
+    def request_timeout(self, timeout: float) -> float:
+        return self.local.request_timeout(timeout) + self.remote.request_timeout(timeout)
+
+    def close(self) -> None:
+        self.local.close()
+        self.remote.close()
+
+
+def parse_org_backends(setting: str = OCR_BACKEND_BY_ORG) -> dict[str, str]:
+    """Parse the org_id=backend pairs of OCR_BACKEND_BY_ORG."""
+    org_backends = {}
+    for pair in setting.split(","):
+        org_id, _, backend = pair.partition("=")
+        if org_id.strip() and backend.strip():
+            org_backends[org_id.strip()] = backend.strip()
+    return org_backends
+
+
+class OCRBackendRegistry:
+    """Creates each configured backend once and picks the one for an org.
+
+    Orgs listed in OCR_BACKEND_BY_ORG get their own backend, the rest use
+    OCR_BACKEND. Backends are shared, so the cascade reuses the same
+    Tesseract pool and Vision client as the plain backends.
+    """
+
+    def __init__(self, default: str = OCR_BACKEND, org_backends: dict[str, str] | None = None):
+        self.default = default
+        self.org_backends = parse_org_backends() if org_backends is None else org_backends
+        self._backends: dict[str, OCRBackend] = {}
+
+    def get(self, org_id: str | None = None) -> OCRBackend:
+        return self._backend(self.org_backends.get(org_id, self.default))
+
+    def close(self) -> None:
+        for backend in self._backends.values():
+            backend.close()
+        self._backends.clear()
+
+    def _backend(self, name: str) -> OCRBackend:
+        if name not in self._backends:
+            if name == "vision":
+                self._backends[name] = VisionOCRBackend()
+            elif name == "tesseract":
+                self._backends[name] = TesseractOCRBackend()
+            elif name == "cascade":
+                self._backends[name] = CascadeOCRBackend(self._backend("tesseract"), self._backend("vision"))
+            else:
+                logger.warning(f"⚠ Unknown OCR backend {name!r}, using vision.")
+                self._backends[name] = self._backend("vision")
+                return self._backends[name]
+            logger.info(f"🔍 Using the {name} OCR backend.")
+        return self._backends[name]
+
+
+# Backends shared by all requests, closed by the app lifespan
+ocr_backends = OCRBackendRegistry()
+
+
+def get_ocr_backend(org_id: str | None = None) -> OCRBackend:
+    """Return the OCR backend configured for an org, or for the deployment."""
+    return ocr_backends.get(org_id)
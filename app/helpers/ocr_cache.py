@@ -0,0 +1,157 @@
+import hashlib
+import logging
+import os
+import threading
+from typing import Callable
+from sqlmodel import Session
+from app.helpers.cache import TTLCache, hit_rate
+
+# Set up a module-level logger
+logger = logging.getLogger(__name__)
+
+# OCR cache settings
+OCR_CACHE_BACKEND = os.environ.get("OCR_CACHE_BACKEND", "memory")  # memory, postgres or none
+OCR_CACHE_TTL_SECONDS = float(os.environ.get("OCR_CACHE_TTL_SECONDS", 7 * 24 * 3600))
+OCR_CACHE_MAX_ENTRIES = int(os.environ.get("OCR_CACHE_MAX_ENTRIES", 10000))
+
+
+def image_content_hash(contents: bytes, namespace: str = "") -> str:
+    """Return the cache key for an image: the SHA-256 hex digest of its bytes.
+
+    Text from OCR backends other than Vision is kept apart by hashing the
+    backend's namespace in front of the bytes.
+    """
+    return hashlib.sha256(namespace.encode() + contents).hexdigest()
+
+
+class OCRCache:
+    """Content-addressed OCR text cache. Subclasses implement the storage backend."""
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self._counter_lock = threading.Lock()
+
+    def get_many(self, content_hashes: list[str]) -> dict[str, str]:
+        """Return cached OCR text for the hashes that are present and not expired."""
+        content_hashes = list(dict.fromkeys(content_hashes))
+        if not content_hashes:
+            return {}
+        try:
+            found = self._get_many(content_hashes)
+        except Exception as e:
+            logger.warning(f"⚠ OCR cache lookup failed, treating as miss: {e}")
+            found = {}
+
+        with self._counter_lock:
+            self.hits += len(found)
+            self.misses += len(content_hashes) - len(found)
+        return found
+
+    def set_many(self, entries: dict[str, str]) -> None:
+        """Store OCR text for the given hashes. Failures are logged, never raised."""
+        if not entries:
+            return
+        try:
+            self._set_many(entries)
+        except Exception as e:
+            logger.warning(f"⚠ OCR cache write failed: {e}")
+
+    def get(self, content_hash: str) -> str | None:
+        return self.get_many([content_hash]).get(content_hash)
+
+    def set(self, content_hash: str, extracted_text: str) -> None:
+        self.set_many({content_hash: extracted_text})
+
+    def stats(self) -> dict:
+        """Return hit/miss counters for monitoring."""
+        return {"backend": type(self).__name__, "hits": self.hits, "misses": self.misses,
+                "hit_rate": hit_rate(self.hits, self.misses)}
+
+    def _get_many(self, content_hashes: list[str]) -> dict[str, str]:
+        raise NotImplementedError
+
+    def _set_many(self, entries: dict[str, str]) -> None:
+        raise NotImplementedError
+
+
+class NullOCRCache(OCRCache):
+    """Cache backend that stores nothing, used when caching is disabled."""
+
+    def _get_many(self, content_hashes: list[str]) -> dict[str, str]:
+        return {}
+
+    def _set_many(self, entries: dict[str, str]) -> None:
+        pass
+
+
+class InMemoryOCRCache(OCRCache):
+    """Per-process LRU cache with TTL and size limits."""
+
+    def __init__(self,
+                 max_entries: int = OCR_CACHE_MAX_ENTRIES,
+                 ttl_seconds: float = OCR_CACHE_TTL_SECONDS):
+        super().__init__()
+        # Lookups are counted once, by OCRCache
+        self._cache = TTLCache(maxsize=max_entries, ttl_seconds=ttl_seconds, count_lookups=False)
+
+    def _get_many(self, content_hashes: list[str]) -> dict[str, str]:
+        found = {}
+        for content_hash in content_hashes:
+            extracted_text = self._cache.get(content_hash)
+            if extracted_text is not None:
+                found[content_hash] = extracted_text
+        return found
+
+    def _set_many(self, entries: dict[str, str]) -> None:
+        for content_hash, extracted_text in entries.items():
+            self._cache.set(content_hash, extracted_text)
+
+    def stats(self) -> dict:
+        return {**super().stats(), "size": len(self._cache)}
+
+
+class PostgresOCRCache(OCRCache):
+    """Cache backed by the ocrtextcache table, shared by all instances.
+
+    Expired and excess entries are pruned every `prune_every` writes.
+    """
+
+    def __init__(self,
+                 session_factory: Callable[[], Session],
+                 max_entries: int = OCR_CACHE_MAX_ENTRIES,
+                 ttl_seconds: float = OCR_CACHE_TTL_SECONDS,
+                 prune_every: int = 100):
+        super().__init__()
+        self.session_factory = session_factory
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.prune_every = prune_every
+        self._writes = 0
+
+    def _get_many(self, content_hashes: list[str]) -> dict[str, str]:
+        from app.crud.ocr_results import get_cached_ocr_texts
+        with self.session_factory() as db:
+            return get_cached_ocr_texts(db, content_hashes, self.ttl_seconds)
+
+    def _set_many(self, entries: dict[str, str]) -> None:
+        from app.crud.ocr_results import save_cached_ocr_texts, prune_ocr_text_cache
+        with self.session_factory() as db:
+            save_cached_ocr_texts(db, entries)
+
+            self._writes += 1
+            if self._writes % self.prune_every == 0:
+                prune_ocr_text_cache(db, self.ttl_seconds, self.max_entries)
+
+
+def build_ocr_cache(backend: str = OCR_CACHE_BACKEND) -> OCRCache:
+    """Create the OCR cache configured for this deployment."""
+    if backend == "postgres":
+        from app.database import engine
+        logger.info("🔍 Using the Postgres OCR cache.")
+        return PostgresOCRCache(session_factory=lambda: Session(engine))
+    if backend == "memory":
+        logger.info("🔍 Using the in-process OCR cache.")
+        return InMemoryOCRCache()
+    logger.info("🔍 OCR cache disabled.")
+    return NullOCRCache()
@@ -0,0 +1,22 @@
+import base64
+import json
+from datetime import datetime
+
+
+def encode_cursor(timestamp: datetime, key: str | int) -> str:
+    """Encode the sort position of the last row on a page as an opaque cursor token."""
+    payload = json.dumps([timestamp.isoformat(), key], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, str | int]:
+    """Decode a cursor token back into its (timestamp, key) sort position.
+
+    Raises ValueError when the token was not produced by encode_cursor.
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        timestamp, key = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return datetime.fromisoformat(timestamp), key
+    except Exception as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
@@ -0,0 +1,40 @@
+import threading
+import time
+
+
+class TokenBucket:
+    """Thread-safe token bucket for limiting the request rate to an external service.
+
+    Tokens refill continuously at `rate_per_second` up to `capacity`, so short
+    bursts are allowed while the long-run rate stays bounded.
+    """
+
+    def __init__(self, rate_per_second: float, capacity: float = 1):
+        self.rate_per_second = rate_per_second
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.capacity,
+                           self._tokens + (now - self._updated_at) * self.rate_per_second)
+        self._updated_at = now
+
+    def try_acquire(self, tokens: float = 1) -> float:
+        """Take tokens if available. Returns 0 on success, otherwise the seconds to wait."""
+        with self._lock:
+            self._refill()
+            if self._tokens >= tokens:
+                self._tokens -= tokens
+                return 0
+            return (tokens - self._tokens) / self.rate_per_second
+
+    def acquire(self, tokens: float = 1) -> None:
+        """Block the calling thread until tokens are available."""
+        while True:
+            wait = self.try_acquire(tokens)
+            if not wait:
+                return
+            time.sleep(wait)
@@ -1,44 +1,262 @@
+import asyncio
 import logging
+import os
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from functools import partial
 from flatten_dict import flatten
 from safer import CompanySnapshot
+from safer.exceptions import CompanySnapshotNotFoundException
+from sqlmodel import Session
 from app.models.carrier_data import CarrierDataCreate
+from app.crud.carrier_data import get_fresh_carrier_data, get_stored_usdots
+from app.helpers.census import get_census_lookups
+from app.helpers.cache import TTLCache
+from app.helpers.rate_limit import TokenBucket
 
 # Set up a module-level logger
 logger = logging.getLogger(__name__)
 
+# SAFER cache settings
+SAFER_CACHE_MAX_AGE_SECONDS = float(os.environ.get("SAFER_CACHE_MAX_AGE_SECONDS", 30 * 24 * 3600))
+SAFER_NEGATIVE_CACHE_TTL_SECONDS = float(os.environ.get("SAFER_NEGATIVE_CACHE_TTL_SECONDS", 24 * 3600))
+SAFER_CACHE_MAX_ENTRIES = int(os.environ.get("SAFER_CACHE_MAX_ENTRIES", 5000))
 
-def safer_web_lookup_from_dot(safer_client: CompanySnapshot,
-                              dot_number: str) -> CarrierDataCreate:
-    """Perform a safer web lookup using the dot reading."""
+# census: resolve carriers from the imported FMCSA census, scrape SAFER only for missing DOTs
+# safer: always scrape SAFER
+CARRIER_LOOKUP_MODE = os.environ.get("CARRIER_LOOKUP_MODE", "census")
+
+# SAFER request settings, shared by all requests so we stay polite to FMCSA
+SAFER_MAX_CONCURRENCY = int(os.environ.get("SAFER_MAX_CONCURRENCY", 4))
+SAFER_RATE_PER_SECOND = float(os.environ.get("SAFER_RATE_PER_SECOND", 2))
+SAFER_RATE_BURST = float(os.environ.get("SAFER_RATE_BURST", 4))
+SAFER_MAX_RETRIES = int(os.environ.get("SAFER_MAX_RETRIES", 3))
+SAFER_BACKOFF_SECONDS = float(os.environ.get("SAFER_BACKOFF_SECONDS", 1))
+
+# In-process cache of recent lookups (hits and misses) for hot DOT numbers
+safer_cache = TTLCache(maxsize=SAFER_CACHE_MAX_ENTRIES,
+                       ttl_seconds=SAFER_CACHE_MAX_AGE_SECONDS)
+
+# Worker pool for the blocking SAFER scrapes and the global request rate limit
+safer_executor = ThreadPoolExecutor(max_workers=SAFER_MAX_CONCURRENCY,
+                                    thread_name_prefix="safer")
+safer_rate_limiter = TokenBucket(rate_per_second=SAFER_RATE_PER_SECOND,
+                                 capacity=SAFER_RATE_BURST)
+
+
+def fetch_safer_snapshot(safer_client: CompanySnapshot,
+                         dot_number: str) -> CarrierDataCreate:
+    """Scrape the SAFER company snapshot for a DOT number.
+
+    Returns a record with lookup_success_flag=False when SAFER has no such
+    carrier. Transport and parsing errors are raised to the caller.
+    """
+    logger.info(f"🔍 Performing SAFER web lookup for DOT number: {dot_number}")
     try:
-        logger.info(f"🔍 Performing SAFER web lookup for DOT number: {dot_number}")
         results = safer_client.get_by_usdot_number(int(dot_number))
-        logger.info(results)
-        if results:
-            logger.info(f"✅ SAFER web lookup results found: {results}")
-
-            results = results.to_dict()
-            if results['usdot'] != dot_number:
-                logger.warning(f"⚠ SAFER web lookup returned a different DOT number: original = {dot_number}, safer = {results['usdot']}")
-                results['usdot'] = dot_number  # Ensure usdot is same as the input
-            results.pop('us_inspections', None)
-            results = flatten(results, reducer='underscore')
-
-            result_record = CarrierDataCreate.model_validate(
-                results,
-                update={
-                    "operation_classification": ', '.join(results.get("operation_classification", [])),
-                    "carrier_operation": ', '.join(results.get("carrier_operation", [])),
-                    "cargo_carried": ', '.join(results.get("cargo_carried", [])),
-                    "lookup_success_flag": True,
-                }
-            )
-            return result_record
-        
+    except CompanySnapshotNotFoundException:
+        results = None
+    logger.info(results)
+
+    if not results:
+        logger.warning("⚠ No data found for the provided DOT number.")
+        return CarrierDataCreate(usdot=dot_number,
+                                 lookup_success_flag=False)
+
+    logger.info(f"✅ SAFER web lookup results found: {results}")
+
+    results = results.to_dict()
+    if results['usdot'] != dot_number:
+        logger.warning(f"⚠ SAFER web lookup returned a different DOT number: original = {dot_number}, safer = {results['usdot']}")
+        results['usdot'] = dot_number  # Ensure usdot is same as the input
+    results.pop('us_inspections', None)
+    results = flatten(results, reducer='underscore')
+
+    return CarrierDataCreate.model_validate(
+        results,
+        update={
+            "operation_classification": ', '.join(results.get("operation_classification", [])),
+            "carrier_operation": ', '.join(results.get("carrier_operation", [])),
+            "cargo_carried": ', '.join(results.get("cargo_carried", [])),
+            "lookup_timestamp": datetime.utcnow(),
+            "lookup_success_flag": True,
+        }
+    )
+
+
+def fetch_safer_snapshot_with_retry(safer_client: CompanySnapshot,
+                                    dot_number: str,
+                                    max_retries: int = SAFER_MAX_RETRIES,
+                                    backoff_seconds: float = SAFER_BACKOFF_SECONDS) -> CarrierDataCreate:
+    """Scrape the SAFER snapshot under the global rate limit, retrying failures.
+
+    Retries use exponential backoff with jitter. Parsing errors (ValueError)
+    are not retried since another attempt would fail the same way.
+    """
+    for attempt in range(max_retries + 1):
+        safer_rate_limiter.acquire()
+        try:
+            return fetch_safer_snapshot(safer_client, dot_number)
+        except ValueError:
+            raise
+        except Exception as e:
+            if attempt == max_retries:
+                raise
+            delay = backoff_seconds * 2 ** attempt * random.uniform(0.5, 1)
+            logger.warning(f"⚠ SAFER lookup for {dot_number} failed ({e}), retrying in {delay:.1f}s")
+            time.sleep(delay)
+
+
+def get_cached_safer_lookups(dot_numbers: list[str],
+                             db: Session = None,
+                             max_age_seconds: float = SAFER_CACHE_MAX_AGE_SECONDS,
+                             lookup_mode: str = None) -> dict[str, CarrierDataCreate]:
+    """Return cached SAFER results keyed by DOT number; missing numbers must be scraped.
+
+    Checks the in-process cache first, then stored CarrierData newer than
+    max_age_seconds and, in census lookup mode, the imported FMCSA census.
+    The census is only used for carriers with no CarrierData row: a stale
+    stored row is scraped again, since the census would blank its SAFER-only
+    fields on upsert. Rows stored before lookup_timestamp existed have it
+    empty too, so it cannot tell scraped rows apart.
+    """
+    found = {}
+    for dot_number in dot_numbers:
+        cached = safer_cache.get(dot_number)
+        if cached is not None:
+            logger.info(f"✅ SAFER cache hit for DOT number: {dot_number}")
+            found[dot_number] = cached
+
+    pending = [dot_number for dot_number in dot_numbers if dot_number not in found]
+    if db is None or not pending:
+        return found
+
+    try:
+        stored_carriers = get_fresh_carrier_data(db, pending, max_age_seconds)
+    except Exception as e:
+        logger.warning(f"⚠ Stored carrier data lookup failed, scraping instead: {e}")
+        stored_carriers = {}
+
+    for dot_number, stored in stored_carriers.items():
+        logger.info(f"✅ Reusing stored carrier data for DOT number: {dot_number}")
+        record = CarrierDataCreate.model_validate(stored, update={"lookup_success_flag": True})
+        cache_safer_lookup(record, max_age_seconds)
+        found[dot_number] = record
+
+    pending = [dot_number for dot_number in pending if dot_number not in found]
+    if (lookup_mode or CARRIER_LOOKUP_MODE) != "census" or not pending:
+        return found
+
+    try:
+        stored = get_stored_usdots(db, pending)
+    except Exception as e:
+        logger.warning(f"⚠ Stored carrier data lookup failed, scraping instead: {e}")
+        return found
+    pending = [dot_number for dot_number in pending if dot_number not in stored]
+
+    for dot_number, record in get_census_lookups(db, pending).items():
+        logger.info(f"✅ Resolved DOT number from the FMCSA census: {dot_number}")
+        cache_safer_lookup(record, max_age_seconds)
+        found[dot_number] = record
+    return found
+
+
+def get_cached_safer_lookup(dot_number: str,
+                            db: Session = None,
+                            max_age_seconds: float = SAFER_CACHE_MAX_AGE_SECONDS) -> CarrierDataCreate | None:
+    """Return a cached SAFER result for the DOT number, or None if it must be scraped."""
+    return get_cached_safer_lookups([dot_number], db, max_age_seconds).get(dot_number)
+
+
+def cache_safer_lookup(record: CarrierDataCreate,
+                       max_age_seconds: float = SAFER_CACHE_MAX_AGE_SECONDS) -> None:
+    """Store a SAFER result in the in-process cache.
+
+    Carriers that were not found are kept for the shorter negative TTL; found
+    carriers are kept until their data is max_age_seconds old.
+    """
+    if not record.lookup_success_flag:
+        safer_cache.set(record.usdot, record, ttl_seconds=SAFER_NEGATIVE_CACHE_TTL_SECONDS)
+        return
+
+    age = (datetime.utcnow() - record.lookup_timestamp).total_seconds() if record.lookup_timestamp else 0
+    if age < max_age_seconds:
+        safer_cache.set(record.usdot, record, ttl_seconds=max_age_seconds - age)
+
+
+def safer_web_lookup_from_dot(safer_client: CompanySnapshot,
+                              dot_number: str,
+                              db: Session = None,
+                              max_retries: int = SAFER_MAX_RETRIES) -> CarrierDataCreate:
+    """Perform a safer web lookup using the dot reading.
+
+    Recent results are served from the in-process cache or, when `db` is
+    given, from stored CarrierData, so known carriers are not scraped again.
+    """
+    cached = get_cached_safer_lookup(dot_number, db)
+    if cached is not None:
+        return cached
+
+    try:
+        result_record = fetch_safer_snapshot_with_retry(safer_client, dot_number, max_retries)
     except Exception as e:
         logger.error(f"❌ SAFER web lookup failed: {e}")
         logger.warning("⚠ No data found for the provided DOT number.")
-    
-    # Default to empty record if no data found or error
-    return CarrierDataCreate(usdot=dot_number, 
-                             lookup_success_flag=False)
+        # Default to empty record on error, errors are not cached
+        return CarrierDataCreate(usdot=dot_number,
+                                 lookup_success_flag=False)
+
+    cache_safer_lookup(result_record)
+    return result_record
+
+
+async def safer_web_lookups_from_dots(safer_client: CompanySnapshot,
+                                      dot_numbers: list[str],
+                                      db: Session = None,
+                                      max_concurrency: int = SAFER_MAX_CONCURRENCY,
+                                      max_retries: int = SAFER_MAX_RETRIES) -> list[CarrierDataCreate]:
+    """Look up many DOT numbers concurrently; results come back in input order.
+
+    Each distinct DOT number is resolved once. Cache misses are scraped in the
+    SAFER worker pool under the global rate limit, and a failed lookup only
+    affects its own DOT number. The transaction of db is rolled back before
+    scraping, so it must not hold unsaved changes.
+    """
+    unique_dots = list(dict.fromkeys(dot_numbers))
+
+    # The database read runs off the event loop, the session is only used by one thread at a time
+    results = await asyncio.to_thread(get_cached_safer_lookups, unique_dots, db)
+    pending = [dot_number for dot_number in unique_dots if dot_number not in results]
+    if pending:
+        logger.info(f"🔍 Scraping SAFER for {len(pending)} of {len(unique_dots)} DOT numbers.")
+    if pending and db is not None:
+        # Only reads ran on db. End its transaction so the pooled connection is not held
+        # idle through the rate-limited scrape, the caller's next statement starts a new one.
+        await asyncio.to_thread(db.rollback)
+
+    loop = asyncio.get_running_loop()
+    semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def lookup(dot_number: str) -> CarrierDataCreate:
+        async with semaphore:
+            return await loop.run_in_executor(
+                safer_executor,
+                partial(fetch_safer_snapshot_with_retry, safer_client, dot_number, max_retries)
+            )
+
+    fetched = await asyncio.gather(*(lookup(dot_number) for dot_number in pending),
+                                   return_exceptions=True)
+
+    for dot_number, record in zip(pending, fetched):
+        if isinstance(record, BaseException):
+            logger.error(f"❌ SAFER web lookup failed for DOT number {dot_number}: {record}")
+            # Default to empty record on error, errors are not cached
+            results[dot_number] = CarrierDataCreate(usdot=dot_number,
+                                                    lookup_success_flag=False)
+            continue
+        cache_safer_lookup(record)
+        results[dot_number] = record
+
+    return [results[dot_number] for dot_number in dot_numbers]
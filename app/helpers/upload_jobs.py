@@ -0,0 +1,125 @@
+import asyncio
+import logging
+import os
+from io import BytesIO
+from typing import Awaitable, Callable
+from fastapi import UploadFile
+from sqlmodel import Session
+from app.crud.upload_job import (
+    claim_next_upload_job,
+    get_pending_upload_job_files,
+    save_upload_job_file_outcomes,
+    finish_upload_job
+)
+from app.models.upload_job import UploadJob
+
+# Set up a module-level logger
+logger = logging.getLogger(__name__)
+
+# Upload job worker settings
+UPLOAD_JOB_WORKERS = int(os.environ.get("UPLOAD_JOB_WORKERS", 2))  # 0 disables the in-process workers
+UPLOAD_JOB_POLL_SECONDS = float(os.environ.get("UPLOAD_JOB_POLL_SECONDS", 5))
+UPLOAD_JOB_CHUNK_SIZE = int(os.environ.get("UPLOAD_JOB_CHUNK_SIZE", 16))
+UPLOAD_JOB_STALE_SECONDS = float(os.environ.get("UPLOAD_JOB_STALE_SECONDS", 900))
+
+# Runs the upload pipeline for a list of files: (db, files, user_id, org_id) -> one outcome per file
+ProcessFiles = Callable[[Session, list[UploadFile], str, str], Awaitable[list]]
+
+
+class UploadJobWorker:
+    """In-process worker pool that drains the database-backed upload job queue.
+
+    Jobs are processed in chunks of `chunk_size` files and progress is saved
+    after each chunk, so a job interrupted by a restart resumes where it stopped.
+    """
+
+    def __init__(self,
+                 workers: int = UPLOAD_JOB_WORKERS,
+                 poll_seconds: float = UPLOAD_JOB_POLL_SECONDS,
+                 chunk_size: int = UPLOAD_JOB_CHUNK_SIZE,
+                 stale_seconds: float = UPLOAD_JOB_STALE_SECONDS):
+        self.workers = workers
+        self.poll_seconds = poll_seconds
+        self.chunk_size = chunk_size
+        self.stale_seconds = stale_seconds
+        self.session_factory: Callable[[], Session] | None = None
+        self.process_files: ProcessFiles | None = None
+        self._tasks: list[asyncio.Task] = []
+        self._wakeup: asyncio.Event | None = None
+        # Claims run in threads now; one at a time per instance, SKIP LOCKED covers other instances
+        self._claim_lock = asyncio.Lock()
+
+    def start(self, session_factory: Callable[[], Session], process_files: ProcessFiles) -> None:
+        """Start the worker tasks on the running event loop."""
+        self.session_factory = session_factory
+        self.process_files = process_files
+        self._wakeup = asyncio.Event()
+        self._tasks = [asyncio.create_task(self._run(), name=f"upload-job-worker-{i}")
+                       for i in range(self.workers)]
+        logger.info(f"✅ Started {self.workers} upload job workers.")
+
+    async def stop(self) -> None:
+        """Cancel the worker tasks. Interrupted jobs are resumed once they go stale."""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def notify(self) -> None:
+        """Wake the workers after a job was queued."""
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                processed = await self.run_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.exception(f"❌ Upload job worker error: {e}")
+                processed = False
+
+            if not processed:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_seconds)
+                except asyncio.TimeoutError:
+                    pass
+
+    async def run_once(self) -> bool:
+        """Claim and process one job. Returns False when the queue is empty."""
+        with self.session_factory() as db:
+            # Blocking session calls run off the event loop, as in process_upload_files
+            async with self._claim_lock:
+                job = await asyncio.to_thread(claim_next_upload_job, db, self.stale_seconds)
+            if job is None:
+                return False
+
+            logger.info(f"🔍 Processing upload job {job.id} ({job.processed_files}/{job.total_files} files done).")
+            try:
+                await self.process_job(db, job)
+            except Exception as e:
+                logger.exception(f"❌ Upload job {job.id} failed: {e}")
+                await asyncio.to_thread(db.rollback)
+                await asyncio.to_thread(finish_upload_job, db, job, error=str(e))
+            return True
+
+    async def process_job(self, db: Session, job: UploadJob) -> None:
+        """Run the upload pipeline over the job's pending files, one chunk at a time."""
+        while job_files := await asyncio.to_thread(get_pending_upload_job_files, db, job.id, self.chunk_size):
+            uploads = [UploadFile(file=BytesIO(job_file.content or b""), filename=job_file.filename)
+                       for job_file in job_files]
+            try:
+                outcomes = await self.process_files(db, uploads, job.user_id, job.org_id)
+            except Exception as e:
+                logger.exception(f"❌ Error processing files of upload job {job.id}: {e}")
+                await asyncio.to_thread(db.rollback)
+                outcomes = [e] * len(job_files)
+            await asyncio.to_thread(save_upload_job_file_outcomes, db, job, job_files, outcomes)
+
+        await asyncio.to_thread(finish_upload_job, db, job)
+
+
+# Shared worker, started by the application lifespan
+upload_job_worker = UploadJobWorker()
@@ -5,8 +5,13 @@ from fastapi.staticfiles import StaticFiles
 from starlette.middleware.sessions import SessionMiddleware
 from contextlib import asynccontextmanager
 from typing import AsyncGenerator
-from app.database import init_db
+from sqlmodel import Session
+from app.database import init_db, engine
 from app.routes import dashboard, upload, auth, home, data, salesforce, heartbeat
+from app.helpers.upload_jobs import upload_job_worker
+from app.helpers.dot_correction import known_usdot_index
+from app.helpers.ocr_backends import ocr_backends
+from app.helpers.image_preprocessing import image_preprocessor
 from app.middleware.session_timeout import SessionTimeoutMiddleware
 
 # Configure Logging to Console
@@ -21,8 +26,15 @@ logging.basicConfig(
 async def lifespan(app: FastAPI) -> AsyncGenerator[None, None]:
     logger.info("Starting up...")
     init_db()
+    known_usdot_index.start(session_factory=lambda: Session(engine))
+    upload_job_worker.start(session_factory=lambda: Session(engine),
+                            process_files=upload.process_upload_files)
     yield
     logger.info("Shutting down...")
+    await upload_job_worker.stop()
+    await known_usdot_index.stop()
+    ocr_backends.close()
+    image_preprocessor.close()
     logger.info("Finished shutting down.")
 
 app = FastAPI(title="DOJ OCR Truck Recognition",
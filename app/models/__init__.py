@@ -1,26 +1,38 @@
 # Import all models here to ensure they are registered with SQLModel
 from .carrier_data import CarrierData, CarrierDataCreate
-from .engagement import CarrierEngagementStatus, CarrierChangeItem, CarrierChangeRequest, CarrierWithEngagementResponse
+from .carrier_census import CarrierCensus, CarrierCensusImport
+from .engagement import CarrierEngagementStatus, CarrierChangeItem, CarrierChangeRequest, CarrierChangeResult, CarrierWithEngagementResponse, CarrierPageResponse
 from .oauth import OAuthToken
-from .ocr_results import OCRResult, OCRResultCreate, OCRResultResponse
+from .ocr_results import OCRResult, OCRResultCreate, OCRResultResponse, OCRResultPageResponse, OCRTextCache
 from .user_org_membership import UserOrgMembership, AppUser, AppOrg
 from .sobject_sync_history import SObjectSyncHistory
 from .sobject_sync_status import SObjectSyncStatus
+from .upload_job import UploadJob, UploadJobFile, UploadJobResponse, UploadJobFileResponse
 
 __all__ = [
     "CarrierData",
     "CarrierDataCreate", 
+    "CarrierCensus",
+    "CarrierCensusImport",
     "CarrierEngagementStatus",
     "CarrierChangeItem",
     "CarrierChangeRequest",
+    "CarrierChangeResult",
     "CarrierWithEngagementResponse",
+    "CarrierPageResponse",
     "OAuthToken",
     "OCRResult",
     "OCRResultCreate",
     "OCRResultResponse",
+    "OCRResultPageResponse",
+    "OCRTextCache",
     "UserOrgMembership",
     "AppUser",
     "AppOrg",
     "SObjectSyncHistory",
     "SObjectSyncStatus",
+    "UploadJob",
+    "UploadJobFile",
+    "UploadJobResponse",
+    "UploadJobFileResponse",
 ]
\ No newline at end of file
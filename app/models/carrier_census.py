@@ -0,0 +1,45 @@
+from sqlmodel import Field, SQLModel
+from sqlalchemy import Column, BigInteger
+from typing import Optional
+from datetime import datetime
+
+
+class CarrierCensus(SQLModel, table=True):
+    """Carrier details from the FMCSA company census file, keyed on USDOT.
+
+    Filled by scripts.import_fmcsa_census and used to resolve carriers
+    without scraping SAFER. Columns use the CarrierData names.
+    """
+    __tablename__ = "carrier_census"
+
+    usdot: str = Field(primary_key=True)
+    legal_name: Optional[str] = None
+    dba_name: Optional[str] = None
+    usdot_status: Optional[str] = None
+    physical_address: Optional[str] = None
+    mailing_address: Optional[str] = None
+    phone: Optional[str] = None
+    power_units: Optional[int] = None
+    drivers: Optional[int] = None
+    mcs_150_form_date: Optional[str] = None
+    mcs_150_mileage_year_mileage: Optional[int] = Field(
+        default=None,
+        sa_column=Column(BigInteger)
+    )
+    mcs_150_mileage_year_year: Optional[int] = None
+    carrier_operation: Optional[str] = None
+    imported_at: datetime = Field(default_factory=datetime.utcnow, nullable=False)  # When the row was last loaded
+
+
+class CarrierCensusImport(SQLModel, table=True):
+    """Progress of a census file import, saved with every batch so an interrupted import resumes."""
+    __tablename__ = "carrier_census_import"
+
+    source: str = Field(primary_key=True, max_length=250)  # File name of the census file
+    file_size: int = Field(sa_column=Column(BigInteger, nullable=False))
+    byte_offset: int = Field(default=0, sa_column=Column(BigInteger, nullable=False))  # End of the last saved row
+    rows_imported: int = Field(default=0)
+    rows_skipped: int = Field(default=0)
+    started_at: datetime = Field(default_factory=datetime.utcnow, nullable=False)
+    updated_at: datetime = Field(default_factory=datetime.utcnow, nullable=False)
+    completed_at: Optional[datetime] = Field(default=None)
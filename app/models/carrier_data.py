@@ -3,6 +3,7 @@ from typing import List, Optional, TYPE_CHECKING
 from pydantic import ConfigDict
 from sqlmodel import Relationship
 from sqlalchemy import Column, BigInteger
+from datetime import datetime
 
 if TYPE_CHECKING:
     from app.models.ocr_results import OCRResult
@@ -159,6 +160,7 @@ class CarrierDataCreate(SQLModel):
     
     latest_update: Optional[str] = None  # Consider changing to datetime
     url: Optional[str] = None
+    lookup_timestamp: Optional[datetime] = None  # When SAFER was last scraped for this carrier
 
     lookup_success_flag: bool
 
@@ -234,6 +236,7 @@ class CarrierData(SQLModel, table=True):
     
     latest_update: Optional[str] = None  # Consider changing to datetime
     url: Optional[str] = None
+    lookup_timestamp: Optional[datetime] = None  # When SAFER was last scraped for this carrier
 
     # Relationship attributes
     ocr_results: List["OCRResult"] = Relationship(back_populates="carrier_data")
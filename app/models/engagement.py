@@ -1,4 +1,5 @@
 from sqlmodel import Field, SQLModel
+from sqlalchemy import Index
 from datetime import datetime
 from typing import List, Optional, TYPE_CHECKING
 from sqlmodel import Relationship
@@ -18,8 +19,25 @@ class CarrierChangeRequest(SQLModel):
     """Schema for carrier checkbox input."""
     changes: List[CarrierChangeItem] = Field(default_factory=list)
 
+class CarrierChangeResult(SQLModel):
+    """Outcome of one change item of a batched engagement update."""
+    usdot: Optional[str] = None
+    field: Optional[str] = None
+    status: str  # "updated", "not_found", "invalid" or "superseded"
+    detail: Optional[str] = None
+
 
 class CarrierEngagementStatus(SQLModel, table=True):
+    __table_args__ = (
+        # Keyset pagination of an org's dashboard, newest first
+        Index("ix_carrierengagementstatus_org_created_usdot", "org_id", "created_at", "usdot"),
+        # Same order with the dashboard's interested / contacted filters
+        Index("ix_carrierengagementstatus_org_interested_created_usdot",
+              "org_id", "carrier_interested", "created_at", "usdot"),
+        Index("ix_carrierengagementstatus_org_contacted_created_usdot",
+              "org_id", "carrier_contacted", "created_at", "usdot"),
+    )
+
     usdot: str = Field(foreign_key="carrierdata.usdot", primary_key=True)
     org_id: str = Field(primary_key=True, foreign_key="apporg.org_id")
     user_id: str = Field(nullable=False, foreign_key="appuser.user_id")
@@ -61,4 +79,9 @@ class CarrierWithEngagementResponse(SQLModel):
     # Salesforce sync status fields
     sf_sync_status: Optional[str] = None  # "SUCCESS", "FAILED", or None
     sf_sobject_id: Optional[str] = None  # Salesforce ID if successful
-    sf_sync_timestamp: Optional[str] = None  # When last sync was attempted
\ No newline at end of file
+    sf_sync_timestamp: Optional[str] = None  # When last sync was attempted
+
+class CarrierPageResponse(SQLModel):
+    """A page of carriers and the cursor of the next page, None on the last page."""
+    items: List[CarrierWithEngagementResponse]
+    next_cursor: Optional[str] = None
@@ -1,4 +1,5 @@
 from sqlmodel import Field, SQLModel
+from sqlalchemy import Index, text
 from datetime import datetime
 from typing import Optional, TYPE_CHECKING
 from pydantic import ConfigDict
@@ -20,9 +21,17 @@ class OCRResult(SQLModel, table=True):
     model_config = ConfigDict(
         orm_mode = True 
     )
+    __table_args__ = (
+        # Keyset pagination of an org's lookup history, newest first
+        Index("ix_ocrresult_org_timestamp_id", "org_id", "timestamp", "id"),
+        # Same order restricted to results with a DOT reading (valid_dot_only)
+        Index("ix_ocrresult_org_timestamp_id_valid_dot", "org_id", "timestamp", "id",
+              postgresql_where=text("dot_reading IS NOT NULL")),
+    )
     id: int = Field(default=None, primary_key=True)
     extracted_text: str | None = Field(default=None, max_length=250)
     dot_reading: str | None = Field(default=None, max_length=32, foreign_key="carrierdata.usdot")
+    dot_confidence: float | None = Field(default=None)  # Confidence of the DOT reading, see app.helpers.dot_correction
     filename: str = Field(nullable=False, max_length=250)
     timestamp: datetime = Field(nullable=False)
     user_id: str = Field(nullable=False, foreign_key="appuser.user_id")
@@ -32,6 +41,12 @@ class OCRResult(SQLModel, table=True):
     app_user: "AppUser" = Relationship(back_populates="ocr_results")
     app_org: "AppOrg" = Relationship(back_populates="ocr_results")
 
+class OCRTextCache(SQLModel, table=True):
+    """Content-addressed OCR text, keyed on the SHA-256 hash of the image bytes."""
+    content_hash: str = Field(primary_key=True, max_length=64)
+    extracted_text: str | None = Field(default=None)
+    created_at: datetime = Field(default_factory=datetime.utcnow, nullable=False, index=True)
+
 class OCRResultResponse(SQLModel):
     """Schema for returning OCR result data."""
     dot_reading: str | None
@@ -42,4 +57,8 @@ class OCRResultResponse(SQLModel):
     filename: str
     user_id: str
     org_id: str
-    
\ No newline at end of file
+
+class OCRResultPageResponse(SQLModel):
+    """A page of lookup history and the cursor of the next page, None on the last page."""
+    items: list[OCRResultResponse]
+    next_cursor: str | None = None
@@ -1,4 +1,5 @@
 from sqlmodel import Field, SQLModel, Relationship
+from sqlalchemy import Index
 from typing import Optional, TYPE_CHECKING
 from datetime import datetime
 from pydantic import ConfigDict
@@ -11,6 +12,10 @@ class SObjectSyncStatus(SQLModel, table=True):
     """SCD type 1 table for maintaining current sync status per carrier and org."""
     
     __tablename__ = "sobject_sync_status"
+    __table_args__ = (
+        # get_sync_status_by_org, optionally filtered by status
+        Index("ix_sobject_sync_status_org_status", "org_id", "sync_status"),
+    )
     
     model_config = ConfigDict(
         populate_by_name=True,
@@ -0,0 +1,53 @@
+from sqlmodel import Field, SQLModel, Column, LargeBinary
+from datetime import datetime
+
+
+class UploadJob(SQLModel, table=True):
+    """Represents an upload batch queued for background processing."""
+    id: int = Field(default=None, primary_key=True)
+    user_id: str = Field(nullable=False, foreign_key="appuser.user_id")
+    org_id: str = Field(nullable=False, foreign_key="apporg.org_id")
+    status: str = Field(default="queued", max_length=16, index=True)  # queued, running, completed, failed
+    total_files: int = Field(default=0)
+    processed_files: int = Field(default=0)
+    error: str | None = Field(default=None)
+    created_at: datetime = Field(default_factory=datetime.utcnow, nullable=False)
+    updated_at: datetime = Field(default_factory=datetime.utcnow, nullable=False)  # Worker heartbeat while running
+    finished_at: datetime | None = Field(default=None)
+
+
+class UploadJobFile(SQLModel, table=True):
+    """Represents one uploaded image of an upload job and its processing outcome."""
+    id: int = Field(default=None, primary_key=True)
+    job_id: int = Field(nullable=False, foreign_key="uploadjob.id", index=True)
+    position: int = Field(nullable=False)  # Order of the file in the upload
+    filename: str = Field(nullable=False, max_length=250)
+    content: bytes | None = Field(default=None, sa_column=Column(LargeBinary))  # Cleared once processed
+    status: str = Field(default="pending", max_length=16)  # pending, completed, failed, invalid
+    ocr_result_id: int | None = Field(default=None, foreign_key="ocrresult.id")
+    dot_reading: str | None = Field(default=None, max_length=32)
+    error: str | None = Field(default=None)
+
+
+class UploadJobFileResponse(SQLModel):
+    """Schema for returning the status of one file of an upload job."""
+    filename: str
+    status: str
+    dot_reading: str | None
+    ocr_result_id: int | None
+    error: str | None
+
+
+class UploadJobResponse(SQLModel):
+    """Schema for returning upload job progress."""
+    job_id: int
+    status: str
+    total_files: int
+    processed_files: int
+    error: str | None
+    created_at: str
+    finished_at: str | None
+    files: list[UploadJobFileResponse]
+    result_ids: list[dict]
+    valid_files: list[str]
+    invalid_files: list[str]
@@ -1,20 +1,23 @@
+import asyncio
 import logging
-import csv
-from io import StringIO, BytesIO
-from openpyxl import Workbook
+from typing import Callable, Iterable
 from fastapi import APIRouter, Depends, Request, HTTPException
 from fastapi.responses import StreamingResponse, JSONResponse
 from fastapi.templating import Jinja2Templates
 from sqlmodel import Session
-from app.database import get_db
-from app.crud.engagement import get_engagement_data, update_carrier_engagement
+from sqlmodel.ext.asyncio.session import AsyncSession
+from app.database import get_db, get_async_db, get_session_factory
+from app.crud.engagement import (get_carrier_dashboard_page_async, stream_engagement_export_rows,
+                                 stream_carrier_snapshot_rows, update_carrier_engagements_bulk)
 from app.crud.carrier_data import get_carrier_data_by_dot
-from app.crud.ocr_results import get_ocr_results
-from app.crud.sobject_sync_status import get_sync_status_for_usdots
+from app.crud.ocr_results import get_ocr_result_rows_async, stream_ocr_result_export_rows
 from app.routes.auth import verify_login, verify_login_json_response
-from app.models.ocr_results import OCRResultResponse
+from app.helpers.pagination import encode_cursor, decode_cursor
+from app.helpers.exports import (EXPORT_FORMATS, CARRIER_EXPORT_COLUMNS, LOOKUP_HISTORY_EXPORT_COLUMNS,
+                                 ExportColumn, carrier_snapshot_columns, export_values)
+from app.models.ocr_results import OCRResultResponse, OCRResultPageResponse
 from app.models.carrier_data import CarrierData
-from app.models.engagement import CarrierWithEngagementResponse
+from app.models.engagement import CarrierPageResponse
 
 router = APIRouter()
 templates = Jinja2Templates(directory="app/templates")
@@ -22,57 +25,48 @@ templates = Jinja2Templates(directory="app/templates")
 # Set up a module-level logger
 logger = logging.getLogger(__name__)
 
+
+def parse_cursor(cursor: str | None) -> tuple | None:
+    """Decode a page cursor from the query string, rejecting tokens we did not issue."""
+    if cursor is None:
+        return None
+    try:
+        return decode_cursor(cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
 @router.get("/data/fetch/carriers",
-            response_model=list[CarrierWithEngagementResponse],
+            response_model=CarrierPageResponse,
             dependencies=[Depends(verify_login_json_response)])
 async def fetch_carriers(request: Request,
                     offset: int = 0,
                     limit: int = 10,
                     carrier_interested: bool = None,
                     client_contacted: bool = None,
-                    db: Session = Depends(get_db)):
+                    cursor: str = None,
+                    db: AsyncSession = Depends(get_async_db)):
+
+    """Return a page of carrier results as JSON for the dashboard.
 
-    """Return carrier results as JSON for the dashboard."""
+    Pass the returned next_cursor to fetch the following page.
+    """
 
     user_id = request.session['userinfo']['sub']
     org_id = (request.session['userinfo']['org_id']
                 if 'org_id' in request.session['userinfo'] else user_id)
     
     logger.info("🔍 Fetching carrier data...")
-    carriers = get_engagement_data(db, 
-                                       org_id=org_id,
-                                       offset=offset,
-                                       carrier_contacted=client_contacted,
-                                       carrier_interested=carrier_interested,
-                                       limit=limit)
-    
-    # Get sync status for all carriers in batch
-    usdots = [carrier.usdot for carrier in carriers]
-    sync_status_dict = get_sync_status_for_usdots(db, usdots, org_id) if usdots else {}
-    
-    results = [
-        CarrierWithEngagementResponse(
-            usdot=carrier.usdot,
-            legal_name=carrier.carrier_data.legal_name,
-            phone=carrier.carrier_data.phone,
-            mailing_address=carrier.carrier_data.mailing_address,
-            created_at=carrier.created_at.strftime("%Y-%m-%d %H:%M:%S"),
-            carrier_interested=carrier.carrier_interested,
-            carrier_contacted=carrier.carrier_contacted,
-            carrier_followed_up=carrier.carrier_followed_up,
-            carrier_follow_up_by_date=carrier.carrier_follow_up_by_date.strftime("%Y-%m-%d") 
-                if carrier.carrier_follow_up_by_date else None,
-            # Add sync status information
-            sf_sync_status=sync_status_dict[carrier.usdot].sync_status if carrier.usdot in sync_status_dict else None,
-            sf_sobject_id=sync_status_dict[carrier.usdot].sobject_id if carrier.usdot in sync_status_dict else None,
-            sf_sync_timestamp=sync_status_dict[carrier.usdot].updated_at.strftime("%Y-%m-%d %H:%M:%S") 
-                if carrier.usdot in sync_status_dict and sync_status_dict[carrier.usdot].updated_at else None
-        )
-        for carrier in carriers
-    ]
+    page = await get_carrier_dashboard_page_async(db,
+                                                  org_id=org_id,
+                                                  offset=offset,
+                                                  carrier_contacted=client_contacted,
+                                                  carrier_interested=carrier_interested,
+                                                  limit=limit,
+                                                  cursor=parse_cursor(cursor))
 
-    logger.info(f"🔍 Carrier data fetched successfully: {results}")
-    return results
+    logger.info(f"🔍 Carrier data fetched successfully: {page.items}")
+    return page
 
 @router.get("/data/fetch/carriers/{dot_number}",
             response_model=CarrierData,
@@ -99,155 +93,155 @@ def fetch_carrier(request: Request,
     return carrier
 
 @router.get("/data/fetch/lookup_history",
-            response_model=list[OCRResultResponse],
+            response_model=OCRResultPageResponse,
             dependencies=[Depends(verify_login_json_response)])
 async def fetch_lookup_history(request: Request, 
                     offset: int = 0,
                     limit: int = 10,
                     valid_dot_only: bool = False,
-                    db: Session = Depends(get_db)):
+                    cursor: str = None,
+                    db: AsyncSession = Depends(get_async_db)):
+
+    """Return a page of lookup history as JSON for the dashboard.
 
-    """Return carrier results as JSON for the dashboard."""
+    Pass the returned next_cursor to fetch the following page.
+    """
     user_id = request.session['userinfo']['sub']
     org_id = (request.session['userinfo']['org_id']
                 if 'org_id' in request.session['userinfo'] else user_id)
 
     logger.info("🔍 Fetching lookup history data...")
-    results = get_ocr_results(db, 
-                                    org_id=org_id,
-                                    offset=offset,
-                                    limit=limit,
-                                    valid_dot_only=valid_dot_only,
-                                    eager_relations=True)
-    
+    rows = await get_ocr_result_rows_async(db,
+                                           org_id=org_id,
+                                           offset=offset,
+                                           limit=limit,
+                                           valid_dot_only=valid_dot_only,
+                                           cursor=parse_cursor(cursor))
+
+    # A full page means there may be more rows after the last result
+    next_cursor = (encode_cursor(rows[-1].timestamp, rows[-1].id)
+                   if rows and len(rows) == limit else None)
+
     results = [
-        OCRResultResponse(dot_reading=result.dot_reading,
-                          legal_name=result.carrier_data.legal_name if result.carrier_data else "",
-                          phone=result.carrier_data.phone if result.carrier_data else "",
-                          mailing_address=result.carrier_data.mailing_address if result.carrier_data else "",
-                          timestamp=result.timestamp.strftime("%Y-%m-%d %H:%M:%S"),
-                          filename=result.filename,
-                          user_id=result.app_user.user_email,
-                          org_id=result.app_org.org_name)
-        for result in results
+        OCRResultResponse(dot_reading=row.dot_reading,
+                          legal_name=row.legal_name if row.carrier_usdot else "",
+                          phone=row.phone if row.carrier_usdot else "",
+                          mailing_address=row.mailing_address if row.carrier_usdot else "",
+                          timestamp=row.timestamp.strftime("%Y-%m-%d %H:%M:%S"),
+                          filename=row.filename,
+                          user_id=row.user_email,
+                          org_id=row.org_name)
+        for row in rows
     ]
     logger.info(f"🔍 Lookup history data fetched successfully: {results}")    
-    return results
+    return OCRResultPageResponse(items=results, next_cursor=next_cursor)
 
 @router.post("/data/update/carrier_interests",
              dependencies=[Depends(verify_login_json_response)])
 async def update_carrier_interests(request: Request,
                                     db: Session = Depends(get_db)):
-    """Update carrier interests based on user input."""
+    """Apply a batch of engagement changes from the dashboard in one transaction.
+
+    Returns the outcome of each change in the order they were sent.
+    """
+
+    user_id = request.session['userinfo']['sub']
+    org_id = (request.session['userinfo']['org_id']
+                if 'org_id' in request.session['userinfo'] else user_id)
 
     form_data = await request.json()
     logger.info("🔄 Updating carrier interests..."
                 f"Changes received: {form_data}")
+
+    changes = form_data.get("changes") if isinstance(form_data, dict) else None
+    if not isinstance(changes, list):
+        raise HTTPException(status_code=400, detail="Invalid input data")
+
+    results = await asyncio.to_thread(update_carrier_engagements_bulk, db, changes, org_id, user_id)
+
+    updated = sum(result.status == "updated" for result in results)
+    return JSONResponse(status_code=200,
+                        content={"status": "ok",
+                                 "message": f"{updated} of {len(results)} changes updated",
+                                 "results": [result.model_dump() for result in results]})
     
-    try:
-        for change_item in form_data.get("changes"):
-            dot_number = change_item.get("usdot")
-            field = change_item.get("field")
-            value = change_item.get("value")
-
-            if not dot_number or not field or value is None:
-                raise HTTPException(status_code=400, detail="Invalid input data")
-
-            update_carrier_engagement(db, change_item)
-            
-        return JSONResponse(status_code=200, 
-                            content={"status": "ok", "message": "Changes updated successfully"})
-    except Exception as e:
-        logger.error(f"Error updating carrier interests: {str(e)}")
-        raise HTTPException(status_code=500, detail=str(e))
-    
+
+def stream_export(format: str,
+                  title: str,
+                  filename: str,
+                  columns: list[ExportColumn],
+                  read_rows: Callable[[Session], Iterable],
+                  session_factory: Callable[[], Session]) -> StreamingResponse:
+    """Stream rows read from the database as an xlsx, csv or parquet download."""
+    export_format = EXPORT_FORMATS.get(format)
+    if export_format is None:
+        raise HTTPException(status_code=400,
+                            detail=f"Unsupported export format: {format}, use one of {', '.join(EXPORT_FORMATS)}")
+
+    def rows():
+        with session_factory() as db:
+            yield from export_values(columns, read_rows(db))
+
+    response = StreamingResponse(export_format.write(title, columns, rows()), media_type=export_format.media_type)
+    response.headers["Content-Disposition"] = f"attachment; filename={filename}.{export_format.extension}"
+    return response
+
 
 @router.get("/data/export/carriers", dependencies=[Depends(verify_login)])
-async def export_carriers(request: Request, db: Session = Depends(get_db)):
-    """Export carrier data to an Excel file."""
+async def export_carriers(request: Request,
+                          session_factory: Callable[[], Session] = Depends(get_session_factory),
+                          format: str = "xlsx"):
+    """Export carrier data as xlsx, csv or parquet, streamed to the client as it is read."""
 
     user_id = request.session['userinfo']['sub']
     org_id = (request.session['userinfo']['org_id']
                 if 'org_id' in request.session['userinfo'] else user_id)
-    logger.info(f"🔍 Fetching carrier data for org ID: {org_id} to export (Excel).")
-
-    results = get_engagement_data(db, org_id=org_id)
-
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "Carriers"
-
-    # Write header
-    ws.append([
-        "DOT Number", "Legal Name", "Phone Number", "Mailing Address", "Created At",
-        "Client Contacted?", "Carrier Followed Up?", "Carrier Follow Up by Date", "Carrier Interested"
-    ])
-
-    # Write data rows
-    for result in results:
-        ws.append([
-            result.usdot,
-            result.carrier_data.legal_name,
-            result.carrier_data.phone,
-            result.carrier_data.mailing_address,
-            result.created_at.strftime("%Y-%m-%d %H:%M:%S"),
-            result.carrier_contacted,
-            result.carrier_followed_up,
-            result.carrier_follow_up_by_date.strftime("%Y-%m-%d") if result.carrier_follow_up_by_date else None,
-            result.carrier_interested,
-        ])
-
-    # Save to in-memory bytes buffer
-    output = BytesIO()
-    wb.save(output)
-    output.seek(0)
-
-    response = StreamingResponse(output, media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")
-    response.headers["Content-Disposition"] = "attachment; filename=carrier_data.xlsx"
-    return response
+    logger.info(f"🔍 Fetching carrier data for org ID: {org_id} to export ({format}).")
+
+    return stream_export(format, "Carriers", "carrier_data", CARRIER_EXPORT_COLUMNS,
+                         lambda db: stream_engagement_export_rows(db, org_id=org_id),
+                         session_factory)
+
+
+@router.get("/data/export/carriers/snapshot", dependencies=[Depends(verify_login)])
+async def export_carrier_snapshot(request: Request,
+                                  session_factory: Callable[[], Session] = Depends(get_session_factory),
+                                  format: str = "xlsx",
+                                  columns: str = None):
+    """Export every CarrierData column of the org's engaged carriers, streamed as it is read.
+
+    columns is an optional comma separated list of CarrierData columns to
+    export instead of all of them.
+    """
+
+    user_id = request.session['userinfo']['sub']
+    org_id = (request.session['userinfo']['org_id']
+                if 'org_id' in request.session['userinfo'] else user_id)
+    logger.info(f"🔍 Fetching carrier snapshot for org ID: {org_id} to export ({format}).")
+
+    try:
+        export_columns = carrier_snapshot_columns(
+            [name.strip() for name in columns.split(",") if name.strip()] if columns else None)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    column_names = [column.name for column in export_columns]
+    return stream_export(format, "Carrier Snapshot", "carrier_snapshot", export_columns,
+                         lambda db: stream_carrier_snapshot_rows(db, org_id, column_names),
+                         session_factory)
 
 
 @router.get("/data/export/lookup_history", dependencies=[Depends(verify_login)])
-async def export_lookup_history(request: Request, db: Session = Depends(get_db)):
-    """Export lookup history to an Excel file."""
+async def export_lookup_history(request: Request,
+                                session_factory: Callable[[], Session] = Depends(get_session_factory),
+                                format: str = "xlsx"):
+    """Export lookup history as xlsx, csv or parquet, streamed to the client as it is read."""
 
     user_id = request.session['userinfo']['sub']
     org_id = (request.session['userinfo']['org_id']
                 if 'org_id' in request.session['userinfo'] else user_id)
-    logger.info(f"🔍 Fetching lookup history for org ID: {org_id} to export (Excel).")
-
-    results = get_ocr_results(db, org_id=org_id, valid_dot_only=False, eager_relations=True)
-
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "Lookup History"
-
-    # Write header
-    ws.append([
-        "DOT Number", "Legal Name", "Phone Number", "Mailing Address",
-        "Created At", "Filename", "Created By"
-    ])
-
-    # Write data rows
-    for result in results:
-        ws.append([
-            result.dot_reading,
-            result.carrier_data.legal_name if result.carrier_data else "",
-            result.carrier_data.phone if result.carrier_data else "",
-            result.carrier_data.mailing_address if result.carrier_data else "",
-            result.timestamp.strftime("%Y-%m-%d %H:%M:%S"),
-            result.filename,
-            result.app_user.user_email if hasattr(result.app_user, "user_email") else "",
-        ])
-
-    # Save to in-memory bytes buffer
-    output = BytesIO()
-    wb.save(output)
-    output.seek(0)
-
-    response = StreamingResponse(
-        output,
-        media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-    )
-    response.headers["Content-Disposition"] = "attachment; filename=lookup_history.xlsx"
-    return response
\ No newline at end of file
+    logger.info(f"🔍 Fetching lookup history for org ID: {org_id} to export ({format}).")
+
+    return stream_export(format, "Lookup History", "lookup_history", LOOKUP_HISTORY_EXPORT_COLUMNS,
+                         lambda db: stream_ocr_result_export_rows(db, org_id=org_id, valid_dot_only=False),
+                         session_factory)
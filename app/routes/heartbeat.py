@@ -1,5 +1,10 @@
-from fastapi import APIRouter, Request
+from fastapi import APIRouter, Request, Depends
 from fastapi.responses import JSONResponse
+from app.database import engine, pool_metrics, async_engine, async_pool_metrics
+from app.helpers.db_pool import pool_stats
+from app.helpers.ocr import ocr_cache
+from app.helpers.safer_web import safer_cache
+from app.routes.auth import verify_login
 
 router = APIRouter()
 
@@ -9,4 +14,24 @@ def session_heartbeat(request: Request):
     """Check if the session is still active."""
     if 'id_token' not in request.session:
         return JSONResponse(status_code=401, content={"status": "Session expiredor not logged in"})
-    return JSONResponse(status_code=200, content={"status": "ok"})
\ No newline at end of file
+    return JSONResponse(status_code=200, content={"status": "ok"})
+
+
+@router.get("/health/db_pool",
+            dependencies=[Depends(verify_login)])
+def db_pool_health():
+    """Report database connection pool occupancy, checkout waits and timeouts for this instance."""
+    return JSONResponse(status_code=200, content={
+        **pool_stats(engine, pool_metrics),
+        "async_pool": pool_stats(async_engine.sync_engine, async_pool_metrics)
+    })
+
+
+@router.get("/health/caches",
+            dependencies=[Depends(verify_login)])
+def cache_health():
+    """Report OCR text and SAFER lookup cache hit rates for this instance."""
+    return JSONResponse(status_code=200, content={
+        "ocr_cache": ocr_cache.stats(),
+        "safer_cache": safer_cache.stats()
+    })
@@ -1,17 +1,18 @@
 from fastapi import APIRouter, Request,HTTPException, Depends, Body
 from sqlmodel import Session, select
+from sqlmodel.ext.asyncio.session import AsyncSession
 from fastapi.responses import RedirectResponse, JSONResponse
-from app.database import get_db
-from app.crud.oauth import get_valid_salesforce_token, upsert_salesforce_token, delete_salesforce_token
-from app.crud.sobject_sync_history import create_sync_history_record
-from app.crud.sobject_sync_status import upsert_sync_status
+from app.database import get_db, get_async_db
+from app.crud.oauth import get_valid_salesforce_token_async, upsert_salesforce_token_async, delete_salesforce_token
+from app.crud.sobject_sync_history import create_sync_history_record_async
+from app.crud.sobject_sync_status import upsert_sync_status_async
 from app.models.carrier_data import CarrierData
 from datetime import datetime
 import urllib.parse
+import asyncio
 import httpx
 import logging
 import os
-import time
 
 router = APIRouter()
 
@@ -43,7 +44,7 @@ async def connect_salesforce(request: Request):
 
 @router.get("/salesforce/callback")
 async def salesforce_callback(request: Request, code: str = None, state: str = None,
-                              db: Session = Depends(get_db)):
+                              db: AsyncSession = Depends(get_async_db)):
     if not code:
         logger.error("Missing code from Salesforce OAuth callback.")
         raise HTTPException(status_code=400, detail="Missing code from Salesforce.")
@@ -76,12 +77,12 @@ async def salesforce_callback(request: Request, code: str = None, state: str = N
     # --- Upsert the token in the database ---
     user_id = request.session["userinfo"]["sub"]
     org_id = request.session["userinfo"].get("org_id", "default")  # Adjust as needed
-    upsert_salesforce_token(db, user_id, org_id, tokens)
+    await upsert_salesforce_token_async(db, user_id, org_id, tokens)
 
     request.session["sf_connected"] = True
     #print sessions id
     logger.info(tokens)
-    time.sleep(1)
+    await asyncio.sleep(1)
     logger.info("Salesforce access token received and stored in session.")
     return RedirectResponse(dashboard_uri)
 
@@ -107,14 +108,14 @@ async def disconnect_salesforce(request: Request,
 async def upload_carriers_to_salesforce(
     request: Request,
     carriers_usdot: list[str] = Body(..., embed=True),  # expects {"carrier_ids": [1,2,3]}
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     user_id = request.session["userinfo"]["sub"]
     org_id = request.session["userinfo"].get("org_id", "default")  # adjust as needed
 
     if request.session.get("sf_connected", False):
         # 1. Get a valid Salesforce access token (refresh if needed)
-        token_obj = await get_valid_salesforce_token(db, user_id, org_id)
+        token_obj = await get_valid_salesforce_token_async(db, user_id, org_id)
         
         if not token_obj:
             logger.error(f"No valid Salesforce token available for user {user_id} and org {org_id}.")
@@ -124,7 +125,7 @@ async def upload_carriers_to_salesforce(
             logger.info(f"Using Salesforce token for user {user_id} and org {org_id}.")
 
         # 2. Prepare Salesforce Account data for each carrier
-        carriers = db.exec(select(CarrierData).where(CarrierData.usdot.in_(carriers_usdot))).all()
+        carriers = (await db.exec(select(CarrierData).where(CarrierData.usdot.in_(carriers_usdot)))).all()
         if not carriers:
             logger.error(f"No carriers found for the provided USDOTs: {carriers_usdot}.")
             return JSONResponse(status_code=404, content={"detail": "No carriers found."})
@@ -212,6 +213,10 @@ async def upload_carriers_to_salesforce(
                 "URL__c": carrier.url,
             })
 
+        # Copy the USDOTs now: a failed log below rolls back the session, which expires
+        # the loaded carriers, and lazy loading them again fails on an AsyncSession
+        carrier_usdots = [carrier.usdot for carrier in carriers]
+
         payload = {
             "records": records
         }
@@ -225,26 +230,26 @@ async def upload_carriers_to_salesforce(
                 request.session["sf_connected"] = False
                 
                 # Log failed sync attempts for all carriers
-                for carrier in carriers:
+                for usdot in carrier_usdots:
                     try:
-                        create_sync_history_record(
+                        await create_sync_history_record_async(
                             db=db,
-                            usdot=carrier.usdot,
+                            usdot=usdot,
                             sync_status="FAILED",
                             sobject_type="account",
                             user_id=user_id,
                             org_id=org_id,
                             detail=f"HTTP {resp.status_code}: {resp.text}"
                         )
-                        upsert_sync_status(
+                        await upsert_sync_status_async(
                             db=db,
-                            usdot=carrier.usdot,
+                            usdot=usdot,
                             org_id=org_id,
                             user_id=user_id,
                             sync_status="FAILED"
                         )
                     except Exception as e:
-                        logger.error(f"Failed to log sync failure for USDOT {carrier.usdot}: {str(e)}")
+                        logger.error(f"Failed to log sync failure for USDOT {usdot}: {str(e)}")
                 
                 return JSONResponse(status_code=resp.status_code, content={"detail": f"Salesforce error: {resp.text}"})
         
@@ -254,8 +259,8 @@ async def upload_carriers_to_salesforce(
         
         logger.info(f"Salesforce response: {sf_response}")
         
-        # Create mapping from referenceId to carrier for result processing
-        carrier_map = {f"carrier_{carrier.usdot}": carrier for carrier in carriers}
+        # Create mapping from referenceId to USDOT for result processing
+        usdot_map = {f"carrier_{usdot}": usdot for usdot in carrier_usdots}
         
         if sf_response.get("hasErrors", False):
             # Handle response with errors
@@ -263,9 +268,9 @@ async def upload_carriers_to_salesforce(
             
             for result in results:
                 reference_id = result.get("referenceId")
-                carrier = carrier_map.get(reference_id)
+                usdot = usdot_map.get(reference_id)
                 
-                if not carrier:
+                if not usdot:
                     logger.warning(f"Could not find carrier for referenceId: {reference_id}")
                     continue
                 
@@ -277,9 +282,9 @@ async def upload_carriers_to_salesforce(
                     detail = "; ".join(error_details)
                     
                     try:
-                        create_sync_history_record(
+                        await create_sync_history_record_async(
                             db=db,
-                            usdot=carrier.usdot,
+                            usdot=usdot,
                             sync_status="FAILED",
                             sobject_type="account",
                             user_id=user_id,
@@ -287,25 +292,25 @@ async def upload_carriers_to_salesforce(
                             detail=detail,
                             sync_timestamp=sync_timestamp
                         )
-                        upsert_sync_status(
+                        await upsert_sync_status_async(
                             db=db,
-                            usdot=carrier.usdot,
+                            usdot=usdot,
                             org_id=org_id,
                             user_id=user_id,
                             sync_status="FAILED"
                         )
-                        logger.info(f"Logged failed sync for USDOT {carrier.usdot}: {detail}")
+                        logger.info(f"Logged failed sync for USDOT {usdot}: {detail}")
                     except Exception as e:
-                        logger.error(f"Failed to log sync failure for USDOT {carrier.usdot}: {str(e)}")
+                        logger.error(f"Failed to log sync failure for USDOT {usdot}: {str(e)}")
                 
                 elif "id" in result:
                     # Successful sync
                     salesforce_id = result["id"]
                     
                     try:
-                        create_sync_history_record(
+                        await create_sync_history_record_async(
                             db=db,
-                            usdot=carrier.usdot,
+                            usdot=usdot,
                             sync_status="SUCCESS",
                             sobject_type="account",
                             user_id=user_id,
@@ -314,17 +319,17 @@ async def upload_carriers_to_salesforce(
                             detail=f"Successfully created Account with ID: {salesforce_id}",
                             sync_timestamp=sync_timestamp
                         )
-                        upsert_sync_status(
+                        await upsert_sync_status_async(
                             db=db,
-                            usdot=carrier.usdot,
+                            usdot=usdot,
                             org_id=org_id,
                             user_id=user_id,
                             sync_status="SUCCESS",
                             sobject_id=salesforce_id
                         )
-                        logger.info(f"Logged successful sync for USDOT {carrier.usdot} -> Salesforce ID: {salesforce_id}")
+                        logger.info(f"Logged successful sync for USDOT {usdot} -> Salesforce ID: {salesforce_id}")
                     except Exception as e:
-                        logger.error(f"Failed to log sync success for USDOT {carrier.usdot}: {str(e)}")
+                        logger.error(f"Failed to log sync success for USDOT {usdot}: {str(e)}")
         else:
             # All successful - process results
             results = sf_response.get("results", [])
@@ -332,17 +337,17 @@ async def upload_carriers_to_salesforce(
             for result in results:
                 reference_id = result.get("referenceId")
                 salesforce_id = result.get("id")
-                carrier = carrier_map.get(reference_id)
+                usdot = usdot_map.get(reference_id)
                 
-                if not carrier:
+                if not usdot:
                     logger.warning(f"Could not find carrier for referenceId: {reference_id}")
                     continue
                 
                 if salesforce_id:
                     try:
-                        create_sync_history_record(
+                        await create_sync_history_record_async(
                             db=db,
-                            usdot=carrier.usdot,
+                            usdot=usdot,
                             sync_status="SUCCESS",
                             sobject_type="account",
                             user_id=user_id,
@@ -351,19 +356,19 @@ async def upload_carriers_to_salesforce(
                             detail=f"Successfully created Account with ID: {salesforce_id}",
                             sync_timestamp=sync_timestamp
                         )
-                        upsert_sync_status(
+                        await upsert_sync_status_async(
                             db=db,
-                            usdot=carrier.usdot,
+                            usdot=usdot,
                             org_id=org_id,
                             user_id=user_id,
                             sync_status="SUCCESS",
                             sobject_id=salesforce_id
                         )
-                        logger.info(f"Logged successful sync for USDOT {carrier.usdot} -> Salesforce ID: {salesforce_id}")
+                        logger.info(f"Logged successful sync for USDOT {usdot} -> Salesforce ID: {salesforce_id}")
                     except Exception as e:
-                        logger.error(f"Failed to log sync success for USDOT {carrier.usdot}: {str(e)}")
+                        logger.error(f"Failed to log sync success for USDOT {usdot}: {str(e)}")
         
-        logger.info(f"Successfully processed Salesforce sync response for {len(carriers)} carriers.")
+        logger.info(f"Successfully processed Salesforce sync response for {len(carrier_usdots)} carriers.")
         return JSONResponse(content=sf_response)
     else:
         logger.error("Salesforce connection not established.")
@@ -1,26 +1,25 @@
-import os
+import asyncio
 import logging
 from fastapi import APIRouter, UploadFile, File, HTTPException, Depends, Request
 from sqlmodel import Session
 from app.database import get_db
-from app.models.ocr_results import OCRResultCreate
+from app.models.ocr_results import OCRResult, OCRResultCreate
+from app.models.upload_job import UploadJobResponse, UploadJobFileResponse
 from app.crud.ocr_results import save_ocr_results_bulk
 from app.crud.carrier_data import save_carrier_data_bulk
-from app.helpers.ocr import cloud_ocr_from_image_file, generate_dot_record
-from app.helpers.safer_web import safer_web_lookup_from_dot
+from app.crud.upload_job import create_upload_job, get_upload_job, get_upload_job_files
+from app.helpers.ocr import batch_cloud_ocr_from_image_files, generate_dot_record
+from app.helpers.ocr_backends import get_ocr_backend
+from app.helpers.safer_web import safer_web_lookups_from_dots
+from app.helpers.dot_correction import known_usdot_index
+from app.helpers.upload_jobs import upload_job_worker
 from app.routes.auth import verify_login
-from google.cloud import vision
 from safer import CompanySnapshot
 from fastapi.responses import JSONResponse
 
 # Set up a module-level logger
 logger = logging.getLogger(__name__)
 
-# Initialize Google Cloud Vision client
-vision_client = vision.ImageAnnotatorClient(
-    client_options={"api_key": os.environ.get("GCP_OCR_API_KEY")}
-)
-
 # Initialize SAFER web crawler
 safer_client = CompanySnapshot()
 
@@ -28,64 +27,126 @@ safer_client = CompanySnapshot()
 router = APIRouter()
 
 
-@router.post("/upload",
-             dependencies=[Depends(verify_login)])
-async def upload_file(files: list[UploadFile] = File(...), 
-                      request: Request = None,
-                      db: Session = Depends(get_db)):
+async def process_upload_files(db: Session,
+                               files: list[UploadFile],
+                               user_id: str,
+                               org_id: str) -> list[OCRResult | BaseException]:
+    """Run OCR, DOT extraction, SAFER lookups and the bulk saves for validated image files.
+
+    Returns one outcome per file, in order: the saved OCRResult, or the
+    exception that stopped that file.
+    """
+    outcomes: list[OCRResult | BaseException] = []
     ocr_records = []  # Store OCR results before batch insert
-    valid_files = []
-    invalid_files = []
-    user_id = request.session['userinfo']['sub']
-    org_id = (request.session['userinfo']['org_id'] 
-                if 'org_id' in request.session['userinfo'] else user_id)
-    
-    for file in files:
+    record_positions = []
+
+    # perform OCR on all images in batched requests with the org's OCR backend,
+    # results come back in input order
+    ocr_texts = await batch_cloud_ocr_from_image_files(get_ocr_backend(org_id), files)
+
+    for position, (file, ocr_text) in enumerate(zip(files, ocr_texts)):
         try:
-            # Validate file type
-            supported_types = ('.png', '.jpg', '.jpeg', '.bmp', '.heic', '.heif')
-            if not file.filename.lower().endswith(supported_types):
-                logger.error(f"❌ Invalid file type. Only image files {supported_types} are allowed.")
-                invalid_files.append(file.filename)
-                continue         
-               
-            # perform OCR on image
-            ocr_text = await cloud_ocr_from_image_file(vision_client, file)
+            if isinstance(ocr_text, BaseException):
+                raise ocr_text
+
             ocr_record = OCRResultCreate(extracted_text=ocr_text, 
                                          filename=file.filename,
                                          user_id=user_id,
                                          org_id=org_id)
             ocr_record = generate_dot_record(ocr_record)
             ocr_records.append(ocr_record)
-            valid_files.append(file.filename)
+            record_positions.append(position)
+            outcomes.append(ocr_record)
         except Exception as e:
-            logger.exception(f"❌ Error processing file: {e}")
+            logger.exception(f"❌ Error processing file {file.filename}: {e}")
+            outcomes.append(e)
     
     if not ocr_records:
-        raise HTTPException(status_code=400, detail="No valid files were processed.")
+        return outcomes
+
+    safer_lookups = []
+    found_dots = []
+
+    # Perform SAFER web lookups for valid DOT readings (all zeros is the orphan record),
+    # duplicates are looked up once and misses are scraped concurrently
+    dot_readings = [result.dot_reading for result in ocr_records
+                    if result.dot_reading and result.dot_reading.strip("0")]
+    if dot_readings:
+        safer_results = await safer_web_lookups_from_dots(safer_client, dot_readings, db=db)
+        safer_lookups = [safer_data for safer_data in safer_results
+                         if safer_data.lookup_success_flag]
+        found_dots = [dot_reading for dot_reading, safer_data in zip(dot_readings, safer_results)
+                      if safer_data.lookup_success_flag]
+
+    # Save carrier data to database, the blocking session calls run off the event loop
+    if safer_lookups:
+        _ = await asyncio.to_thread(save_carrier_data_bulk, db, safer_lookups,
+                                    user_id=user_id,
+                                    org_id=org_id)
+        # New carriers can correct misread DOT numbers before the next index refresh
+        known_usdot_index.add(found_dots)
+
+    # Save to database using schema
+    ocr_results = await asyncio.to_thread(save_ocr_results_bulk, db, ocr_records)
+    for position, ocr_result in zip(record_positions, ocr_results):
+        outcomes[position] = ocr_result
+
+    logger.info(f"✅ Processed {len(ocr_results)} OCR results, {len(safer_lookups)} carrier records saved.")
+    return outcomes
+
+
+def split_supported_files(files: list[UploadFile]) -> tuple[list[UploadFile], list[str]]:
+    """Split uploads into supported image files and the names of rejected files."""
+    supported_types = ('.png', '.jpg', '.jpeg', '.bmp', '.heic', '.heif')
+    ocr_files = []
+    invalid_files = []
+    for file in files:
+        if not file.filename.lower().endswith(supported_types):
+            logger.error(f"❌ Invalid file type. Only image files {supported_types} are allowed.")
+            invalid_files.append(file.filename)
+            continue
+        ocr_files.append(file)
+    return ocr_files, invalid_files
+
+
+@router.post("/upload",
+             dependencies=[Depends(verify_login)])
+async def upload_file(files: list[UploadFile] = File(...), 
+                      request: Request = None,
+                      db: Session = Depends(get_db),
+                      async_job: bool = False):
+    """Process uploaded images, or queue them as an upload job when async_job is set."""
+    user_id = request.session['userinfo']['sub']
+    org_id = (request.session['userinfo']['org_id'] 
+                if 'org_id' in request.session['userinfo'] else user_id)
     
+    # Validate file types before starting OCR
+    ocr_files, invalid_files = split_supported_files(files)
+
+    if async_job:
+        if not ocr_files:
+            raise HTTPException(status_code=400, detail="No valid files were processed.")
+        job = await asyncio.to_thread(create_upload_job, db, user_id, org_id,
+                                      files=[(file.filename, await file.read()) for file in ocr_files],
+                                      invalid_filenames=invalid_files)
+        upload_job_worker.notify()
+        return JSONResponse(
+            content={
+                "message": "Upload queued",
+                "job_id": job.id,
+                "status_url": f"/upload/jobs/{job.id}",
+                "invalid_files": invalid_files
+            },
+            status_code=202
+        )
+
+    outcomes = await process_upload_files(db, ocr_files, user_id, org_id)
+    ocr_results = [outcome for outcome in outcomes if not isinstance(outcome, BaseException)]
+    valid_files = [file.filename for file, outcome in zip(ocr_files, outcomes)
+                   if not isinstance(outcome, BaseException)]
 
-    if ocr_records:
-        logger.info("✅ All OCR results saved successfully.")
-        safer_lookups = []
-        for result in ocr_records:
-            
-            # Perform SAFER web lookup for valid DOT readings (00000000 is the orphan record)
-            if result.dot_reading and result.dot_reading != "0000000":
-                safer_data = safer_web_lookup_from_dot(safer_client, result.dot_reading)
-                if safer_data.lookup_success_flag:
-                    safer_lookups.append(safer_data)
-
-        # Save carrier data to database
-        if safer_lookups:
-            _ = save_carrier_data_bulk(db, safer_lookups, 
-                                       user_id=user_id,
-                                       org_id=org_id)
-                                       
-        # Save to database using schema
-        ocr_results = save_ocr_results_bulk(db, ocr_records)       
-
-        logger.info(f"✅ Processed {len(ocr_results)} OCR results, {safer_lookups} carrier records saved.")
+    if not ocr_results:
+        raise HTTPException(status_code=400, detail="No valid files were processed.")
 
     # Collect all OCR result IDs
     ocr_result_ids = [
@@ -102,4 +163,36 @@ async def upload_file(files: list[UploadFile] = File(...),
             "invalid_files": invalid_files
         },
         status_code=200
-    )
\ No newline at end of file
+    )
+
+
+@router.get("/upload/jobs/{job_id}",
+            response_model=UploadJobResponse,
+            dependencies=[Depends(verify_login)])
+def get_upload_job_status(job_id: int,
+                          request: Request,
+                          db: Session = Depends(get_db)):
+    """Return the progress of an upload job, per file, and its result IDs once done."""
+    user_id = request.session['userinfo']['sub']
+    org_id = (request.session['userinfo']['org_id'] 
+                if 'org_id' in request.session['userinfo'] else user_id)
+
+    job = get_upload_job(db, job_id, org_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Upload job not found.")
+
+    job_files = get_upload_job_files(db, job.id)
+    return UploadJobResponse(
+        job_id=job.id,
+        status=job.status,
+        total_files=job.total_files,
+        processed_files=job.processed_files,
+        error=job.error,
+        created_at=job.created_at.strftime("%Y-%m-%d %H:%M:%S"),
+        finished_at=job.finished_at.strftime("%Y-%m-%d %H:%M:%S") if job.finished_at else None,
+        files=[UploadJobFileResponse.model_validate(job_file) for job_file in job_files],
+        result_ids=[{"id": job_file.ocr_result_id, "dot_reading": job_file.dot_reading}
+                    for job_file in job_files if job_file.status == "completed"],
+        valid_files=[job_file.filename for job_file in job_files if job_file.status == "completed"],
+        invalid_files=[job_file.filename for job_file in job_files if job_file.status == "invalid"]
+    )
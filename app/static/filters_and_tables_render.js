@@ -1,7 +1,7 @@
 import { Engagement } from "./update_carrier_engagement.js";
 
 const Filters = {
-    offset: 0,
+    cursor: null,
     limit: 10,
     isLoading: false,
     hasMoreData: true,
@@ -25,7 +25,10 @@ const Filters = {
             }
         }
 
-        queryParams.append("offset", Filters.offset);
+        // Continue after the last row of the previous page
+        if (Filters.cursor) {
+            queryParams.append("cursor", Filters.cursor);
+        }
         queryParams.append("limit", Filters.limit);
 
         try {
@@ -35,20 +38,17 @@ const Filters = {
             });
 
             if (response.ok) {
-                const data = await response.json();
-
-                if (data.length < Filters.limit) {
-                    Filters.hasMoreData = false; // No more data to load
-                }
+                const page = await response.json();
 
                 if (append) {
-                    Filters.appendRows(data, tableType); // Pass table type
+                    Filters.appendRows(page.items, tableType); // Pass table type
                 } else {
-                    Filters.updateTable(data, tableType); // Pass table type
+                    Filters.updateTable(page.items, tableType); // Pass table type
                 }
 
-                // Update the offset for the next batch
-                Filters.offset += Filters.limit;
+                // Follow the cursor for the next batch, there is none on the last page
+                Filters.cursor = page.next_cursor;
+                Filters.hasMoreData = Boolean(page.next_cursor);
             } else {
                 console.error("Failed to fetch data");
             }
@@ -91,7 +91,7 @@ const Filters = {
         event.preventDefault();
 
         // Reset state for new filter results
-        Filters.offset = 0;
+        Filters.cursor = null;
         Filters.hasMoreData = true;
 
         // Fetch filtered data and replace the table
@@ -147,7 +147,7 @@ const Filters = {
                 if (response.ok) {
                     alert("Sync request sent!");
                     // Optionally, reload table data here
-                    Filters.offset = 0;
+                    Filters.cursor = null;
                     Filters.hasMoreData = true;
                     Filters.fetchData(false);
                 } else {
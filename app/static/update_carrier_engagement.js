@@ -60,20 +60,34 @@ export const Engagement = {
             body: JSON.stringify({ changes }),
         })
             .then((response) => {
-                if (response.ok) {
+                if (!response.ok) {
+                    alert("Failed to submit changes.");
+                    return;
+                }
+                return response.json().then((body) => {
+                    // Only changes the server applied become the new saved state
+                    const updated = new Set(body.results
+                        .filter((result) => result.status === "updated")
+                        .map((result) => result.usdot + "-" + result.field));
                     inputs.forEach((input) => {
                         const key = input.dataset.usdot + "-" + input.dataset.field;
-                        if (input.type === "checkbox") {
-                            Engagement.initialStates[key] = input.checked;
-                        } else {
-                            Engagement.initialStates[key] = input.value;
+                        if (updated.has(key)) {
+                            Engagement.initialStates[key] = input.type === "checkbox" ? input.checked : input.value;
                         }
                     });
-                    document.getElementById("submit-button").disabled = true;
-                    document.getElementById("revert-button").disabled = true;
-                } else {
-                    alert("Failed to submit changes.");
-                }
+                    const failed = body.results.filter((result) => result.status === "invalid" || result.status === "not_found");
+                    if (failed.length > 0) {
+                        alert(`${failed.length} of ${body.results.length} changes could not be saved.`);
+                    }
+                    const hasChanges = Array.from(inputs).some((input) => {
+                        const key = input.dataset.usdot + "-" + input.dataset.field;
+                        return input.type === "checkbox"
+                            ? input.checked !== Engagement.initialStates[key]
+                            : input.value !== Engagement.initialStates[key];
+                    });
+                    document.getElementById("submit-button").disabled = !hasChanges;
+                    document.getElementById("revert-button").disabled = !hasChanges;
+                });
             })
             .catch((error) => console.error("Error submitting changes:", error));
     },
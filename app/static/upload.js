@@ -39,6 +39,25 @@ const Upload = {
         });
     },
 
+    pollJob: async function (statusUrl, statusDiv, intervalMs = 2000) {
+        // poll the upload job until the background workers finish it
+        while (true) {
+            const response = await fetch(statusUrl);
+            if (!response.ok) {
+                throw new Error(`Upload job status request failed: ${response.status}`);
+            }
+
+            const job = await response.json();
+            if (job.status === "completed" || job.status === "failed") {
+                return job;
+            }
+
+            statusDiv.textContent = `Processing images... ${job.processed_files}/${job.total_files}`;
+            statusDiv.style.display = "block";
+            await new Promise((resolve) => setTimeout(resolve, intervalMs));
+        }
+    },
+
     handleFormSubmit: async function (event) {
         //calculate time to process all files
         const startTime = performance.now();
@@ -99,17 +118,24 @@ const Upload = {
         statusDiv.textContent = "Uploading images...";
         statusDiv.style.display = "block";
         try {
-            const response = await fetch("/upload", {
+            const response = await fetch("/upload?async_job=true", {
                 method: "POST",
                 body: formData,
             });
 
             if (response.ok) {
-                statusDiv.textContent = "✅ Images uploaded successfully!";
-                statusDiv.style.display = "block";
-                setTimeout(() => {
-                    location.reload();
-                }, 500);
+                const job = await response.json();
+                const finishedJob = await Upload.pollJob(job.status_url, statusDiv);
+                if (finishedJob.status === "completed") {
+                    statusDiv.textContent = `✅ Processed ${finishedJob.valid_files.length} of ${finishedJob.total_files} images!`;
+                    statusDiv.style.display = "block";
+                    setTimeout(() => {
+                        location.reload();
+                    }, 500);
+                } else {
+                    statusDiv.textContent = "❌ Upload failed.";
+                    statusDiv.style.display = "block";
+                }
             } else {
                 statusDiv.textContent = "❌ Upload failed.";
                 statusDiv.style.display = "block";
@@ -0,0 +1,28 @@
+"""Add dot_confidence to ocrresult
+
+Revision ID: 0b9d4e6a2c71
+Revises: f3c72a9e5d18
+Create Date: 2026-10-17 17:02:37.104826
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '0b9d4e6a2c71'
+down_revision: Union[str, None] = 'f3c72a9e5d18'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Confidence of the DOT reading after digit-error correction, NULL for older rows
+    op.add_column('ocrresult', sa.Column('dot_confidence', sa.Float(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('ocrresult', 'dot_confidence')
@@ -0,0 +1,36 @@
+"""Add OCR text cache table
+
+Revision ID: a41c7e9b2d10
+Revises: 62b8d32ff6de
+Create Date: 2026-10-17 09:12:44.318205
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = 'a41c7e9b2d10'
+down_revision: Union[str, None] = '62b8d32ff6de'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Content-addressed OCR text, keyed on the SHA-256 of the image bytes
+    op.create_table(
+        'ocrtextcache',
+        sa.Column('content_hash', sa.String(length=64), nullable=False),
+        sa.Column('extracted_text', sa.String(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=False, server_default=sa.text('CURRENT_TIMESTAMP')),
+        sa.PrimaryKeyConstraint('content_hash')
+    )
+    op.create_index('ix_ocrtextcache_created_at', 'ocrtextcache', ['created_at'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_ocrtextcache_created_at', table_name='ocrtextcache')
+    op.drop_table('ocrtextcache')
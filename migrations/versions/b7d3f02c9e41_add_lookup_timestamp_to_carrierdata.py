@@ -0,0 +1,29 @@
+"""Add lookup_timestamp to CarrierData
+
+Revision ID: b7d3f02c9e41
+Revises: a41c7e9b2d10
+Create Date: 2026-10-17 11:40:07.902113
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7d3f02c9e41'
+down_revision: Union[str, None] = 'a41c7e9b2d10'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # When SAFER was last scraped for the carrier, used to decide if stored data can be reused.
+    # Existing rows stay NULL so they are refreshed on their next lookup.
+    op.add_column('carrierdata', sa.Column('lookup_timestamp', sa.DateTime(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('carrierdata', 'lookup_timestamp')
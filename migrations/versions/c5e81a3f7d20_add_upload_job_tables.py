@@ -0,0 +1,65 @@
+"""Add upload job tables
+
+Revision ID: c5e81a3f7d20
+Revises: b7d3f02c9e41
+Create Date: 2026-10-17 14:05:31.447902
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = 'c5e81a3f7d20'
+down_revision: Union[str, None] = 'b7d3f02c9e41'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Queue of upload batches processed by the background workers
+    op.create_table(
+        'uploadjob',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.String(), nullable=False),
+        sa.Column('org_id', sa.String(), nullable=False),
+        sa.Column('status', sa.String(length=16), nullable=False),
+        sa.Column('total_files', sa.Integer(), nullable=False),
+        sa.Column('processed_files', sa.Integer(), nullable=False),
+        sa.Column('error', sa.String(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=False),
+        sa.Column('finished_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['appuser.user_id']),
+        sa.ForeignKeyConstraint(['org_id'], ['apporg.org_id']),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_uploadjob_status', 'uploadjob', ['status'])
+
+    # Uploaded images of each job, the bytes are cleared once processed
+    op.create_table(
+        'uploadjobfile',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('job_id', sa.Integer(), nullable=False),
+        sa.Column('position', sa.Integer(), nullable=False),
+        sa.Column('filename', sa.String(length=250), nullable=False),
+        sa.Column('content', sa.LargeBinary(), nullable=True),
+        sa.Column('status', sa.String(length=16), nullable=False),
+        sa.Column('ocr_result_id', sa.Integer(), nullable=True),
+        sa.Column('dot_reading', sa.String(length=32), nullable=True),
+        sa.Column('error', sa.String(), nullable=True),
+        sa.ForeignKeyConstraint(['job_id'], ['uploadjob.id']),
+        sa.ForeignKeyConstraint(['ocr_result_id'], ['ocrresult.id']),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_uploadjobfile_job_id', 'uploadjobfile', ['job_id'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_uploadjobfile_job_id', table_name='uploadjobfile')
+    op.drop_table('uploadjobfile')
+    op.drop_index('ix_uploadjob_status', table_name='uploadjob')
+    op.drop_table('uploadjob')
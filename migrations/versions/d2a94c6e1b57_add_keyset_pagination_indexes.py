@@ -0,0 +1,32 @@
+"""Add keyset pagination indexes
+
+Revision ID: d2a94c6e1b57
+Revises: c5e81a3f7d20
+Create Date: 2026-10-17 16:20:12.583104
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = 'd2a94c6e1b57'
+down_revision: Union[str, None] = 'c5e81a3f7d20'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Match the (timestamp, key) sort order of the dashboard cursors, scoped by org
+    op.create_index('ix_carrierengagementstatus_org_created_usdot', 'carrierengagementstatus',
+                    ['org_id', 'created_at', 'usdot'])
+    op.create_index('ix_ocrresult_org_timestamp_id', 'ocrresult',
+                    ['org_id', 'timestamp', 'id'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_ocrresult_org_timestamp_id', table_name='ocrresult')
+    op.drop_index('ix_carrierengagementstatus_org_created_usdot', table_name='carrierengagementstatus')
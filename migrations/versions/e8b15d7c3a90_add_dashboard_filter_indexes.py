@@ -0,0 +1,53 @@
+"""Add dashboard filter indexes
+
+Revision ID: e8b15d7c3a90
+Revises: d2a94c6e1b57
+Create Date: 2026-10-17 17:02:48.216375
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = 'e8b15d7c3a90'
+down_revision: Union[str, None] = 'd2a94c6e1b57'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Built concurrently so uploads and dashboards keep writing while the indexes build
+    with op.get_context().autocommit_block():
+        # get_ocr_results(valid_dot_only=True): org_id = ? AND dot_reading IS NOT NULL ORDER BY timestamp DESC, id DESC
+        op.create_index('ix_ocrresult_org_timestamp_id_valid_dot', 'ocrresult',
+                        ['org_id', 'timestamp', 'id'],
+                        postgresql_where=sa.text('dot_reading IS NOT NULL'),
+                        postgresql_concurrently=True)
+        # get_engagement_data(carrier_interested=?): org_id = ? AND carrier_interested = ? ORDER BY created_at DESC, usdot DESC
+        op.create_index('ix_carrierengagementstatus_org_interested_created_usdot', 'carrierengagementstatus',
+                        ['org_id', 'carrier_interested', 'created_at', 'usdot'],
+                        postgresql_concurrently=True)
+        # get_engagement_data(carrier_contacted=?): org_id = ? AND carrier_contacted = ? ORDER BY created_at DESC, usdot DESC
+        op.create_index('ix_carrierengagementstatus_org_contacted_created_usdot', 'carrierengagementstatus',
+                        ['org_id', 'carrier_contacted', 'created_at', 'usdot'],
+                        postgresql_concurrently=True)
+        # get_sync_status_by_org: org_id = ? [AND sync_status = ?]
+        op.create_index('ix_sobject_sync_status_org_status', 'sobject_sync_status',
+                        ['org_id', 'sync_status'],
+                        postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_sobject_sync_status_org_status', table_name='sobject_sync_status',
+                      postgresql_concurrently=True)
+        op.drop_index('ix_carrierengagementstatus_org_contacted_created_usdot', table_name='carrierengagementstatus',
+                      postgresql_concurrently=True)
+        op.drop_index('ix_carrierengagementstatus_org_interested_created_usdot', table_name='carrierengagementstatus',
+                      postgresql_concurrently=True)
+        op.drop_index('ix_ocrresult_org_timestamp_id_valid_dot', table_name='ocrresult',
+                      postgresql_concurrently=True)
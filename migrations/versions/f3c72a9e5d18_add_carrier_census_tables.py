@@ -0,0 +1,60 @@
+"""Add carrier census tables
+
+Revision ID: f3c72a9e5d18
+Revises: e8b15d7c3a90
+Create Date: 2026-10-17 16:21:08.562913
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = 'f3c72a9e5d18'
+down_revision: Union[str, None] = 'e8b15d7c3a90'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Carriers from the FMCSA company census file, looked up by primary key before scraping SAFER
+    op.create_table(
+        'carrier_census',
+        sa.Column('usdot', sa.String(), nullable=False),
+        sa.Column('legal_name', sa.String(), nullable=True),
+        sa.Column('dba_name', sa.String(), nullable=True),
+        sa.Column('usdot_status', sa.String(), nullable=True),
+        sa.Column('physical_address', sa.String(), nullable=True),
+        sa.Column('mailing_address', sa.String(), nullable=True),
+        sa.Column('phone', sa.String(), nullable=True),
+        sa.Column('power_units', sa.Integer(), nullable=True),
+        sa.Column('drivers', sa.Integer(), nullable=True),
+        sa.Column('mcs_150_form_date', sa.String(), nullable=True),
+        sa.Column('mcs_150_mileage_year_mileage', sa.BigInteger(), nullable=True),
+        sa.Column('mcs_150_mileage_year_year', sa.Integer(), nullable=True),
+        sa.Column('carrier_operation', sa.String(), nullable=True),
+        sa.Column('imported_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('usdot')
+    )
+
+    # Progress of each census import, so an interrupted import resumes
+    op.create_table(
+        'carrier_census_import',
+        sa.Column('source', sa.String(length=250), nullable=False),
+        sa.Column('file_size', sa.BigInteger(), nullable=False),
+        sa.Column('byte_offset', sa.BigInteger(), nullable=False),
+        sa.Column('rows_imported', sa.Integer(), nullable=False),
+        sa.Column('rows_skipped', sa.Integer(), nullable=False),
+        sa.Column('started_at', sa.DateTime(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=False),
+        sa.Column('completed_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('source')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('carrier_census_import')
+    op.drop_table('carrier_census')
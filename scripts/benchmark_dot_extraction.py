@@ -0,0 +1,106 @@
+"""
+Benchmark DOT and MC number extraction on the stored OCR text corpus.
+
+Runs app.helpers.dot_extraction and the previous first-match regex over every
+text of tests/data/ocr_text_corpus.jsonl. Prints how many of the labelled
+DOT and MC numbers each one finds and the median time per text. The known
+USDOT index holds the corpus numbers plus --known random numbers, so digit
+correction runs against an index as dense as an imported census.
+
+The corpus texts are hand-written to mimic OCR output of truck doors, with the
+layouts and misreads seen in lookup history, not stored OCR samples. The
+accuracy printed is measured on that synthetic text only.
+
+Usage:
+
+    python -m scripts.benchmark_dot_extraction --known 2000000
+
+Add texts to the corpus as {"id", "text", "usdot", "mc"} lines when a new
+layout is seen in lookup history, with the numbers in text order.
+"""
+import argparse
+import json
+import random
+import re
+import statistics
+import time
+from pathlib import Path
+
+from app.helpers.dot_correction import KnownUSDOTIndex
+from app.helpers.dot_extraction import best_dot_candidate, extract_identifiers
+
+CORPUS_PATH = Path(__file__).resolve().parent.parent / "tests" / "data" / "ocr_text_corpus.jsonl"
+
+# Extraction before the extraction module: the first DOT-labelled run of digits
+LEGACY_DOT_PATTERN = r'\b(?:US\s*DOT|USDOT|DOT)[\s#-]*?(\d{5,8})\b'
+
+
+def legacy_extract(text: str) -> tuple[list[str], list[str], str | None]:
+    """DOT numbers, MC numbers and the DOT number looked up, as the previous regex read them."""
+    match = re.search(LEGACY_DOT_PATTERN, text, re.IGNORECASE)
+    return ([match.group(1)], [], match.group(1)) if match else ([], [], None)
+
+
+def module_extract(text: str, known_usdots: KnownUSDOTIndex) -> tuple[list[str], list[str], str | None]:
+    """DOT numbers, MC numbers and the DOT number looked up, as the extraction module reads them."""
+    candidates = extract_identifiers(text, known_usdots)
+    best = best_dot_candidate(candidates)
+    return ([candidate.number for candidate in candidates if candidate.kind == "usdot"],
+            [candidate.number for candidate in candidates if candidate.kind == "mc"],
+            best.number if best else None)
+
+
+def score(corpus: list[dict], extract) -> dict:
+    """Count the labelled numbers found and the texts whose looked up number is right."""
+    found_dots = found_mcs = right_lookups = 0
+    for entry in corpus:
+        dots, mcs, lookup = extract(entry["text"])
+        found_dots += sum(min(dots.count(usdot), entry["usdot"].count(usdot)) for usdot in set(entry["usdot"]))
+        found_mcs += sum(min(mcs.count(mc), entry["mc"].count(mc)) for mc in set(entry["mc"]))
+        # The number looked up must be one of the carriers shown, or none when there is none
+        right_lookups += lookup in entry["usdot"] if lookup else not entry["usdot"]
+    return {"dots": found_dots, "mcs": found_mcs, "lookups": right_lookups}
+
+
+def time_per_text(corpus: list[dict], extract, repeat: int) -> float:
+    """Median microseconds per corpus text."""
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for entry in corpus:
+            extract(entry["text"])
+        durations.append((time.perf_counter() - start) / len(corpus) * 1e6)
+    return statistics.median(durations)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--corpus", type=Path, default=CORPUS_PATH)
+    parser.add_argument("--known", type=int, default=2000000,
+                        help="Random USDOT numbers added to the known index")
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    corpus = [json.loads(line) for line in args.corpus.read_text().splitlines() if line.strip()]
+    corpus_usdots = [usdot for entry in corpus for usdot in entry["usdot"]]
+    filler = random.Random(0).sample(range(1, 4500000), args.known)
+    known_usdots = KnownUSDOTIndex()
+    known_usdots.replace([*corpus_usdots, *map(str, filler)])
+
+    extractors = {
+        "previous first-match regex": legacy_extract,
+        "dot_extraction": lambda text: module_extract(text, known_usdots),
+    }
+    totals = {"dots": len(corpus_usdots), "mcs": sum(len(entry["mc"]) for entry in corpus), "lookups": len(corpus)}
+    print(f"{len(corpus)} texts, {totals['dots']} DOT and {totals['mcs']} MC numbers, "
+          f"{len(known_usdots)} known USDOT numbers\n")
+    print(f"{'extractor':<28} {'DOT found':>10} {'MC found':>9} {'right lookup':>13} {'us/text':>8}")
+    for name, extract in extractors.items():
+        found = score(corpus, extract)
+        timing = time_per_text(corpus, extract, args.repeat)
+        print(f"{name:<28} {found['dots']:>5}/{totals['dots']:<4} {found['mcs']:>4}/{totals['mcs']:<4} "
+              f"{found['lookups']:>8}/{totals['lookups']:<4} {timing:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,11 +2,15 @@
 Test configuration and fixtures for the USDOT Lookup Tool tests.
 """
 import pytest
+import pytest_asyncio
 import os
 from unittest.mock import Mock, MagicMock
 from sqlmodel import Session, SQLModel, create_engine
+from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlalchemy.ext.asyncio import create_async_engine
 from sqlalchemy import create_engine as sa_create_engine
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
 from fastapi.testclient import TestClient
 from datetime import datetime
 from typing import Generator
@@ -48,6 +52,27 @@ def mock_db_session():
     return session
 
 
+@pytest.fixture
+def sqlite_engine():
+    """Create a temporary in-memory database that can be used from worker threads."""
+    engine = create_engine("sqlite://",
+                           connect_args={"check_same_thread": False},
+                           poolclass=StaticPool)
+    SQLModel.metadata.create_all(engine)
+    return engine
+
+
+@pytest_asyncio.fixture
+async def async_db_session():
+    """Create a temporary in-memory database with an async session for testing."""
+    engine = create_async_engine("sqlite+aiosqlite://")
+    async with engine.begin() as connection:
+        await connection.run_sync(SQLModel.metadata.create_all)
+    async with AsyncSession(engine, expire_on_commit=False) as session:
+        yield session
+    await engine.dispose()
+
+
 @pytest.fixture
 def sample_carrier_data():
     """Create sample carrier data for testing."""
@@ -0,0 +1,148 @@
+"""
+Unit tests for the shared bulk persistence helpers.
+"""
+import pytest
+from datetime import datetime
+from unittest.mock import Mock, patch
+from sqlalchemy.dialects import postgresql
+from sqlmodel import Session, SQLModel, create_engine, select
+
+from app.crud.bulk import bulk_insert_returning
+from app.models.carrier_data import CarrierData
+from app.models.engagement import CarrierEngagementStatus
+from app.models.ocr_results import OCRResult
+
+
+@pytest.fixture
+def db_session():
+    """Create a temporary in-memory database for testing."""
+    engine = create_engine("sqlite://")
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        yield session
+
+
+def make_ocr_result(dot_reading: str) -> OCRResult:
+    return OCRResult(filename=f"{dot_reading}.jpg", dot_reading=dot_reading,
+                     timestamp=datetime(2024, 1, 1), user_id="user", org_id="org")
+
+
+class TestBulkInsertReturning:
+    """Test bulk_insert_returning function."""
+
+    def test_returns_generated_keys_in_input_order(self, db_session):
+        """Test that generated primary keys come back aligned with the input records."""
+        # Arrange
+        records = [make_ocr_result(str(100000 + i)) for i in range(5)]
+
+        # Act
+        result = bulk_insert_returning(db_session, OCRResult, records)
+        db_session.commit()
+
+        # Assert
+        assert [record.dot_reading for record in result] == [record.dot_reading for record in records]
+        assert all(record.id is not None for record in result)
+        assert len({record.id for record in result}) == 5
+        stored = db_session.exec(select(OCRResult).order_by(OCRResult.id)).all()
+        assert [(record.id, record.dot_reading) for record in stored] == \
+               [(record.id, record.dot_reading) for record in result]
+
+    def test_returns_defaults(self, db_session):
+        """Test that column defaults are filled in on the returned records."""
+        # Act
+        result = bulk_insert_returning(db_session, CarrierEngagementStatus,
+                                       [CarrierEngagementStatus(usdot="123456", org_id="org", user_id="user")])
+
+        # Assert
+        assert result[0].carrier_interested is False
+        assert result[0].created_at is not None
+
+    def test_conflicts_are_skipped(self, db_session):
+        """Test that existing rows are left alone and not returned without update_on_conflict."""
+        # Arrange
+        db_session.add(CarrierData(usdot="123456", legal_name="Existing"))
+        db_session.commit()
+
+        # Act
+        result = bulk_insert_returning(db_session, CarrierData,
+                                       [CarrierData(usdot="123456", legal_name="New"),
+                                        CarrierData(usdot="789012", legal_name="Other")],
+                                       conflict_columns=["usdot"])
+
+        # Assert
+        assert [record.usdot for record in result] == ["789012"]
+        assert db_session.get(CarrierData, "123456").legal_name == "Existing"
+
+    def test_conflicts_are_updated(self, db_session):
+        """Test that existing rows are overwritten with update_on_conflict."""
+        # Arrange
+        db_session.add(CarrierData(usdot="123456", legal_name="Existing"))
+        db_session.commit()
+
+        # Act
+        result = bulk_insert_returning(db_session, CarrierData,
+                                       [CarrierData(usdot="123456", legal_name="New")],
+                                       conflict_columns=["usdot"],
+                                       update_on_conflict=True)
+        db_session.commit()
+
+        # Assert
+        assert [record.legal_name for record in result] == ["New"]
+        assert db_session.exec(select(CarrierData.legal_name)).one() == "New"
+
+    def test_chunks_large_batches(self, db_session):
+        """Test that batches larger than chunk_size are split across statements."""
+        # Arrange
+        records = [make_ocr_result(str(100000 + i)) for i in range(5)]
+
+        # Act
+        with patch.object(db_session, 'execute', wraps=db_session.execute) as mock_execute:
+            result = bulk_insert_returning(db_session, OCRResult, records, chunk_size=2)
+
+        # Assert
+        assert mock_execute.call_count == 3
+        assert len(result) == 5
+
+    def test_empty_list(self, db_session):
+        """Test that nothing is executed for an empty batch."""
+        with patch.object(db_session, 'execute') as mock_execute:
+            assert bulk_insert_returning(db_session, OCRResult, []) == []
+        mock_execute.assert_not_called()
+
+    def test_unset_fields_are_not_sent(self, db_session):
+        """Test that fields left unset are omitted so server defaults apply, one statement per column set."""
+        # Arrange
+        records = [CarrierData(usdot="123456", legal_name="Named"), CarrierData(usdot="789012"),
+                   CarrierData(usdot="345678", legal_name="Also named")]
+
+        # Act
+        with patch.object(db_session, 'execute', wraps=db_session.execute) as mock_execute:
+            result = bulk_insert_returning(db_session, CarrierData, records)
+
+        # Assert
+        assert [record.usdot for record in result] == ["123456", "789012", "345678"]
+        assert mock_execute.call_count == 2
+        unnamed_row, = mock_execute.call_args_list[1].args[1]
+        assert unnamed_row["usdot"] == "789012"
+        assert "legal_name" not in unnamed_row
+
+    def test_conflict_path_on_postgresql(self):
+        """Test that a conflict insert is one multi-row statement on PostgreSQL and skipped rows are matched by key."""
+        # Arrange
+        db = Mock(spec=Session)
+        db.get_bind.return_value.dialect.name = "postgresql"
+        # The first record already exists, PostgreSQL returns only the inserted one
+        db.execute.return_value.mappings.return_value = [{"usdot": "789012", "org_id": "org", "user_id": "user"}]
+        records = [CarrierEngagementStatus(usdot="123456", org_id="org", user_id="user"),
+                   CarrierEngagementStatus(usdot="789012", org_id="org", user_id="user")]
+
+        # Act
+        result = bulk_insert_returning(db, CarrierEngagementStatus, records, conflict_columns=["usdot", "org_id"])
+
+        # Assert
+        stmt, = db.execute.call_args.args  # No executemany parameters, so no sentinel-keyed sorting
+        sql = str(stmt.compile(dialect=postgresql.dialect()))
+        assert "ON CONFLICT (usdot, org_id) DO NOTHING" in sql
+        assert "RETURNING" in sql
+        assert sql.count("%(usdot_m") == 2
+        assert [(record.usdot, record.org_id) for record in result] == [("789012", "org")]
@@ -4,15 +4,17 @@ Unit tests for carrier_data CRUD operations.
 import pytest
 from unittest.mock import Mock, patch, MagicMock
 from fastapi import HTTPException
+from sqlmodel import Session, SQLModel, create_engine, select
 
 from app.crud.carrier_data import (
     get_carrier_data,
     get_carrier_data_by_dot,
     save_carrier_data,
-    generate_carrier_records,
+    upsert_carrier_data_bulk,
     save_carrier_data_bulk
 )
 from app.models.carrier_data import CarrierData, CarrierDataCreate
+from app.models.engagement import CarrierEngagementStatus
 
 
 class TestGetCarrierData:
@@ -158,53 +160,67 @@ class TestSaveCarrierData:
             mock_db_session.rollback.assert_called_once()
 
 
-class TestGenerateCarrierRecords:
-    """Test generate_carrier_records function."""
+class TestUpsertCarrierDataBulk:
+    """Test upsert_carrier_data_bulk function."""
     
-    def test_generate_carrier_records_success(self, mock_db_session):
-        """Test generating carrier records successfully."""
+    @pytest.fixture
+    def db_session(self):
+        """Create a temporary in-memory database for testing."""
+        engine = create_engine("sqlite://")
+        SQLModel.metadata.create_all(engine)
+        with Session(engine) as session:
+            yield session
+    
+    def test_inserts_and_updates_in_one_statement(self, db_session):
+        """Test that new carriers are inserted and existing ones updated."""
         # Arrange
+        db_session.add(CarrierData(usdot="123456", legal_name="Old Name", phone="555-000-0000"))
+        db_session.commit()
         carrier_data_list = [
-            CarrierDataCreate(usdot="123456", legal_name="Carrier 1", lookup_success_flag=True),
-            CarrierDataCreate(usdot="789012", legal_name="Carrier 2", lookup_success_flag=True)
+            CarrierDataCreate(usdot="123456", legal_name="New Name", lookup_success_flag=True),
+            CarrierDataCreate(usdot="789012", legal_name="Carrier 2", power_units=3, lookup_success_flag=True)
         ]
         
-        mock_db_session.query.return_value.filter.return_value.first.return_value = None
+        # Act
+        with patch.object(db_session, 'execute', wraps=db_session.execute) as mock_execute:
+            result = upsert_carrier_data_bulk(db_session, carrier_data_list)
+        db_session.commit()
         
-        with patch('app.models.carrier_data.CarrierData.model_validate') as mock_validate:
-            mock_records = [Mock(spec=CarrierData) for _ in range(2)]
-            mock_validate.side_effect = mock_records
-            
-            # Act
-            result = generate_carrier_records(mock_db_session, carrier_data_list)
-            
-            # Assert
-            assert len(result) == 2
-            assert all(isinstance(record, Mock) for record in result)
+        # Assert
+        mock_execute.assert_called_once()
+        assert [(record.usdot, record.legal_name) for record in result] == [
+            ("123456", "New Name"), ("789012", "Carrier 2")
+        ]
+        stored = {carrier.usdot: carrier for carrier in db_session.exec(select(CarrierData)).all()}
+        assert stored["123456"].legal_name == "New Name"
+        assert stored["123456"].phone is None
+        assert stored["789012"].power_units == 3
     
-    def test_generate_carrier_records_validation_error(self, mock_db_session):
-        """Test handling validation errors in generate_carrier_records."""
+    def test_duplicate_usdots_keep_last_record(self, db_session):
+        """Test that repeated USDOT numbers in one batch collapse to the last record."""
         # Arrange
         carrier_data_list = [
-            CarrierDataCreate(usdot="invalid", legal_name="Invalid Carrier", lookup_success_flag=True)
+            CarrierDataCreate(usdot="123456", legal_name="First", lookup_success_flag=True),
+            CarrierDataCreate(usdot="123456", legal_name="Second", lookup_success_flag=True)
         ]
         
-        with patch('app.models.carrier_data.CarrierData.model_validate') as mock_validate:
-            mock_validate.side_effect = Exception("Validation error")
-            
-            # Act & Assert
-            with pytest.raises(HTTPException) as exc_info:
-                generate_carrier_records(mock_db_session, carrier_data_list)
-            
-            assert exc_info.value.status_code == 500
+        # Act
+        result = upsert_carrier_data_bulk(db_session, carrier_data_list)
+        
+        # Assert
+        assert [record.legal_name for record in result] == ["Second"]
+    
+    def test_empty_list(self, db_session):
+        """Test that nothing is written for an empty batch."""
+        assert upsert_carrier_data_bulk(db_session, []) == []
 
 
 class TestSaveCarrierDataBulk:
     """Test save_carrier_data_bulk function."""
     
-    @patch('app.crud.carrier_data.generate_engagement_records')
-    @patch('app.crud.carrier_data.generate_carrier_records')
-    def test_save_carrier_data_bulk_success(self, mock_gen_carriers, mock_gen_engagement, mock_db_session):
+    @patch('app.crud.carrier_data.insert_engagement_records_bulk')
+    @patch('app.crud.carrier_data.upsert_carrier_data_bulk')
+    def test_save_carrier_data_bulk_success(self, mock_upsert, mock_insert_engagement, mock_db_session):
         """Test bulk saving carrier data successfully."""
         # Arrange
         carrier_data_list = [
@@ -215,61 +231,71 @@ class TestSaveCarrierDataBulk:
         org_id = "test_org"
         
         mock_carrier_records = [Mock(spec=CarrierData) for _ in range(2)]
-        mock_engagement_records = [Mock() for _ in range(2)]
-        
-        mock_gen_carriers.return_value = mock_carrier_records
-        mock_gen_engagement.return_value = mock_engagement_records
+        mock_upsert.return_value = mock_carrier_records
+        mock_insert_engagement.return_value = [Mock()]
         
         # Act
         result = save_carrier_data_bulk(mock_db_session, carrier_data_list, user_id, org_id)
         
         # Assert
         assert result == mock_carrier_records
-        mock_db_session.add_all.assert_any_call(mock_carrier_records)
-        mock_db_session.add_all.assert_any_call(mock_engagement_records)
+        mock_upsert.assert_called_once_with(mock_db_session, carrier_data_list)
+        mock_insert_engagement.assert_called_once_with(mock_db_session, ["123456", "789012"],
+                                                       user_id=user_id, org_id=org_id)
         mock_db_session.commit.assert_called_once()
         
-    @patch('app.crud.carrier_data.generate_engagement_records')
-    @patch('app.crud.carrier_data.generate_carrier_records')
-    def test_save_carrier_data_bulk_no_records(self, mock_gen_carriers, mock_gen_engagement, mock_db_session):
+    @patch('app.crud.carrier_data.insert_engagement_records_bulk')
+    @patch('app.crud.carrier_data.upsert_carrier_data_bulk')
+    def test_save_carrier_data_bulk_no_records(self, mock_upsert, mock_insert_engagement, mock_db_session):
         """Test bulk saving when no valid records to save."""
-        # Arrange
-        carrier_data_list = []
-        user_id = "test_user"
-        org_id = "test_org"
-        
-        mock_gen_carriers.return_value = []
-        mock_gen_engagement.return_value = []
-        
         # Act
-        result = save_carrier_data_bulk(mock_db_session, carrier_data_list, user_id, org_id)
+        result = save_carrier_data_bulk(mock_db_session, [], "test_user", "test_org")
         
         # Assert
         assert result == []
-        mock_db_session.add_all.assert_not_called()
+        mock_upsert.assert_not_called()
+        mock_insert_engagement.assert_not_called()
         mock_db_session.commit.assert_not_called()
     
-    @patch('app.crud.carrier_data.generate_engagement_records')
-    @patch('app.crud.carrier_data.generate_carrier_records')
-    def test_save_carrier_data_bulk_database_error(self, mock_gen_carriers, mock_gen_engagement, mock_db_session):
+    @patch('app.crud.carrier_data.insert_engagement_records_bulk')
+    @patch('app.crud.carrier_data.upsert_carrier_data_bulk')
+    def test_save_carrier_data_bulk_database_error(self, mock_upsert, mock_insert_engagement, mock_db_session):
         """Test handling database errors in bulk save."""
         # Arrange
         carrier_data_list = [
             CarrierDataCreate(usdot="123456", legal_name="Carrier 1", lookup_success_flag=True)
         ]
-        user_id = "test_user"
-        org_id = "test_org"
-        
-        mock_carrier_records = [Mock(spec=CarrierData)]
-        mock_engagement_records = [Mock()]
         
-        mock_gen_carriers.return_value = mock_carrier_records
-        mock_gen_engagement.return_value = mock_engagement_records
+        mock_upsert.return_value = [Mock(spec=CarrierData)]
+        mock_insert_engagement.return_value = [Mock()]
         mock_db_session.commit.side_effect = Exception("Database error")
         
         # Act & Assert
         with pytest.raises(HTTPException) as exc_info:
-            save_carrier_data_bulk(mock_db_session, carrier_data_list, user_id, org_id)
+            save_carrier_data_bulk(mock_db_session, carrier_data_list, "test_user", "test_org")
         
         assert exc_info.value.status_code == 500
-        mock_db_session.rollback.assert_called_once()
\ No newline at end of file
+        mock_db_session.rollback.assert_called_once()
+    
+    def test_save_carrier_data_bulk_updates_already_engaged_carriers(self):
+        """Test that carriers the org already engaged are still updated."""
+        # Arrange
+        engine = create_engine("sqlite://")
+        SQLModel.metadata.create_all(engine)
+        with Session(engine) as db:
+            db.add(CarrierData(usdot="123456", legal_name="Old Name"))
+            db.add(CarrierEngagementStatus(usdot="123456", org_id="test_org", user_id="test_user"))
+            db.commit()
+            carrier_data_list = [
+                CarrierDataCreate(usdot="123456", legal_name="New Name", lookup_success_flag=True),
+                CarrierDataCreate(usdot="789012", legal_name="Carrier 2", lookup_success_flag=True)
+            ]
+            
+            # Act
+            result = save_carrier_data_bulk(db, carrier_data_list, "test_user", "test_org")
+            
+            # Assert
+            assert len(result) == 2
+            assert db.get(CarrierData, "123456").legal_name == "New Name"
+            engaged = db.exec(select(CarrierEngagementStatus.usdot)).all()
+            assert sorted(engaged) == ["123456", "789012"]
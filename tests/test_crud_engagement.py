@@ -5,157 +5,311 @@ import pytest
 from unittest.mock import Mock, patch, MagicMock
 from datetime import datetime
 from fastapi import HTTPException
+from sqlmodel import Session, SQLModel, create_engine, select
 
 from app.crud.engagement import (
     get_engagement_data,
-    generate_engagement_records,
+    get_engagement_rows_async,
+    get_carrier_dashboard_page_async,
+    stream_engagement_export_rows,
+    stream_carrier_snapshot_rows,
+    insert_engagement_records_bulk,
     save_engagement_records_bulk,
-    update_carrier_engagement
+    update_carrier_engagement,
+    update_carrier_engagements_bulk
 )
 from app.models.engagement import CarrierEngagementStatus, CarrierChangeItem
+from app.models.carrier_data import CarrierData
+from app.models.sobject_sync_status import SObjectSyncStatus
+from app.helpers.pagination import decode_cursor
+from sqlalchemy import event, text
 
 
 class TestGetEngagementData:
     """Test get_engagement_data function."""
-    
-    def test_get_engagement_data_without_filters(self, mock_db_session):
-        """Test getting engagement data without any filters."""
-        # Arrange
-        mock_engagements = [Mock(spec=CarrierEngagementStatus) for _ in range(3)]
-        mock_query = mock_db_session.query.return_value
-        mock_query.order_by.return_value.all.return_value = mock_engagements
-        
+
+    @pytest.fixture
+    def db_session(self, sqlite_engine):
+        """Store engaged carriers for two orgs, one created per day."""
+        with Session(sqlite_engine) as session:
+            session.add_all([
+                CarrierEngagementStatus(usdot=str(100000 + i), org_id="org_a", user_id="user",
+                                        created_at=datetime(2024, 1, 1 + i),
+                                        carrier_interested=i % 2 == 0, carrier_contacted=i < 2)
+                for i in range(6)
+            ] + [CarrierEngagementStatus(usdot="200000", org_id="org_b", user_id="other_user",
+                                         created_at=datetime(2024, 2, 1))])
+            session.commit()
+            yield session
+
+    def test_get_engagement_data_without_filters(self, db_session):
+        """Test getting engagement data without any filters, newest first."""
         # Act
-        result = get_engagement_data(mock_db_session)
-        
+        result = get_engagement_data(db_session)
+
         # Assert
-        assert result == mock_engagements
-        mock_db_session.query.assert_called_once_with(CarrierEngagementStatus)
-        mock_query.order_by.assert_called_once()
-        
-    def test_get_engagement_data_with_org_filter(self, mock_db_session):
+        assert [record.usdot for record in result] == \
+               ["200000", "100005", "100004", "100003", "100002", "100001", "100000"]
+
+    def test_get_engagement_data_with_org_filter(self, db_session):
         """Test getting engagement data filtered by org_id."""
-        # Arrange
-        org_id = "test_org_123"
-        mock_engagements = [Mock(spec=CarrierEngagementStatus) for _ in range(2)]
-        mock_query = mock_db_session.query.return_value
-        mock_query.filter.return_value.order_by.return_value.all.return_value = mock_engagements
-        
         # Act
-        result = get_engagement_data(mock_db_session, org_id=org_id)
-        
+        result = get_engagement_data(db_session, org_id="org_b")
+
         # Assert
-        assert result == mock_engagements
-        mock_query.filter.assert_called_once()
-        
-    def test_get_engagement_data_with_interested_filter(self, mock_db_session):
+        assert [record.usdot for record in result] == ["200000"]
+
+    def test_get_engagement_data_with_interested_filter(self, db_session):
         """Test getting engagement data filtered by carrier_interested."""
-        # Arrange
-        mock_engagements = [Mock(spec=CarrierEngagementStatus)]
-        mock_query = mock_db_session.query.return_value
-        mock_query.filter.return_value.order_by.return_value.all.return_value = mock_engagements
-        
         # Act
-        result = get_engagement_data(mock_db_session, carrier_interested=True)
-        
+        result = get_engagement_data(db_session, org_id="org_a", carrier_interested=True)
+
         # Assert
-        assert result == mock_engagements
-        mock_query.filter.assert_called_once()
-        
-    def test_get_engagement_data_with_contacted_filter(self, mock_db_session):
+        assert [record.usdot for record in result] == ["100004", "100002", "100000"]
+
+    def test_get_engagement_data_with_contacted_filter(self, db_session):
         """Test getting engagement data filtered by carrier_contacted."""
+        # Act
+        result = get_engagement_data(db_session, org_id="org_a", carrier_contacted=True)
+
+        # Assert
+        assert [record.usdot for record in result] == ["100001", "100000"]
+
+    def test_get_engagement_data_with_pagination(self, db_session):
+        """Test that offset paging and cursor paging return the same page."""
+        # Act
+        first_page = get_engagement_data(db_session, org_id="org_a", offset=0, limit=2)
+        offset_page = get_engagement_data(db_session, org_id="org_a", offset=2, limit=2)
+        cursor_page = get_engagement_data(db_session, org_id="org_a", offset=0, limit=2,
+                                          cursor=(first_page[-1].created_at, first_page[-1].usdot))
+
+        # Assert
+        assert [record.usdot for record in first_page] == ["100005", "100004"]
+        assert [record.usdot for record in offset_page] == ["100003", "100002"]
+        assert cursor_page == offset_page
+
+
+class TestGetEngagementRowsAsync:
+    """Test get_engagement_rows_async function."""
+
+    @pytest.mark.asyncio
+    async def test_page_is_one_joined_query(self, async_db_session):
+        """Test that carrier fields and the org's sync status come back from a single SELECT."""
         # Arrange
-        mock_engagements = [Mock(spec=CarrierEngagementStatus)]
-        mock_query = mock_db_session.query.return_value
-        mock_query.filter.return_value.order_by.return_value.all.return_value = mock_engagements
-        
+        async_db_session.add_all(
+            [CarrierData(usdot=str(100000 + i), legal_name=f"Carrier {i}", phone=f"555-000-000{i}",
+                         mailing_address=f"{i} Main St") for i in range(20)] +
+            [CarrierEngagementStatus(usdot=str(100000 + i), org_id="org_a", user_id="user",
+                                     created_at=datetime(2024, 1, 1 + i)) for i in range(20)] +
+            [SObjectSyncStatus(usdot="100019", org_id="org_a", user_id="user",
+                               sync_status="SUCCESS", sobject_id="sf001"),
+             SObjectSyncStatus(usdot="100018", org_id="org_b", user_id="user",
+                               sync_status="FAILED")]
+        )
+        await async_db_session.commit()
+        statements = []
+        event.listen(async_db_session.bind.sync_engine, "before_cursor_execute",
+                     lambda *args: statements.append(args[2]))
+
         # Act
-        result = get_engagement_data(mock_db_session, carrier_contacted=True)
-        
+        rows = await get_engagement_rows_async(async_db_session, org_id="org_a", offset=0, limit=10)
+
         # Assert
-        assert result == mock_engagements
-        mock_query.filter.assert_called_once()
-    
-    def test_get_engagement_data_with_pagination(self, mock_db_session):
-        """Test getting engagement data with pagination."""
+        assert len(statements) == 1
+        assert len(rows) == 10
+        assert rows[0].usdot == "100019"
+        assert rows[0].legal_name == "Carrier 19"
+        assert rows[0].mailing_address == "19 Main St"
+        assert rows[0].sf_sync_status == "SUCCESS"
+        assert rows[0].sf_sobject_id == "sf001"
+        # Another org's sync status is not joined in
+        assert rows[1].sf_sync_status is None
+
+    @pytest.mark.asyncio
+    async def test_filters_and_cursor(self, async_db_session):
+        """Test that the dashboard filters and cursor apply to the joined rows."""
         # Arrange
-        offset, limit = 10, 5
-        mock_engagements = [Mock(spec=CarrierEngagementStatus) for _ in range(5)]
-        mock_query = mock_db_session.query.return_value
-        mock_query.order_by.return_value.offset.return_value.limit.return_value.all.return_value = mock_engagements
-        
+        async_db_session.add_all(
+            [CarrierData(usdot=str(100000 + i), legal_name=f"Carrier {i}") for i in range(6)] +
+            [CarrierEngagementStatus(usdot=str(100000 + i), org_id="org_a", user_id="user",
+                                     created_at=datetime(2024, 1, 1 + i), carrier_contacted=i % 2 == 1)
+             for i in range(6)]
+        )
+        await async_db_session.commit()
+
         # Act
-        result = get_engagement_data(mock_db_session, offset=offset, limit=limit)
-        
+        rows = await get_engagement_rows_async(async_db_session, org_id="org_a", carrier_contacted=True,
+                                               cursor=(datetime(2024, 1, 6), "100005"))
+
+        # Assert
+        assert [row.usdot for row in rows] == ["100003", "100001"]
+
+
+class TestGetCarrierDashboardPageAsync:
+    """Test get_carrier_dashboard_page_async function."""
+
+    @pytest.mark.asyncio
+    async def test_pages_through_dashboard_with_one_query_per_page(self, async_db_session):
+        """Test that each page is a single query and the cursor resumes after the last carrier."""
+        # Arrange
+        async_db_session.add_all(
+            [CarrierData(usdot=str(100000 + i), legal_name=f"Carrier {i}", mailing_address="Main St")
+             for i in range(3)] +
+            [CarrierEngagementStatus(usdot=str(100000 + i), org_id="org_a", user_id="user",
+                                     created_at=datetime(2024, 1, 1, 12, 0, 0, 500 + i),
+                                     carrier_follow_up_by_date=datetime(2024, 2, 1) if i == 2 else None)
+             for i in range(3)] +
+            [SObjectSyncStatus(usdot="100002", org_id="org_a", user_id="user", sync_status="SUCCESS",
+                               sobject_id="sf001", updated_at=datetime(2024, 1, 3, 4, 5, 6))]
+        )
+        await async_db_session.commit()
+        statements = []
+        event.listen(async_db_session.bind.sync_engine, "before_cursor_execute",
+                     lambda *args: statements.append(args[2]))
+
+        # Act
+        first_page = await get_carrier_dashboard_page_async(async_db_session, org_id="org_a",
+                                                            offset=0, limit=2)
+        last_page = await get_carrier_dashboard_page_async(async_db_session, org_id="org_a",
+                                                           offset=0, limit=2,
+                                                           cursor=decode_cursor(first_page.next_cursor))
+
         # Assert
-        assert result == mock_engagements
-        mock_query.order_by.return_value.offset.assert_called_once_with(offset)
-        mock_query.order_by.return_value.offset.return_value.limit.assert_called_once_with(limit)
+        assert len(statements) == 2
+        assert [item.usdot for item in first_page.items] == ["100002", "100001"]
+        assert first_page.items[0].created_at == "2024-01-01 12:00:00"
+        assert first_page.items[0].carrier_follow_up_by_date == "2024-02-01"
+        assert first_page.items[0].sf_sync_status == "SUCCESS"
+        assert first_page.items[0].sf_sync_timestamp == "2024-01-03 04:05:06"
+        assert first_page.items[1].sf_sync_status is None
+        # Rows created within the same second are not skipped by the cursor
+        assert [item.usdot for item in last_page.items] == ["100000"]
+        assert last_page.next_cursor is None
 
 
-class TestGenerateEngagementRecords:
-    """Test generate_engagement_records function."""
+class TestStreamEngagementExportRows:
+    """Test stream_engagement_export_rows function."""
+
+    def test_streams_all_org_rows_in_batches(self, sqlite_engine):
+        """Test that every row of the org is yielded in dashboard order using yield_per."""
+        # Arrange
+        with Session(sqlite_engine) as db:
+            db.add_all(
+                [CarrierData(usdot=str(100000 + i), legal_name=f"Carrier {i}") for i in range(5)] +
+                [CarrierEngagementStatus(usdot=str(100000 + i), org_id="org_a" if i < 4 else "org_b",
+                                         user_id="user", created_at=datetime(2024, 1, 1 + i))
+                 for i in range(5)]
+            )
+            db.commit()
+            statements = []
+            event.listen(sqlite_engine, "before_cursor_execute",
+                         lambda conn, cursor, statement, params, context, executemany:
+                             statements.append(context.execution_options))
+
+            # Act
+            rows = list(stream_engagement_export_rows(db, org_id="org_a", batch_size=2))
+
+        # Assert
+        assert [row.usdot for row in rows] == ["100003", "100002", "100001", "100000"]
+        assert rows[0].legal_name == "Carrier 3"
+        assert statements[0]["yield_per"] == 2
+
+
+class TestStreamCarrierSnapshotRows:
+    """Test stream_carrier_snapshot_rows function."""
+
+    def test_streams_selected_columns_of_engaged_carriers(self, sqlite_engine):
+        """Test that only the org's engaged carriers are returned with the chosen columns."""
+        # Arrange
+        with Session(sqlite_engine) as db:
+            db.add_all(
+                [CarrierData(usdot=str(100000 + i), legal_name=f"Carrier {i}", usa_crashes_total=i)
+                 for i in range(4)] +
+                [CarrierEngagementStatus(usdot=str(100000 + i), org_id="org_a" if i < 3 else "org_b",
+                                         user_id="user", created_at=datetime(2024, 1, 1 + i))
+                 for i in range(4)]
+            )
+            db.commit()
+
+            # Act
+            rows = list(stream_carrier_snapshot_rows(db, "org_a", ["usdot", "usa_crashes_total"], batch_size=2))
+
+        # Assert
+        assert [tuple(row) for row in rows] == [("100002", 2), ("100001", 1), ("100000", 0)]
+        assert rows[0]._fields == ("usdot", "usa_crashes_total")
+
+
+class TestInsertEngagementRecordsBulk:
+    """Test insert_engagement_records_bulk function."""
+    
+    @pytest.fixture
+    def db_session(self):
+        """Create a temporary in-memory database for testing."""
+        engine = create_engine("sqlite://")
+        SQLModel.metadata.create_all(engine)
+        with Session(engine) as session:
+            yield session
     
-    def test_generate_engagement_records_success(self, mock_db_session):
-        """Test generating engagement records successfully."""
+    def test_insert_engagement_records_success(self, db_session):
+        """Test creating engagement records for new carriers in one statement."""
         # Arrange
         usdot_numbers = ["123456", "789012", "345678"]
-        user_id = "test_user_123"
-        org_id = "test_org_456"
-        
-        # Mock that no existing engagement records exist
-        mock_db_session.query.return_value.filter.return_value.first.return_value = None
         
         # Act
-        result = generate_engagement_records(mock_db_session, usdot_numbers, user_id, org_id)
+        with patch.object(db_session, 'execute', wraps=db_session.execute) as mock_execute:
+            result = insert_engagement_records_bulk(db_session, usdot_numbers, "test_user_123", "test_org_456")
         
         # Assert
-        assert len(result) == 3
-        for i, record in enumerate(result):
+        mock_execute.assert_called_once()
+        assert [record.usdot for record in result] == usdot_numbers
+        for record in result:
             assert isinstance(record, CarrierEngagementStatus)
-            assert record.usdot == usdot_numbers[i]
-            assert record.user_id == user_id
-            assert record.org_id == org_id
+            assert record.user_id == "test_user_123"
+            assert record.org_id == "test_org_456"
     
-    def test_generate_engagement_records_skip_existing(self, mock_db_session):
-        """Test skipping existing engagement records."""
+    def test_insert_engagement_records_skip_existing(self, db_session):
+        """Test that existing engagement is left untouched and not reported."""
         # Arrange
-        usdot_numbers = ["123456", "789012"]
-        user_id = "test_user_123"
-        org_id = "test_org_456"
-        
-        # Mock that first record exists, second doesn't
-        existing_record = Mock(spec=CarrierEngagementStatus)
-        mock_db_session.query.return_value.filter.return_value.first.side_effect = [existing_record, None]
+        db_session.add(CarrierEngagementStatus(usdot="123456", org_id="test_org_456",
+                                               user_id="other_user", carrier_interested=True))
+        db_session.commit()
         
         # Act
-        result = generate_engagement_records(mock_db_session, usdot_numbers, user_id, org_id)
+        result = insert_engagement_records_bulk(db_session, ["123456", "789012", "789012"],
+                                                "test_user_123", "test_org_456")
+        db_session.commit()
         
         # Assert
-        assert len(result) == 1  # Only one new record should be generated
-        assert result[0].usdot == "789012"
+        assert [record.usdot for record in result] == ["789012"]
+        existing = db_session.exec(
+            select(CarrierEngagementStatus).where(CarrierEngagementStatus.usdot == "123456")
+        ).one()
+        assert existing.user_id == "other_user"
+        assert existing.carrier_interested is True
     
-    def test_generate_engagement_records_database_error(self, mock_db_session):
-        """Test handling database errors in generate_engagement_records."""
+    def test_insert_engagement_records_other_org(self, db_session):
+        """Test that engagement of another org does not block creating this org's record."""
         # Arrange
-        usdot_numbers = ["123456"]
-        user_id = "test_user_123"
-        org_id = "test_org_456"
-        
-        mock_db_session.query.side_effect = Exception("Database error")
+        db_session.add(CarrierEngagementStatus(usdot="123456", org_id="other_org", user_id="other_user"))
+        db_session.commit()
         
-        # Act & Assert
-        with pytest.raises(HTTPException) as exc_info:
-            generate_engagement_records(mock_db_session, usdot_numbers, user_id, org_id)
+        # Act
+        result = insert_engagement_records_bulk(db_session, ["123456"], "test_user_123", "test_org_456")
         
-        assert exc_info.value.status_code == 500
+        # Assert
+        assert [(record.usdot, record.org_id) for record in result] == [("123456", "test_org_456")]
+    
+    def test_insert_engagement_records_empty(self, mock_db_session):
+        """Test that nothing is executed without USDOT numbers."""
+        assert insert_engagement_records_bulk(mock_db_session, [], "test_user_123", "test_org_456") == []
+        mock_db_session.execute.assert_not_called()
 
 
 class TestSaveEngagementRecordsBulk:
     """Test save_engagement_records_bulk function."""
     
-    @patch('app.crud.engagement.generate_engagement_records')
-    def test_save_engagement_records_bulk_success(self, mock_generate, mock_db_session):
+    @patch('app.crud.engagement.insert_engagement_records_bulk')
+    def test_save_engagement_records_bulk_success(self, mock_insert, mock_db_session):
         """Test bulk saving engagement records successfully."""
         # Arrange
         usdot_numbers = ["123456", "789012"]
@@ -163,27 +317,26 @@ class TestSaveEngagementRecordsBulk:
         org_id = "test_org_456"
         
         mock_records = [Mock(spec=CarrierEngagementStatus) for _ in range(2)]
-        mock_generate.return_value = mock_records
+        mock_insert.return_value = mock_records
         
         # Act
         result = save_engagement_records_bulk(mock_db_session, usdot_numbers, user_id, org_id)
         
         # Assert
         assert result == mock_records
-        mock_db_session.add_all.assert_called_once_with(mock_records)
+        mock_insert.assert_called_once_with(mock_db_session, usdot_numbers, user_id, org_id)
         mock_db_session.commit.assert_called_once()
-        assert mock_db_session.refresh.call_count == 2
+        mock_db_session.refresh.assert_not_called()
     
-    @patch('app.crud.engagement.generate_engagement_records')
-    def test_save_engagement_records_bulk_database_error(self, mock_generate, mock_db_session):
+    @patch('app.crud.engagement.insert_engagement_records_bulk')
+    def test_save_engagement_records_bulk_database_error(self, mock_insert, mock_db_session):
         """Test handling database errors in bulk save."""
         # Arrange
         usdot_numbers = ["123456"]
         user_id = "test_user_123"
         org_id = "test_org_456"
         
-        mock_records = [Mock(spec=CarrierEngagementStatus)]
-        mock_generate.return_value = mock_records
+        mock_insert.return_value = [Mock(spec=CarrierEngagementStatus)]
         mock_db_session.commit.side_effect = Exception("Database error")
         
         # Act & Assert
@@ -209,16 +362,17 @@ class TestUpdateCarrierEngagement:
         
         existing_carrier = Mock(spec=CarrierEngagementStatus)
         existing_carrier.usdot = "123456"
-        mock_db_session.query.return_value.filter.return_value.first.return_value = existing_carrier
+        mock_db_session.get.return_value = existing_carrier
         
         # Act
-        result = update_carrier_engagement(mock_db_session, change_data)
+        result = update_carrier_engagement(mock_db_session, change_data, "test_org_456")
         
         # Assert
         assert result == existing_carrier
         assert existing_carrier.carrier_interested == True
-        assert hasattr(existing_carrier, 'carrier_interested_timestamp')
-        assert hasattr(existing_carrier, 'carrier_interested_by_user_id')
+        assert existing_carrier.carrier_interested_by_user_id == "test_user_123"
+        assert isinstance(existing_carrier.carrier_interested_timestamp, datetime)
+        mock_db_session.get.assert_called_once_with(CarrierEngagementStatus, ("123456", "test_org_456"))
         mock_db_session.commit.assert_called_once()
         mock_db_session.refresh.assert_called_once_with(existing_carrier)
     
@@ -234,22 +388,18 @@ class TestUpdateCarrierEngagement:
         
         existing_carrier = Mock(spec=CarrierEngagementStatus)
         existing_carrier.usdot = "123456"
-        mock_db_session.query.return_value.filter.return_value.first.return_value = existing_carrier
+        mock_db_session.get.return_value = existing_carrier
         
-        # Mock the table columns check
-        with patch('app.models.engagement.CarrierEngagementStatus.__table__') as mock_table:
-            mock_table.columns = {"rental_notes": Mock()}
-            
-            # Act
-            result = update_carrier_engagement(mock_db_session, change_data)
-            
-            # Assert
-            assert result == existing_carrier
-            assert existing_carrier.rental_notes == "Updated notes"
-            mock_db_session.commit.assert_called_once()
+        # Act
+        result = update_carrier_engagement(mock_db_session, change_data, "test_org_456")
+        
+        # Assert
+        assert result == existing_carrier
+        assert existing_carrier.rental_notes == "Updated notes"
+        mock_db_session.commit.assert_called_once()
     
     def test_update_carrier_engagement_carrier_not_found(self, mock_db_session):
-        """Test updating engagement when carrier not found."""
+        """Test updating engagement when the org has not engaged the carrier."""
         # Arrange
         change_data = {
             "usdot": "999999",
@@ -258,38 +408,31 @@ class TestUpdateCarrierEngagement:
             "user_id": "test_user_123"
         }
         
-        mock_db_session.query.return_value.filter.return_value.first.return_value = None
+        mock_db_session.get.return_value = None
         
         # Act
-        result = update_carrier_engagement(mock_db_session, change_data)
+        result = update_carrier_engagement(mock_db_session, change_data, "test_org_456")
         
         # Assert
         assert result is None
         mock_db_session.commit.assert_not_called()
     
     def test_update_carrier_engagement_invalid_field(self, mock_db_session):
-        """Test updating engagement with invalid field."""
+        """Test that fields the dashboard may not change are rejected before touching the database."""
         # Arrange
         change_data = {
             "usdot": "123456",
-            "field": "invalid_field",
-            "value": "test",
+            "field": "org_id",
+            "value": "other_org",
             "user_id": "test_user_123"
         }
         
-        existing_carrier = Mock(spec=CarrierEngagementStatus)
-        mock_db_session.query.return_value.filter.return_value.first.return_value = existing_carrier
+        # Act & Assert
+        with pytest.raises(HTTPException) as exc_info:
+            update_carrier_engagement(mock_db_session, change_data, "test_org_456")
         
-        # Mock the table columns check to not include the invalid field
-        with patch('app.models.engagement.CarrierEngagementStatus.__table__') as mock_table:
-            mock_table.columns = {}
-            
-            # Act & Assert
-            with pytest.raises(HTTPException) as exc_info:
-                update_carrier_engagement(mock_db_session, change_data)
-            
-            # The original code catches HTTPException(400) and converts to 500 - this is the actual behavior
-            assert exc_info.value.status_code == 500
+        assert exc_info.value.status_code == 400
+        mock_db_session.get.assert_not_called()
     
     def test_update_carrier_engagement_database_error(self, mock_db_session):
         """Test handling database errors in update_carrier_engagement."""
@@ -302,12 +445,12 @@ class TestUpdateCarrierEngagement:
         }
         
         existing_carrier = Mock(spec=CarrierEngagementStatus)
-        mock_db_session.query.return_value.filter.return_value.first.return_value = existing_carrier
+        mock_db_session.get.return_value = existing_carrier
         mock_db_session.commit.side_effect = Exception("Database error")
         
         # Act & Assert
         with pytest.raises(HTTPException) as exc_info:
-            update_carrier_engagement(mock_db_session, change_data)
+            update_carrier_engagement(mock_db_session, change_data, "test_org_456")
         
         assert exc_info.value.status_code == 500
         mock_db_session.rollback.assert_called_once()
@@ -326,15 +469,167 @@ class TestUpdateCarrierEngagement:
             }
             
             existing_carrier = Mock(spec=CarrierEngagementStatus)
-            mock_db_session.query.return_value.filter.return_value.first.return_value = existing_carrier
             mock_db_session.reset_mock()
+            mock_db_session.get.return_value = existing_carrier
             
             # Act
-            result = update_carrier_engagement(mock_db_session, change_data)
+            result = update_carrier_engagement(mock_db_session, change_data, "test_org_456")
             
             # Assert
             assert result == existing_carrier
-            assert getattr(existing_carrier, field) == True
-            assert hasattr(existing_carrier, f'{field}_timestamp')
-            assert hasattr(existing_carrier, f'{field}_by_user_id')
-            mock_db_session.commit.assert_called_once()
\ No newline at end of file
+            assert getattr(existing_carrier, field) is True
+            assert getattr(existing_carrier, f"{field}_by_user_id") == "test_user_123"
+            mock_db_session.commit.assert_called_once()
+
+    def test_only_updates_callers_org(self, sqlite_engine):
+        """Test that a carrier engaged by two orgs is only changed for the caller's org."""
+        # Arrange
+        with Session(sqlite_engine) as db:
+            db.add_all([CarrierEngagementStatus(usdot="123456", org_id=org_id, user_id="user")
+                        for org_id in ["org_a", "org_b"]])
+            db.commit()
+
+            # Act
+            update_carrier_engagement(db, {"usdot": "123456", "field": "carrier_contacted", "value": True}, "org_b")
+
+            # Assert
+            assert db.get(CarrierEngagementStatus, ("123456", "org_a")).carrier_contacted is False
+            assert db.get(CarrierEngagementStatus, ("123456", "org_b")).carrier_contacted is True
+
+
+class TestUpdateCarrierEngagementsBulk:
+    """Test update_carrier_engagements_bulk function."""
+
+    @pytest.fixture
+    def db_session(self, sqlite_engine):
+        """Store engaged carriers for two orgs."""
+        with Session(sqlite_engine) as session:
+            session.add_all(
+                [CarrierEngagementStatus(usdot=str(100000 + i), org_id="org_a", user_id="user") for i in range(50)] +
+                [CarrierEngagementStatus(usdot="100000", org_id="org_b", user_id="other_user")]
+            )
+            session.commit()
+            yield session
+
+    def test_updates_batch_in_one_statement_per_group(self, db_session):
+        """Test that marking 50 carriers contacted is one UPDATE and one commit."""
+        # Arrange
+        changes = [{"usdot": str(100000 + i), "field": "carrier_contacted", "value": True} for i in range(50)]
+        statements = []
+        event.listen(db_session.get_bind(), "before_cursor_execute",
+                     lambda *args: statements.append(args[2]))
+
+        # Act
+        with patch.object(db_session, 'commit', wraps=db_session.commit) as mock_commit:
+            results = update_carrier_engagements_bulk(db_session, changes, org_id="org_a", user_id="editor")
+
+        # Assert
+        assert [result.status for result in results] == ["updated"] * 50
+        assert len(statements) == 1
+        assert statements[0].startswith("UPDATE carrierengagementstatus")
+        mock_commit.assert_called_once()
+        record = db_session.get(CarrierEngagementStatus, ("100049", "org_a"))
+        assert record.carrier_contacted is True
+        assert record.carrier_contacted_by_user_id == "editor"
+        assert record.carrier_contacted_timestamp is not None
+
+    def test_only_updates_callers_org(self, db_session):
+        """Test that a carrier engaged by two orgs is only changed for the caller's org."""
+        # Act
+        results = update_carrier_engagements_bulk(
+            db_session,
+            [{"usdot": "100000", "field": "carrier_interested", "value": True},
+             {"usdot": "999999", "field": "carrier_interested", "value": True}],
+            org_id="org_a", user_id="editor")
+
+        # Assert
+        assert [result.status for result in results] == ["updated", "not_found"]
+        assert db_session.get(CarrierEngagementStatus, ("100000", "org_a")).carrier_interested is True
+        assert db_session.get(CarrierEngagementStatus, ("100000", "org_b")).carrier_interested is False
+
+    def test_groups_by_field_and_value(self, db_session):
+        """Test that mixed changes are applied per field and value, and the last duplicate wins."""
+        # Act
+        results = update_carrier_engagements_bulk(
+            db_session,
+            [{"usdot": "100001", "field": "carrier_interested", "value": True},
+             {"usdot": "100002", "field": "carrier_interested", "value": False},
+             {"usdot": "100003", "field": "carrier_follow_up_by_date", "value": "2024-03-01"},
+             {"usdot": "100004", "field": "rental_notes", "value": "Needs 2 trailers"},
+             {"usdot": "100001", "field": "carrier_interested", "value": False}],
+            org_id="org_a", user_id="editor")
+
+        # Assert
+        assert [result.status for result in results] == ["superseded", "updated", "updated", "updated", "updated"]
+        assert db_session.get(CarrierEngagementStatus, ("100001", "org_a")).carrier_interested is False
+        assert db_session.get(CarrierEngagementStatus, ("100003", "org_a")).carrier_follow_up_by_date == datetime(2024, 3, 1)
+        assert db_session.get(CarrierEngagementStatus, ("100004", "org_a")).rental_notes == "Needs 2 trailers"
+
+    def test_reports_invalid_changes(self, db_session):
+        """Test that invalid changes are reported without blocking the valid ones."""
+        # Act
+        results = update_carrier_engagements_bulk(
+            db_session,
+            [{"usdot": "100001", "field": "carrier_interested"},
+             {"usdot": "100002", "field": "org_id", "value": "org_b"},
+             {"usdot": "100003", "field": "carrier_contacted", "value": "yes"},
+             {"usdot": "100004", "field": "carrier_follow_up_by_date", "value": "next week"},
+             {"usdot": "100005", "field": "carrier_contacted", "value": True}],
+            org_id="org_a", user_id="editor")
+
+        # Assert
+        assert [result.status for result in results] == ["invalid"] * 4 + ["updated"]
+        assert results[1].usdot == "100002"
+        assert db_session.get(CarrierEngagementStatus, ("100002", "org_a")).org_id == "org_a"
+
+
+class TestEngagementUpdateQueryPlans:
+    """Regression tests for the engagement update paths on a multi-org dataset."""
+
+    @pytest.fixture
+    def db_session(self, sqlite_engine):
+        """Store 200 carriers engaged by each of 20 orgs."""
+        with Session(sqlite_engine) as session:
+            session.add_all([CarrierEngagementStatus(usdot=str(100000 + i), org_id=f"org_{org}", user_id="user")
+                             for i in range(200) for org in range(20)])
+            session.commit()
+            session.exec(text("ANALYZE"))
+            yield session
+
+    def query_plans(self, db_session, update) -> list[str]:
+        """Run the update and return the SQLite query plan of every statement it issued."""
+        statements = []
+        record = lambda conn, cursor, statement, parameters, context, executemany: \
+            statements.append((statement, parameters))
+        event.listen(db_session.get_bind(), "before_cursor_execute", record)
+        try:
+            update()
+        finally:
+            event.remove(db_session.get_bind(), "before_cursor_execute", record)
+
+        return [detail
+                for statement, parameters in statements
+                for *_, detail in db_session.connection().exec_driver_sql(
+                    f"EXPLAIN QUERY PLAN {statement}", parameters).fetchall()]
+
+    def test_batched_update_searches_primary_key(self, db_session):
+        """Test that a batched update addresses rows by (usdot, org_id) instead of scanning."""
+        # Act
+        plans = self.query_plans(db_session, lambda: update_carrier_engagements_bulk(
+            db_session,
+            [{"usdot": str(100000 + i), "field": "carrier_contacted", "value": True} for i in range(50)],
+            org_id="org_7", user_id="editor"))
+
+        # Assert
+        assert plans
+        assert all(plan.startswith("SEARCH") and "(usdot=? AND org_id=?)" in plan for plan in plans)
+
+    def test_single_update_searches_primary_key(self, db_session):
+        """Test that a single update looks up and writes its row by (usdot, org_id)."""
+        # Act
+        plans = self.query_plans(db_session, lambda: update_carrier_engagement(
+            db_session, {"usdot": "100042", "field": "carrier_interested", "value": True}, "org_7"))
+
+        # Assert
+        assert len(plans) == 3  # SELECT by primary key, UPDATE, refresh
+        assert all(plan.startswith("SEARCH") and "(usdot=? AND org_id=?)" in plan for plan in plans)
@@ -2,36 +2,46 @@
 Unit tests for OCR results CRUD operations.
 """
 import pytest
+from datetime import datetime
 from unittest.mock import Mock, patch, MagicMock
 from fastapi import HTTPException
+from sqlalchemy import event
+from sqlmodel import Session
 
 from app.crud.ocr_results import (
     save_ocr_results_bulk,
     save_single_ocr_result,
     get_ocr_result_by_id,
-    get_ocr_results
+    get_ocr_results,
+    get_ocr_result_rows_async,
+    stream_ocr_result_export_rows
 )
 from app.models.ocr_results import OCRResult, OCRResultCreate
+from app.models.carrier_data import CarrierData
+from app.models.user_org_membership import AppUser, AppOrg
 
 
 class TestSaveOcrResultsBulk:
     """Test save_ocr_results_bulk function."""
     
-    def test_save_ocr_results_bulk_success(self, mock_db_session):
+    @patch('app.crud.ocr_results.bulk_insert_returning')
+    def test_save_ocr_results_bulk_success(self, mock_bulk_insert, mock_db_session):
         """Test bulk saving OCR results successfully."""
         # Arrange
         mock_results = [Mock(spec=OCRResult) for _ in range(3)]
-        for i, result in enumerate(mock_results):
+        saved_results = [Mock(spec=OCRResult) for _ in range(3)]
+        for i, result in enumerate(saved_results):
             result.id = i + 1
+        mock_bulk_insert.return_value = saved_results
         
         # Act
         result = save_ocr_results_bulk(mock_db_session, mock_results)
         
         # Assert
-        assert result == mock_results
-        mock_db_session.add_all.assert_called_once_with(mock_results)
+        assert result == saved_results
+        mock_bulk_insert.assert_called_once_with(mock_db_session, OCRResult, mock_results)
         mock_db_session.commit.assert_called_once()
-        assert mock_db_session.refresh.call_count == 3
+        mock_db_session.refresh.assert_not_called()
     
     def test_save_ocr_results_bulk_empty_list(self, mock_db_session):
         """Test bulk saving with empty list."""
@@ -46,10 +56,12 @@ class TestSaveOcrResultsBulk:
         mock_db_session.add_all.assert_not_called()
         mock_db_session.commit.assert_not_called()
     
-    def test_save_ocr_results_bulk_database_error(self, mock_db_session):
+    @patch('app.crud.ocr_results.bulk_insert_returning')
+    def test_save_ocr_results_bulk_database_error(self, mock_bulk_insert, mock_db_session):
         """Test handling database errors in bulk save."""
         # Arrange
         mock_results = [Mock(spec=OCRResult)]
+        mock_bulk_insert.return_value = [Mock(spec=OCRResult)]
         mock_db_session.commit.side_effect = Exception("Database error")
         
         # Act & Assert
@@ -249,4 +261,66 @@ class TestGetOcrResults:
         
         # Assert
         assert result == []
-        mock_db_session.query.assert_called_once_with(OCRResult)
\ No newline at end of file
+        mock_db_session.query.assert_called_once_with(OCRResult)
+
+
+class TestGetOcrResultRowsAsync:
+    """Test get_ocr_result_rows_async function."""
+
+    @pytest.mark.asyncio
+    async def test_page_is_one_joined_query(self, async_db_session):
+        """Test that carrier, user and org columns come back from a single SELECT."""
+        # Arrange
+        async_db_session.add_all(
+            [AppUser(user_id=f"user_{i}", user_email=f"user{i}@example.com") for i in range(3)] +
+            [AppOrg(org_id="org_a", org_name="Org A"),
+             CarrierData(usdot="123456", legal_name="Test Carrier", phone="555-0100")] +
+            [OCRResult(dot_reading="123456" if i % 2 else None, filename=f"{i}.jpg",
+                       timestamp=datetime(2024, 1, 1 + i), user_id=f"user_{i % 3}", org_id="org_a")
+             for i in range(12)]
+        )
+        await async_db_session.commit()
+        statements = []
+        event.listen(async_db_session.bind.sync_engine, "before_cursor_execute",
+                     lambda *args: statements.append(args[2]))
+
+        # Act
+        rows = await get_ocr_result_rows_async(async_db_session, org_id="org_a", offset=0, limit=10,
+                                               valid_dot_only=False)
+
+        # Assert
+        assert len(statements) == 1
+        assert [row.filename for row in rows] == [f"{i}.jpg" for i in range(11, 1, -1)]
+        assert rows[0].legal_name == "Test Carrier"
+        assert rows[0].user_email == "user2@example.com"
+        assert rows[0].org_name == "Org A"
+        assert rows[1].carrier_usdot is None
+
+
+class TestStreamOcrResultExportRows:
+    """Test stream_ocr_result_export_rows function."""
+
+    def test_streams_all_org_rows(self, sqlite_engine):
+        """Test that every lookup of the org is yielded newest first with its joined columns."""
+        # Arrange
+        with Session(sqlite_engine) as db:
+            db.add_all(
+                [AppUser(user_id="user", user_email="user@example.com"),
+                 AppOrg(org_id="org_a", org_name="Org A"),
+                 AppOrg(org_id="org_b", org_name="Org B"),
+                 CarrierData(usdot="123456", legal_name="Test Carrier")] +
+                [OCRResult(dot_reading="123456" if i % 2 else None, filename=f"{i}.jpg",
+                           timestamp=datetime(2024, 1, 1 + i), user_id="user",
+                           org_id="org_a" if i < 5 else "org_b")
+                 for i in range(6)]
+            )
+            db.commit()
+
+            # Act
+            rows = list(stream_ocr_result_export_rows(db, org_id="org_a", batch_size=2))
+
+        # Assert
+        assert [row.filename for row in rows] == ["4.jpg", "3.jpg", "2.jpg", "1.jpg", "0.jpg"]
+        assert rows[1].legal_name == "Test Carrier"
+        assert rows[1].user_email == "user@example.com"
+        assert rows[0].legal_name is None
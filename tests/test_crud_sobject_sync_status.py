@@ -1,10 +1,11 @@
 import pytest
-from sqlmodel import Session, create_engine, SQLModel
+from sqlmodel import Session, create_engine, SQLModel, select
 from app.crud.sobject_sync_status import (
     upsert_sync_status,
     get_sync_status_by_usdot,
     get_sync_status_by_org,
     get_sync_status_for_usdots,
+    upsert_sync_status_async,
     delete_sync_status
 )
 from app.models.sobject_sync_status import SObjectSyncStatus
@@ -274,4 +275,22 @@ class TestDeleteSyncStatus:
     def test_delete_sync_status_not_found(self, db_session):
         """Test deletion of non-existent sync status."""
         result = delete_sync_status(db_session, "99999", "org1")
-        assert result is False
\ No newline at end of file
+        assert result is False
+
+
+class TestSyncStatusAsync:
+    """Test cases for the async sync status operations."""
+
+    @pytest.mark.asyncio
+    async def test_upsert_sync_status_async_creates_then_updates(self, async_db_session):
+        """Test that a second upsert for the same USDOT and org updates the record."""
+        await upsert_sync_status_async(async_db_session, usdot="12345", org_id="org1",
+                                       user_id="user1", sync_status="FAILED")
+
+        result = await upsert_sync_status_async(async_db_session, usdot="12345", org_id="org1",
+                                                user_id="user2", sync_status="SUCCESS", sobject_id="sf001")
+
+        statuses = (await async_db_session.exec(select(SObjectSyncStatus))).all()
+        assert [(status.usdot, status.sync_status) for status in statuses] == [("12345", "SUCCESS")]
+        assert result.user_id == "user2"
+        assert result.sobject_id == "sf001"
@@ -0,0 +1,222 @@
+"""
+Unit tests for the FMCSA census import and lookup helpers.
+"""
+import pytest
+from unittest.mock import Mock, patch
+from sqlmodel import Session, select
+
+from app.crud.carrier_census import save_census_batch
+from app.helpers.census import (
+    census_column_positions,
+    get_census_lookups,
+    import_census_file,
+    parse_census_row,
+    read_census_rows
+)
+from app.models.carrier_census import CarrierCensus, CarrierCensusImport
+
+CENSUS_HEADER = ("DOT_NUMBER,LEGAL_NAME,DBA_NAME,CARRIER_OPERATION,HM_FLAG,PHY_STREET,PHY_CITY,PHY_STATE,"
+                 "PHY_ZIP,MAILING_STREET,MAILING_CITY,MAILING_STATE,MAILING_ZIP,TELEPHONE,MCS150_DATE,"
+                 "MCS150_MILEAGE,MCS150_MILEAGE_YEAR,NBR_POWER_UNIT,DRIVER_TOTAL\n")
+
+
+def census_line(dot_number, legal_name="Acme Trucking LLC"):
+    return (f"{dot_number},{legal_name},,A,N,1 Main St,Springfield,IL,62701,PO Box 9,Springfield,IL,62705,"
+            f"(217) 555-0100,15-JAN-24,120000,2023,12,14\n")
+
+
+@pytest.fixture
+def census_file(tmp_path):
+    """Write a census file with 25 carriers and one unusable row."""
+    path = tmp_path / "FMCSA_CENSUS1_TEST.txt"
+    lines = [census_line(1000 + i, f"Carrier {i}") for i in range(25)]
+    lines.insert(10, census_line("N/A"))
+    path.write_text(CENSUS_HEADER + "".join(lines), encoding="latin-1")
+    return path
+
+
+@pytest.fixture
+def census_db(sqlite_engine):
+    """Create a session on the temporary in-memory database."""
+    with Session(sqlite_engine) as session:
+        yield session
+
+
+class TestParseCensusRow:
+    """Test census_column_positions and parse_census_row functions."""
+
+    def test_parses_census_layout(self):
+        """Test that codes, addresses and numbers are converted to the CarrierData format."""
+        # Arrange
+        columns = census_column_positions(CENSUS_HEADER.strip().split(","))
+
+        # Act
+        record = parse_census_row(columns, census_line("00123456").strip().split(","))
+
+        # Assert
+        assert record == {
+            "usdot": "123456",
+            "legal_name": "Acme Trucking LLC",
+            "dba_name": None,
+            "usdot_status": None,
+            "phone": "(217) 555-0100",
+            "power_units": 12,
+            "drivers": 14,
+            "mcs_150_form_date": "15-JAN-24",
+            "mcs_150_mileage_year_mileage": 120000,
+            "mcs_150_mileage_year_year": 2023,
+            "carrier_operation": "Interstate",
+            "physical_address": "1 Main St, Springfield, IL 62701",
+            "mailing_address": "PO Box 9, Springfield, IL 62705",
+        }
+
+    def test_parses_newer_layout(self):
+        """Test that the lowercase headers of the newer census file are recognized."""
+        # Arrange
+        columns = census_column_positions(["dot_number", "legal_name", "status_code", "power_units",
+                                           "total_drivers", "carrier_mailing_city", "carrier_mailing_state"])
+
+        # Act
+        record = parse_census_row(columns, ["654321", "Beta Freight", "A", "3", "", "Dallas", "TX"])
+
+        # Assert
+        assert record["usdot_status"] == "ACTIVE"
+        assert record["power_units"] == 3
+        assert record["drivers"] is None
+        assert record["mailing_address"] == "Dallas, TX"
+        assert record["physical_address"] is None
+
+    def test_skips_rows_without_dot_number(self):
+        """Test that rows without a numeric DOT number are not imported."""
+        # Arrange
+        columns = census_column_positions(["DOT_NUMBER", "LEGAL_NAME"])
+
+        # Act & Assert
+        assert parse_census_row(columns, ["", "No DOT"]) is None
+        assert parse_census_row(columns, ["12AB", "Bad DOT"]) is None
+
+    def test_header_without_dot_number(self):
+        """Test that a file that is not a census file is rejected."""
+        # Act & Assert
+        with pytest.raises(ValueError, match="DOT_NUMBER"):
+            census_column_positions(["LEGAL_NAME", "TELEPHONE"])
+
+
+class TestReadCensusRows:
+    """Test read_census_rows function."""
+
+    def test_offsets_resume_after_each_row(self, tmp_path):
+        """Test that reading from a yielded offset continues with the next row, quoted newlines included."""
+        # Arrange
+        path = tmp_path / "census.csv"
+        path.write_bytes(b'\xef\xbb\xbfDOT_NUMBER,LEGAL_NAME\r\n1,"First\r\nCarrier"\r\n2,Second\r\n3,Third\r\n')
+
+        # Act
+        rows = list(read_census_rows(str(path), encoding="utf-8"))
+        resumed = list(read_census_rows(str(path), byte_offset=rows[0][1], encoding="utf-8"))
+
+        # Assert
+        assert [record["legal_name"] for record, _ in rows] == ["First\r\nCarrier", "Second", "Third"]
+        assert rows[-1][1] == path.stat().st_size
+        assert [record["usdot"] for record, _ in resumed] == ["2", "3"]
+
+
+class TestImportCensusFile:
+    """Test import_census_file function."""
+
+    def test_imports_in_batches(self, census_db, census_file):
+        """Test that every usable row is upserted and the import is recorded as complete."""
+        # Act
+        progress = import_census_file(census_db, str(census_file), batch_size=10)
+
+        # Assert
+        carriers = census_db.exec(select(CarrierCensus)).all()
+        assert len(carriers) == 25
+        assert progress.rows_imported == 25
+        assert progress.rows_skipped == 1
+        assert progress.byte_offset == census_file.stat().st_size
+        assert progress.completed_at is not None
+
+    def test_resumes_after_interruption(self, census_db, census_file):
+        """Test that a failed import continues after the last saved batch."""
+        # Arrange
+        saved_batches = []
+
+        def fail_on_second_batch(db, progress, records, byte_offset, rows_skipped=0):
+            if len(saved_batches) == 1:
+                raise ConnectionError("connection lost")
+            saved_batches.append(records)
+            return save_census_batch(db, progress, records, byte_offset, rows_skipped)
+
+        with patch('app.helpers.census.save_census_batch', side_effect=fail_on_second_batch):
+            with pytest.raises(ConnectionError):
+                import_census_file(census_db, str(census_file), batch_size=10)
+        interrupted = census_db.get(CarrierCensusImport, census_file.name)
+        interrupted_rows, interrupted_completed_at = interrupted.rows_imported, interrupted.completed_at
+
+        # Act
+        with patch('app.helpers.census.save_census_batch', wraps=save_census_batch) as save_batch:
+            progress = import_census_file(census_db, str(census_file), batch_size=10)
+
+        # Assert
+        assert interrupted_rows == 10
+        assert interrupted_completed_at is None
+        resumed_usdots = [record["usdot"] for call in save_batch.call_args_list for record in call.args[2]]
+        assert resumed_usdots == [str(1000 + i) for i in range(10, 25)]
+        assert progress.rows_imported == 25
+        assert progress.rows_skipped == 1
+        assert len(census_db.exec(select(CarrierCensus)).all()) == 25
+
+    def test_completed_file_is_not_read_again(self, census_db, census_file):
+        """Test that importing the same file twice only reads it once unless restarted."""
+        # Arrange
+        import_census_file(census_db, str(census_file))
+
+        # Act
+        with patch('app.helpers.census.read_census_rows') as read_rows:
+            import_census_file(census_db, str(census_file))
+        progress = import_census_file(census_db, str(census_file), restart=True)
+
+        # Assert
+        read_rows.assert_not_called()
+        assert progress.rows_imported == 25
+
+    def test_changed_file_is_imported_again(self, census_db, census_file):
+        """Test that a new census file under the same name replaces the stored rows."""
+        # Arrange
+        import_census_file(census_db, str(census_file))
+        census_file.write_text(CENSUS_HEADER + census_line(1000, "Renamed Carrier LLC"), encoding="latin-1")
+
+        # Act
+        progress = import_census_file(census_db, str(census_file))
+
+        # Assert
+        assert progress.rows_imported == 1
+        assert census_db.get(CarrierCensus, "1000").legal_name == "Renamed Carrier LLC"
+
+
+class TestGetCensusLookups:
+    """Test get_census_lookups function."""
+
+    def test_returns_carrier_records(self, census_db, census_file):
+        """Test that census rows are returned as successful carrier lookups."""
+        # Arrange
+        import_census_file(census_db, str(census_file))
+
+        # Act
+        found = get_census_lookups(census_db, ["1000", "999999"])
+
+        # Assert
+        assert list(found) == ["1000"]
+        assert found["1000"].lookup_success_flag is True
+        assert found["1000"].legal_name == "Carrier 0"
+        assert found["1000"].lookup_timestamp is None
+
+    def test_failure_is_a_miss(self):
+        """Test that a database error falls back to scraping instead of failing the upload."""
+        # Arrange
+        db = Mock()
+        db.exec.side_effect = Exception("relation carrier_census does not exist")
+
+        # Act & Assert
+        assert get_census_lookups(db, ["1000"]) == {}
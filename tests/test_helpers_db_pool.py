@@ -0,0 +1,73 @@
+"""
+Unit tests for connection pool instrumentation.
+"""
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+
+from app.helpers.db_pool import InstrumentedQueuePool, PoolMetrics, instrument_engine_pool, pool_stats
+
+
+@pytest.fixture
+def instrumented_engine():
+    """Create a single-connection SQLite engine with pool metrics attached."""
+    engine = create_engine("sqlite://",
+                           poolclass=InstrumentedQueuePool,
+                           pool_size=1,
+                           max_overflow=0,
+                           pool_timeout=0.1)
+    metrics = instrument_engine_pool(engine, PoolMetrics(slow_checkout_seconds=0.05))
+    yield engine, metrics
+    engine.dispose()
+
+
+class TestPoolMetrics:
+    """Test pool checkout metrics."""
+
+    def test_counts_checkouts_and_connects(self, instrumented_engine):
+        """Test that reused connections count as checkouts but not new connects."""
+        engine, metrics = instrumented_engine
+
+        for _ in range(3):
+            with engine.connect() as connection:
+                connection.execute(text("SELECT 1"))
+
+        stats = metrics.stats()
+        assert stats["checkouts"] == 3
+        assert stats["connects"] == 1
+        assert stats["timeouts"] == 0
+
+    def test_records_timeouts_and_wait(self, instrumented_engine):
+        """Test that an exhausted pool records the wait and the timeout."""
+        engine, metrics = instrumented_engine
+
+        with engine.connect():
+            with pytest.raises(PoolTimeoutError):
+                engine.connect()
+
+        stats = metrics.stats()
+        assert stats["timeouts"] == 1
+        assert stats["wait_seconds_max"] >= 0.1
+
+    def test_pool_stats_reports_occupancy(self, instrumented_engine):
+        """Test that current pool occupancy is included with the counters."""
+        engine, metrics = instrumented_engine
+
+        with engine.connect():
+            stats = pool_stats(engine, metrics)
+
+        assert stats["pool_size"] == 1
+        assert stats["checked_out"] == 1
+        assert stats["max_overflow"] == 0
+        assert stats["checkouts"] == 1
+
+    def test_metrics_survive_dispose(self, instrumented_engine):
+        """Test that the recreated pool keeps reporting to the same metrics."""
+        engine, metrics = instrumented_engine
+
+        engine.dispose()
+        with engine.connect():
+            with pytest.raises(PoolTimeoutError):
+                engine.connect()
+
+        assert metrics.stats()["timeouts"] == 1
@@ -0,0 +1,165 @@
+"""
+Unit tests for OCR digit-error correction of DOT numbers.
+"""
+import asyncio
+import pytest
+from sqlmodel import Session
+
+from app.helpers.dot_correction import (
+    KnownUSDOTIndex,
+    correct_dot_reading,
+    dot_reading_candidates
+)
+from app.models.carrier_census import CarrierCensus
+from app.models.carrier_data import CarrierData
+
+
+def make_index(*usdots):
+    index = KnownUSDOTIndex()
+    index.replace(usdots)
+    return index
+
+
+class TestKnownUSDOTIndex:
+    """Test KnownUSDOTIndex class."""
+
+    def test_membership(self):
+        """Test that numbers are found in sorted and unsorted input, and the orphan record is left out."""
+        # Act
+        index = make_index("2345678", "00000000", "1234567", "2345678", "99")
+
+        # Assert
+        assert len(index) == 3
+        assert "1234567" in index
+        assert "99" in index
+        assert "1234568" not in index
+        assert "00000000" not in index
+        assert "12A4567" not in index
+
+    def test_add(self):
+        """Test that newly found carriers are added in order without duplicates."""
+        # Arrange
+        index = make_index("100", "300")
+
+        # Act
+        index.add(["200", "300", "00000000"])
+
+        # Assert
+        assert list(index._numbers) == [100, 200, 300]
+
+    def test_load_from_carrier_data_and_census(self, sqlite_engine):
+        """Test that the index holds every carrier stored or imported, once."""
+        # Arrange
+        with Session(sqlite_engine) as db:
+            db.add_all([CarrierData(usdot="00000000"), CarrierData(usdot="1234567"),
+                        CarrierData(usdot="99999"), CarrierCensus(usdot="1234567"),
+                        CarrierCensus(usdot="100000")])
+            db.commit()
+            index = KnownUSDOTIndex()
+
+            # Act
+            index.load(db)
+
+        # Assert
+        assert list(index._numbers) == [99999, 100000, 1234567]
+        assert index.loaded_at is not None
+
+    @pytest.mark.asyncio
+    async def test_background_refresh(self, sqlite_engine):
+        """Test that start loads the index off the event loop and stop cancels the refresh."""
+        # Arrange
+        with Session(sqlite_engine) as db:
+            db.add(CarrierData(usdot="1234567"))
+            db.commit()
+        index = KnownUSDOTIndex(refresh_seconds=3600)
+
+        # Act
+        index.start(session_factory=lambda: Session(sqlite_engine))
+        for _ in range(100):
+            if index.loaded_at:
+                break
+            await asyncio.sleep(0.01)
+        await index.stop()
+
+        # Assert
+        assert "1234567" in index
+
+
+class TestDotReadingCandidates:
+    """Test dot_reading_candidates function."""
+
+    def test_usual_reading_first(self):
+        """Test that letters take their usual digit and the usual reading comes first."""
+        # Act
+        candidates = dot_reading_candidates("12B4SO7")
+
+        # Assert
+        assert next(iter(candidates)) == "1284507"
+        assert "1234507" in candidates
+        assert candidates["1284507"] > candidates["1234507"]
+
+    def test_substitution_limit(self):
+        """Test that at most max_substitutions positions take a less likely digit."""
+        # Act
+        candidates = dot_reading_candidates("888", max_substitutions=1)
+
+        # Assert
+        assert "388" in candidates
+        assert "338" not in candidates
+
+    def test_unreadable_and_orphan_tokens(self):
+        """Test that tokens with other characters or only zeros have no candidates."""
+        # Act & Assert
+        assert dot_reading_candidates("12X4567") == {}
+        assert dot_reading_candidates("00000") == {}
+
+
+class TestCorrectDotReading:
+    """Test correct_dot_reading function."""
+
+    def test_known_reading_is_kept(self):
+        """Test that a reading found in the index is returned as known."""
+        # Act
+        candidate = correct_dot_reading("1234567", make_index("1234567", "1234561"))
+
+        # Assert
+        assert candidate.usdot == "1234567"
+        assert candidate.known is True
+        assert candidate.confidence > 0.9
+
+    def test_misread_letter_is_corrected(self):
+        """Test that S read for 5 resolves to the known carrier."""
+        # Act
+        candidate = correct_dot_reading("12345S7", make_index("1234557"))
+
+        # Assert
+        assert candidate.usdot == "1234557"
+        assert candidate.known is True
+
+    def test_ambiguous_letter_uses_index(self):
+        """Test that the less usual digit of a letter wins when only it is a known carrier."""
+        # Act
+        candidate = correct_dot_reading("12B4567", make_index("1234567"))
+
+        # Assert
+        assert candidate == ("1234567", candidate.confidence, True)
+        assert candidate.confidence >= 0.6
+
+    def test_weak_correction_keeps_reading(self):
+        """Test that an unknown but clean reading is not replaced by a known neighbour on weak evidence."""
+        # Act
+        candidate = correct_dot_reading("1284567", make_index("1234567"))
+
+        # Assert
+        assert candidate.usdot == "1284567"
+        assert candidate.known is False
+
+    def test_empty_index_keeps_reading(self):
+        """Test that without a loaded index the usual reading is returned unverified."""
+        # Act
+        candidate = correct_dot_reading("12345S7", KnownUSDOTIndex())
+
+        # Assert
+        assert candidate.usdot == "1234557"
+        assert candidate.known is False
+        assert 0 < candidate.confidence < 1
@@ -0,0 +1,98 @@
+"""
+Unit tests for DOT and MC number extraction, including the OCR text corpus.
+"""
+import json
+import pytest
+from pathlib import Path
+
+from app.helpers.dot_correction import KnownUSDOTIndex
+from app.helpers.dot_extraction import IdentifierCandidate, best_dot_candidate, extract_identifiers
+
+CORPUS_PATH = Path(__file__).parent / "data" / "ocr_text_corpus.jsonl"
+CORPUS = [json.loads(line) for line in CORPUS_PATH.read_text().splitlines() if line.strip()]
+
+
+def make_index(*usdots):
+    index = KnownUSDOTIndex()
+    index.replace(usdots)
+    return index
+
+
+class TestExtractIdentifiers:
+    """Test extract_identifiers function."""
+
+    def test_returns_positions_and_kinds(self):
+        """Test that every DOT and MC number is returned in text order with its span."""
+        # Arrange
+        text = "MC 654321\nUSDOT 1234567"
+
+        # Act
+        candidates = extract_identifiers(text, make_index("1234567"))
+
+        # Assert
+        assert [(candidate.kind, candidate.number, candidate.pattern) for candidate in candidates] == \
+               [("mc", "654321", "mc"), ("usdot", "1234567", "usdot")]
+        assert text[candidates[1].start:candidates[1].end] == "1234567"
+        assert candidates[1].known is True
+        assert candidates[0].known is False
+
+    def test_higher_ranked_pattern_wins(self):
+        """Test that a number matched by several labels is returned once, from the most trusted one."""
+        # Act
+        candidates = extract_identifiers("US DOT 1234567", make_index("1234567"))
+
+        # Assert
+        assert len(candidates) == 1
+        assert candidates[0].pattern == "usdot"
+
+    def test_confidence_includes_label_weight(self):
+        """Test that a bare DOT label is trusted less than a USDOT label."""
+        # Act
+        usdot_label, = extract_identifiers("USDOT 1234567", make_index("1234567"))
+        dot_label, = extract_identifiers("DOT 1234567", make_index("1234567"))
+
+        # Assert
+        assert dot_label.confidence < usdot_label.confidence
+
+
+class TestBestDotCandidate:
+    """Test best_dot_candidate function."""
+
+    def test_prefers_known_then_confidence(self):
+        """Test that a known carrier beats an unknown one, and confidence breaks ties."""
+        # Arrange
+        candidates = [
+            IdentifierCandidate("usdot", "7654321", 0, 7, 0.9, False, "usdot"),
+            IdentifierCandidate("mc", "654321", 10, 16, 1.0, False, "mc"),
+            IdentifierCandidate("usdot", "2345678", 20, 27, 0.7, True, "dot"),
+            IdentifierCandidate("usdot", "3456789", 30, 37, 0.8, True, "usdot"),
+        ]
+
+        # Act & Assert
+        assert best_dot_candidate(candidates).number == "3456789"
+        assert best_dot_candidate(candidates[:3]).number == "2345678"
+
+    def test_only_mc_numbers(self):
+        """Test that MC numbers are never used as the DOT reading."""
+        # Act & Assert
+        assert best_dot_candidate(extract_identifiers("MC 654321", make_index())) is None
+
+
+@pytest.fixture(scope="module")
+def known_usdots():
+    """Known USDOT index holding the corpus numbers."""
+    return make_index(*(usdot for entry in CORPUS for usdot in entry["usdot"]))
+
+
+class TestOcrTextCorpus:
+    """Run the stored OCR text corpus, see scripts/benchmark_dot_extraction.py."""
+
+    @pytest.mark.parametrize("entry", CORPUS, ids=[entry["id"] for entry in CORPUS])
+    def test_corpus_entry(self, entry, known_usdots):
+        """Test that every labelled DOT and MC number of the entry is found, in text order."""
+        # Act
+        candidates = extract_identifiers(entry["text"], known_usdots)
+
+        # Assert
+        assert [candidate.number for candidate in candidates if candidate.kind == "usdot"] == entry["usdot"]
+        assert [candidate.number for candidate in candidates if candidate.kind == "mc"] == entry["mc"]
@@ -0,0 +1,169 @@
+"""
+Unit tests for the streaming export writers.
+"""
+import csv
+import pytest
+from datetime import date, datetime
+from io import BytesIO, StringIO
+import pyarrow.parquet as pq
+from openpyxl import load_workbook
+
+from app.helpers.exports import ExportColumn, carrier_snapshot_columns, stream_csv, stream_parquet, stream_xlsx
+from app.models.carrier_data import CarrierData
+
+COLUMNS = [
+    ExportColumn("usdot", "DOT"),
+    ExportColumn("legal_name", "Name"),
+    ExportColumn("created_at", "Created At", "datetime"),
+    ExportColumn("follow_up_by", "Follow Up By", "date"),
+    ExportColumn("interested", "Interested", "bool"),
+]
+
+ROWS = [
+    ["123456", "Acme & Sons <LLC>", datetime(2024, 1, 2, 3, 4, 5), datetime(2024, 2, 1), True],
+    ["789012", None, datetime(2024, 1, 1, 0, 0, 0), None, False],
+]
+
+
+def read_workbook(chunks) -> tuple[str, list[tuple]]:
+    """Join the streamed chunks and read the sheet back with openpyxl."""
+    workbook = load_workbook(BytesIO(b"".join(chunks)))
+    return workbook.active.title, list(workbook.active.iter_rows(values_only=True))
+
+
+class TestStreamXlsx:
+    """Test stream_xlsx function."""
+
+    def test_writes_readable_workbook(self):
+        """Test that headers, strings, dates, booleans and empty cells round trip."""
+        # Act
+        title, rows = read_workbook(stream_xlsx("Carriers", COLUMNS, ROWS))
+
+        # Assert
+        assert title == "Carriers"
+        assert rows == [("DOT", "Name", "Created At", "Follow Up By", "Interested"),
+                        ("123456", "Acme & Sons <LLC>", "2024-01-02 03:04:05", "2024-02-01", True),
+                        ("789012", None, "2024-01-01 00:00:00", None, False)]
+
+    def test_streams_before_rows_are_exhausted(self):
+        """Test that output is produced while rows are still being read."""
+        # Arrange
+        consumed = []
+
+        def rows():
+            for i in range(2000):
+                consumed.append(i)
+                yield [f"Carrier {i}" * 20, i]
+
+        # Act
+        stream = stream_xlsx("Carriers", [ExportColumn("name", "Name"), ExportColumn("index", "Index")],
+                             rows(), flush_rows=100)
+        first_chunk = next(stream)
+        consumed_before_first_chunk = len(consumed)
+        chunks = [first_chunk, *stream]
+
+        # Assert
+        assert first_chunk
+        assert consumed_before_first_chunk < 2000
+        assert len(chunks) > 2
+        assert len(read_workbook(chunks)[1]) == 2001
+
+    def test_strips_illegal_characters(self):
+        """Test that control characters from OCR text do not corrupt the sheet."""
+        # Act
+        _, rows = read_workbook(stream_xlsx("Lookup History", [ExportColumn("text", "Text")],
+                                            [["USDOT\x0c 123\x00456"]]))
+
+        # Assert
+        assert rows[1] == ("USDOT 123456",)
+
+
+class TestStreamCsv:
+    """Test stream_csv function."""
+
+    def test_writes_rows_in_chunks(self):
+        """Test that the CSV matches the spreadsheet layout and is flushed every flush_rows rows."""
+        # Act
+        chunks = list(stream_csv("Carriers", COLUMNS, ROWS * 3, flush_rows=2))
+
+        # Assert
+        rows = list(csv.reader(StringIO(b"".join(chunks).decode())))
+        assert len(chunks) == 4
+        assert rows[0] == ["DOT", "Name", "Created At", "Follow Up By", "Interested"]
+        assert rows[1] == ["123456", "Acme & Sons <LLC>", "2024-01-02 03:04:05", "2024-02-01", "True"]
+        assert rows[2] == ["789012", "", "2024-01-01 00:00:00", "", "False"]
+        assert len(rows) == 7
+
+
+class TestStreamParquet:
+    """Test stream_parquet function."""
+
+    def test_writes_typed_row_groups(self):
+        """Test that columns keep their types and each row group is streamed separately."""
+        # Act
+        chunks = list(stream_parquet("Carriers", COLUMNS, ROWS * 3, row_group_rows=2))
+
+        # Assert
+        parquet_file = pq.ParquetFile(BytesIO(b"".join(chunks)))
+        table = parquet_file.read()
+        assert parquet_file.num_row_groups == 3
+        assert table.column_names == ["usdot", "legal_name", "created_at", "follow_up_by", "interested"]
+        assert table.to_pylist()[:2] == [
+            {"usdot": "123456", "legal_name": "Acme & Sons <LLC>", "created_at": datetime(2024, 1, 2, 3, 4, 5),
+             "follow_up_by": date(2024, 2, 1), "interested": True},
+            {"usdot": "789012", "legal_name": None, "created_at": datetime(2024, 1, 1, 0, 0, 0),
+             "follow_up_by": None, "interested": False},
+        ]
+
+    def test_empty_export_has_schema(self):
+        """Test that an export without rows is still a valid file with its columns."""
+        # Act
+        table = pq.read_table(BytesIO(b"".join(stream_parquet("Carriers", COLUMNS, []))))
+
+        # Assert
+        assert table.num_rows == 0
+        assert table.column_names == [column.name for column in COLUMNS]
+
+
+class TestCarrierSnapshotColumns:
+    """Test carrier_snapshot_columns function."""
+
+    def test_all_columns_from_model(self):
+        """Test that every CarrierData column is exported with a kind matching its type."""
+        # Act
+        columns = carrier_snapshot_columns()
+
+        # Assert
+        assert [column.name for column in columns] == [column.name for column in CarrierData.__table__.columns]
+        kinds = {column.name: column.kind for column in columns}
+        assert kinds["legal_name"] == "string"
+        assert kinds["usa_crashes_fatal"] == "int"
+        assert kinds["mcs_150_mileage_year_mileage"] == "int"
+        assert kinds["lookup_timestamp"] == "datetime"
+
+    def test_selected_columns_start_with_usdot(self):
+        """Test that a column selection keeps its order behind usdot and drops duplicates."""
+        # Act
+        columns = carrier_snapshot_columns(["safety_rating", "usdot", "usa_crashes_total", "safety_rating"])
+
+        # Assert
+        assert [column.name for column in columns] == ["usdot", "safety_rating", "usa_crashes_total"]
+
+    def test_unknown_column(self):
+        """Test that names outside the CarrierData table are rejected."""
+        # Act & Assert
+        with pytest.raises(ValueError, match="carrier_data"):
+            carrier_snapshot_columns(["legal_name", "carrier_data"])
+
+    def test_snapshot_parquet_keeps_integer_columns(self):
+        """Test that integer columns are written as integers in Parquet."""
+        # Arrange
+        columns = carrier_snapshot_columns(["power_units", "mcs_150_mileage_year_mileage"])
+
+        # Act
+        table = pq.read_table(BytesIO(b"".join(stream_parquet("Carrier Snapshot", columns,
+                                                              [["123456", 12, 5000000000]]))))
+
+        # Assert
+        assert table.to_pylist() == [{"usdot": "123456", "power_units": 12,
+                                      "mcs_150_mileage_year_mileage": 5000000000}]
@@ -0,0 +1,123 @@
+"""
+Unit tests for image preprocessing before OCR.
+"""
+import io
+import pytest
+from concurrent.futures import ThreadPoolExecutor
+from PIL import Image
+
+from app.helpers.image_preprocessing import PREPROCESS_STEPS, ImagePreprocessor, preprocess_image
+
+
+def make_jpeg(size, orientation=None, mode="RGB", quality=95):
+    """Create a noisy JPEG, so it compresses like a photo, with an optional EXIF orientation."""
+    image = Image.effect_noise(size, 60).convert(mode)
+    exif = Image.Exif()
+    if orientation:
+        exif[0x0112] = orientation
+    output = io.BytesIO()
+    image.save(output, format="JPEG", quality=quality, exif=exif)
+    return output.getvalue()
+
+
+def open_image(contents):
+    return Image.open(io.BytesIO(contents))
+
+
+class TestPreprocessImage:
+    """Test preprocess_image function."""
+
+    def test_downscales_to_grayscale_jpeg(self):
+        """Test that a large photo is shrunk to max_dimension and re-encoded as grayscale JPEG."""
+        # Arrange
+        contents = make_jpeg((3000, 2000))
+
+        # Act
+        result = preprocess_image(contents, max_dimension=1000)
+
+        # Assert
+        image = open_image(result.contents)
+        assert (image.format, image.mode, image.size) == ("JPEG", "L", (1000, 667))
+        assert result.original_bytes == len(contents)
+        assert result.processed_bytes == len(result.contents) < len(contents)
+        assert set(result.timings) == set(PREPROCESS_STEPS)
+        assert result.error is None
+
+    def test_auto_orients(self):
+        """Test that the EXIF orientation is applied, so text reaches OCR upright."""
+        # Arrange
+        contents = make_jpeg((400, 200), orientation=6)  # Rotated 90 degrees clockwise
+
+        # Act
+        result = preprocess_image(contents, max_dimension=1000)
+
+        # Assert
+        assert open_image(result.contents).size == (200, 400)
+
+    def test_keeps_original_when_not_smaller(self):
+        """Test that an image already small and grayscale is sent as uploaded."""
+        # Arrange
+        contents = make_jpeg((300, 200), mode="L", quality=50)
+
+        # Act
+        result = preprocess_image(contents, max_dimension=1000)
+
+        # Assert
+        assert result.contents == contents
+        assert result.processed_bytes == result.original_bytes
+
+    def test_other_formats_are_always_converted(self):
+        """Test that formats other than JPEG and PNG are re-encoded even when the JPEG is larger."""
+        # Arrange
+        output = io.BytesIO()
+        Image.effect_noise((300, 200), 60).save(output, format="WEBP", quality=5)
+        contents = output.getvalue()
+
+        # Act
+        result = preprocess_image(contents, max_dimension=1000)
+
+        # Assert
+        assert open_image(result.contents).format == "JPEG"
+        assert result.processed_bytes > result.original_bytes
+
+    def test_undecodable_bytes_pass_through(self):
+        """Test that bytes Pillow cannot decode are sent to OCR unchanged with the error."""
+        # Act
+        result = preprocess_image(b"not an image")
+
+        # Assert
+        assert result.contents == b"not an image"
+        assert result.error
+
+
+class TestImagePreprocessor:
+    """Test ImagePreprocessor class."""
+
+    @pytest.mark.asyncio
+    async def test_preprocess_many_reports_bytes_saved(self):
+        """Test that images come back in order and the totals are recorded."""
+        # Arrange
+        preprocessor = ImagePreprocessor(max_dimension=500, executor=ThreadPoolExecutor(max_workers=2))
+        contents = [make_jpeg((2000, 1000)), b"not an image"]
+
+        # Act
+        processed = await preprocessor.preprocess_many(contents)
+
+        # Assert
+        assert open_image(processed[0]).size == (500, 250)
+        assert processed[1] == b"not an image"
+        stats = preprocessor.stats()
+        assert stats["images"] == 2
+        assert stats["original_bytes"] == sum(map(len, contents))
+        assert stats["bytes_saved"] == stats["original_bytes"] - sum(map(len, processed))
+        assert stats["step_seconds"]["decode"] > 0
+
+    @pytest.mark.asyncio
+    async def test_disabled_sends_uploads_as_is(self):
+        """Test that a disabled preprocessor does not touch the images."""
+        # Arrange
+        preprocessor = ImagePreprocessor(enabled=False)
+
+        # Act & Assert
+        assert await preprocessor.preprocess_many([b"a", b"b"]) == [b"a", b"b"]
+        assert preprocessor.stats()["images"] == 0
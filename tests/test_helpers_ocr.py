@@ -0,0 +1,294 @@
+"""
+Unit tests for OCR helpers.
+"""
+import asyncio
+import threading
+import time
+import pytest
+from unittest.mock import Mock, AsyncMock, patch
+from fastapi import UploadFile
+
+from app.helpers.dot_correction import KnownUSDOTIndex
+from app.helpers.ocr import (
+    cloud_ocr_from_image_file,
+    batch_cloud_ocr_from_image_files,
+    generate_dot_record
+)
+from app.helpers.image_preprocessing import ImagePreprocessor
+from app.helpers.ocr_backends import VisionOCRBackend
+from app.helpers.ocr_cache import InMemoryOCRCache
+from app.models.ocr_results import OCRResultCreate
+
+
+@pytest.fixture(autouse=True)
+def fresh_ocr_cache():
+    """Give every test an empty OCR cache."""
+    cache = InMemoryOCRCache()
+    with patch('app.helpers.ocr.ocr_cache', cache):
+        yield cache
+
+
+@pytest.fixture(autouse=True)
+def no_image_preprocessing():
+    """Send the fake image bytes to OCR as they are."""
+    with patch('app.helpers.ocr.image_preprocessor', ImagePreprocessor(enabled=False)):
+        yield
+
+
+class SuffixPreprocessor(ImagePreprocessor):
+    """Marks preprocessed images by appending a digit to their bytes."""
+
+    async def preprocess_many(self, contents):
+        self.images += len(contents)
+        return [item + b"0" for item in contents]
+
+
+class FakeImageAnnotatorClient:
+    """Local stand-in for vision.ImageAnnotatorClient."""
+
+    def __init__(self, delays=None, errors=None, batch_errors=None, fail_batches=False):
+        self.delays = delays or {}
+        self.errors = errors or {}
+        self.batch_errors = batch_errors or {}
+        self.fail_batches = fail_batches
+        self.text_detection_calls = []
+        self.batch_calls = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._lock = threading.Lock()
+
+    def _response(self, content, error_message=""):
+        response = Mock()
+        response.error.message = error_message
+        response.text_annotations = [Mock(description=f"USDOT {content}")]
+        return response
+
+    def batch_annotate_images(self, requests, timeout=None, **kwargs):
+        contents = [request.image.content.decode() for request in requests]
+        self.batch_calls.append(contents)
+        if self.fail_batches:
+            raise Exception("batch endpoint unavailable")
+        batch_response = Mock()
+        batch_response.responses = [
+            self._response(content, self.batch_errors.get(content, ""))
+            for content in contents
+        ]
+        return batch_response
+
+    def text_detection(self, image, timeout=None, **kwargs):
+        content = image.content.decode()
+        self.text_detection_calls.append(content)
+        with self._lock:
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            time.sleep(self.delays.get(content, 0))
+            return self._response(content, self.errors.get(content, ""))
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+
+def make_upload(content: str) -> UploadFile:
+    """Create a mock upload whose bytes are the given string."""
+    upload = Mock(spec=UploadFile)
+    upload.filename = f"{content}.jpg"
+    upload.read = AsyncMock(return_value=content.encode())
+    return upload
+
+
+class TestCloudOcrFromImageFile:
+    """Test cloud_ocr_from_image_file function."""
+
+    @pytest.mark.asyncio
+    async def test_cloud_ocr_from_image_file_success(self):
+        """Test extracting text from a single image."""
+        client = FakeImageAnnotatorClient()
+
+        result = await cloud_ocr_from_image_file(VisionOCRBackend(client), make_upload("123456"))
+
+        assert result == "USDOT 123456"
+
+    @pytest.mark.asyncio
+    async def test_cloud_ocr_from_image_file_api_error(self):
+        """Test that Vision API errors are raised."""
+        client = FakeImageAnnotatorClient(errors={"123456": "quota exceeded"})
+
+        with pytest.raises(Exception) as exc_info:
+            await cloud_ocr_from_image_file(VisionOCRBackend(client), make_upload("123456"))
+
+        assert "quota exceeded" in str(exc_info.value)
+
+
+class TestBatchCloudOcrFromImageFiles:
+    """Test batch_cloud_ocr_from_image_files function."""
+
+    @pytest.mark.asyncio
+    async def test_packs_images_into_batch_requests(self):
+        """Test that images are packed into batch requests of at most batch_size."""
+        client = FakeImageAnnotatorClient()
+        files = [make_upload(str(100000 + i)) for i in range(20)]
+
+        results = await batch_cloud_ocr_from_image_files(VisionOCRBackend(client), files, batch_size=16)
+
+        assert [len(call) for call in client.batch_calls] == [16, 4]
+        assert client.text_detection_calls == []
+        assert results == [f"USDOT {100000 + i}" for i in range(20)]
+
+    @pytest.mark.asyncio
+    async def test_falls_back_only_for_failed_items(self):
+        """Test that only images that failed inside a batch are retried individually."""
+        client = FakeImageAnnotatorClient(batch_errors={"222222": "deadline exceeded"})
+        files = [make_upload(dot) for dot in ("111111", "222222", "333333")]
+
+        results = await batch_cloud_ocr_from_image_files(VisionOCRBackend(client), files)
+
+        assert len(client.batch_calls) == 1
+        assert client.text_detection_calls == ["222222"]
+        assert results == ["USDOT 111111", "USDOT 222222", "USDOT 333333"]
+
+    @pytest.mark.asyncio
+    async def test_falls_back_when_whole_batch_fails(self):
+        """Test that a failed batch request is retried image by image."""
+        client = FakeImageAnnotatorClient(fail_batches=True)
+        files = [make_upload(dot) for dot in ("111111", "222222")]
+
+        results = await batch_cloud_ocr_from_image_files(VisionOCRBackend(client), files)
+
+        assert sorted(client.text_detection_calls) == ["111111", "222222"]
+        assert results == ["USDOT 111111", "USDOT 222222"]
+
+    @pytest.mark.asyncio
+    async def test_reports_items_that_fail_after_fallback(self):
+        """Test that an image failing both paths keeps its error in its own slot."""
+        client = FakeImageAnnotatorClient(batch_errors={"222222": "bad image"},
+                                          errors={"222222": "bad image"})
+        files = [make_upload(dot) for dot in ("111111", "222222", "333333")]
+
+        results = await batch_cloud_ocr_from_image_files(VisionOCRBackend(client), files)
+
+        assert results[0] == "USDOT 111111"
+        assert isinstance(results[1], Exception)
+        assert results[2] == "USDOT 333333"
+
+    @pytest.mark.asyncio
+    async def test_fallback_respects_max_concurrency(self):
+        """Test that no more than max_concurrency individual retries run at once."""
+        client = FakeImageAnnotatorClient(delays={str(i): 0.05 for i in range(6)}, fail_batches=True)
+        files = [make_upload(str(i)) for i in range(6)]
+
+        await batch_cloud_ocr_from_image_files(VisionOCRBackend(client), files, max_concurrency=2)
+
+        assert 1 < client.max_in_flight <= 2
+
+    @pytest.mark.asyncio
+    async def test_fallback_isolates_errors_and_timeouts(self):
+        """Test that a failing or slow image only affects its own slot."""
+        client = FakeImageAnnotatorClient(delays={"222222": 0.5},
+                                          errors={"333333": "bad image"},
+                                          fail_batches=True)
+        files = [make_upload(dot) for dot in ("111111", "222222", "333333")]
+
+        results = await batch_cloud_ocr_from_image_files(VisionOCRBackend(client), files, timeout=0.1)
+
+        assert results[0] == "USDOT 111111"
+        assert isinstance(results[1], asyncio.TimeoutError)
+        assert "bad image" in str(results[2])
+
+    @pytest.mark.asyncio
+    async def test_empty_file_list(self):
+        """Test that an empty upload returns an empty list without OCR calls."""
+        client = FakeImageAnnotatorClient()
+
+        results = await batch_cloud_ocr_from_image_files(VisionOCRBackend(client), [])
+
+        assert results == []
+        assert client.batch_calls == []
+
+
+class TestOcrCacheIntegration:
+    """Test that OCR helpers consult the content-hash cache."""
+
+    @pytest.mark.asyncio
+    async def test_single_file_cache_hit_skips_vision(self, fresh_ocr_cache):
+        """Test that a repeated image is served from the cache."""
+        client = FakeImageAnnotatorClient()
+
+        first = await cloud_ocr_from_image_file(VisionOCRBackend(client), make_upload("123456"))
+        second = await cloud_ocr_from_image_file(VisionOCRBackend(client), make_upload("123456"))
+
+        assert first == second == "USDOT 123456"
+        assert client.text_detection_calls == ["123456"]
+        assert fresh_ocr_cache.hits == 1
+        assert fresh_ocr_cache.misses == 1
+
+    @pytest.mark.asyncio
+    async def test_batch_skips_cached_and_duplicate_images(self, fresh_ocr_cache):
+        """Test that cached images and repeats within a batch are not sent to Vision."""
+        client = FakeImageAnnotatorClient()
+        await cloud_ocr_from_image_file(VisionOCRBackend(client), make_upload("111111"))
+
+        files = [make_upload(dot) for dot in ("111111", "222222", "222222", "333333")]
+        results = await batch_cloud_ocr_from_image_files(VisionOCRBackend(client), files)
+
+        assert results == ["USDOT 111111", "USDOT 222222", "USDOT 222222", "USDOT 333333"]
+        assert client.batch_calls == [["222222", "333333"]]
+
+    @pytest.mark.asyncio
+    async def test_failed_ocr_is_not_cached(self, fresh_ocr_cache):
+        """Test that errors are not stored in the cache."""
+        client = FakeImageAnnotatorClient(batch_errors={"222222": "bad image"},
+                                          errors={"222222": "bad image"})
+
+        await batch_cloud_ocr_from_image_files(VisionOCRBackend(client), [make_upload("222222")])
+        client.errors = {}
+        client.batch_errors = {}
+        results = await batch_cloud_ocr_from_image_files(VisionOCRBackend(client), [make_upload("222222")])
+
+        assert results == ["USDOT 222222"]
+        assert len(client.batch_calls) == 2
+
+    @pytest.mark.asyncio
+    async def test_only_cache_misses_are_preprocessed(self, fresh_ocr_cache):
+        """Test that OCR gets the preprocessed bytes while the cache is keyed by the uploaded ones."""
+        client = FakeImageAnnotatorClient()
+        preprocessor = SuffixPreprocessor()
+
+        first = await batch_cloud_ocr_from_image_files(VisionOCRBackend(client), [make_upload("111111")],
+                                                       preprocessor=preprocessor)
+        second = await batch_cloud_ocr_from_image_files(VisionOCRBackend(client), [make_upload("111111")],
+                                                        preprocessor=preprocessor)
+
+        assert first == second == ["USDOT 1111110"]
+        assert client.batch_calls == [["1111110"]]
+        assert preprocessor.images == 1
+
+
+class TestGenerateDotRecord:
+    """Test generate_dot_record function."""
+
+    def make_ocr_result(self, text):
+        return OCRResultCreate(extracted_text=text, filename="truck.jpg",
+                               user_id="test_user_123", org_id="test_org_456")
+
+    def test_corrects_misread_digit(self):
+        """Test that a letter read inside the number resolves to the known carrier."""
+        # Arrange
+        known_usdots = KnownUSDOTIndex()
+        known_usdots.replace(["1234557"])
+
+        # Act
+        record = generate_dot_record(self.make_ocr_result("ACME FREIGHT USDOT 12345S7"), known_usdots)
+
+        # Assert
+        assert record.dot_reading == "1234557"
+        assert record.dot_confidence > 0.9
+
+    def test_no_dot_number_is_orphan(self):
+        """Test that text without a DOT number gets the orphan reading and no confidence."""
+        # Act
+        record = generate_dot_record(self.make_ocr_result("ACME FREIGHT"), KnownUSDOTIndex())
+
+        # Assert
+        assert record.dot_reading == "00000000"
+        assert record.dot_confidence is None
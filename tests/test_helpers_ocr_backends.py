@@ -0,0 +1,173 @@
+"""
+Unit tests for the OCR backends.
+"""
+import pytest
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+
+from app.helpers.ocr import ocr_image_contents
+from app.helpers.ocr_backends import (
+    CascadeOCRBackend,
+    OCRBackend,
+    OCRBackendRegistry,
+    TesseractOCRBackend,
+    VisionOCRBackend,
+    parse_org_backends
+)
+from app.helpers.ocr_cache import InMemoryOCRCache
+
+
+class FakeOCRBackend(OCRBackend):
+    """Backend returning canned text per image, or raising for images in errors."""
+
+    def __init__(self, name, texts=None, errors=(), batch_size=1, delays=None):
+        super().__init__(ThreadPoolExecutor(max_workers=2))
+        self.name = self.cache_namespace = name
+        self.batch_size = batch_size
+        self.texts = texts or {}
+        self.errors = set(errors)
+        self.delays = delays or {}
+        self.calls = []
+
+    def detect_text(self, contents, timeout):
+        image = contents.decode()
+        self.calls.append(image)
+        time.sleep(self.delays.get(image, 0))
+        if image in self.errors:
+            raise Exception(f"{self.name} failed on {image}")
+        return self.texts.get(image, "")
+
+
+class TestCascadeOCRBackend:
+    """Test CascadeOCRBackend class."""
+
+    @pytest.mark.asyncio
+    async def test_escalates_only_images_without_dot_candidate(self):
+        """Test that images the local backend reads a DOT number from never reach the remote one."""
+        # Arrange
+        local = FakeOCRBackend("local", texts={"a": "USDOT 1234567", "b": "FREIGHTLINER"})
+        remote = FakeOCRBackend("remote", texts={"b": "USDOT 7654321"}, batch_size=16)
+        cascade = CascadeOCRBackend(local, remote)
+
+        # Act
+        results = await cascade.ocr_images([b"a", b"b"])
+
+        # Assert
+        assert results == ["USDOT 1234567", "USDOT 7654321"]
+        assert remote.calls == ["b"]
+        assert cascade.escalations == 1
+        assert cascade.batch_size == 16
+
+    @pytest.mark.asyncio
+    async def test_local_failure_escalates(self):
+        """Test that an image the local backend fails on is read by the remote backend."""
+        # Arrange
+        cascade = CascadeOCRBackend(FakeOCRBackend("local", errors={"a"}),
+                                    FakeOCRBackend("remote", texts={"a": "DOT 1234567"}))
+
+        # Act & Assert
+        assert await cascade.ocr_image(b"a") == "DOT 1234567"
+
+    @pytest.mark.asyncio
+    async def test_remote_failure_keeps_local_text(self):
+        """Test that the local text is kept when the remote backend fails as well."""
+        # Arrange
+        cascade = CascadeOCRBackend(FakeOCRBackend("local", texts={"a": "FREIGHTLINER"}),
+                                    FakeOCRBackend("remote", errors={"a"}))
+
+        # Act & Assert
+        assert await cascade.ocr_images([b"a"]) == ["FREIGHTLINER"]
+
+
+    @pytest.mark.asyncio
+    async def test_local_timeout_escalates(self):
+        """Test that an image the local backend cannot read in time goes to the remote backend."""
+        # Arrange
+        local = FakeOCRBackend("local", texts={"a": "USDOT 1234567", "b": "USDOT 1111111"}, delays={"b": 0.5})
+        remote = FakeOCRBackend("remote", texts={"b": "USDOT 7654321"}, batch_size=16)
+        cascade = CascadeOCRBackend(local, remote)
+
+        # Act
+        results = await cascade.ocr_images([b"a", b"b"], timeout=0.1)
+
+        # Assert
+        assert results == ["USDOT 1234567", "USDOT 7654321"]
+        assert remote.calls == ["b"]
+        assert cascade.request_timeout(0.1) == pytest.approx(0.2)
+
+
+class TestTesseractOCRBackend:
+    """Test TesseractOCRBackend class."""
+
+    @pytest.mark.asyncio
+    async def test_images_are_read_independently(self):
+        """Test that every image gets its own Tesseract run and failures stay in their slot."""
+        # Arrange
+        def fake_tesseract(contents, lang, config, timeout):
+            if contents == b"bad":
+                raise RuntimeError("Tesseract process timeout")
+            return f"USDOT {contents.decode()}"
+
+        backend = TesseractOCRBackend(executor=ThreadPoolExecutor(max_workers=2))
+
+        # Act
+        with patch("app.helpers.ocr_backends.tesseract_image_text", side_effect=fake_tesseract) as mock_tesseract:
+            results = await backend.ocr_images([b"1234567", b"bad"])
+
+        # Assert
+        assert results[0] == "USDOT 1234567"
+        assert isinstance(results[1], RuntimeError)
+        assert mock_tesseract.call_args.args[1:3] == (backend.lang, backend.config)
+
+
+class TestOCRBackendRegistry:
+    """Test OCRBackendRegistry class."""
+
+    def test_parse_org_backends(self):
+        """Test that org_id=backend pairs are parsed and malformed pairs skipped."""
+        # Act & Assert
+        assert parse_org_backends(" org_a=tesseract, org_b = cascade,broken,=vision") == \
+               {"org_a": "tesseract", "org_b": "cascade"}
+
+    def test_org_override_and_default(self):
+        """Test that listed orgs get their own backend and the rest the deployment default."""
+        # Arrange
+        registry = OCRBackendRegistry(default="vision", org_backends={"org_a": "cascade"})
+
+        # Act
+        cascade = registry.get("org_a")
+        default = registry.get("org_b")
+
+        # Assert
+        assert isinstance(cascade, CascadeOCRBackend)
+        assert isinstance(default, VisionOCRBackend)
+        assert cascade.remote is default
+        assert isinstance(cascade.local, TesseractOCRBackend)
+        assert registry.get() is default
+
+    def test_unknown_backend_uses_vision(self):
+        """Test that a misspelled backend name falls back to Vision."""
+        # Act & Assert
+        assert isinstance(OCRBackendRegistry(default="tesseract-ocr", org_backends={}).get(), VisionOCRBackend)
+
+
+class TestBackendCacheNamespace:
+    """Test that each backend caches its own text."""
+
+    @pytest.mark.asyncio
+    async def test_backends_do_not_share_cached_text(self):
+        """Test that text read by one backend is not served for another."""
+        # Arrange
+        cache = InMemoryOCRCache()
+        local = FakeOCRBackend("local", texts={"a": "FREIGHTLINER"})
+        remote = FakeOCRBackend("remote", texts={"a": "USDOT 1234567"})
+
+        # Act
+        local_text = await ocr_image_contents(local, b"a", cache=cache)
+        remote_text = await ocr_image_contents(remote, b"a", cache=cache)
+        cached_text = await ocr_image_contents(remote, b"a", cache=cache)
+
+        # Assert
+        assert (local_text, remote_text, cached_text) == ("FREIGHTLINER", "USDOT 1234567", "USDOT 1234567")
+        assert remote.calls == ["a"]
@@ -0,0 +1,157 @@
+"""
+Unit tests for the OCR result cache backends.
+"""
+import time
+import pytest
+from datetime import datetime, timedelta
+from sqlmodel import Session, SQLModel, create_engine, select
+from sqlalchemy.pool import StaticPool
+
+from app.helpers.cache import TTLCache
+from app.helpers.ocr_cache import (
+    InMemoryOCRCache,
+    NullOCRCache,
+    PostgresOCRCache,
+    build_ocr_cache,
+    image_content_hash
+)
+from app.models.ocr_results import OCRTextCache
+
+
+@pytest.fixture
+def db_engine():
+    """Create a temporary in-memory database for testing."""
+    engine = create_engine("sqlite://",
+                           connect_args={"check_same_thread": False},
+                           poolclass=StaticPool)
+    SQLModel.metadata.create_all(engine)
+    return engine
+
+
+class TestTTLCache:
+    """Test the in-process TTL/LRU cache."""
+
+    def test_get_and_set(self):
+        cache = TTLCache(maxsize=2, ttl_seconds=60)
+        cache.set("a", 1)
+
+        assert cache.get("a") == 1
+        assert cache.get("b") is None
+        assert cache.stats()["hits"] == 1
+        assert cache.stats()["misses"] == 1
+
+    def test_evicts_least_recently_used(self):
+        cache = TTLCache(maxsize=2, ttl_seconds=60)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+
+        assert cache.get("a") == 1
+        assert cache.get("b") is None
+        assert cache.get("c") == 3
+
+    def test_entries_expire(self):
+        cache = TTLCache(maxsize=2, ttl_seconds=0.01)
+        cache.set("a", 1)
+        time.sleep(0.02)
+
+        assert cache.get("a") is None
+        assert len(cache) == 0
+
+    def test_per_entry_ttl(self):
+        cache = TTLCache(maxsize=2, ttl_seconds=60)
+        cache.set("a", 1, ttl_seconds=0.01)
+        cache.set("b", 2)
+        time.sleep(0.02)
+
+        assert cache.get("a") is None
+        assert cache.get("b") == 2
+
+
+class TestInMemoryOCRCache:
+    """Test the in-process OCR cache backend."""
+
+    def test_hit_and_miss_counters(self):
+        cache = InMemoryOCRCache(max_entries=10, ttl_seconds=60)
+        key = image_content_hash(b"image")
+        cache.set(key, "USDOT 123456")
+
+        assert cache.get_many([key, image_content_hash(b"other")]) == {key: "USDOT 123456"}
+        assert cache.stats()["hits"] == 1
+        assert cache.stats()["misses"] == 1
+        assert cache.stats()["hit_rate"] == 0.5
+        # Counted once, not again by the TTLCache underneath
+        assert cache._cache.stats()["hits"] == cache._cache.stats()["misses"] == 0
+
+    def test_empty_text_is_cached(self):
+        cache = InMemoryOCRCache(max_entries=10, ttl_seconds=60)
+        cache.set("key", "")
+
+        assert cache.get("key") == ""
+
+    def test_size_limit(self):
+        cache = InMemoryOCRCache(max_entries=1, ttl_seconds=60)
+        cache.set("first", "a")
+        cache.set("second", "b")
+
+        assert cache.get("first") is None
+        assert cache.get("second") == "b"
+
+
+class TestPostgresOCRCache:
+    """Test the table-backed OCR cache backend."""
+
+    def test_round_trip(self, db_engine):
+        cache = PostgresOCRCache(session_factory=lambda: Session(db_engine),
+                                 max_entries=10, ttl_seconds=60)
+        cache.set_many({"a": "USDOT 111111", "b": "USDOT 222222"})
+
+        assert cache.get_many(["a", "b", "c"]) == {"a": "USDOT 111111", "b": "USDOT 222222"}
+        assert cache.hits == 2
+        assert cache.misses == 1
+
+    def test_upsert_overwrites_existing_entry(self, db_engine):
+        cache = PostgresOCRCache(session_factory=lambda: Session(db_engine),
+                                 max_entries=10, ttl_seconds=60)
+        cache.set("a", "old")
+        cache.set("a", "new")
+
+        assert cache.get("a") == "new"
+
+    def test_expired_entries_are_ignored(self, db_engine):
+        cache = PostgresOCRCache(session_factory=lambda: Session(db_engine),
+                                 max_entries=10, ttl_seconds=60)
+        with Session(db_engine) as db:
+            db.add(OCRTextCache(content_hash="a", extracted_text="stale",
+                                created_at=datetime.utcnow() - timedelta(seconds=120)))
+            db.commit()
+
+        assert cache.get("a") is None
+
+    def test_prunes_to_max_entries(self, db_engine):
+        cache = PostgresOCRCache(session_factory=lambda: Session(db_engine),
+                                 max_entries=2, ttl_seconds=60, prune_every=1)
+        for key in ("a", "b", "c"):
+            cache.set(key, key)
+            time.sleep(0.01)
+
+        with Session(db_engine) as db:
+            keys = sorted(row.content_hash for row in db.exec(select(OCRTextCache)).all())
+        assert keys == ["b", "c"]
+
+    def test_backend_errors_are_treated_as_misses(self):
+        def broken_session():
+            raise RuntimeError("database unavailable")
+
+        cache = PostgresOCRCache(session_factory=broken_session)
+        cache.set("a", "text")
+
+        assert cache.get("a") is None
+        assert cache.misses == 1
+
+
+def test_build_ocr_cache_backends():
+    """Test backend selection by name."""
+    assert isinstance(build_ocr_cache("memory"), InMemoryOCRCache)
+    assert isinstance(build_ocr_cache("none"), NullOCRCache)
@@ -0,0 +1,30 @@
+"""
+Unit tests for pagination cursor helpers.
+"""
+import pytest
+from datetime import datetime
+
+from app.helpers.pagination import encode_cursor, decode_cursor
+
+
+class TestCursor:
+    """Test cursor encoding and decoding."""
+
+    def test_round_trip(self):
+        """Test that a cursor decodes to the position it was built from."""
+        timestamp = datetime(2024, 5, 6, 7, 8, 9, 123456)
+
+        assert decode_cursor(encode_cursor(timestamp, "123456")) == (timestamp, "123456")
+        assert decode_cursor(encode_cursor(timestamp, 42)) == (timestamp, 42)
+
+    def test_cursor_is_url_safe(self):
+        """Test that the token can be sent in a query string as is."""
+        cursor = encode_cursor(datetime(2024, 1, 1), "a/b+c")
+
+        assert all(c.isalnum() or c in "-_" for c in cursor)
+
+    @pytest.mark.parametrize("cursor", ["not-a-cursor", "", "W10"])
+    def test_invalid_cursor(self, cursor):
+        """Test that malformed tokens raise ValueError."""
+        with pytest.raises(ValueError):
+            decode_cursor(cursor)
@@ -0,0 +1,384 @@
+"""
+Unit tests for SAFER web lookup helpers.
+"""
+import threading
+import time
+import pytest
+from datetime import datetime, timedelta
+from unittest.mock import Mock, patch
+from safer.exceptions import CompanySnapshotNotFoundException, SAFERUnreachableException
+from sqlmodel import Session, SQLModel, create_engine
+from sqlalchemy.pool import StaticPool
+
+from app.helpers.cache import TTLCache
+from app.helpers.rate_limit import TokenBucket
+from app.helpers.safer_web import (
+    fetch_safer_snapshot_with_retry,
+    get_cached_safer_lookups,
+    safer_web_lookup_from_dot,
+    safer_web_lookups_from_dots
+)
+from app.models.carrier_census import CarrierCensus
+from app.models.carrier_data import CarrierData
+
+
+@pytest.fixture(autouse=True)
+def fresh_safer_cache():
+    """Give every test an empty in-process SAFER cache."""
+    cache = TTLCache(maxsize=100, ttl_seconds=3600)
+    with patch('app.helpers.safer_web.safer_cache', cache):
+        yield cache
+
+
+@pytest.fixture(autouse=True)
+def unlimited_safer_rate():
+    """Lift the global SAFER rate limit unless a test sets its own."""
+    with patch('app.helpers.safer_web.safer_rate_limiter', TokenBucket(rate_per_second=1000, capacity=1000)):
+        yield
+
+
+@pytest.fixture
+def db_session():
+    """Create a temporary in-memory database for testing."""
+    engine = create_engine("sqlite://",
+                           connect_args={"check_same_thread": False},
+                           poolclass=StaticPool)
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        yield session
+
+
+def make_safer_client(usdot="123456", legal_name="Test Carrier LLC"):
+    """Create a fake CompanySnapshot that returns a minimal company."""
+    company = Mock()
+    company.to_dict.return_value = {
+        "usdot": usdot,
+        "legal_name": legal_name,
+        "operation_classification": ["Auth. For Hire"],
+        "carrier_operation": ["Interstate"],
+        "cargo_carried": ["General Freight"],
+    }
+    client = Mock()
+    client.get_by_usdot_number.return_value = company
+    return client
+
+
+class TestSaferWebLookupFromDot:
+    """Test safer_web_lookup_from_dot function."""
+
+    def test_lookup_success(self):
+        """Test a successful scrape is parsed into CarrierDataCreate."""
+        client = make_safer_client()
+
+        result = safer_web_lookup_from_dot(client, "123456")
+
+        assert result.lookup_success_flag is True
+        assert result.legal_name == "Test Carrier LLC"
+        assert result.operation_classification == "Auth. For Hire"
+        assert result.lookup_timestamp is not None
+        client.get_by_usdot_number.assert_called_once_with(123456)
+
+    def test_repeat_lookup_served_from_memory_cache(self):
+        """Test that a hot DOT number is only scraped once."""
+        client = make_safer_client()
+
+        safer_web_lookup_from_dot(client, "123456")
+        result = safer_web_lookup_from_dot(client, "123456")
+
+        assert result.legal_name == "Test Carrier LLC"
+        client.get_by_usdot_number.assert_called_once()
+
+    def test_fresh_stored_carrier_is_reused(self, db_session):
+        """Test that recent CarrierData is returned without scraping."""
+        db_session.add(CarrierData(usdot="123456", legal_name="Stored Carrier",
+                                   lookup_timestamp=datetime.utcnow() - timedelta(days=1)))
+        db_session.commit()
+        client = make_safer_client()
+
+        result = safer_web_lookup_from_dot(client, "123456", db=db_session)
+
+        assert result.lookup_success_flag is True
+        assert result.legal_name == "Stored Carrier"
+        client.get_by_usdot_number.assert_not_called()
+
+    def test_stale_stored_carrier_is_refreshed(self, db_session):
+        """Test that CarrierData older than the max age is scraped again."""
+        db_session.add(CarrierData(usdot="123456", legal_name="Stored Carrier",
+                                   lookup_timestamp=datetime.utcnow() - timedelta(days=365)))
+        db_session.commit()
+        client = make_safer_client()
+
+        result = safer_web_lookup_from_dot(client, "123456", db=db_session)
+
+        assert result.legal_name == "Test Carrier LLC"
+        client.get_by_usdot_number.assert_called_once()
+
+    def test_census_carrier_is_not_scraped(self, db_session):
+        """Test that a DOT number in the imported census is resolved without scraping."""
+        db_session.add(CarrierCensus(usdot="123456", legal_name="Census Carrier", power_units=3))
+        db_session.commit()
+        client = make_safer_client()
+
+        result = safer_web_lookup_from_dot(client, "123456", db=db_session)
+
+        assert result.lookup_success_flag is True
+        assert result.legal_name == "Census Carrier"
+        assert result.power_units == 3
+        client.get_by_usdot_number.assert_not_called()
+
+    def test_census_does_not_replace_stale_scraped_carrier(self, db_session):
+        """Test that a carrier scraped before is scraped again rather than overwritten from the census."""
+        db_session.add(CarrierData(usdot="123456", legal_name="Stored Carrier",
+                                   lookup_timestamp=datetime.utcnow() - timedelta(days=365)))
+        db_session.add(CarrierCensus(usdot="123456", legal_name="Census Carrier"))
+        db_session.commit()
+        client = make_safer_client()
+
+        result = safer_web_lookup_from_dot(client, "123456", db=db_session)
+
+        assert result.legal_name == "Test Carrier LLC"
+        assert result.lookup_timestamp is not None
+        client.get_by_usdot_number.assert_called_once()
+
+    def test_census_does_not_replace_carrier_stored_before_lookup_timestamp(self, db_session):
+        """Test that a carrier stored before lookup_timestamp existed is scraped, not rebuilt from the census."""
+        db_session.add(CarrierData(usdot="123456", legal_name="Scraped LLC", safety_rating="Satisfactory",
+                                   usa_vehicle_inspections=42, lookup_timestamp=None))
+        db_session.add(CarrierCensus(usdot="123456", legal_name="Census LLC"))
+        db_session.commit()
+        client = make_safer_client()
+
+        assert get_cached_safer_lookups(["123456"], db=db_session) == {}
+        result = safer_web_lookup_from_dot(client, "123456", db=db_session)
+
+        assert result.legal_name == "Test Carrier LLC"
+        client.get_by_usdot_number.assert_called_once()
+
+    def test_census_lookup_disabled_in_safer_mode(self, db_session):
+        """Test that CARRIER_LOOKUP_MODE=safer ignores the census."""
+        db_session.add(CarrierCensus(usdot="123456", legal_name="Census Carrier"))
+        db_session.commit()
+        client = make_safer_client()
+
+        with patch('app.helpers.safer_web.CARRIER_LOOKUP_MODE', "safer"):
+            result = safer_web_lookup_from_dot(client, "123456", db=db_session)
+
+        assert result.legal_name == "Test Carrier LLC"
+        client.get_by_usdot_number.assert_called_once()
+
+    def test_not_found_is_cached_with_negative_ttl(self):
+        """Test that an unknown carrier is cached only for the negative TTL."""
+        client = Mock()
+        client.get_by_usdot_number.side_effect = CompanySnapshotNotFoundException("not found")
+
+        with patch('app.helpers.safer_web.SAFER_NEGATIVE_CACHE_TTL_SECONDS', 0.05):
+            first = safer_web_lookup_from_dot(client, "999999")
+            second = safer_web_lookup_from_dot(client, "999999")
+            time.sleep(0.1)
+            safer_web_lookup_from_dot(client, "999999")
+
+        assert first.lookup_success_flag is False
+        assert second.lookup_success_flag is False
+        assert client.get_by_usdot_number.call_count == 2
+
+    def test_errors_are_not_cached(self):
+        """Test that transient SAFER errors are retried on the next lookup."""
+        client = Mock()
+        client.get_by_usdot_number.side_effect = SAFERUnreachableException("503")
+
+        first = safer_web_lookup_from_dot(client, "123456", max_retries=0)
+        second = safer_web_lookup_from_dot(client, "123456", max_retries=0)
+
+        assert first.lookup_success_flag is False
+        assert second.lookup_success_flag is False
+        assert client.get_by_usdot_number.call_count == 2
+
+
+class FakeCompanySnapshot:
+    """Local stand-in for safer.CompanySnapshot that records concurrency."""
+
+    def __init__(self, delay=0.0, failures=None):
+        self.delay = delay
+        self.failures = dict(failures or {})
+        self.calls = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._lock = threading.Lock()
+
+    def get_by_usdot_number(self, number):
+        self.calls.append(str(number))
+        with self._lock:
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            time.sleep(self.delay)
+            if self.failures.get(str(number)):
+                self.failures[str(number)] -= 1
+                raise SAFERUnreachableException("503")
+            return make_safer_client(usdot=str(number)).get_by_usdot_number(number)
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+
+class TestFetchSaferSnapshotWithRetry:
+    """Test fetch_safer_snapshot_with_retry function."""
+
+    def test_retries_transient_errors(self):
+        """Test that a transient failure is retried with backoff."""
+        client = FakeCompanySnapshot(failures={"123456": 2})
+
+        result = fetch_safer_snapshot_with_retry(client, "123456", max_retries=3, backoff_seconds=0.01)
+
+        assert result.lookup_success_flag is True
+        assert client.calls == ["123456"] * 3
+
+    def test_raises_after_max_retries(self):
+        """Test that the last error is raised once retries are exhausted."""
+        client = FakeCompanySnapshot(failures={"123456": 5})
+
+        with pytest.raises(SAFERUnreachableException):
+            fetch_safer_snapshot_with_retry(client, "123456", max_retries=1, backoff_seconds=0.01)
+
+        assert len(client.calls) == 2
+
+    def test_not_found_is_not_retried(self):
+        """Test that an unknown carrier is a result, not a retryable error."""
+        client = Mock()
+        client.get_by_usdot_number.side_effect = CompanySnapshotNotFoundException("not found")
+
+        result = fetch_safer_snapshot_with_retry(client, "999999", backoff_seconds=0.01)
+
+        assert result.lookup_success_flag is False
+        client.get_by_usdot_number.assert_called_once()
+
+    def test_respects_rate_limit(self):
+        """Test that every attempt takes a token from the global bucket."""
+        client = FakeCompanySnapshot()
+
+        with patch('app.helpers.safer_web.safer_rate_limiter', TokenBucket(rate_per_second=20, capacity=1)):
+            start = time.perf_counter()
+            for dot in ("1", "2", "3", "4"):
+                fetch_safer_snapshot_with_retry(client, dot)
+            elapsed = time.perf_counter() - start
+
+        assert elapsed >= 0.14
+
+
+class TestSaferWebLookupsFromDots:
+    """Test safer_web_lookups_from_dots function."""
+
+    @pytest.mark.asyncio
+    async def test_results_in_input_order_and_deduped(self):
+        """Test that each DOT number is scraped once and results follow the input."""
+        client = FakeCompanySnapshot()
+
+        results = await safer_web_lookups_from_dots(client, ["111111", "222222", "111111"])
+
+        assert [result.usdot for result in results] == ["111111", "222222", "111111"]
+        assert sorted(client.calls) == ["111111", "222222"]
+
+    @pytest.mark.asyncio
+    async def test_runs_concurrently(self):
+        """Test that batch latency tracks the slowest lookup rather than the sum."""
+        client = FakeCompanySnapshot(delay=0.2)
+        dots = [str(100000 + i) for i in range(4)]
+
+        start = time.perf_counter()
+        await safer_web_lookups_from_dots(client, dots, max_concurrency=4)
+        elapsed = time.perf_counter() - start
+
+        assert elapsed < 0.6
+        assert client.max_in_flight > 1
+
+    @pytest.mark.asyncio
+    async def test_respects_max_concurrency(self):
+        """Test that no more than max_concurrency scrapes run at once."""
+        client = FakeCompanySnapshot(delay=0.05)
+        dots = [str(100000 + i) for i in range(6)]
+
+        await safer_web_lookups_from_dots(client, dots, max_concurrency=2)
+
+        assert client.max_in_flight <= 2
+
+    @pytest.mark.asyncio
+    async def test_isolates_failures(self):
+        """Test that a failing DOT number only affects its own result and is not cached."""
+        client = FakeCompanySnapshot(failures={"222222": 10})
+
+        results = await safer_web_lookups_from_dots(client, ["111111", "222222"], max_retries=1)
+
+        assert results[0].lookup_success_flag is True
+        assert results[1].lookup_success_flag is False
+
+        client.failures = {}
+        retried = await safer_web_lookups_from_dots(client, ["222222"])
+        assert retried[0].lookup_success_flag is True
+
+    @pytest.mark.asyncio
+    async def test_uses_cache_and_stored_carriers(self, db_session):
+        """Test that cached and fresh stored carriers are not scraped."""
+        db_session.add(CarrierData(usdot="222222", legal_name="Stored Carrier",
+                                   lookup_timestamp=datetime.utcnow()))
+        db_session.commit()
+        client = FakeCompanySnapshot()
+        await safer_web_lookups_from_dots(client, ["111111"])
+
+        results = await safer_web_lookups_from_dots(client, ["111111", "222222", "333333"], db=db_session)
+
+        assert [result.lookup_success_flag for result in results] == [True, True, True]
+        assert results[1].legal_name == "Stored Carrier"
+        assert client.calls == ["111111", "333333"]
+
+    @pytest.mark.asyncio
+    async def test_scrapes_only_dots_missing_from_census(self, db_session):
+        """Test that SAFER is the fallback for DOT numbers the census does not have."""
+        db_session.add(CarrierCensus(usdot="222222", legal_name="Census Carrier"))
+        db_session.commit()
+        client = FakeCompanySnapshot()
+
+        results = await safer_web_lookups_from_dots(client, ["111111", "222222"], db=db_session)
+
+        assert [result.lookup_success_flag for result in results] == [True, True]
+        assert results[1].legal_name == "Census Carrier"
+        assert client.calls == ["111111"]
+
+    @pytest.mark.asyncio
+    async def test_releases_connection_while_scraping(self, db_session):
+        """Test that the stored carrier reads do not keep a transaction open during the scrape."""
+        in_transaction = []
+        client = make_safer_client("111111")
+        company = client.get_by_usdot_number.return_value
+
+        def scrape(usdot):
+            in_transaction.append(db_session.in_transaction())
+            return company
+
+        client.get_by_usdot_number.side_effect = scrape
+
+        results = await safer_web_lookups_from_dots(client, ["111111"], db=db_session)
+
+        assert results[0].lookup_success_flag is True
+        assert in_transaction == [False]
+
+
+class TestTokenBucket:
+    """Test TokenBucket rate limiter."""
+
+    def test_allows_burst_then_waits(self):
+        """Test that capacity tokens are available immediately and the next one is not."""
+        bucket = TokenBucket(rate_per_second=10, capacity=2)
+
+        assert bucket.try_acquire() == 0
+        assert bucket.try_acquire() == 0
+        assert bucket.try_acquire() > 0
+
+    def test_acquire_blocks_until_refilled(self):
+        """Test that acquire waits for the bucket to refill."""
+        bucket = TokenBucket(rate_per_second=20, capacity=1)
+        bucket.acquire()
+
+        start = time.perf_counter()
+        bucket.acquire()
+
+        assert time.perf_counter() - start >= 0.04
@@ -0,0 +1,189 @@
+"""
+Unit tests for the background upload job queue.
+"""
+import asyncio
+import threading
+import pytest
+from datetime import datetime, timedelta
+from unittest.mock import Mock, patch
+from sqlmodel import Session, SQLModel, create_engine
+from sqlalchemy.pool import StaticPool
+
+from app.crud.upload_job import (
+    create_upload_job,
+    claim_next_upload_job,
+    get_upload_job,
+    get_upload_job_files
+)
+from app.helpers.upload_jobs import UploadJobWorker
+
+
+@pytest.fixture
+def db_engine():
+    """Create a temporary in-memory database for testing."""
+    engine = create_engine("sqlite://",
+                           connect_args={"check_same_thread": False},
+                           poolclass=StaticPool)
+    SQLModel.metadata.create_all(engine)
+    return engine
+
+
+def make_worker(db_engine, process_files, chunk_size=16):
+    """Create a worker bound to the test database without starting its tasks."""
+    worker = UploadJobWorker(workers=1, poll_seconds=0.05, chunk_size=chunk_size, stale_seconds=60)
+    worker.session_factory = lambda: Session(db_engine)
+    worker.process_files = process_files
+    return worker
+
+
+class FakePipeline:
+    """Stand-in for the upload pipeline that records the files of each call."""
+
+    def __init__(self, failing_files=(), raise_error=None):
+        self.failing_files = set(failing_files)
+        self.raise_error = raise_error
+        self.calls = []
+
+    async def __call__(self, db, files, user_id, org_id):
+        self.calls.append([await file.read() for file in files])
+        if self.raise_error:
+            raise self.raise_error
+        return [
+            Exception("no text") if file.filename in self.failing_files
+            else Mock(id=len(self.calls) * 100 + i, dot_reading="123456")
+            for i, file in enumerate(files)
+        ]
+
+
+class TestUploadJobQueue:
+    """Test queueing and claiming upload jobs."""
+
+    def test_create_and_claim_job(self, db_engine):
+        """Test that a queued job is claimed once and marked running."""
+        with Session(db_engine) as db:
+            job = create_upload_job(db, "user", "org",
+                                    files=[("a.jpg", b"a"), ("b.jpg", b"b")],
+                                    invalid_filenames=["c.pdf"])
+
+            claimed = claim_next_upload_job(db, stale_seconds=60)
+
+            assert claimed.id == job.id
+            assert claimed.status == "running"
+            assert claimed.total_files == 2
+            assert claim_next_upload_job(db, stale_seconds=60) is None
+            assert [f.status for f in get_upload_job_files(db, job.id)] == ["pending", "pending", "invalid"]
+
+    def test_stale_running_job_is_reclaimed(self, db_engine):
+        """Test that a job left running by a dead worker is picked up again."""
+        with Session(db_engine) as db:
+            job = create_upload_job(db, "user", "org", files=[("a.jpg", b"a")])
+            claim_next_upload_job(db, stale_seconds=60)
+            job.updated_at = datetime.utcnow() - timedelta(hours=1)
+            db.add(job)
+            db.commit()
+
+            reclaimed = claim_next_upload_job(db, stale_seconds=60)
+
+            assert reclaimed.id == job.id
+
+    def test_get_upload_job_is_org_scoped(self, db_engine):
+        """Test that a job is only visible to its organization."""
+        with Session(db_engine) as db:
+            job = create_upload_job(db, "user", "org", files=[("a.jpg", b"a")])
+
+            assert get_upload_job(db, job.id, "org").id == job.id
+            assert get_upload_job(db, job.id, "other_org") is None
+
+
+class TestUploadJobWorker:
+    """Test UploadJobWorker processing."""
+
+    @pytest.mark.asyncio
+    async def test_processes_job_in_chunks(self, db_engine):
+        """Test that files are processed chunk by chunk and outcomes are recorded per file."""
+        pipeline = FakePipeline(failing_files={"b.jpg"})
+        worker = make_worker(db_engine, pipeline, chunk_size=2)
+        with Session(db_engine) as db:
+            job = create_upload_job(db, "user", "org",
+                                    files=[("a.jpg", b"a"), ("b.jpg", b"b"), ("c.jpg", b"c")])
+
+        assert await worker.run_once() is True
+        assert await worker.run_once() is False
+
+        assert pipeline.calls == [[b"a", b"b"], [b"c"]]
+        with Session(db_engine) as db:
+            job = get_upload_job(db, job.id, "org")
+            job_files = get_upload_job_files(db, job.id)
+            assert job.status == "completed"
+            assert job.processed_files == 3
+            assert job.finished_at is not None
+            assert [f.status for f in job_files] == ["completed", "failed", "completed"]
+            assert job_files[0].ocr_result_id == 100
+            assert job_files[1].error == "no text"
+            assert all(f.content is None for f in job_files)
+
+    @pytest.mark.asyncio
+    async def test_session_calls_run_off_the_event_loop(self, db_engine):
+        """Test that the blocking claim query does not run on the event loop thread."""
+        worker = make_worker(db_engine, FakePipeline())
+        threads = []
+
+        def record_thread(db, stale_seconds):
+            threads.append(threading.current_thread())
+            return None
+
+        with patch('app.helpers.upload_jobs.claim_next_upload_job', side_effect=record_thread):
+            assert await worker.run_once() is False
+
+        assert threads and threads[0] is not threading.main_thread()
+
+    @pytest.mark.asyncio
+    async def test_pipeline_error_fails_only_its_chunk(self, db_engine):
+        """Test that an exception from the pipeline marks the chunk's files failed."""
+        pipeline = FakePipeline(raise_error=Exception("database unavailable"))
+        worker = make_worker(db_engine, pipeline)
+        with Session(db_engine) as db:
+            job = create_upload_job(db, "user", "org", files=[("a.jpg", b"a")])
+
+        await worker.run_once()
+
+        with Session(db_engine) as db:
+            assert get_upload_job(db, job.id, "org").status == "completed"
+            assert get_upload_job_files(db, job.id)[0].error == "database unavailable"
+
+    @pytest.mark.asyncio
+    async def test_resumes_remaining_files(self, db_engine):
+        """Test that a reclaimed job only processes files that are still pending."""
+        pipeline = FakePipeline()
+        worker = make_worker(db_engine, pipeline, chunk_size=1)
+        with Session(db_engine) as db:
+            job = create_upload_job(db, "user", "org", files=[("a.jpg", b"a"), ("b.jpg", b"b")])
+            job_file = get_upload_job_files(db, job.id)[0]
+            job_file.status = "completed"
+            db.add(job_file)
+            db.commit()
+
+        await worker.run_once()
+
+        assert pipeline.calls == [[b"b"]]
+
+    @pytest.mark.asyncio
+    async def test_started_worker_picks_up_notified_job(self, db_engine):
+        """Test that running workers process a job soon after notify."""
+        pipeline = FakePipeline()
+        worker = UploadJobWorker(workers=2, poll_seconds=10, stale_seconds=60)
+        worker.start(session_factory=lambda: Session(db_engine), process_files=pipeline)
+        try:
+            with Session(db_engine) as db:
+                job = create_upload_job(db, "user", "org", files=[("a.jpg", b"a")])
+            worker.notify()
+
+            for _ in range(100):
+                with Session(db_engine) as db:
+                    if get_upload_job(db, job.id, "org").status == "completed":
+                        break
+                await asyncio.sleep(0.01)
+        finally:
+            await worker.stop()
+
+        assert pipeline.calls == [[b"a"]]
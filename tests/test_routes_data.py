@@ -1,11 +1,18 @@
 """
 Unit tests for data routes.
 """
+import json
 import pytest
+from datetime import datetime
+from types import SimpleNamespace
 from unittest.mock import Mock, patch, AsyncMock
 from fastapi import HTTPException
 from fastapi.testclient import TestClient
 from fastapi.responses import JSONResponse
+from io import BytesIO
+from openpyxl import load_workbook
+import pyarrow.parquet as pq
+from sqlmodel import Session
 
 from app.routes.data import (
     fetch_carriers,
@@ -13,8 +20,47 @@ from app.routes.data import (
     fetch_lookup_history,
     update_carrier_interests,
     export_carriers,
+    export_carrier_snapshot,
     export_lookup_history
 )
+from app.models.carrier_data import CarrierData
+from app.models.engagement import CarrierEngagementStatus, CarrierChangeResult
+from app.models.ocr_results import OCRResult
+from app.models.user_org_membership import AppUser, AppOrg
+
+
+def make_carrier_row(usdot="123456", **overrides):
+    """Build a flat carrier dashboard row like get_engagement_rows_async returns."""
+    row = dict(usdot=usdot,
+               created_at=datetime(2023, 1, 1, 12, 0, 0),
+               carrier_interested=False,
+               carrier_contacted=False,
+               carrier_followed_up=False,
+               carrier_follow_up_by_date=None,
+               legal_name=f"Carrier {usdot}",
+               phone="555-000-0000",
+               mailing_address="Address",
+               sf_sync_status=None,
+               sf_sobject_id=None,
+               sf_sync_timestamp=None)
+    row.update(overrides)
+    return SimpleNamespace(**row)
+
+
+def make_lookup_row(dot_reading="123456", **overrides):
+    """Build a flat lookup history row like get_ocr_result_rows_async returns."""
+    row = dict(id=1,
+               dot_reading=dot_reading,
+               timestamp=datetime(2023, 1, 1, 12, 0, 0),
+               filename="image.jpg",
+               carrier_usdot=dot_reading,
+               legal_name=f"Carrier {dot_reading}",
+               phone="555-000-0000",
+               mailing_address="Address",
+               user_email="user@example.com",
+               org_name="Test Org")
+    row.update(overrides)
+    return SimpleNamespace(**row)
 
 
 class TestFetchCarriers:
@@ -24,22 +70,10 @@ class TestFetchCarriers:
     async def test_fetch_carriers_success(self, mock_request, mock_db_session):
         """Test successfully fetching carriers."""
         # Arrange
-        mock_carriers = [Mock() for _ in range(3)]
-        for i, carrier in enumerate(mock_carriers):
-            carrier.usdot = f"12345{i}"
-            carrier.carrier_data.legal_name = f"Carrier {i}"
-            carrier.carrier_data.phone = f"555-000-000{i}"
-            carrier.carrier_data.mailing_address = f"Address {i}"
-            carrier.created_at.strftime.return_value = "2023-01-01 12:00:00"
-            carrier.carrier_interested = False
-            carrier.carrier_contacted = False
-            carrier.carrier_followed_up = False
-            carrier.carrier_follow_up_by_date = None
+        rows = [make_carrier_row(f"12345{i}") for i in range(3)]
         
-        with patch('app.routes.data.get_engagement_data') as mock_get_engagement, \
-             patch('app.routes.data.get_sync_status_for_usdots') as mock_get_sync_status:
-            mock_get_engagement.return_value = mock_carriers
-            mock_get_sync_status.return_value = {}  # No sync status records
+        with patch('app.crud.engagement.get_engagement_rows_async', new_callable=AsyncMock) as mock_get_rows:
+            mock_get_rows.return_value = rows
             
             # Act
             result = await fetch_carriers(
@@ -52,35 +86,28 @@ class TestFetchCarriers:
             )
             
             # Assert
-            assert len(result) == 3
-            mock_get_engagement.assert_called_once_with(
+            assert len(result.items) == 3
+            assert result.items[0].legal_name == "Carrier 123450"
+            assert result.items[0].created_at == "2023-01-01 12:00:00"
+            assert result.next_cursor is None
+            mock_get_rows.assert_awaited_once_with(
                 mock_db_session,
                 org_id='test_org_456',
                 offset=0,
                 carrier_contacted=None,
                 carrier_interested=None,
-                limit=10
+                limit=10,
+                cursor=None
             )
     
     @pytest.mark.asyncio
     async def test_fetch_carriers_with_filters(self, mock_request, mock_db_session):
         """Test fetching carriers with filters applied."""
         # Arrange
-        mock_carriers = [Mock()]
-        mock_carriers[0].usdot = "123456"
-        mock_carriers[0].carrier_data.legal_name = "Interested Carrier"
-        mock_carriers[0].carrier_data.phone = "555-000-0001"
-        mock_carriers[0].carrier_data.mailing_address = "Address 1"
-        mock_carriers[0].created_at.strftime.return_value = "2023-01-01 12:00:00"
-        mock_carriers[0].carrier_interested = True
-        mock_carriers[0].carrier_contacted = True
-        mock_carriers[0].carrier_followed_up = False
-        mock_carriers[0].carrier_follow_up_by_date = None
+        rows = [make_carrier_row(carrier_interested=True, carrier_contacted=True)]
         
-        with patch('app.routes.data.get_engagement_data') as mock_get_engagement, \
-             patch('app.routes.data.get_sync_status_for_usdots') as mock_get_sync_status:
-            mock_get_engagement.return_value = mock_carriers
-            mock_get_sync_status.return_value = {}  # No sync status records
+        with patch('app.crud.engagement.get_engagement_rows_async', new_callable=AsyncMock) as mock_get_rows:
+            mock_get_rows.return_value = rows
             
             # Act
             result = await fetch_carriers(
@@ -93,30 +120,78 @@ class TestFetchCarriers:
             )
             
             # Assert
-            assert len(result) == 1
-            assert result[0].carrier_interested is True
-            assert result[0].carrier_contacted is True
-            mock_get_engagement.assert_called_once_with(
+            assert len(result.items) == 1
+            assert result.items[0].carrier_interested is True
+            assert result.items[0].carrier_contacted is True
+            mock_get_rows.assert_awaited_once_with(
                 mock_db_session,
                 org_id='test_org_456',
                 offset=5,
                 carrier_contacted=True,
                 carrier_interested=True,
-                limit=5
+                limit=5,
+                cursor=None
             )
+
+    @pytest.mark.asyncio
+    async def test_fetch_carriers_with_sync_status(self, mock_request, mock_db_session):
+        """Test that the joined Salesforce sync columns are formatted into the response."""
+        # Arrange
+        rows = [make_carrier_row(sf_sync_status="SUCCESS",
+                                 sf_sobject_id="001D000000K1YFjIAN",
+                                 sf_sync_timestamp=datetime(2023, 2, 3, 4, 5, 6),
+                                 carrier_follow_up_by_date=datetime(2023, 3, 1))]
+
+        with patch('app.crud.engagement.get_engagement_rows_async', new_callable=AsyncMock) as mock_get_rows:
+            mock_get_rows.return_value = rows
+
+            # Act
+            result = await fetch_carriers(mock_request, db=mock_db_session)
+
+            # Assert
+            assert result.items[0].sf_sync_status == "SUCCESS"
+            assert result.items[0].sf_sobject_id == "001D000000K1YFjIAN"
+            assert result.items[0].sf_sync_timestamp == "2023-02-03 04:05:06"
+            assert result.items[0].carrier_follow_up_by_date == "2023-03-01"
     
     @pytest.mark.asyncio
     async def test_fetch_carriers_empty_result(self, mock_request, mock_db_session):
         """Test fetching carriers when no results found."""
         # Arrange
-        with patch('app.routes.data.get_engagement_data') as mock_get_engagement:
-            mock_get_engagement.return_value = []
+        with patch('app.crud.engagement.get_engagement_rows_async', new_callable=AsyncMock) as mock_get_rows:
+            mock_get_rows.return_value = []
             
             # Act
             result = await fetch_carriers(mock_request, db=mock_db_session)
             
             # Assert
-            assert result == []
+            assert result.items == []
+            assert result.next_cursor is None
+
+    @pytest.mark.asyncio
+    async def test_fetch_carriers_follows_cursor(self, mock_request, mock_db_session):
+        """Test that a full page returns a cursor that resumes after its last carrier."""
+        # Arrange
+        rows = [make_carrier_row("123456", created_at=datetime(2024, 1, 2, 3, 4, 5))]
+
+        with patch('app.crud.engagement.get_engagement_rows_async', new_callable=AsyncMock) as mock_get_rows:
+            mock_get_rows.return_value = rows
+
+            # Act
+            first_page = await fetch_carriers(mock_request, limit=1, db=mock_db_session)
+            await fetch_carriers(mock_request, limit=1, cursor=first_page.next_cursor, db=mock_db_session)
+
+            # Assert
+            assert first_page.next_cursor is not None
+            assert mock_get_rows.await_args.kwargs["cursor"] == (datetime(2024, 1, 2, 3, 4, 5), "123456")
+
+    @pytest.mark.asyncio
+    async def test_fetch_carriers_invalid_cursor(self, mock_request, mock_db_session):
+        """Test that a cursor we did not issue is rejected."""
+        # Act & Assert
+        with pytest.raises(HTTPException) as exc_info:
+            await fetch_carriers(mock_request, cursor="not-a-cursor", db=mock_db_session)
+        assert exc_info.value.status_code == 400
 
 
 class TestFetchCarrier:
@@ -160,19 +235,11 @@ class TestFetchLookupHistory:
     async def test_fetch_lookup_history_success(self, mock_request, mock_db_session):
         """Test successfully fetching lookup history."""
         # Arrange
-        mock_results = [Mock() for _ in range(2)]
-        for i, result in enumerate(mock_results):
-            result.dot_reading = f"12345{i}"
-            result.carrier_data.legal_name = f"Carrier {i}"
-            result.carrier_data.phone = f"555-000-000{i}"
-            result.carrier_data.mailing_address = f"Address {i}"
-            result.timestamp.strftime.return_value = "2023-01-01 12:00:00"
-            result.filename = f"image{i}.jpg"
-            result.app_user.user_email = f"user{i}@example.com"
-            result.app_org.org_name = f"Org {i}"
+        rows = [make_lookup_row(f"12345{i}", id=i, user_email=f"user{i}@example.com", org_name=f"Org {i}")
+                for i in range(2)]
         
-        with patch('app.routes.data.get_ocr_results') as mock_get_ocr:
-            mock_get_ocr.return_value = mock_results
+        with patch('app.routes.data.get_ocr_result_rows_async', new_callable=AsyncMock) as mock_get_rows:
+            mock_get_rows.return_value = rows
             
             # Act
             result = await fetch_lookup_history(
@@ -184,39 +251,36 @@ class TestFetchLookupHistory:
             )
             
             # Assert
-            assert len(result) == 2
-            mock_get_ocr.assert_called_once_with(
+            assert len(result.items) == 2
+            assert result.items[1].user_id == "user1@example.com"
+            assert result.items[1].org_id == "Org 1"
+            assert result.next_cursor is None
+            mock_get_rows.assert_awaited_once_with(
                 mock_db_session,
                 org_id='test_org_456',
                 offset=0,
                 limit=10,
                 valid_dot_only=False,
-                eager_relations=True
+                cursor=None
             )
     
     @pytest.mark.asyncio
     async def test_fetch_lookup_history_with_no_carrier_data(self, mock_request, mock_db_session):
         """Test fetching lookup history when carrier data is None."""
         # Arrange
-        mock_result = Mock()
-        mock_result.dot_reading = "123456"
-        mock_result.carrier_data = None  # No carrier data
-        mock_result.timestamp.strftime.return_value = "2023-01-01 12:00:00"
-        mock_result.filename = "image.jpg"
-        mock_result.app_user.user_email = "user@example.com"
-        mock_result.app_org.org_name = "Test Org"
+        row = make_lookup_row(carrier_usdot=None, legal_name=None, phone=None, mailing_address=None)
         
-        with patch('app.routes.data.get_ocr_results') as mock_get_ocr:
-            mock_get_ocr.return_value = [mock_result]
+        with patch('app.routes.data.get_ocr_result_rows_async', new_callable=AsyncMock) as mock_get_rows:
+            mock_get_rows.return_value = [row]
             
             # Act
             result = await fetch_lookup_history(mock_request, db=mock_db_session)
             
             # Assert
-            assert len(result) == 1
-            assert result[0].legal_name == ""
-            assert result[0].phone == ""
-            assert result[0].mailing_address == ""
+            assert len(result.items) == 1
+            assert result.items[0].legal_name == ""
+            assert result.items[0].phone == ""
+            assert result.items[0].mailing_address == ""
 
 
 class TestUpdateCarrierInterests:
@@ -224,25 +288,20 @@ class TestUpdateCarrierInterests:
     
     @pytest.mark.asyncio
     async def test_update_carrier_interests_success(self, mock_request, mock_db_session):
-        """Test successfully updating carrier interests."""
+        """Test that the batch is applied once for the caller's org and results are returned."""
         # Arrange
-        mock_request.json = AsyncMock(return_value={
-            "changes": [
-                {
-                    "usdot": "123456",
-                    "field": "carrier_interested",
-                    "value": True
-                },
-                {
-                    "usdot": "789012",
-                    "field": "carrier_contacted",
-                    "value": True
-                }
-            ]
-        })
+        changes = [
+            {"usdot": "123456", "field": "carrier_interested", "value": True},
+            {"usdot": "789012", "field": "carrier_contacted", "value": True}
+        ]
+        mock_request.json = AsyncMock(return_value={"changes": changes})
         
-        with patch('app.routes.data.update_carrier_engagement') as mock_update:
-            mock_update.return_value = Mock()  # Successful update
+        with patch('app.routes.data.update_carrier_engagements_bulk') as mock_update:
+            mock_update.return_value = [
+                CarrierChangeResult(usdot="123456", field="carrier_interested", status="updated"),
+                CarrierChangeResult(usdot="789012", field="carrier_contacted", status="not_found",
+                                    detail="No engagement record for DOT 789012 in this organization")
+            ]
             
             # Act
             result = await update_carrier_interests(mock_request, mock_db_session)
@@ -250,45 +309,33 @@ class TestUpdateCarrierInterests:
             # Assert
             assert isinstance(result, JSONResponse)
             assert result.status_code == 200
-            assert mock_update.call_count == 2
+            body = json.loads(result.body)
+            assert body["message"] == "1 of 2 changes updated"
+            assert [item["status"] for item in body["results"]] == ["updated", "not_found"]
+            mock_update.assert_called_once_with(mock_db_session, changes, "test_org_456", "test_user_123")
     
     @pytest.mark.asyncio
-    async def test_update_carrier_interests_missing_data(self, mock_request, mock_db_session):
-        """Test updating with missing required data."""
+    async def test_update_carrier_interests_missing_changes(self, mock_request, mock_db_session):
+        """Test that a body without a changes list is rejected."""
         # Arrange
-        mock_request.json = AsyncMock(return_value={
-            "changes": [
-                {
-                    "usdot": "123456",
-                    "field": "carrier_interested"
-                    # Missing 'value' field
-                }
-            ]
-        })
+        mock_request.json = AsyncMock(return_value={"usdot": "123456"})
         
         # Act & Assert
         with pytest.raises(HTTPException) as exc_info:
             await update_carrier_interests(mock_request, mock_db_session)
         
-        # The actual behavior is that this gets caught and converted to 500
-        assert exc_info.value.status_code == 500
+        assert exc_info.value.status_code == 400
     
     @pytest.mark.asyncio
     async def test_update_carrier_interests_database_error(self, mock_request, mock_db_session):
         """Test handling database errors during update."""
         # Arrange
         mock_request.json = AsyncMock(return_value={
-            "changes": [
-                {
-                    "usdot": "123456",
-                    "field": "carrier_interested",
-                    "value": True
-                }
-            ]
+            "changes": [{"usdot": "123456", "field": "carrier_interested", "value": True}]
         })
         
-        with patch('app.routes.data.update_carrier_engagement') as mock_update:
-            mock_update.side_effect = Exception("Database error")
+        with patch('app.routes.data.update_carrier_engagements_bulk') as mock_update:
+            mock_update.side_effect = HTTPException(status_code=500, detail="Database error")
             
             # Act & Assert
             with pytest.raises(HTTPException) as exc_info:
@@ -297,87 +344,186 @@ class TestUpdateCarrierInterests:
             assert exc_info.value.status_code == 500
 
 
+async def read_export(response) -> list[tuple]:
+    """Consume a streamed Excel export and return its rows."""
+    body = b"".join([chunk async for chunk in response.body_iterator])
+    return list(load_workbook(BytesIO(body)).active.iter_rows(values_only=True))
+
+
 class TestExportCarriers:
     """Test export_carriers route."""
     
     @pytest.mark.asyncio
-    async def test_export_carriers_success(self, mock_request, mock_db_session):
+    async def test_export_carriers_success(self, mock_request, sqlite_engine):
         """Test successfully exporting carrier data."""
         # Arrange
-        mock_carriers = [Mock() for _ in range(2)]
-        for i, carrier in enumerate(mock_carriers):
-            carrier.usdot = f"12345{i}"
-            carrier.carrier_data.legal_name = f"Carrier {i}"
-            carrier.carrier_data.phone = f"555-000-000{i}"
-            carrier.carrier_data.mailing_address = f"Address {i}"
-            carrier.created_at.strftime.return_value = "2023-01-01 12:00:00"
-            carrier.carrier_contacted = False
-            carrier.carrier_followed_up = False
-            carrier.carrier_follow_up_by_date = None
-            carrier.carrier_interested = False
-        
-        with patch('app.routes.data.get_engagement_data') as mock_get_engagement:
-            mock_get_engagement.return_value = mock_carriers
-            
-            # Act
-            result = await export_carriers(mock_request, mock_db_session)
-            
-            # Assert
-            assert result.media_type == "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-            assert "carrier_data.xlsx" in result.headers["Content-Disposition"]
-            mock_get_engagement.assert_called_once_with(mock_db_session, org_id='test_org_456')
+        with Session(sqlite_engine) as db:
+            db.add_all(
+                [CarrierData(usdot=f"12345{i}", legal_name=f"Carrier {i}", phone=f"555-000-000{i}",
+                             mailing_address=f"Address {i}") for i in range(2)] +
+                [CarrierEngagementStatus(usdot=f"12345{i}", org_id="test_org_456", user_id="test_user_123",
+                                         created_at=datetime(2023, 1, 1 + i, 12, 0, 0),
+                                         carrier_interested=i == 1,
+                                         carrier_follow_up_by_date=datetime(2023, 2, 1) if i == 1 else None)
+                 for i in range(2)] +
+                [CarrierData(usdot="999999", legal_name="Other Org Carrier"),
+                 CarrierEngagementStatus(usdot="999999", org_id="other_org", user_id="other_user")]
+            )
+            db.commit()
+
+        # Act
+        result = await export_carriers(mock_request, lambda: Session(sqlite_engine), format="xlsx")
+        rows = await read_export(result)
+
+        # Assert
+        assert result.media_type == "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+        assert "carrier_data.xlsx" in result.headers["Content-Disposition"]
+        assert rows[0][0] == "DOT Number"
+        assert rows[1:] == [
+            ("123451", "Carrier 1", "555-000-0001", "Address 1", "2023-01-02 12:00:00",
+             False, False, "2023-02-01", True),
+            ("123450", "Carrier 0", "555-000-0000", "Address 0", "2023-01-01 12:00:00",
+             False, False, None, False),
+        ]
+
+
+class TestExportCarrierSnapshot:
+    """Test export_carrier_snapshot route."""
+
+    @pytest.fixture
+    def engaged_carrier(self, sqlite_engine):
+        """Store one carrier engaged by the test org."""
+        with Session(sqlite_engine) as db:
+            db.add_all([
+                CarrierData(usdot="123456", legal_name="Carrier 0", usa_crashes_fatal=1, safety_rating="Satisfactory"),
+                CarrierEngagementStatus(usdot="123456", org_id="test_org_456", user_id="test_user_123"),
+            ])
+            db.commit()
+
+    @pytest.mark.asyncio
+    async def test_export_all_columns(self, mock_request, sqlite_engine, engaged_carrier):
+        """Test that every CarrierData column is exported by default."""
+        # Act
+        result = await export_carrier_snapshot(mock_request, lambda: Session(sqlite_engine), format="xlsx")
+        rows = await read_export(result)
+
+        # Assert
+        assert "carrier_snapshot.xlsx" in result.headers["Content-Disposition"]
+        assert list(rows[0]) == [column.name for column in CarrierData.__table__.columns]
+        snapshot = dict(zip(rows[0], rows[1]))
+        assert snapshot["usdot"] == "123456"
+        assert snapshot["usa_crashes_fatal"] == 1
+        assert snapshot["safety_rating"] == "Satisfactory"
+
+    @pytest.mark.asyncio
+    async def test_export_selected_columns(self, mock_request, sqlite_engine, engaged_carrier):
+        """Test that the columns parameter picks the exported columns."""
+        # Act
+        result = await export_carrier_snapshot(mock_request, lambda: Session(sqlite_engine),
+                                               format="csv", columns="legal_name, usa_crashes_fatal")
+        body = b"".join([chunk async for chunk in result.body_iterator]).decode()
+
+        # Assert
+        assert body.splitlines() == ["usdot,legal_name,usa_crashes_fatal", "123456,Carrier 0,1"]
+
+    @pytest.mark.asyncio
+    async def test_export_unknown_column(self, mock_request, sqlite_engine):
+        """Test that a column outside CarrierData is rejected."""
+        # Act & Assert
+        with pytest.raises(HTTPException) as exc_info:
+            await export_carrier_snapshot(mock_request, lambda: Session(sqlite_engine),
+                                          format="csv", columns="legal_name,password")
+        assert exc_info.value.status_code == 400
 
 
 class TestExportLookupHistory:
     """Test export_lookup_history route."""
     
     @pytest.mark.asyncio
-    async def test_export_lookup_history_success(self, mock_request, mock_db_session):
-        """Test successfully exporting lookup history."""
+    async def test_export_lookup_history_success(self, mock_request, sqlite_engine):
+        """Test successfully exporting lookup history, including lookups without carrier data."""
         # Arrange
-        mock_results = [Mock() for _ in range(2)]
-        for i, result in enumerate(mock_results):
-            result.dot_reading = f"12345{i}"
-            result.carrier_data.legal_name = f"Carrier {i}"
-            result.carrier_data.phone = f"555-000-000{i}"
-            result.carrier_data.mailing_address = f"Address {i}"
-            result.timestamp.strftime.return_value = "2023-01-01 12:00:00"
-            result.filename = f"image{i}.jpg"
-            result.app_user.user_email = f"user{i}@example.com"
-        
-        with patch('app.routes.data.get_ocr_results') as mock_get_ocr:
-            mock_get_ocr.return_value = mock_results
-            
-            # Act
-            result = await export_lookup_history(mock_request, mock_db_session)
-            
-            # Assert
-            assert result.media_type == "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-            assert "lookup_history.xlsx" in result.headers["Content-Disposition"]
-            mock_get_ocr.assert_called_once_with(
-                mock_db_session,
-                org_id='test_org_456',
-                valid_dot_only=False,
-                eager_relations=True
-            )
-    
+        with Session(sqlite_engine) as db:
+            db.add_all([
+                AppUser(user_id="test_user_123", user_email="user@example.com"),
+                AppOrg(org_id="test_org_456", org_name="Test Org"),
+                CarrierData(usdot="123456", legal_name="Carrier 0", phone="555-000-0000",
+                            mailing_address="Address 0"),
+                OCRResult(dot_reading="123456", filename="image0.jpg", timestamp=datetime(2023, 1, 2, 12, 0, 0),
+                          user_id="test_user_123", org_id="test_org_456"),
+                OCRResult(dot_reading="777777", filename="image1.jpg", timestamp=datetime(2023, 1, 1, 12, 0, 0),
+                          user_id="test_user_123", org_id="test_org_456"),
+            ])
+            db.commit()
+
+        # Act
+        result = await export_lookup_history(mock_request, lambda: Session(sqlite_engine), format="xlsx")
+        rows = await read_export(result)
+
+        # Assert
+        assert result.media_type == "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+        assert "lookup_history.xlsx" in result.headers["Content-Disposition"]
+        assert rows[1:] == [
+            ("123456", "Carrier 0", "555-000-0000", "Address 0", "2023-01-02 12:00:00",
+             "image0.jpg", "user@example.com"),
+            # No carrier data for this DOT reading
+            ("777777", None, None, None, "2023-01-01 12:00:00", "image1.jpg", "user@example.com"),
+        ]
+
     @pytest.mark.asyncio
-    async def test_export_lookup_history_no_carrier_data(self, mock_request, mock_db_session):
-        """Test exporting lookup history when some entries have no carrier data."""
+    async def test_export_lookup_history_csv(self, mock_request, sqlite_engine):
+        """Test exporting lookup history as CSV."""
         # Arrange
-        mock_result = Mock()
-        mock_result.dot_reading = "123456"
-        mock_result.carrier_data = None  # No carrier data
-        mock_result.timestamp.strftime.return_value = "2023-01-01 12:00:00"
-        mock_result.filename = "image.jpg"
-        mock_result.app_user.user_email = "user@example.com"
-        
-        with patch('app.routes.data.get_ocr_results') as mock_get_ocr:
-            mock_get_ocr.return_value = [mock_result]
-            
-            # Act
-            result = await export_lookup_history(mock_request, mock_db_session)
-            
-            # Assert
-            assert result.media_type == "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-            assert "lookup_history.xlsx" in result.headers["Content-Disposition"]
\ No newline at end of file
+        with Session(sqlite_engine) as db:
+            db.add_all([
+                AppUser(user_id="test_user_123", user_email="user@example.com"),
+                AppOrg(org_id="test_org_456", org_name="Test Org"),
+                OCRResult(dot_reading="123456", filename="image0.jpg", timestamp=datetime(2023, 1, 2, 12, 0, 0),
+                          user_id="test_user_123", org_id="test_org_456"),
+            ])
+            db.commit()
+
+        # Act
+        result = await export_lookup_history(mock_request, lambda: Session(sqlite_engine), format="csv")
+        body = b"".join([chunk async for chunk in result.body_iterator]).decode()
+
+        # Assert
+        assert result.media_type == "text/csv"
+        assert "lookup_history.csv" in result.headers["Content-Disposition"]
+        assert body.splitlines() == [
+            "DOT Number,Legal Name,Phone Number,Mailing Address,Created At,Filename,Created By",
+            "123456,,,,2023-01-02 12:00:00,image0.jpg,user@example.com",
+        ]
+
+    @pytest.mark.asyncio
+    async def test_export_lookup_history_parquet(self, mock_request, sqlite_engine):
+        """Test exporting lookup history as Parquet with typed columns."""
+        # Arrange
+        with Session(sqlite_engine) as db:
+            db.add_all([
+                AppUser(user_id="test_user_123", user_email="user@example.com"),
+                AppOrg(org_id="test_org_456", org_name="Test Org"),
+                OCRResult(dot_reading="123456", filename="image0.jpg", timestamp=datetime(2023, 1, 2, 12, 0, 0),
+                          user_id="test_user_123", org_id="test_org_456"),
+            ])
+            db.commit()
+
+        # Act
+        result = await export_lookup_history(mock_request, lambda: Session(sqlite_engine), format="parquet")
+        body = b"".join([chunk async for chunk in result.body_iterator])
+
+        # Assert
+        assert "lookup_history.parquet" in result.headers["Content-Disposition"]
+        assert pq.read_table(BytesIO(body)).to_pylist() == [{
+            "dot_reading": "123456", "legal_name": None, "phone": None, "mailing_address": None,
+            "timestamp": datetime(2023, 1, 2, 12, 0, 0), "filename": "image0.jpg",
+            "user_email": "user@example.com",
+        }]
+
+    @pytest.mark.asyncio
+    async def test_export_unsupported_format(self, mock_request, sqlite_engine):
+        """Test that an unknown export format is rejected."""
+        # Act & Assert
+        with pytest.raises(HTTPException) as exc_info:
+            await export_lookup_history(mock_request, lambda: Session(sqlite_engine), format="pdf")
+        assert exc_info.value.status_code == 400
@@ -2,11 +2,13 @@
 Unit tests for upload routes.
 """
 import pytest
+from datetime import datetime
 from unittest.mock import Mock, patch, AsyncMock
 from fastapi import HTTPException, UploadFile
 from fastapi.responses import JSONResponse
 
-from app.routes.upload import upload_file
+from app.models.upload_job import UploadJobFile
+from app.routes.upload import upload_file, get_upload_job_status
 
 
 class TestUploadFile:
@@ -29,18 +31,18 @@ class TestUploadFile:
             result.id = i + 1
             result.dot_reading = f"12345{i}"
         
-        with patch('app.routes.upload.cloud_ocr_from_image_file', new_callable=AsyncMock) as mock_ocr:
+        with patch('app.routes.upload.batch_cloud_ocr_from_image_files', new_callable=AsyncMock) as mock_ocr:
             with patch('app.routes.upload.generate_dot_record') as mock_generate:
-                with patch('app.routes.upload.safer_web_lookup_from_dot') as mock_safer:
+                with patch('app.routes.upload.safer_web_lookups_from_dots', new_callable=AsyncMock) as mock_safer:
                     with patch('app.routes.upload.save_carrier_data_bulk') as mock_save_carrier:
                         with patch('app.routes.upload.save_ocr_results_bulk') as mock_save_ocr:
                             
-                            mock_ocr.return_value = "USDOT 123456 TEST CARRIER"
+                            mock_ocr.side_effect = lambda client, files: ["USDOT 123456 TEST CARRIER"] * len(files)
                             mock_generate.side_effect = mock_ocr_records
                             
                             mock_safer_data = Mock()
                             mock_safer_data.lookup_success_flag = True
-                            mock_safer.return_value = mock_safer_data
+                            mock_safer.side_effect = lambda client, dots, db=None: [mock_safer_data] * len(dots)
                             
                             mock_save_carrier.return_value = [Mock()]
                             mock_save_ocr.return_value = mock_ocr_results
@@ -53,11 +55,13 @@ class TestUploadFile:
                             assert result.status_code == 200
                             
                             # Verify OCR was called for each file
-                            assert mock_ocr.call_count == 2
+                            mock_ocr.assert_called_once()
+                            assert len(mock_ocr.call_args.args[1]) == 2
                             assert mock_generate.call_count == 2
                             
-                            # Verify safer lookup was called for valid DOT readings
-                            assert mock_safer.call_count == 2
+                            # Verify safer lookup was called once with all valid DOT readings
+                            mock_safer.assert_called_once()
+                            assert mock_safer.call_args.args[1] == ["123450", "123451"]
                             
                             # Verify bulk saves were called
                             mock_save_carrier.assert_called_once()
@@ -78,24 +82,26 @@ class TestUploadFile:
         mock_ocr_result.id = 1
         mock_ocr_result.dot_reading = "123456"
         
-        with patch('app.routes.upload.cloud_ocr_from_image_file', new_callable=AsyncMock) as mock_ocr:
+        with patch('app.routes.upload.batch_cloud_ocr_from_image_files', new_callable=AsyncMock) as mock_ocr:
             with patch('app.routes.upload.generate_dot_record') as mock_generate:
                 with patch('app.routes.upload.save_ocr_results_bulk') as mock_save_ocr:
+                    with patch('app.routes.upload.safer_web_lookups_from_dots', new_callable=AsyncMock) as mock_safer:
                     
-                    mock_ocr.return_value = "USDOT 123456 TEST CARRIER"
-                    mock_generate.return_value = mock_ocr_record
-                    mock_save_ocr.return_value = [mock_ocr_result]
+                        mock_ocr.side_effect = lambda client, files: ["USDOT 123456 TEST CARRIER"] * len(files)
+                        mock_generate.return_value = mock_ocr_record
+                        mock_save_ocr.return_value = [mock_ocr_result]
                     
-                    # Act
-                    result = await upload_file(mock_files, mock_request, mock_db_session)
+                        # Act
+                        result = await upload_file(mock_files, mock_request, mock_db_session)
                     
-                    # Assert
-                    assert isinstance(result, JSONResponse)
-                    assert result.status_code == 200
+                        # Assert
+                        assert isinstance(result, JSONResponse)
+                        assert result.status_code == 200
                     
-                    # Only valid file should be processed
-                    assert mock_ocr.call_count == 1
-                    assert mock_generate.call_count == 1
+                        # Only valid file should be processed
+                        mock_ocr.assert_called_once()
+                        assert mock_ocr.call_args.args[1] == [mock_files[1]]
+                        assert mock_generate.call_count == 1
     
     @pytest.mark.asyncio
     async def test_upload_file_all_invalid_types(self, mock_request, mock_db_session):
@@ -119,8 +125,8 @@ class TestUploadFile:
         mock_files = [Mock(spec=UploadFile)]
         mock_files[0].filename = "test.jpg"
         
-        with patch('app.routes.upload.cloud_ocr_from_image_file', new_callable=AsyncMock) as mock_ocr:
-            mock_ocr.side_effect = Exception("OCR processing failed")
+        with patch('app.routes.upload.batch_cloud_ocr_from_image_files', new_callable=AsyncMock) as mock_ocr:
+            mock_ocr.side_effect = lambda client, files: [Exception("OCR processing failed")] * len(files)
             
             # Act & Assert
             with pytest.raises(HTTPException) as exc_info:
@@ -143,12 +149,12 @@ class TestUploadFile:
         mock_ocr_result.id = 1
         mock_ocr_result.dot_reading = None
         
-        with patch('app.routes.upload.cloud_ocr_from_image_file', new_callable=AsyncMock) as mock_ocr:
+        with patch('app.routes.upload.batch_cloud_ocr_from_image_files', new_callable=AsyncMock) as mock_ocr:
             with patch('app.routes.upload.generate_dot_record') as mock_generate:
                 with patch('app.routes.upload.save_ocr_results_bulk') as mock_save_ocr:
-                    with patch('app.routes.upload.safer_web_lookup_from_dot') as mock_safer:
+                    with patch('app.routes.upload.safer_web_lookups_from_dots', new_callable=AsyncMock) as mock_safer:
                         
-                        mock_ocr.return_value = "NO DOT NUMBER FOUND"
+                        mock_ocr.side_effect = lambda client, files: ["NO DOT NUMBER FOUND"] * len(files)
                         mock_generate.return_value = mock_ocr_record
                         mock_save_ocr.return_value = [mock_ocr_result]
                         
@@ -179,12 +185,12 @@ class TestUploadFile:
         mock_ocr_result.id = 1
         mock_ocr_result.dot_reading = "0000000"
         
-        with patch('app.routes.upload.cloud_ocr_from_image_file', new_callable=AsyncMock) as mock_ocr:
+        with patch('app.routes.upload.batch_cloud_ocr_from_image_files', new_callable=AsyncMock) as mock_ocr:
             with patch('app.routes.upload.generate_dot_record') as mock_generate:
                 with patch('app.routes.upload.save_ocr_results_bulk') as mock_save_ocr:
-                    with patch('app.routes.upload.safer_web_lookup_from_dot') as mock_safer:
+                    with patch('app.routes.upload.safer_web_lookups_from_dots', new_callable=AsyncMock) as mock_safer:
                         
-                        mock_ocr.return_value = "USDOT 0000000"
+                        mock_ocr.side_effect = lambda client, files: ["USDOT 0000000"] * len(files)
                         mock_generate.return_value = mock_ocr_record
                         mock_save_ocr.return_value = [mock_ocr_result]
                         
@@ -212,17 +218,17 @@ class TestUploadFile:
         mock_ocr_result.id = 1
         mock_ocr_result.dot_reading = "123456"
         
-        with patch('app.routes.upload.cloud_ocr_from_image_file', new_callable=AsyncMock) as mock_ocr:
+        with patch('app.routes.upload.batch_cloud_ocr_from_image_files', new_callable=AsyncMock) as mock_ocr:
             with patch('app.routes.upload.generate_dot_record') as mock_generate:
-                with patch('app.routes.upload.safer_web_lookup_from_dot') as mock_safer:
+                with patch('app.routes.upload.safer_web_lookups_from_dots', new_callable=AsyncMock) as mock_safer:
                     with patch('app.routes.upload.save_ocr_results_bulk') as mock_save_ocr:
                         
-                        mock_ocr.return_value = "USDOT 123456 TEST CARRIER"
+                        mock_ocr.side_effect = lambda client, files: ["USDOT 123456 TEST CARRIER"] * len(files)
                         mock_generate.return_value = mock_ocr_record
                         
                         mock_safer_data = Mock()
                         mock_safer_data.lookup_success_flag = False  # Lookup failed
-                        mock_safer.return_value = mock_safer_data
+                        mock_safer.side_effect = lambda client, dots, db=None: [mock_safer_data] * len(dots)
                         
                         mock_save_ocr.return_value = [mock_ocr_result]
                         
@@ -260,24 +266,26 @@ class TestUploadFile:
             result.id = i + 1
             result.dot_reading = f"12345{i}"
         
-        with patch('app.routes.upload.cloud_ocr_from_image_file', new_callable=AsyncMock) as mock_ocr:
+        with patch('app.routes.upload.batch_cloud_ocr_from_image_files', new_callable=AsyncMock) as mock_ocr:
             with patch('app.routes.upload.generate_dot_record') as mock_generate:
                 with patch('app.routes.upload.save_ocr_results_bulk') as mock_save_ocr:
+                    with patch('app.routes.upload.safer_web_lookups_from_dots', new_callable=AsyncMock) as mock_safer:
                     
-                    mock_ocr.return_value = "USDOT 123456 TEST CARRIER"
-                    mock_generate.side_effect = mock_ocr_records
-                    mock_save_ocr.return_value = mock_ocr_results
+                        mock_ocr.side_effect = lambda client, files: ["USDOT 123456 TEST CARRIER"] * len(files)
+                        mock_generate.side_effect = mock_ocr_records
+                        mock_save_ocr.return_value = mock_ocr_results
                     
-                    # Act
-                    result = await upload_file(mock_files, mock_request, mock_db_session)
+                        # Act
+                        result = await upload_file(mock_files, mock_request, mock_db_session)
                     
-                    # Assert
-                    assert isinstance(result, JSONResponse)
-                    assert result.status_code == 200
+                        # Assert
+                        assert isinstance(result, JSONResponse)
+                        assert result.status_code == 200
                     
-                    # Only valid files should be processed
-                    assert mock_ocr.call_count == len(valid_extensions)
-                    assert mock_generate.call_count == len(valid_extensions)
+                        # Only valid files should be processed
+                        mock_ocr.assert_called_once()
+                        assert len(mock_ocr.call_args.args[1]) == len(valid_extensions)
+                        assert mock_generate.call_count == len(valid_extensions)
     
     @pytest.mark.asyncio
     async def test_upload_file_session_data_extraction(self, mock_db_session):
@@ -301,23 +309,24 @@ class TestUploadFile:
         mock_ocr_result.id = 1
         mock_ocr_result.dot_reading = "123456"
         
-        with patch('app.routes.upload.cloud_ocr_from_image_file', new_callable=AsyncMock) as mock_ocr:
+        with patch('app.routes.upload.batch_cloud_ocr_from_image_files', new_callable=AsyncMock) as mock_ocr:
             with patch('app.routes.upload.generate_dot_record') as mock_generate:
                 with patch('app.routes.upload.save_ocr_results_bulk') as mock_save_ocr:
+                    with patch('app.routes.upload.safer_web_lookups_from_dots', new_callable=AsyncMock) as mock_safer:
                     
-                    mock_ocr.return_value = "USDOT 123456"
-                    mock_generate.return_value = mock_ocr_record
-                    mock_save_ocr.return_value = [mock_ocr_result]
+                        mock_ocr.side_effect = lambda client, files: ["USDOT 123456"] * len(files)
+                        mock_generate.return_value = mock_ocr_record
+                        mock_save_ocr.return_value = [mock_ocr_result]
                     
-                    # Act
-                    result = await upload_file(mock_files, mock_request, mock_db_session)
+                        # Act
+                        result = await upload_file(mock_files, mock_request, mock_db_session)
                     
-                    # Assert
-                    assert isinstance(result, JSONResponse)
-                    assert result.status_code == 200
+                        # Assert
+                        assert isinstance(result, JSONResponse)
+                        assert result.status_code == 200
                     
-                    # Verify the OCRResultCreate was called with correct user/org IDs
-                    mock_generate.assert_called_once()
+                        # Verify the OCRResultCreate was called with correct user/org IDs
+                        mock_generate.assert_called_once()
     
     @pytest.mark.asyncio
     async def test_upload_file_default_org_id(self, mock_db_session):
@@ -341,17 +350,163 @@ class TestUploadFile:
         mock_ocr_result.id = 1
         mock_ocr_result.dot_reading = "123456"
         
-        with patch('app.routes.upload.cloud_ocr_from_image_file', new_callable=AsyncMock) as mock_ocr:
+        with patch('app.routes.upload.batch_cloud_ocr_from_image_files', new_callable=AsyncMock) as mock_ocr:
+            with patch('app.routes.upload.generate_dot_record') as mock_generate:
+                with patch('app.routes.upload.save_ocr_results_bulk') as mock_save_ocr:
+                    with patch('app.routes.upload.safer_web_lookups_from_dots', new_callable=AsyncMock) as mock_safer:
+                    
+                        mock_ocr.side_effect = lambda client, files: ["USDOT 123456"] * len(files)
+                        mock_generate.return_value = mock_ocr_record
+                        mock_save_ocr.return_value = [mock_ocr_result]
+                    
+                        # Act
+                        result = await upload_file(mock_files, mock_request, mock_db_session)
+                    
+                        # Assert
+                        assert isinstance(result, JSONResponse)
+                        assert result.status_code == 200
+    
+    @pytest.mark.asyncio
+    async def test_upload_file_isolates_per_file_ocr_errors(self, mock_request, mock_db_session):
+        """Test that one failed or timed out image does not drop the rest of the batch."""
+        # Arrange
+        mock_files = [Mock(spec=UploadFile) for _ in range(3)]
+        for i, mock_file in enumerate(mock_files):
+            mock_file.filename = f"test{i}.jpg"
+        
+        with patch('app.routes.upload.batch_cloud_ocr_from_image_files', new_callable=AsyncMock) as mock_ocr:
             with patch('app.routes.upload.generate_dot_record') as mock_generate:
                 with patch('app.routes.upload.save_ocr_results_bulk') as mock_save_ocr:
                     
-                    mock_ocr.return_value = "USDOT 123456"
-                    mock_generate.return_value = mock_ocr_record
-                    mock_save_ocr.return_value = [mock_ocr_result]
+                    mock_ocr.return_value = ["USDOT 111111", TimeoutError(), "USDOT 333333"]
+                    mock_generate.side_effect = lambda record: Mock(dot_reading=None,
+                                                                    extracted_text=record.extracted_text)
+                    mock_save_ocr.side_effect = lambda db, records: [Mock(id=i + 1, dot_reading=record.dot_reading)
+                                                                     for i, record in enumerate(records)]
                     
                     # Act
                     result = await upload_file(mock_files, mock_request, mock_db_session)
                     
                     # Assert
-                    assert isinstance(result, JSONResponse)
-                    assert result.status_code == 200
\ No newline at end of file
+                    assert result.status_code == 200
+                    saved_texts = [record.extracted_text for record in mock_save_ocr.call_args.args[1]]
+                    assert saved_texts == ["USDOT 111111", "USDOT 333333"]
+                    assert b'"valid_files":["test0.jpg","test2.jpg"]' in result.body
+    
+    @pytest.mark.asyncio
+    async def test_upload_file_skips_all_zero_orphan_readings(self, mock_request, mock_db_session):
+        """Test that orphan readings are not looked up and valid ones go in one batch."""
+        # Arrange
+        mock_files = [Mock(spec=UploadFile) for _ in range(3)]
+        for i, mock_file in enumerate(mock_files):
+            mock_file.filename = f"test{i}.jpg"
+        
+        mock_ocr_records = [Mock(dot_reading=dot) for dot in ("123456", "00000000", "123456")]
+        
+        with patch('app.routes.upload.batch_cloud_ocr_from_image_files', new_callable=AsyncMock) as mock_ocr:
+            with patch('app.routes.upload.generate_dot_record') as mock_generate:
+                with patch('app.routes.upload.safer_web_lookups_from_dots', new_callable=AsyncMock) as mock_safer:
+                    with patch('app.routes.upload.save_ocr_results_bulk') as mock_save_ocr:
+                        
+                        mock_ocr.side_effect = lambda client, files: ["USDOT 123456"] * len(files)
+                        mock_generate.side_effect = mock_ocr_records
+                        mock_safer.side_effect = lambda client, dots, db=None: [Mock(lookup_success_flag=False)] * len(dots)
+                        mock_save_ocr.side_effect = lambda db, records: [Mock(id=i + 1, dot_reading=record.dot_reading)
+                                                                         for i, record in enumerate(records)]
+                        
+                        # Act
+                        result = await upload_file(mock_files, mock_request, mock_db_session)
+                        
+                        # Assert
+                        assert result.status_code == 200
+                        mock_safer.assert_called_once()
+                        assert mock_safer.call_args.args[1] == ["123456", "123456"]
+
+
+class TestUploadJobs:
+    """Test upload job routes."""
+    
+    @pytest.mark.asyncio
+    async def test_upload_file_async_job_queues_files(self, mock_request, mock_db_session):
+        """Test that job mode stores the images and returns a job id without processing."""
+        # Arrange
+        mock_files = [Mock(spec=UploadFile), Mock(spec=UploadFile)]
+        mock_files[0].filename = "test.jpg"
+        mock_files[0].read = AsyncMock(return_value=b"image bytes")
+        mock_files[1].filename = "document.pdf"
+        
+        with patch('app.routes.upload.create_upload_job') as mock_create_job:
+            with patch('app.routes.upload.upload_job_worker') as mock_worker:
+                with patch('app.routes.upload.batch_cloud_ocr_from_image_files', new_callable=AsyncMock) as mock_ocr:
+                    
+                    mock_create_job.return_value = Mock(id=42)
+                    
+                    # Act
+                    result = await upload_file(mock_files, mock_request, mock_db_session, async_job=True)
+                    
+                    # Assert
+                    assert result.status_code == 202
+                    assert b'"job_id":42' in result.body
+                    assert b'"status_url":"/upload/jobs/42"' in result.body
+                    
+                    mock_create_job.assert_called_once()
+                    assert mock_create_job.call_args.kwargs["files"] == [("test.jpg", b"image bytes")]
+                    assert mock_create_job.call_args.kwargs["invalid_filenames"] == ["document.pdf"]
+                    mock_worker.notify.assert_called_once()
+                    mock_ocr.assert_not_called()
+    
+    @pytest.mark.asyncio
+    async def test_upload_file_async_job_rejects_invalid_types(self, mock_request, mock_db_session):
+        """Test that a job with no supported images is not queued."""
+        # Arrange
+        mock_files = [Mock(spec=UploadFile)]
+        mock_files[0].filename = "document.pdf"
+        
+        with patch('app.routes.upload.create_upload_job') as mock_create_job:
+            
+            # Act & Assert
+            with pytest.raises(HTTPException) as exc_info:
+                await upload_file(mock_files, mock_request, mock_db_session, async_job=True)
+            
+            assert exc_info.value.status_code == 400
+            mock_create_job.assert_not_called()
+    
+    def test_get_upload_job_status(self, mock_request, mock_db_session):
+        """Test reporting per-file progress and result IDs of a job."""
+        # Arrange
+        mock_job = Mock(id=42, status="running", total_files=2, processed_files=1, error=None,
+                        created_at=datetime(2024, 1, 1, 12, 0, 0), finished_at=None)
+        job_files = [
+            UploadJobFile(job_id=42, position=0, filename="a.jpg", status="completed",
+                          ocr_result_id=7, dot_reading="123456"),
+            UploadJobFile(job_id=42, position=1, filename="b.jpg", status="pending"),
+            UploadJobFile(job_id=42, position=2, filename="c.pdf", status="invalid"),
+        ]
+        
+        with patch('app.routes.upload.get_upload_job') as mock_get_job:
+            with patch('app.routes.upload.get_upload_job_files') as mock_get_files:
+                
+                mock_get_job.return_value = mock_job
+                mock_get_files.return_value = job_files
+                
+                # Act
+                result = get_upload_job_status(42, mock_request, mock_db_session)
+                
+                # Assert
+                mock_get_job.assert_called_once_with(mock_db_session, 42, "test_org_456")
+                assert result.status == "running"
+                assert result.processed_files == 1
+                assert [file.status for file in result.files] == ["completed", "pending", "invalid"]
+                assert result.result_ids == [{"id": 7, "dot_reading": "123456"}]
+                assert result.valid_files == ["a.jpg"]
+                assert result.invalid_files == ["c.pdf"]
+    
+    def test_get_upload_job_status_not_found(self, mock_request, mock_db_session):
+        """Test that jobs of other organizations are not found."""
+        with patch('app.routes.upload.get_upload_job', return_value=None):
+            
+            # Act & Assert
+            with pytest.raises(HTTPException) as exc_info:
+                get_upload_job_status(42, mock_request, mock_db_session)
+            
+            assert exc_info.value.status_code == 404